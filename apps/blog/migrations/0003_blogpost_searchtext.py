@@ -0,0 +1,28 @@
+# Generated by Django 4.0.3 on 2026-10-17 22:05
+
+from django.db import migrations, models
+from apps.search.service.normalizer_service import TextNormalizer
+
+
+def fill_search_text(apps, schema_editor):
+    """متن جستجوی پست‌های موجود"""
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    for post in BlogPost.objects.only('id', 'title', 'content', 'description').iterator():
+        post.searchText = TextNormalizer.search_text(post.title, post.content, post.description)
+        post.save(update_fields=['searchText'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='searchText',
+            field=models.TextField(blank=True, editable=False, verbose_name='متن جستجو'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+    ]
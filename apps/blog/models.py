@@ -4,6 +4,7 @@ from django.utils.text import slugify
 from apps.product.models import Product
 from apps.user.models.user import CustomUser
 from ckeditor_uploader.fields import RichTextUploadingField
+from apps.search.service.normalizer_service import TextNormalizer
 
 
 # ========================
@@ -61,6 +62,9 @@ class BlogPost(models.Model):
     publishedAt = models.DateTimeField(null=True, blank=True, verbose_name="تاریخ انتشار")
     isActive = models.BooleanField(default=True, verbose_name="فعال")
 
+    # عنوان، محتوا و توضیحات یکسان شده با TextNormalizer برای جستجو
+    searchText = models.TextField(blank=True, editable=False, verbose_name="متن جستجو")
+
     class Meta:
         verbose_name = "پست بلاگ"
         verbose_name_plural = "پست‌های بلاگ"
@@ -69,6 +73,7 @@ class BlogPost(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title, allow_unicode=True)
+        self.searchText = TextNormalizer.search_text(self.title, self.content, self.description)
         super().save(*args, **kwargs)
 
     def __str__(self):
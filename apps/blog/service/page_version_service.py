@@ -0,0 +1,59 @@
+from django.db.models import Count, Max
+from django.utils import timezone
+from utils import build_etag, get_cache_versions, request_viewer
+from apps.product.service.category_service import CategoryTreeService
+from ..models import BlogPost
+
+
+class BlogPageVersion:
+    """
+    نسخه محتوای صفحه پست بلاگ برای GET شرطی (ETag / Last-Modified)
+    از تاریخ بروزرسانی پست، آخرین تغییر و تعداد کامنت‌ها و نسخه مشترک پست‌ها/منو
+    """
+
+    # پست‌های مرتبط و سایدبار دسته‌ها (signals بلاگ) + منوی دسته‌بندی محصولات
+    CACHE_NAME = 'blog_posts'
+    SHARED_VERSIONS = (CACHE_NAME, CategoryTreeService.CACHE_NAME)
+
+    @staticmethod
+    def get(request, slug):
+        """{'etag', 'last_modified'} یا None اگر پست منتشر شده‌ای با این slug نباشد (یک بار در هر درخواست)"""
+        cache_attr = '_blog_page_version'
+        if not hasattr(request, cache_attr):
+            setattr(request, cache_attr, BlogPageVersion._build(request, slug))
+        return getattr(request, cache_attr)
+
+    @staticmethod
+    def _build(request, slug):
+        row = BlogPost.objects.filter(
+            slug=slug,
+            isActive=True,
+            publishedAt__isnull=False,
+            publishedAt__lte=timezone.now()
+        ).values('id', 'updatedAt').annotate(
+            comments_updated=Max('comments__updatedAt'),
+            comments_count=Count('comments'),
+        ).order_by().first()
+        if row is None:
+            return None
+
+        versions = get_cache_versions(BlogPageVersion.SHARED_VERSIONS)
+        timestamps = [row['updatedAt'], row['comments_updated']]
+        return {
+            'etag': build_etag(
+                'blog', row['id'], *timestamps, row['comments_count'],
+                *(versions[name] for name in BlogPageVersion.SHARED_VERSIONS),
+                request_viewer(request),
+            ),
+            'last_modified': max(timestamp for timestamp in timestamps if timestamp is not None),
+        }
+
+    @staticmethod
+    def etag(request, slug):
+        version = BlogPageVersion.get(request, slug)
+        return version['etag'] if version else None
+
+    @staticmethod
+    def last_modified(request, slug):
+        version = BlogPageVersion.get(request, slug)
+        return version['last_modified'] if version else None
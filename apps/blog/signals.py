@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from utils import bump_cache_version
+from .models import BlogPost, BlogCategory
+from .service.page_version_service import BlogPageVersion
+
+
+# ========================
+# نسخه مشترک صفحه‌های پست (پست‌های مرتبط و سایدبار دسته‌ها)
+# ========================
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+def bump_blog_pages_version(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_cache_version(BlogPageVersion.CACHE_NAME))
@@ -2,10 +2,12 @@ from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, condition
 from django.utils import timezone
-from django.db import models
+from django.db.models import F
+from apps.search.service.normalizer_service import TextNormalizer
 from .models import BlogPost, BlogComment, BlogCategory
+from .service.page_version_service import BlogPageVersion
 
 
 def get_latest_blogs():
@@ -54,13 +56,9 @@ def blog_list(request):
     if category_slug:
         blogs = blogs.filter(category__slug=category_slug)
 
-    # جستجو در عنوان و محتوا
+    # جستجو در عنوان، محتوا و توضیحات (متن یکسان شده با TextNormalizer)
     if search_query:
-        blogs = blogs.filter(
-            models.Q(title__icontains=search_query) |
-            models.Q(content__icontains=search_query) |
-            models.Q(excerpt__icontains=search_query)
-        )
+        blogs = blogs.filter(TextNormalizer.match_q('searchText', search_query))
 
     # مرتب‌سازی
     blogs = blogs.order_by('-publishedAt')
@@ -86,7 +84,21 @@ def blog_list(request):
 def blog_detail(request, slug):
     """
     صفحه جزئیات پست بلاگ
+    بازدید همیشه شمرده می‌شود، حتی اگر صفحه با 304 از کش مرورگر نمایش داده شود
     """
+    # افزایش تعداد بازدید (update بدون تغییر updatedAt و بدون سیگنال)
+    BlogPost.objects.filter(
+        slug=slug,
+        isActive=True,
+        publishedAt__isnull=False,
+        publishedAt__lte=timezone.now()
+    ).update(view_count=F('view_count') + 1)
+
+    return _render_blog_detail(request, slug)
+
+
+@condition(etag_func=BlogPageVersion.etag, last_modified_func=BlogPageVersion.last_modified)
+def _render_blog_detail(request, slug):
     # دریافت پست بلاگ
     blog = get_object_or_404(
         BlogPost.objects.select_related('author', 'category').prefetch_related(
@@ -98,10 +110,6 @@ def blog_detail(request, slug):
         publishedAt__lte=timezone.now()
     )
 
-    # افزایش تعداد بازدید
-    blog.view_count += 1
-    blog.save(update_fields=['view_count'])
-
     # کامنت‌های فعال
     comments = blog.comments.filter(isActive=True).order_by('createdAt')
 
@@ -109,6 +109,10 @@ class Notification(models.Model):
         verbose_name = "اعلان"
         verbose_name_plural = "اعلان‌ها"
         ordering = ['-created_at']
+        indexes = [
+            # اعلان‌های (خوانده نشده) کاربر به ترتیب تاریخ
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notification_user_read_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.title}"
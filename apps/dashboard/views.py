@@ -12,7 +12,7 @@ def loadDashboard(request):
     orders = (
         Order.objects.filter(customer=request.user)
         .order_by("-registerDate")
-        .prefetch_related("details", "address__state", "address__city")
+        .prefetch_related("details__product", "address__state", "address__city")
     )
 
     context = {
@@ -31,7 +31,7 @@ def orders_page(request):
     qs = (
         Order.objects.filter(customer=request.user)
         .order_by("-registerDate")
-        .prefetch_related("details", "address__state", "address__city")
+        .prefetch_related("details__product", "address__state", "address__city")
     )
 
     # Filters
@@ -147,20 +147,26 @@ def check_favorite(request, product_id):
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from apps.product.models import ProductSaleType
+from django.db.models import Prefetch
+from apps.product.models import ProductGallery, ProductSaleType
 from .models import Favorite
 
 @login_required
 def favorite_list(request):
     # دریافت علاقه‌مندی‌های کاربر با اطلاعات کامل محصول
-    favorites = Favorite.objects.filter(user=request.user).select_related('product')
+    # (خلاصه نظرات، انواع فروش فعال و تصاویر فعال همه محصولات با چند کوئری ثابت)
+    favorites = Favorite.objects.filter(user=request.user).select_related(
+        'product', 'product__reviewSummary'
+    ).prefetch_related(
+        Prefetch('product__saleTypes', queryset=ProductSaleType.objects.filter(isActive=True).order_by('pk'),
+                 to_attr='active_sale_types'),
+        Prefetch('product__galleries', queryset=ProductGallery.objects.filter(isActive=True),
+                 to_attr='active_galleries'),
+    )
 
     # برای هر محصول، اولین نوع فروش فعال را پیدا می‌کنیم
     for favorite in favorites:
-        sale_type = ProductSaleType.objects.filter(
-            product=favorite.product,
-            isActive=True
-        ).first()
+        sale_type = next(iter(favorite.product.active_sale_types), None)
 
         # اضافه کردن قیمت به context محصول
         if sale_type:
@@ -172,8 +178,8 @@ def favorite_list(request):
 
         # بررسی تصاویر محصول
         favorite.product.primary_image = favorite.product.mainImage
-        galleries = favorite.product.galleries.filter(isActive=True)
-        favorite.product.secondary_image = galleries.first().image if galleries.exists() else favorite.product.mainImage
+        galleries = favorite.product.active_galleries
+        favorite.product.secondary_image = galleries[0].image if galleries else favorite.product.mainImage
 
     return render(request, 'dashboard_app/favorites/favorite_list.html', {'favorites': favorites})
 
@@ -412,6 +418,9 @@ def notifications_page(request):
         # ریفرش کوئری‌ست برای دریافت داده‌های به‌روز شده
         notifications = Notification.objects.filter(user=request.user)
 
+    # سفارش هر اعلان در قالب نمایش داده می‌شود
+    notifications = notifications.select_related('order')
+
     return render(request, 'dashboard_app/notifications/notifications.html', {
         'notifications': notifications,
         'unread_count': 0  # پس از بروزرسانی، همه خوانده شده‌اند
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('discount', '0003_alter_copon_enddate_alter_copon_startdate_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='discountbasket',
+            index=models.Index(fields=['isActive', 'startDate', 'endDate'], name='discount_basket_active_idx'),
+        ),
+    ]
@@ -32,6 +32,10 @@ class DiscountBasket(models.Model):
     class Meta:
         verbose_name = ' سبد تخفیف '
         verbose_name_plural =  'سبد تخفیف ها '
+        indexes = [
+            # سبدهای فعال در بازه زمانی جاری (صفحه اصلی و شگفت انگیزها)
+            models.Index(fields=['isActive', 'startDate', 'endDate'], name='discount_basket_active_idx'),
+        ]
 
 
 class DiscountDetail(models.Model):
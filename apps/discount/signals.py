@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import DiscountBasket, DiscountDetail
+from apps.product.service.pricing_service import PricingService
+
+
+# ========================
+# بروزرسانی جدول قیمت محصولات (ProductPricing)
+# ========================
+@receiver(post_save, sender=DiscountBasket)
+def refresh_basket_pricing(sender, instance, **kwargs):
+    """تغییر درصد/بازه/وضعیت سبد روی قیمت همه محصولات آن اثر دارد"""
+    basket_id = instance.pk
+    transaction.on_commit(lambda: PricingService.refresh_basket(basket_id))
+
+
+@receiver(post_save, sender=DiscountDetail)
+@receiver(post_delete, sender=DiscountDetail)
+def refresh_detail_pricing(sender, instance, **kwargs):
+    """افزودن/حذف محصول از سبد تخفیف (حذف سبد هم به حذف آبشاری جزئیات می‌رسد)"""
+    product_id = instance.product_id
+    transaction.on_commit(lambda: PricingService.refresh(product_id))
@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from apps.main.service.image_service import ImageDerivativeService
+from apps.main.service.home_service import HomePageService
+
+
+class Command(BaseCommand):
+    help = 'ساخت نسخه‌های کوچک‌شده و WebP تصاویر موجود (محصول، گالری، اسلایدر و بنر)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=list(ImageDerivativeService.IMAGE_FIELDS),
+                            help='فقط یک مدل (مثلاً product.Product)')
+        parser.add_argument('--force', action='store_true', help='ساخت مجدد حتی اگر نسخه‌ها موجود باشند')
+        parser.add_argument('--async', action='store_true', dest='use_queue',
+                            help='به جای ساخت همزمان، تسک‌ها را در صف سلری قرار بده')
+
+    def handle(self, *args, **options):
+        from apps.main.tasks import generate_image_derivatives
+
+        labels = [options['model']] if options['model'] else list(ImageDerivativeService.IMAGE_FIELDS)
+        total = 0
+        for label in labels:
+            model = apps.get_model(label)
+            for field_name in ImageDerivativeService.IMAGE_FIELDS[label]:
+                variants_field = ImageDerivativeService.variants_field(field_name)
+                rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for pk, name, variants in rows.values_list('pk', field_name, variants_field).iterator():
+                    if not options['force'] and (variants or {}).get('source') == name:
+                        continue
+                    if options['use_queue']:
+                        generate_image_derivatives.delay(label, pk, field_name)
+                        total += 1
+                    else:
+                        total += ImageDerivativeService.generate(
+                            label, pk, field_name, force=options['force'], invalidate=False
+                        )
+
+        if not options['use_queue']:
+            HomePageService.invalidate(HomePageService.TAG_PRODUCTS, HomePageService.TAG_SLIDERS)
+        word = 'تسک در صف قرار گرفت' if options['use_queue'] else 'نسخه تصویر ساخته شد'
+        self.stdout.write(self.style.SUCCESS(f'{total} {word}'))
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_alter_banner_imagename_alter_slidermain_imagename_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banner',
+            name='imageNameVariants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='نسخه\u200cهای عکس بنر'),
+        ),
+        migrations.AddField(
+            model_name='slidermain',
+            name='imageNameVariants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='نسخه\u200cهای عکس اسلایدر'),
+        ),
+        migrations.AddField(
+            model_name='slidersite',
+            name='imageMobileVariants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='نسخه\u200cهای عکس موبایل'),
+        ),
+        migrations.AddField(
+            model_name='slidersite',
+            name='imageNameVariants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='نسخه\u200cهای عکس اسلایدر'),
+        ),
+    ]
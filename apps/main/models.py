@@ -13,6 +13,8 @@ class SliderSite(models.Model):
     imageFile = utils.FileUpload('images', 'slider')
     imageName = models.ImageField(upload_to=imageFile.upload_to, verbose_name='عکس اسلایدر', blank=True, null=True)
     imageMobile = models.ImageField(upload_to=imageFile.upload_to, verbose_name='عکس برای موبایل', blank=True, null=True)
+    imageNameVariants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='نسخه‌های عکس اسلایدر')
+    imageMobileVariants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='نسخه‌های عکس موبایل')
     altSlide = models.CharField(verbose_name='نوشتار عکس', max_length=100, blank=True, null=True)
     isActive = models.BooleanField(verbose_name='فعال', default=True)
     registerData = models.DateTimeField(verbose_name='تاریخ شروع', default=timezone.now)
@@ -36,6 +38,7 @@ class SliderMain(models.Model):
     textSlider = models.CharField(max_length=100, verbose_name='متن اسلایدر')
     imageFile = utils.FileUpload('images', 'slider')
     imageName = models.ImageField(upload_to=imageFile.upload_to, verbose_name='عکس اسلایدر')
+    imageNameVariants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='نسخه‌های عکس اسلایدر')
     altSlide = models.CharField(verbose_name='نوشتار عکس', max_length=100, blank=True, null=True)
     isActive = models.BooleanField(verbose_name='فعال', default=True)
     registerData = models.DateTimeField(verbose_name='تاریخ شروع', default=timezone.now)
@@ -61,6 +64,7 @@ class Banner(models.Model):
     altSlide = models.CharField(verbose_name='نوشتار عکس', max_length=100, blank=True, null=True)
     imageFile = utils.FileUpload('images', 'banners')
     imageName = models.ImageField(upload_to=imageFile.upload_to)
+    imageNameVariants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='نسخه‌های عکس بنر')
     isActive = models.BooleanField(default=False)
     registerData = models.DateTimeField(verbose_name='تاریخ شروع', default=timezone.now)
     endData = models.DateTimeField(verbose_name='تاریخ پایان', default=timezone.now)
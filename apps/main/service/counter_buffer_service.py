@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """
+    بافر شمارنده‌ها در کش (write-behind) برای شمارنده‌های پرتکرار مثل جستجوها و بازدیدها
+
+    - هر افزایش فقط چند دستور کش است (add/incr) و به دیتابیس نمی‌رود؛ شمارنده‌ها در سطل‌های
+      bucket_seconds ثانیه‌ای جمع می‌شوند و اعضای هر سطل با شماره ردیف (slot) در کش فهرست
+      می‌شوند تا روی هر backend کشی قابل خواندن باشند
+    - flush سطل‌های بسته شده را به صورت {مقدار عضو: (شمارنده هر kind)} به تابع apply می‌دهد
+    - اولین افزایش هر سطل، flush سطل‌های قبلی را در ترد پس‌زمینه همان پروسس شروع می‌کند؛
+      بنابراین با کش محلی هر پروسس (LocMem) هم شمارنده‌ها بدون تسک دوره‌ای ثبت می‌شوند
+    """
+
+    def __init__(self, prefix, kinds, apply, bucket_seconds=60, key_timeout=60 * 60, flush_lock_timeout=60):
+        self.prefix = prefix
+        self.kinds = kinds
+        self.apply = apply
+        self.bucket_seconds = bucket_seconds
+        self.key_timeout = key_timeout
+        self.max_backlog = key_timeout // bucket_seconds
+        self.flush_lock_timeout = flush_lock_timeout
+
+    def _bucket(self, now=None):
+        return int((now or time.time()) // self.bucket_seconds)
+
+    def _incr(self, key, amount):
+        cache.add(key, 0, self.key_timeout)
+        try:
+            return cache.incr(key, amount)
+        except ValueError:
+            # کلید بین add و incr منقضی شد
+            cache.set(key, amount, self.key_timeout)
+            return amount
+
+    # ========================
+    # ثبت در بافر
+    # ========================
+    def add(self, kind, member, amount=1, value=None):
+        """
+        افزودن به شمارنده kind یک عضو در سطل جاری
+        member: شناسه کوتاه عضو در کلیدهای کش؛ value: مقداری که به apply داده می‌شود (پیش‌فرض member)
+        """
+        bucket = self._bucket()
+        base = f'{self.prefix}:{bucket}'
+        if cache.add(f'{base}:member:{member}', member if value is None else value, self.key_timeout):
+            slot = self._incr(f'{base}:slots', 1)
+            cache.set(f'{base}:slot:{slot}', member, self.key_timeout)
+        self._incr(f'{base}:{kind}:{member}', amount)
+        self.flush_if_due(bucket)
+
+    # ========================
+    # ثبت در دیتابیس
+    # ========================
+    def _flush_bucket(self, bucket):
+        base = f'{self.prefix}:{bucket}'
+        slots = cache.get(f'{base}:slots')
+        if not slots:
+            return 0
+        slot_keys = [f'{base}:slot:{slot}' for slot in range(1, slots + 1)]
+        members = list(cache.get_many(slot_keys).values())
+        member_keys = {f'{base}:member:{member}': member for member in members}
+        counter_keys = [f'{base}:{kind}:{member}' for member in members for kind in self.kinds]
+        values = cache.get_many(list(member_keys))
+        counters = cache.get_many(counter_keys)
+
+        count = self.apply({
+            value: tuple(counters.get(f'{base}:{kind}:{member_keys[key]}', 0) for kind in self.kinds)
+            for key, value in values.items()
+        })
+        cache.delete_many([f'{base}:slots', *slot_keys, *member_keys, *counter_keys])
+        return count
+
+    def flush(self, now=None):
+        """
+        ثبت سطل‌های بسته شده (سطل جاری و قبلی که ممکن است هنوز نوشته شوند نه)
+        خروجی: مجموع خروجی apply (تعداد ردیف‌های ثبت شده)
+        """
+        lock = f'{self.prefix}:flush_lock'
+        if not cache.add(lock, 1, self.flush_lock_timeout):
+            return 0
+        try:
+            current = self._bucket(now)
+            flushed_key = f'{self.prefix}:flushed'
+            last = cache.get(flushed_key)
+            start = current - self.max_backlog
+            if last is not None:
+                start = max(start, last + 1)
+            total = 0
+            for bucket in range(start, current - 1):
+                total += self._flush_bucket(bucket)
+                cache.set(flushed_key, bucket, None)
+        finally:
+            cache.delete(lock)
+        if total:
+            logger.info('Counter buffer %s flushed: %s rows', self.prefix, total)
+        return total
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Counter buffer %s flush failed', self.prefix)
+        finally:
+            connection.close()
+
+    def flush_if_due(self, bucket):
+        """اولین ثبت هر سطل، flush سطل‌های قبلی را در پس‌زمینه شروع می‌کند"""
+        if cache.add(f'{self.prefix}:flush_due:{bucket}', 1, self.key_timeout):
+            threading.Thread(
+                target=self._flush_in_background,
+                name=f'{self.prefix}-flush',
+                daemon=True
+            ).start()
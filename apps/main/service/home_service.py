@@ -0,0 +1,434 @@
+import logging
+import time
+from django.core.cache import cache
+from django.db.models import Count, Q, Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+import web.settings as sett
+from utils import get_cache_versions, bump_cache_version
+from apps.discount.models import DiscountBasket, DiscountDetail
+from apps.product.models import Brand, Category, Product, ProductGallery
+from apps.product.service.category_service import CategoryTreeService
+from apps.product.service.listing_service import ListingService
+from apps.product.service.pricing_service import PricingService
+from apps.product.service.sales_service import SalesStatsService
+from ..models import SliderMain
+
+logger = logging.getLogger(__name__)
+
+
+class HomePageService:
+    """
+    سازنده صفحه اصلی: همه ویجت‌ها در یک مرحله ساخته و HTML هر کدام جداگانه کش می‌شود
+
+    - هر ویجت TTL و برچسب‌های (tag) باطل‌سازی خودش را دارد؛ کلید کش از نسخه برچسب‌ها
+      ساخته می‌شود، پس bump یک برچسب همه ویجت‌های وابسته را باطل می‌کند
+    - ویجت‌های محصولی (شگفت‌انگیز، جدیدترین، پرفروش) یک مرحله hydrate مشترک دارند:
+      یک کوئری محصول + قیمت، یک کوئری خلاصه نظرات و یک کوئری گالری
+    - single-flight: فقط یک درخواست ویجت منقضی را می‌سازد؛ بقیه نسخه قبلی (stale) را
+      می‌گیرند یا کوتاه منتظر نسخه جدید می‌مانند
+    """
+
+    CACHE_PREFIX = 'home_fragment'
+    STALE_TIMEOUT = 60 * 60 * 24
+    LOCK_TIMEOUT = 30
+    WAIT_TIMEOUT = 2.0
+    WAIT_STEP = 0.05
+
+    # برچسب‌ها نام فضای نام نسخه کش هستند (utils.bump_cache_version)
+    TAG_PRODUCTS = 'home:products'
+    TAG_BRANDS = 'home:brands'
+    TAG_DISCOUNTS = 'home:discounts'
+    TAG_SLIDERS = 'home:sliders'
+    TAG_PRICING = PricingService.CACHE_NAME
+    TAG_CATEGORIES = CategoryTreeService.CACHE_NAME
+    TAG_SALES = SalesStatsService.CACHE_NAME
+
+    FRAGMENTS = {
+        'rich_categories': {
+            'template': 'product_app/category/popular_categories.html',
+            'ttl': 60 * 30,
+            'tags': (TAG_CATEGORIES,),
+        },
+        'amazing_products': {
+            'template': 'discount_app/amazing.html',
+            'ttl': 60 * 5,
+            'tags': (TAG_PRODUCTS, TAG_PRICING, TAG_DISCOUNTS),
+        },
+        'latest_products': {
+            'template': 'product_app/product/latest_products.html',
+            'ttl': 60 * 10,
+            'tags': (TAG_PRODUCTS, TAG_PRICING),
+        },
+        'main_slider': {
+            'template': 'main_app/mainslider.html',
+            'ttl': 60 * 10,
+            'tags': (TAG_SLIDERS,),
+        },
+        'top_selling': {
+            'template': 'product_app/product/top_selling.html',
+            'ttl': 60 * 30,
+            'tags': (TAG_PRODUCTS, TAG_PRICING, TAG_SALES),
+        },
+        'popular_brands': {
+            'template': 'product_app/brand/popular_brands.html',
+            'ttl': 60 * 60,
+            'tags': (TAG_PRODUCTS, TAG_BRANDS),
+        },
+    }
+
+    # ========================
+    # کش و باطل‌سازی
+    # ========================
+    @staticmethod
+    def invalidate(*tags):
+        """باطل کردن همه ویجت‌های دارای این برچسب‌ها"""
+        for tag in tags:
+            bump_cache_version(tag)
+
+    @staticmethod
+    def _cache_keys(names):
+        tags = {tag for name in names for tag in HomePageService.FRAGMENTS[name]['tags']}
+        versions = get_cache_versions(sorted(tags))
+        return {
+            name: '{}:{}:{}'.format(
+                HomePageService.CACHE_PREFIX, name,
+                '.'.join(str(versions[tag]) for tag in HomePageService.FRAGMENTS[name]['tags'])
+            )
+            for name in names
+        }
+
+    @staticmethod
+    def _stale_key(name):
+        return f'{HomePageService.CACHE_PREFIX}:{name}:stale'
+
+    @staticmethod
+    def render(request, names=None):
+        """
+        HTML همه ویجت‌ها برای تمپلیت صفحه اصلی: {name: SafeString}
+        در حالت گرم فقط دو رفت و برگشت به کش (نسخه برچسب‌ها + خود ویجت‌ها)
+        """
+        names = list(names or HomePageService.FRAGMENTS)
+        keys = HomePageService._cache_keys(names)
+        cached = cache.get_many(list(keys.values()))
+
+        fragments = {name: cached[keys[name]] for name in names if keys[name] in cached}
+        missing = [name for name in names if name not in fragments]
+        if missing:
+            fragments.update(HomePageService._rebuild(request, missing, keys))
+        return {name: mark_safe(html) for name, html in fragments.items()}
+
+    @staticmethod
+    def _rebuild(request, names, keys):
+        """ساخت ویجت‌های منقضی با قفل single-flight"""
+        owned = [name for name in names if cache.add(f'lock:{keys[name]}', 1, HomePageService.LOCK_TIMEOUT)]
+        result = {}
+
+        if owned:
+            try:
+                result.update(HomePageService._render_and_store(request, owned, keys))
+            finally:
+                cache.delete_many([f'lock:{keys[name]}' for name in owned])
+
+        waiting = [name for name in names if name not in owned]
+        if waiting:
+            # درخواست دیگری در حال ساخت است: نسخه قبلی یا انتظار کوتاه برای نسخه جدید
+            stale = cache.get_many([HomePageService._stale_key(name) for name in waiting])
+            pending = []
+            for name in waiting:
+                html = stale.get(HomePageService._stale_key(name))
+                if html is None:
+                    pending.append(name)
+                else:
+                    result[name] = html
+
+            deadline = time.monotonic() + HomePageService.WAIT_TIMEOUT
+            while pending and time.monotonic() < deadline:
+                time.sleep(HomePageService.WAIT_STEP)
+                found = cache.get_many([keys[name] for name in pending])
+                for name in list(pending):
+                    if keys[name] in found:
+                        result[name] = found[keys[name]]
+                        pending.remove(name)
+
+            if pending:
+                logger.warning('Home fragments not ready after waiting, building inline: %s', pending)
+                result.update(HomePageService._render_and_store(request, pending, keys))
+        return result
+
+    @staticmethod
+    def _render_and_store(request, names, keys):
+        now = timezone.now()
+        contexts = HomePageService.build_contexts(names, now=now)
+        result = {}
+        for name in names:
+            context, expires_at = contexts[name]
+            html = render_to_string(HomePageService.FRAGMENTS[name]['template'], context, request=request)
+
+            # TTL ویجت تا اولین تغییر زمان‌دار (مثلاً پایان سبد شگفت‌انگیز) کوتاه می‌شود
+            timeout = HomePageService.FRAGMENTS[name]['ttl']
+            if expires_at is not None:
+                timeout = max(1, min(timeout, int((expires_at - now).total_seconds()) + 1))
+
+            cache.set(keys[name], html, timeout)
+            cache.set(HomePageService._stale_key(name), html, HomePageService.STALE_TIMEOUT)
+            result[name] = html
+        return result
+
+    # ========================
+    # ساخت context ویجت‌ها
+    # ========================
+    @staticmethod
+    def build_context(name):
+        """context یک ویجت (برای ویوهای مستقل همان ویجت)"""
+        return HomePageService.build_contexts([name])[name][0]
+
+    @staticmethod
+    def build_contexts(names, now=None):
+        """
+        ساخت context چند ویجت با hydrate مشترک محصولات
+        خروجی: {name: (context, expires_at)}
+        """
+        now = now or timezone.now()
+
+        selections = {}
+        if 'amazing_products' in names:
+            selections['amazing_products'] = HomePageService._select_amazing(now)
+        if 'latest_products' in names:
+            selections['latest_products'] = HomePageService._select_latest()
+        if 'top_selling' in names:
+            selections['top_selling'] = HomePageService._select_top_selling()
+
+        product_ids = set()
+        for selection in selections.values():
+            product_ids.update(selection['product_ids'])
+        products = HomePageService._hydrate(product_ids, with_gallery='latest_products' in names)
+
+        builders = {
+            'rich_categories': lambda: HomePageService._rich_categories(),
+            'popular_brands': lambda: HomePageService._popular_brands(),
+            'main_slider': lambda: HomePageService._main_slider(now),
+            'amazing_products': lambda: HomePageService._amazing_products(
+                selections['amazing_products'], products, now),
+            'latest_products': lambda: HomePageService._latest_products(
+                selections['latest_products'], products),
+            'top_selling': lambda: HomePageService._top_selling(
+                selections['top_selling'], products, now),
+        }
+        return {name: builders[name]() for name in names}
+
+    @staticmethod
+    def _hydrate(product_ids, with_gallery=False):
+        """
+        یک کوئری محصول (برند و قیمت با select_related) + یک کوئری خلاصه نظرات
+        (+ اولین تصویر گالری هر محصول برای تصویر hover)
+        """
+        if not product_ids:
+            return {}
+        products = {
+            product.id: product
+            for product in Product.objects.filter(id__in=product_ids).select_related('brand', 'pricing')
+        }
+        ListingService.attach_review_stats(products.values())
+
+        for product in products.values():
+            try:
+                pricing = product.pricing
+            except Product.pricing.RelatedObjectDoesNotExist:
+                pricing = None
+            product.price = (pricing.basePrice or 0) if pricing else 0
+            product.discount_percent = pricing.discountPercent if pricing else 0
+            product.final_price = (pricing.finalPrice or 0) if pricing else 0
+            product.hover_image = None
+
+        if with_gallery:
+            for gallery in ProductGallery.objects.filter(
+                product_id__in=product_ids, isActive=True
+            ).exclude(image='').order_by('product_id', 'createdAt', 'id'):
+                product = products.get(gallery.product_id)
+                if product is not None and product.hover_image is None:
+                    product.hover_image = gallery.image.url
+        return products
+
+    # ---------- دسته‌ها، برندها و اسلایدر ----------
+    @staticmethod
+    def _rich_categories():
+        """پر محتواترین دسته‌های لایه دوم (تعداد محصولات از قبل محاسبه شده)"""
+        categories = list(Category.objects.filter(
+            isActive=True,
+            level=1,
+            subtreeProductCount__gt=0
+        ).order_by('-subtreeProductCount')[:10])
+        return {'categories': categories}, None
+
+    @staticmethod
+    def _popular_brands():
+        """محبوب‌ترین برندها بر اساس تعداد محصولات فعال"""
+        brands = list(Brand.objects.filter(
+            isActive=True
+        ).annotate(
+            product_count=Count('products', filter=Q(products__isActive=True))
+        ).filter(
+            product_count__gt=0
+        ).order_by('-product_count')[:10])
+        return {'brands': brands}, None
+
+    @staticmethod
+    def _main_slider(now):
+        """اسلایدرهای فعال در بازه نمایش؛ زمان شروع/پایان بعدی TTL را محدود می‌کند"""
+        sliders, expires_at = [], None
+        for slider in SliderMain.objects.filter(isActive=True, endData__gte=now).order_by('-registerData'):
+            if slider.registerData <= now:
+                sliders.append(slider)
+                change_at = slider.endData
+            else:
+                change_at = slider.registerData
+            if expires_at is None or change_at < expires_at:
+                expires_at = change_at
+        return {'sliders': sliders, 'media_url': sett.MEDIA_URL}, expires_at
+
+    # ---------- شگفت‌انگیزها ----------
+    @staticmethod
+    def _select_amazing(now):
+        details = list(DiscountDetail.objects.filter(
+            discountBasket__isamzing=True,
+            discountBasket__isActive=True,
+            discountBasket__startDate__lte=now,
+            discountBasket__endDate__gte=now
+        ).select_related('discountBasket').order_by('discountBasket_id', 'id'))
+
+        # شروع سبد شگفت‌انگیز بعدی هم ویجت را تغییر می‌دهد
+        next_start = DiscountBasket.objects.filter(
+            isamzing=True, isActive=True, startDate__gt=now
+        ).aggregate(next_start=Min('startDate'))['next_start']
+
+        return {
+            'details': details,
+            'next_start': next_start,
+            'product_ids': {detail.product_id for detail in details},
+        }
+
+    @staticmethod
+    def _amazing_products(selection, products, now):
+        amazing_products, baskets = [], {}
+        expires_at = selection['next_start']
+
+        for detail in selection['details']:
+            product = products.get(detail.product_id)
+            if product is None:
+                continue
+            discount = detail.discountBasket
+            baskets.setdefault(discount.id, discount)
+            if expires_at is None or discount.endDate < expires_at:
+                expires_at = discount.endDate
+
+            base_price = product.price
+            discounted_price = base_price - (base_price * discount.discount) // 100
+            remaining_seconds = int((discount.endDate - now).total_seconds())
+
+            amazing_products.append({
+                'product': product,
+                'discount': discount.discount,
+                'discount_title': discount.discountTitle,
+                'end_date': discount.endDate,
+                'original_price': base_price,
+                'discounted_price': discounted_price,
+                'remaining_time': {
+                    'days': remaining_seconds // 86400,
+                    'hours': (remaining_seconds % 86400) // 3600,
+                    'minutes': (remaining_seconds % 3600) // 60,
+                    'seconds': remaining_seconds % 60,
+                    'total_seconds': remaining_seconds,
+                    'timestamp': int(discount.endDate.timestamp())
+                }
+            })
+
+        context = {
+            'amazing_products': amazing_products,
+            'amazing_discounts': list(baskets.values()),
+            'now_timestamp': int(now.timestamp()),
+        }
+        return context, expires_at
+
+    # ---------- جدیدترین محصولات ----------
+    @staticmethod
+    def _select_latest():
+        product_ids = list(
+            Product.objects.filter(isActive=True).order_by('-createdAt').values_list('id', flat=True)[:12]
+        )
+        return {'product_ids': product_ids}
+
+    @staticmethod
+    def _latest_products(selection, products):
+        from .image_service import ImageDerivativeService
+
+        product_list = []
+        for product_id in selection['product_ids']:
+            product = products.get(product_id)
+            if product is None:
+                continue
+            base_price = product.price
+            final_price = product.final_price or base_price
+            main_image = product.mainImage.url if product.mainImage else ''
+
+            product_list.append({
+                'id': product.id,
+                'slug': product.slug,
+                'title': product.title,
+                'short_title': product.title[:40] + '...' if len(product.title) > 40 else product.title,
+                'main_image': main_image,
+                'hover_image': product.hover_image or main_image,
+                'main_image_webp_srcset': ImageDerivativeService.srcset(product.mainImage, 'webp'),
+                'main_image_srcset': ImageDerivativeService.srcset(product.mainImage, 'fallback'),
+                'final_price': int(final_price),
+                'base_price': int(base_price),
+                'discount_percentage': int(product.discount_percent),
+                'rating': product.rating_avg,
+                'comments_count': product.comments_count,
+                'shipping_today': True,
+                'brand': product.brand.title if product.brand else None,
+            })
+
+        return {'latest_products': product_list, 'title': 'جدیدترین محصولات'}, None
+
+    # ---------- پرفروش‌ترین محصولات ----------
+    @staticmethod
+    def _select_top_selling():
+        # از جدول آمار فروش (SalesStatsService) به جای جمع زدن همه اقلام سفارش‌ها
+        rows = SalesStatsService.top_product_ids(limit=10)
+        return {'rows': rows, 'product_ids': [product_id for product_id, _ in rows]}
+
+    @staticmethod
+    def _top_selling(selection, products, now):
+        # سبد تخفیف فعال هر محصول (شگفت‌انگیز بودن/عنوان) با یک کوئری
+        discount_details = {}
+        if selection['product_ids']:
+            for detail in DiscountDetail.objects.filter(
+                product_id__in=selection['product_ids'],
+                discountBasket__isActive=True,
+                discountBasket__startDate__lte=now,
+                discountBasket__endDate__gte=now
+            ).select_related('discountBasket').order_by('-discountBasket__discount'):
+                discount_details.setdefault(detail.product_id, detail)
+
+        products_list = []
+        for product_id, total_sold in selection['rows']:
+            product = products.get(product_id)
+            if product is None:
+                continue
+            product.total_sold = total_sold
+            discount_detail = discount_details.get(product_id)
+
+            products_list.append({
+                'product': product,
+                'total_sold': total_sold or 0,
+                'original_price': product.price,
+                'final_price': product.final_price,
+                'discount_percent': product.discount_percent,
+                'is_discounted': product.discount_percent > 0,
+                'is_amazing': discount_detail.discountBasket.isamzing if discount_detail else False,
+                'discount_title': discount_detail.discountBasket.discountTitle if discount_detail else ""
+            })
+
+        return {'products_list': products_list}, None
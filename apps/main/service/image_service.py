@@ -0,0 +1,200 @@
+import logging
+import os
+from io import BytesIO
+from django.apps import apps
+from django.core.files.base import ContentFile
+from PIL import Image, UnidentifiedImageError
+from pilkit.processors import ProcessorPipeline, ResizeToFit, Transpose
+from .home_service import HomePageService
+
+logger = logging.getLogger(__name__)
+
+
+class ImageDerivativeService:
+    """
+    نسخه‌های کوچک‌شده و WebP تصاویر آپلودی در چند عرض ثابت (برای srcset)
+
+    - بعد از ذخیره یک تصویر جدید، تسک سلری generate_image_derivatives نسخه‌ها را می‌سازد
+    - نام فایل نسخه‌ها در فیلد JSON کنار همان تصویر ذخیره می‌شود (<field>Variants)،
+      پس نمایش srcset هیچ کوئری اضافه‌ای ندارد
+    - تا آماده شدن نسخه‌ها (یا اگر تصویر عوض شده باشد) همان فایل اصلی نمایش داده می‌شود
+    - تصویری که نسخه‌هایش ساخته نمی‌شود (SVG، فایل خراب یا حذف شده) با failed ثبت می‌شود تا
+      ذخیره‌های بعدی دوباره آن را به صف نفرستند (ساخت مجدد فقط با build_image_derivatives --force)
+    """
+
+    PRODUCT_WIDTHS = (240, 480, 800)
+    SLIDER_WIDTHS = (640, 1024, 1600)
+    WEBP_QUALITY = 80
+    JPEG_QUALITY = 85
+    DERIVATIVES_DIR = 'derivatives'
+    # فرمت‌های غیر رستری که Pillow باز نمی‌کند (بدون خواندن فایل شکست ثبت می‌شود)
+    UNSUPPORTED_EXTENSIONS = ('.svg', '.svgz')
+
+    # مدل -> {فیلد تصویر: (عرض‌ها، برچسب کش صفحه اصلی)}
+    IMAGE_FIELDS = {
+        'product.Product': {'mainImage': (PRODUCT_WIDTHS, HomePageService.TAG_PRODUCTS)},
+        'product.ProductGallery': {'image': (PRODUCT_WIDTHS, HomePageService.TAG_PRODUCTS)},
+        'main.SliderSite': {'imageName': (SLIDER_WIDTHS, None), 'imageMobile': (SLIDER_WIDTHS, None)},
+        'main.SliderMain': {'imageName': (SLIDER_WIDTHS, HomePageService.TAG_SLIDERS)},
+        'main.Banner': {'imageName': (SLIDER_WIDTHS, None)},
+    }
+
+    @staticmethod
+    def variants_field(field_name):
+        return f'{field_name}Variants'
+
+    # ========================
+    # ساخت نسخه‌ها
+    # ========================
+    @staticmethod
+    def _derivative_name(source_name, width, extension):
+        directory, filename = os.path.split(source_name)
+        stem = os.path.splitext(filename)[0]
+        return f'{ImageDerivativeService.DERIVATIVES_DIR}/{directory}/{stem}_{width}w.{extension}'
+
+    @staticmethod
+    def _save(storage, name, image, image_format, **options):
+        buffer = BytesIO()
+        image.save(buffer, image_format, **options)
+        if storage.exists(name):
+            storage.delete(name)
+        return storage.save(name, ContentFile(buffer.getvalue()))
+
+    @staticmethod
+    def build_variants(field_file, widths):
+        """
+        ساخت نسخه‌ها از روی یک فایل تصویر
+        خروجی: {'source', 'width', 'height', 'webp': [[عرض، نام فایل]], 'fallback': [[عرض، نام فایل]]}
+        """
+        storage = field_file.storage
+        with storage.open(field_file.name, 'rb') as source:
+            original = Image.open(source)
+            original.load()
+        original = Transpose().process(original)
+        width, height = original.size
+
+        has_alpha = original.mode in ('RGBA', 'LA') or (
+            original.mode == 'P' and 'transparency' in original.info
+        )
+        original = original.convert('RGBA' if has_alpha else 'RGB')
+
+        # عرض‌های کوچک‌تر از تصویر + یک نسخه در عرض خود تصویر (حداکثر بزرگ‌ترین عرض)
+        targets = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+
+        variants = {'source': field_file.name, 'width': width, 'height': height, 'webp': [], 'fallback': []}
+        for target in targets:
+            resized = ProcessorPipeline([ResizeToFit(width=target, upscale=False)]).process(original)
+            variants['webp'].append([target, ImageDerivativeService._save(
+                storage, ImageDerivativeService._derivative_name(field_file.name, target, 'webp'),
+                resized, 'WEBP', quality=ImageDerivativeService.WEBP_QUALITY, method=4
+            )])
+            if has_alpha:
+                fallback = ImageDerivativeService._save(
+                    storage, ImageDerivativeService._derivative_name(field_file.name, target, 'png'),
+                    resized, 'PNG', optimize=True
+                )
+            else:
+                fallback = ImageDerivativeService._save(
+                    storage, ImageDerivativeService._derivative_name(field_file.name, target, 'jpg'),
+                    resized, 'JPEG', quality=ImageDerivativeService.JPEG_QUALITY, optimize=True, progressive=True
+                )
+            variants['fallback'].append([target, fallback])
+        return variants
+
+    @staticmethod
+    def _delete_files(storage, variants, keep=()):
+        for kind in ('webp', 'fallback'):
+            for _, name in variants.get(kind, []):
+                if name not in keep:
+                    try:
+                        storage.delete(name)
+                    except OSError:
+                        logger.warning('Could not delete image derivative %s', name)
+
+    @staticmethod
+    def generate(model_label, pk, field_name, force=False, invalidate=True):
+        """
+        ساخت و ثبت نسخه‌های یک فیلد تصویر (بدنه تسک سلری و دستور backfill)
+        خروجی: تعداد نسخه‌های ساخته شده
+        """
+        model = apps.get_model(model_label)
+        widths, tag = ImageDerivativeService.IMAGE_FIELDS[model_label][field_name]
+        variants_field = ImageDerivativeService.variants_field(field_name)
+
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None:
+            return 0
+        field_file = getattr(instance, field_name)
+        current = getattr(instance, variants_field) or {}
+
+        if not field_file:
+            if current:
+                model.objects.filter(pk=pk).update(**{variants_field: {}})
+                ImageDerivativeService._delete_files(field_file.storage, current)
+            return 0
+        if not force and current.get('source') == field_file.name:
+            return 0
+
+        try:
+            if not ImageDerivativeService.is_supported(field_file.name):
+                raise UnidentifiedImageError(f'unsupported format: {field_file.name}')
+            variants = ImageDerivativeService.build_variants(field_file, widths)
+        except (FileNotFoundError, UnidentifiedImageError, OSError) as e:
+            # فایل حذف شده یا تصویر رستری نیست (مثلاً SVG): شکست برای همین فایل ثبت می‌شود
+            logger.warning('Image derivatives skipped for %s #%s %s: %s', model_label, pk, field_name, e)
+            model.objects.filter(pk=pk, **{field_name: field_file.name}).update(
+                **{variants_field: ImageDerivativeService.failed_variants(field_file.name)}
+            )
+            ImageDerivativeService._delete_files(field_file.storage, current)
+            return 0
+
+        # اگر در این فاصله تصویر عوض شده باشد نسخه‌ها ثبت نمی‌شوند (تسک تصویر جدید در راه است)
+        updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**{variants_field: variants})
+        if not updated:
+            ImageDerivativeService._delete_files(field_file.storage, variants)
+            return 0
+
+        kept = {name for kind in ('webp', 'fallback') for _, name in variants[kind]}
+        ImageDerivativeService._delete_files(field_file.storage, current, keep=kept)
+        if tag and invalidate:
+            HomePageService.invalidate(tag)
+        return len(variants['webp']) + len(variants['fallback'])
+
+    @staticmethod
+    def failed_variants(source_name):
+        """نشانگر «نسخه‌ای برای این فایل ساخته نمی‌شود» (srcset خالی، بدون ارسال مجدد به صف)"""
+        return {'source': source_name, 'failed': True, 'webp': [], 'fallback': []}
+
+    @staticmethod
+    def is_supported(name):
+        return not (name or '').lower().endswith(ImageDerivativeService.UNSUPPORTED_EXTENSIONS)
+
+    @staticmethod
+    def pending_fields(instance):
+        """فیلدهای تصویری که نسخه‌هایشان با فایل فعلی همخوان نیست"""
+        fields = ImageDerivativeService.IMAGE_FIELDS.get(instance._meta.label, {})
+        pending = []
+        for field_name in fields:
+            field_file = getattr(instance, field_name)
+            variants = getattr(instance, ImageDerivativeService.variants_field(field_name)) or {}
+            if (field_file.name or None) != variants.get('source'):
+                pending.append(field_name)
+        return pending
+
+    # ========================
+    # srcset برای تمپلیت‌ها
+    # ========================
+    @staticmethod
+    def srcset(field_file, kind='webp'):
+        """
+        مقدار srcset یک ImageFieldFile ('<url> 480w, ...')؛
+        رشته خالی اگر نسخه‌ها هنوز ساخته نشده یا مربوط به تصویر قبلی باشند
+        """
+        if not field_file:
+            return ''
+        instance = getattr(field_file, 'instance', None)
+        variants = getattr(instance, ImageDerivativeService.variants_field(field_file.field.name), None)
+        if not variants or variants.get('source') != field_file.name:
+            return ''
+        storage = field_file.storage
+        return ', '.join(f'{storage.url(name)} {width}w' for width, name in variants.get(kind, []))
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.discount.models import DiscountBasket, DiscountDetail
+from apps.product.models import Brand, Product
+from .models import SliderMain
+from .service.home_service import HomePageService
+
+
+# ========================
+# باطل کردن ویجت‌های کش شده صفحه اصلی (بر اساس برچسب)
+# ========================
+def _invalidate_on_commit(*tags):
+    transaction.on_commit(lambda: HomePageService.invalidate(*tags))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_home_products(sender, instance, **kwargs):
+    _invalidate_on_commit(HomePageService.TAG_PRODUCTS)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def invalidate_home_brands(sender, instance, **kwargs):
+    _invalidate_on_commit(HomePageService.TAG_BRANDS)
+
+
+@receiver(post_save, sender=DiscountBasket)
+@receiver(post_delete, sender=DiscountBasket)
+@receiver(post_save, sender=DiscountDetail)
+@receiver(post_delete, sender=DiscountDetail)
+def invalidate_home_discounts(sender, instance, **kwargs):
+    _invalidate_on_commit(HomePageService.TAG_DISCOUNTS)
+
+
+@receiver(post_save, sender=SliderMain)
+@receiver(post_delete, sender=SliderMain)
+def invalidate_home_sliders(sender, instance, **kwargs):
+    _invalidate_on_commit(HomePageService.TAG_SLIDERS)
+
+
+# ========================
+# نسخه‌های کوچک‌شده/WebP تصاویر (srcset)
+# ========================
+import logging
+from django.apps import apps as django_apps
+from .service.image_service import ImageDerivativeService
+
+logger = logging.getLogger(__name__)
+
+
+def _enqueue_image_derivatives(model_label, pk, field_name):
+    from .tasks import generate_image_derivatives
+
+    try:
+        generate_image_derivatives.delay(model_label, pk, field_name)
+    except Exception:
+        # در دسترس نبودن بروکر نباید ذخیره را خراب کند؛ دستور build_image_derivatives جبران می‌کند
+        logger.exception('Could not enqueue image derivatives for %s #%s %s', model_label, pk, field_name)
+
+
+def queue_image_derivatives(sender, instance, **kwargs):
+    for field_name in ImageDerivativeService.pending_fields(instance):
+        transaction.on_commit(
+            lambda field_name=field_name: _enqueue_image_derivatives(instance._meta.label, instance.pk, field_name)
+        )
+
+
+for _model_label in ImageDerivativeService.IMAGE_FIELDS:
+    post_save.connect(
+        queue_image_derivatives,
+        sender=django_apps.get_model(_model_label),
+        dispatch_uid=f'image_derivatives:{_model_label}'
+    )
@@ -125,4 +125,17 @@ def cleanup_old_backups(backup_dir, keep_last=5):
             os.remove(old_file)
             logger.info(f"بکاپ قدیمی حذف شد: {old_file}")
         except Exception as e:
-            logger.warning(f"خطا در حذف فایل {old_file}: {e}")
\ No newline at end of file
+            logger.warning(f"خطا در حذف فایل {old_file}: {e}")
+
+
+@shared_task(ignore_result=True)
+def generate_image_derivatives(model_label, pk, field_name):
+    """
+    ساخت نسخه‌های کوچک‌شده و WebP یک تصویر آپلود شده (بعد از ذخیره مدل صدا زده می‌شود)
+    """
+    from apps.main.service.image_service import ImageDerivativeService
+
+    count = ImageDerivativeService.generate(model_label, pk, field_name)
+    if count:
+        logger.info(f"{count} نسخه تصویر برای {model_label} #{pk} ({field_name}) ساخته شد")
+    return count
@@ -0,0 +1,16 @@
+from django import template
+from apps.main.service.image_service import ImageDerivativeService
+
+register = template.Library()
+
+
+@register.filter
+def webp_srcset(image):
+    """srcset نسخه‌های WebP یک فیلد تصویر (برای <source type="image/webp">)"""
+    return ImageDerivativeService.srcset(image, 'webp')
+
+
+@register.filter
+def srcset(image):
+    """srcset نسخه‌های JPEG/PNG کوچک‌شده یک فیلد تصویر (برای خود <img>)"""
+    return ImageDerivativeService.srcset(image, 'fallback')
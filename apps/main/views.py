@@ -1,6 +1,7 @@
 from django.shortcuts import render
 import web.settings as sett
 from apps.blog.views import get_latest_blogs
+from .service.home_service import HomePageService
 # Create your views here.
 
 
@@ -29,12 +30,15 @@ def main(request):
         endData__gte=timezone.now()  # تاریخ پایان >= الان
     ).order_by('-registerData')
 
-    print(f"DEBUG: Active and non-expired sliders: {head_sliders.count()}")
+    # ویجت‌های صفحه اصلی (دسته‌ها، شگفت‌انگیزها، جدیدترین‌ها، اسلایدر، پرفروش‌ها، برندها)
+    # از کش ویجت‌ها؛ ویجت‌های منقضی با هم و با hydrate مشترک ساخته می‌شوند
+    home_fragments = HomePageService.render(request)
 
     context = {
         'media_url': sett.MEDIA_URL,
         'latest_blogs': latest_blogs,
         'head_sliders': head_sliders,
+        'home_fragments': home_fragments,
     }
 
     return render(request, 'main_app/main.html', context)
@@ -42,19 +46,7 @@ def main(request):
 
 def mainSlider(request):
     # دریافت اسلایدرهای اصلی فعال که تاریخ آنها معتبر است
-    from .models import SliderMain
-    from django.utils import timezone
-
-    sliders = SliderMain.objects.filter(
-        isActive=True,
-        registerData__lte=timezone.now(),
-        endData__gte=timezone.now()
-    ).order_by('-registerData')
-
-    context = {
-        'sliders': sliders,
-        'media_url': sett.MEDIA_URL,
-    }
+    context = HomePageService.build_context('main_slider')
 
     return render(request,'main_app/mainslider.html', context)
 
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import Order, OrderDetail, State, City, UserAddress
+from apps.product.service.sales_service import SalesStatsService
+from apps.product.service.stock_service import StockService
 import jdatetime
 from django.contrib import messages
 from django.utils import timezone
@@ -178,12 +180,20 @@ class OrderAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
     def mark_as_delivered(self, request, queryset):
+        order_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(status='delivered', updateDate=timezone.now())
+        # update سیگنال post_save ندارد
+        SalesStatsService.sync_orders(order_ids)
         self.message_user(request, f"{updated} سفارش به وضعیت 'تحویل شده' تغییر یافت.")
     mark_as_delivered.short_description = "علامت‌گذاری به عنوان تحویل شده"
 
     def mark_as_canceled(self, request, queryset):
+        order_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(status='canceled', updateDate=timezone.now())
+        # update سیگنال post_save (آزادسازی رزرو موجودی) ندارد
+        for order_id in order_ids:
+            StockService.release_order(order_id)
+        SalesStatsService.sync_orders(order_ids)
         self.message_user(request, f"{updated} سفارش به وضعیت 'لغو شده' تغییر یافت.")
     mark_as_canceled.short_description = "علامت‌گذاری به عنوان لغو شده"
 
@@ -170,6 +170,11 @@ class Order(models.Model):
         verbose_name = "سفارش"
         verbose_name_plural = "سفارش‌ها"
         ordering = ['-registerDate']
+        indexes = [
+            # سفارش‌های یک مشتری و لیست سفارش‌های پنل بر اساس وضعیت
+            models.Index(fields=['customer', 'registerDate'], name='order_customer_date_idx'),
+            models.Index(fields=['status', 'registerDate'], name='order_status_date_idx'),
+        ]
 
 
 class OrderDetail(models.Model):
@@ -1,5 +1,6 @@
 # shop_cart.py
-from apps.product.models import Product
+from django.db.models import Prefetch
+from apps.product.models import Product, ProductSaleType
 from apps.discount.models import DiscountBasket
 from django.utils import timezone
 
@@ -111,15 +112,24 @@ class ShopCart:
 
     def get_cart_items(self):
         """دریافت آیتم‌های سبد خرید به صورت قابل سریالایز"""
+        # همه محصولات سبد و انواع فروش فعالشان با دو کوئری (به جای دو کوئری برای هر قلم)
+        product_ids = {int(item.get('product_id', key.split(':')[0])) for key, item in self.shop_cart.items()}
+        products = Product.objects.filter(id__in=product_ids).prefetch_related(
+            Prefetch('saleTypes', queryset=ProductSaleType.objects.filter(isActive=True).order_by('pk'),
+                     to_attr='active_sale_types')
+        ).in_bulk()
+
         items = []
         for key, item in self.shop_cart.items():
             try:
                 # همیشه محصول را از دیتابیس بگیر
-                product = Product.objects.get(id=item.get('product_id', key.split(':')[0]))
+                product = products.get(int(item.get('product_id', key.split(':')[0])))
+                if product is None:
+                    raise Product.DoesNotExist
 
                 # اگر اطلاعات محصول کامل نیست، بروزرسانی کن
                 if 'product_name' not in item:
-                    sale_type = product.saleTypes.filter(isActive=True).first()
+                    sale_type = next(iter(product.active_sale_types), None)
                     base_price = sale_type.finalPrice if sale_type else 0
 
                     # Only update if final_price is not already set (preserve discounted prices)
@@ -142,7 +152,11 @@ class ShopCart:
                 sale_type_obj = None
                 limited_sale = 1
                 if 'sale_type' in item:
-                    sale_type_obj = product.saleTypes.filter(isActive=True, typeSale=item['sale_type']).first()
+                    sale_type_obj = next(
+                        (sale_type for sale_type in product.active_sale_types
+                         if str(sale_type.typeSale) == str(item['sale_type'])),
+                        None
+                    )
                     if sale_type_obj:
                         limited_sale = sale_type_obj.limitedSale or 1
 
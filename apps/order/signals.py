@@ -1,7 +1,7 @@
 from django.db.models.signals import post_save, post_init
 from django.dispatch import receiver
 from django.apps import apps
-from .models import Order
+from .models import Order, OrderDetail
 
 
 @receiver(post_init, sender=Order)
@@ -72,46 +72,97 @@ def create_order_notifications(sender, instance, created, **kwargs):
 
 
 
-from django.db.models.signals import post_save
+import logging
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
-from apps.order.models import Order, OrderDetail
-from apps.product.models import Product
 from apps.peyment.models import Peyment
 
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_save, sender=Peyment)
 def decrease_stock_on_successful_payment(sender, instance, created, **kwargs):
     """
-    بعد از پرداخت موفق، موجودی محصولات رو کم کن.
-    فقط یک بار این کار انجام بشه.
+    بعد از پرداخت موفق، موجودی محصولات سفارش کم می‌شود.
+    فقط یک بار برای هر سفارش (نشانگر OrderStockRecord در StockService).
     """
-    # فقط اگه پرداخت موفق بوده و نهایی شده
-    if instance.isFinaly:  # statusCode 100 یعنی موفق
-        order = instance.order
+    if not instance.isFinaly:
+        return
+
+    from apps.product.service.stock_service import StockService
+
+    order_id = instance.order_id
+
+    def decrease():
+        try:
+            StockService.decrease_for_order(order_id)
+        except Exception:
+            logger.exception('Stock decrease failed for order #%s', order_id)
+
+    transaction.on_commit(decrease)
+
+
+@receiver(post_save, sender=Order)
+def release_stock_on_cancel(sender, instance, created, **kwargs):
+    """آزاد کردن رزرو موجودی سفارش لغو شده"""
+    if created or instance.status != 'canceled':
+        return
+
+    from apps.product.service.stock_service import StockService
+
+    order_id = instance.pk
+    transaction.on_commit(lambda: StockService.release_order(order_id))
+
 
-        # اگه قبلاً موجودی این سفارش کم شده بود، دوباره کم نکن
-        if hasattr(order, 'stock_decreased') and order.stock_decreased:
-            return
+@receiver(pre_delete, sender=Order)
+def release_stock_on_delete(sender, instance, **kwargs):
+    """آزاد کردن رزرو موجودی قبل از حذف سفارش (رزروها همراه سفارش حذف می‌شوند)"""
+    from apps.product.service.stock_service import StockService
 
-        # کم کردن موجودی از هر آیتم سفارش
-        for detail in order.details.all():
-            product = detail.product
-            if product.stock >= detail.qty:
-                product.stock -= detail.qty
-                product.save()
-            else:
-                # اگه موجودی کافی نبود، می‌تونی لاگ بزنی یا خطا بدی
-                print(f"⚠️ موجودی کافی نیست برای محصول {product.title} - سفارش {order.orderCode}")
+    StockService.release_order(instance.pk)
 
-        # علامت بزن که موجودی کم شده (با یه attr موقت یا فیلد جدید)
-        order.stock_decreased = True
+
+# ========================
+# آمار فروش محصولات (لیست پرفروش‌ها)
+# ========================
+from django.db.models.signals import post_delete
 
 
 @receiver(post_save, sender=Order)
-def prevent_double_stock_decrease(sender, instance, created, **kwargs):
+def sync_product_sales_stats(sender, instance, **kwargs):
     """
-    هر سفارشی که ساخته می‌شه، یه attr موقت می‌گیره تا توی سیگنال پرداخت
-    بدونیم قبلاً کم شده یا نه.
+    اضافه/کم کردن اقلام سفارش از آمار فروش بعد از ثبت تراکنش
+    (بعد از ثبت تا اقلام سفارش هم ذخیره شده باشند)
     """
-    if created:
-        instance.stock_decreased = False
\ No newline at end of file
+    from apps.product.service.sales_service import SalesStatsService
+
+    order_id = instance.pk
+    transaction.on_commit(lambda: SalesStatsService.sync_order(order_id))
+
+
+@receiver(pre_delete, sender=Order)
+def remove_order_from_sales_stats(sender, instance, **kwargs):
+    """کم کردن اقلام سفارش شمرده شده قبل از حذف آن و اقلامش"""
+    from apps.product.service.sales_service import SalesStatsService
+
+    SalesStatsService.remove_order(instance.pk)
+
+
+@receiver(post_init, sender=OrderDetail)
+def store_original_detail_product(sender, instance, **kwargs):
+    """محصول اولیه قلم سفارش (تغییر محصول یک قلم آمار هر دو محصول را تغییر می‌دهد)"""
+    instance._original_product_id = instance.product_id
+
+
+@receiver(post_save, sender=OrderDetail)
+@receiver(post_delete, sender=OrderDetail)
+def recount_sales_stats_on_detail_change(sender, instance, **kwargs):
+    """ویرایش/حذف اقلام سفارش شمرده شده در آمار فروش (بعد از ثبت تراکنش)"""
+    from apps.product.service.sales_service import SalesStatsService
+
+    order_id = instance.order_id
+    product_ids = {instance.product_id, getattr(instance, '_original_product_id', None)} - {None}
+    instance._original_product_id = instance.product_id
+    transaction.on_commit(lambda: SalesStatsService.recount_order_lines(order_id, product_ids))
+
@@ -3,7 +3,9 @@ from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 import json
+from django.db import transaction
 from apps.product.models import Product
+from apps.product.service.stock_service import StockService, StockReservationError
 from django.shortcuts import get_object_or_404, redirect, render
 from .shop_cart import ShopCart
 from .models import Order, OrderDetail, State, City
@@ -296,27 +298,38 @@ class CreateOrderView(LoginRequiredMixin, View):
                 messages.error(request, "سبد خرید شما خالی است.", "danger")
                 return redirect("main:index")
 
-            order = Order.objects.create(
-                customer=request.user,
-                status="pending",
-            )
-
-            for item in shop_cart.get_cart_items():
-                try:
-                    product = Product.objects.get(id=item['id'])
-
-                    OrderDetail.objects.create(
-                        order=order,
-                        product=product,
-                        brand=product.brand,
-                        qty=item['quantity'],
-                        price=item['price'],
-                        selectedOptions=item.get('detail', '')
+            try:
+                # ثبت سفارش و رزرو موجودی اقلام آن با هم (در صورت کمبود هیچ‌کدام ثبت نمی‌شود)
+                with transaction.atomic():
+                    order = Order.objects.create(
+                        customer=request.user,
+                        status="pending",
                     )
 
-                except Product.DoesNotExist:
-                    messages.warning(request, f"محصول با شناسه {item['id']} یافت نشد و از سفارش حذف شد.")
-                    continue
+                    # محصولات همه اقلام با یک کوئری و درج اقلام با یک bulk_create
+                    cart_items = shop_cart.get_cart_items()
+                    products = Product.objects.in_bulk({int(item['id']) for item in cart_items})
+                    details = []
+                    for item in cart_items:
+                        product = products.get(int(item['id']))
+                        if product is None:
+                            messages.warning(request, f"محصول با شناسه {item['id']} یافت نشد و از سفارش حذف شد.")
+                            continue
+
+                        details.append(OrderDetail(
+                            order=order,
+                            product=product,
+                            brand_id=product.brand_id,
+                            qty=item['quantity'],
+                            price=item['price'],
+                            selectedOptions=item.get('detail', '')
+                        ))
+                    OrderDetail.objects.bulk_create(details)
+
+                    StockService.reserve_order(order.id)
+            except StockReservationError as e:
+                messages.error(request, f"موجودی کافی نیست: {e}", "danger")
+                return redirect('order:cart_page')
 
             # پاک کردن سبد خرید پس از ایجاد سفارش موفق
             shop_cart.delete_all_list()
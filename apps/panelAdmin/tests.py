@@ -1,3 +1,25 @@
 from django.test import TestCase
+from django.urls import reverse
+from apps.user.models.user import CustomUser
 
-# Create your tests here.
+
+class StaffOnlyViewsTest(TestCase):
+    """صفحات گروهی کاتالوگ و قیمت فقط برای کاربران staff"""
+
+    URL_NAMES = ('admin_catalog_import', 'admin_catalog_export', 'admin_product_reprice')
+
+    def test_requires_staff(self):
+        user = CustomUser.objects.create(mobileNumber='09120000002')
+        for logged_in in (False, True):
+            if logged_in:
+                self.client.force_login(user)
+            for name in self.URL_NAMES:
+                response = self.client.get(reverse(f'panelAdmin:{name}'))
+                self.assertEqual(response.status_code, 302, name)
+                self.assertIn(reverse('admin:login'), response['Location'])
+
+    def test_staff_allowed(self):
+        user = CustomUser.objects.create(mobileNumber='09120000003', is_staff=True)
+        self.client.force_login(user)
+        for name in self.URL_NAMES:
+            self.assertEqual(self.client.get(reverse(f'panelAdmin:{name}')).status_code, 200, name)
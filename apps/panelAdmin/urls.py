@@ -1,3 +1,4 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import path
 from .views.user import views
 from .views.product import product_view
@@ -44,6 +45,9 @@ urlpatterns = [
     # Product URLs
     path('products/', product_view.product_list, name='admin_product_list'),
     path('products/create/', product_view.product_create, name='admin_product_create'),
+    path('products/import/', staff_member_required(product_view.catalog_import), name='admin_catalog_import'),
+    path('products/export/', staff_member_required(product_view.catalog_export), name='admin_catalog_export'),
+    path('products/reprice/', staff_member_required(product_view.product_reprice), name='admin_product_reprice'),
     path('products/<int:product_id>/', product_view.product_detail, name='admin_product_detail'),
     path('products/<int:product_id>/update/', product_view.product_update, name='admin_product_update'),
     path('products/<int:product_id>/delete/', product_view.product_delete, name='admin_product_delete'),
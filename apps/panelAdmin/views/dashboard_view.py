@@ -2,7 +2,8 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models import Count, Sum, Q, F, Value, DecimalField, Subquery, OuterRef, Prefetch
+from django.db.models import Count, Sum, Q, F, Value, DecimalField, Subquery, OuterRef, Prefetch, prefetch_related_objects
+from django.db.models.functions import TruncDate
 import json
 from decimal import Decimal
 
@@ -10,6 +11,7 @@ from apps.user.models.user import CustomUser
 from apps.order.models import Order, OrderDetail
 from apps.product.models import Product
 from apps.peyment.models import Peyment
+from apps.product.service.sales_service import SalesStatsService
 
 def admin_check(user):
     return user.is_authenticated and user.is_staff
@@ -25,18 +27,15 @@ def admin_dashboard(request):
     month_ago = today - timedelta(days=30)
 
     # ========== آمار کاربران ==========
-    # تعداد کل کاربران
-    total_users = CustomUser.objects.count()
-
-    # کاربران جدید امروز
-    new_users_today = CustomUser.objects.filter(
-        createAt__date=today
-    ).count()
-
-    # کاربران جدید این هفته
-    new_users_week = CustomUser.objects.filter(
-        createAt__date__gte=week_ago
-    ).count()
+    # تعداد کل، جدید امروز و جدید این هفته با یک کوئری
+    user_counts = CustomUser.objects.aggregate(
+        total=Count('id'),
+        today=Count('id', filter=Q(createAt__date=today)),
+        week=Count('id', filter=Q(createAt__date__gte=week_ago)),
+    )
+    total_users = user_counts['total']
+    new_users_today = user_counts['today']
+    new_users_week = user_counts['week']
 
     # کاربران فعال (کسانی که سفارش داشتن)
     active_users = CustomUser.objects.filter(
@@ -44,92 +43,72 @@ def admin_dashboard(request):
     ).distinct().count()
 
     # ========== آمار سفارشات ==========
-    # کل سفارشات
-    total_orders = Order.objects.count()
+    # کل سفارشات، امروز، این هفته و هفته قبل، تحویل شده امروز و پرداخت نهایی شده با یک کوئری
+    order_counts = Order.objects.aggregate(
+        total=Count('id'),
+        today=Count('id', filter=Q(registerDate__date=today)),
+        week=Count('id', filter=Q(registerDate__date__gte=week_ago)),
+        last_week=Count('id', filter=Q(registerDate__date__gte=week_ago - timedelta(days=7),
+                                       registerDate__date__lt=week_ago)),
+        delivered_today=Count('id', filter=Q(status='delivered', updateDate__date=today)),
+        paid_final=Count('id', filter=Q(status='paid', isFinally=True)),
+    )
+    total_orders = order_counts['total']
 
     # سفارشات امروز
-    today_orders = Order.objects.filter(
-        registerDate__date=today
-    ).count()
+    today_orders = order_counts['today']
 
     # سفارشات این هفته
-    week_orders = Order.objects.filter(
-        registerDate__date__gte=week_ago
-    ).count()
+    week_orders = order_counts['week']
+
+    # تعداد سفارشات هر وضعیت با یک کوئری گروه‌بندی شده
+    status_counts = dict(Order.objects.values_list('status').annotate(total=Count('id')).order_by())
 
     # سفارشات در انتظار
-    pending_orders = Order.objects.filter(
-        status='pending'
-    ).count()
+    pending_orders = status_counts.get('pending', 0)
 
     # سفارشات در حال پردازش
-    processing_orders = Order.objects.filter(
-        status='processing'
-    ).count()
+    processing_orders = status_counts.get('processing', 0)
 
     # سفارشات پرداخت شده
-    paid_orders = Order.objects.filter(
-        status='paid'
-    ).count()
+    paid_orders = status_counts.get('paid', 0)
 
     # سفارشات تحویل شده امروز
-    delivered_today = Order.objects.filter(
-        status='delivered',
-        updateDate__date=today
-    ).count()
+    delivered_today = order_counts['delivered_today']
 
     # ========== آمار محصولات ==========
-    # کل محصولات
-    total_products = Product.objects.count()
-
-    # محصولات فعال
-    active_products = Product.objects.filter(isActive=True).count()
-
-    # محصولات ناموجود
-    out_of_stock = Product.objects.filter(
-        Q(stock=0) | Q(stock__isnull=True)
-    ).count()
-
-    # محصولات با موجودی کم (کمتر از 5)
-    low_stock = Product.objects.filter(
-        stock__lte=5,
-        stock__gt=0
-    ).count()
+    # کل، فعال، ناموجود و کم‌موجودی (کمتر از 5) با یک کوئری
+    product_counts = Product.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(isActive=True)),
+        out_of_stock=Count('id', filter=Q(stock=0) | Q(stock__isnull=True)),
+        low_stock=Count('id', filter=Q(stock__lte=5, stock__gt=0)),
+    )
+    total_products = product_counts['total']
+    active_products = product_counts['active']
+    out_of_stock = product_counts['out_of_stock']
+    low_stock = product_counts['low_stock']
 
     # ========== آمار مالی ==========
     # محاسبه درآمد فقط از پرداخت‌های نهایی شده (isFinaly=True)
 
-    # کل درآمد (همه زمان‌ها)
-    total_revenue = Peyment.objects.filter(
+    # کل درآمد (همه زمان‌ها)، امروز، این هفته و این ماه با یک کوئری
+    revenues = Peyment.objects.filter(
         isFinaly=True  # فقط پرداخت‌های نهایی شده
     ).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal('0')
-
-    # درآمد امروز
-    today_revenue = Peyment.objects.filter(
-        isFinaly=True,
-        createAt__date=today
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # درآمد این هفته
-    week_revenue = Peyment.objects.filter(
-        isFinaly=True,
-        createAt__date__gte=week_ago
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    # درآمد این ماه
-    month_revenue = Peyment.objects.filter(
-        isFinaly=True,
-        createAt__date__gte=month_ago
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        total=Sum('amount'),
+        today=Sum('amount', filter=Q(createAt__date=today)),
+        week=Sum('amount', filter=Q(createAt__date__gte=week_ago)),
+        month=Sum('amount', filter=Q(createAt__date__gte=month_ago)),
+    )
+    total_revenue = revenues['total'] or Decimal('0')
+    today_revenue = revenues['today'] or Decimal('0')
+    week_revenue = revenues['week'] or Decimal('0')
+    month_revenue = revenues['month'] or Decimal('0')
 
     # میانگین ارزش هر سفارش
     # برای محاسبه میانگین، از سفارش‌هایی که پرداخت نهایی شدن استفاده می‌کنیم
-    paid_orders_count = Order.objects.filter(
-        status='paid',
-        isFinally=True
-    ).count()
+    paid_orders_count = order_counts['paid_final']
 
     if paid_orders_count > 0:
         avg_order_value = total_revenue / paid_orders_count
@@ -163,36 +142,9 @@ def admin_dashboard(request):
     ).order_by('-createAt')[:10]
 
     # ========== محصولات پرفروش ==========
-    # محاسبه دقیق پرفروش‌ترین محصولات
-    top_products = []
-
-    # دریافت همه محصولات فعال
-    all_products = Product.objects.filter(isActive=True).prefetch_related('category', 'brand')[:20]
-
-    for product in all_products:
-        # محاسبه تعداد فروش (تعداد آیتم‌های فروخته شده) - فقط سفارشات نهایی شده
-        total_sold = OrderDetail.objects.filter(
-            product=product,
-            order__status__in=['delivered', 'paid', 'processing'],
-            order__isFinally=True
-        ).aggregate(total=Sum('qty'))['total'] or 0
-
-        if total_sold > 0:  # فقط محصولاتی که فروش داشتن
-            # محاسبه درآمد از این محصول
-            total_revenue_product = OrderDetail.objects.filter(
-                product=product,
-                order__status__in=['delivered', 'paid', 'processing'],
-                order__isFinally=True
-            ).aggregate(
-                total=Sum(F('price') * F('qty'), output_field=DecimalField())
-            )['total'] or Decimal('0')
-
-            product.total_sold = total_sold
-            product.total_revenue = total_revenue_product
-            top_products.append(product)
-
-    # مرتب‌سازی بر اساس تعداد فروش
-    top_products = sorted(top_products, key=lambda x: x.total_sold, reverse=True)[:5]
+    # از جدول آمار فروش؛ total_sold و total_revenue روی هر محصول ست می‌شود
+    top_products = SalesStatsService.top_products(limit=5)
+    prefetch_related_objects(top_products, 'category')
 
     # ========== آخرین پرداخت‌ها ==========
     recent_payments = Peyment.objects.filter(
@@ -202,7 +154,7 @@ def admin_dashboard(request):
     # ========== آمار وضعیت سفارشات ==========
     order_status_stats = []
     for status_code, status_name in Order.STATUS_CHOICES:
-        count = Order.objects.filter(status=status_code).count()
+        count = status_counts.get(status_code, 0)
         if count > 0:
             order_status_stats.append({
                 'code': status_code,
@@ -213,10 +165,7 @@ def admin_dashboard(request):
 
     # ========== محاسبه نرخ رشد ==========
     # مقایسه با هفته قبل
-    last_week_orders = Order.objects.filter(
-        registerDate__date__gte=week_ago - timedelta(days=7),
-        registerDate__date__lt=week_ago
-    ).count()
+    last_week_orders = order_counts['last_week']
 
     if last_week_orders > 0:
         order_growth = ((week_orders - last_week_orders) / last_week_orders) * 100
@@ -258,23 +207,24 @@ def admin_dashboard(request):
     chart_data = []
     chart_orders_count = []
 
+    # درآمد (فقط پرداخت‌های نهایی شده) و تعداد سفارشات هر روز با یک کوئری گروه‌بندی شده برای هر کدام
+    chart_start = today - timedelta(days=6)
+    daily_revenues = dict(
+        Peyment.objects.filter(isFinaly=True, createAt__date__gte=chart_start)
+        .annotate(day=TruncDate('createAt')).values_list('day')
+        .annotate(total=Sum('amount')).order_by()
+    )
+    daily_orders = dict(
+        Order.objects.filter(registerDate__date__gte=chart_start)
+        .annotate(day=TruncDate('registerDate')).values_list('day')
+        .annotate(total=Count('id')).order_by()
+    )
+
     for i in range(6, -1, -1):
         date = today - timedelta(days=i)
         chart_labels.append(date.strftime('%Y/%m/%d'))
-
-        # درآمد هر روز (فقط پرداخت‌های نهایی شده)
-        day_revenue = Peyment.objects.filter(
-            isFinaly=True,
-            createAt__date=date
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-        # تعداد سفارشات هر روز
-        day_orders = Order.objects.filter(
-            registerDate__date=date
-        ).count()
-
-        chart_data.append(float(day_revenue))
-        chart_orders_count.append(day_orders)
+        chart_data.append(float(daily_revenues.get(date) or Decimal('0')))
+        chart_orders_count.append(daily_orders.get(date, 0))
 
     context = {
         'stats': {
@@ -4,10 +4,11 @@ from django.db import transaction
 from django.core.paginator import Paginator
 from django.utils import timezone
 from django.http import JsonResponse
-from django.db.models import Q, Count
+from django.db.models import Count
 from datetime import datetime, timedelta
 from apps.discount.models import Copon, DiscountBasket, DiscountDetail
 from apps.product.models import Product, Category, Brand
+from apps.search.service.search_index_service import SearchIndexService
 
 # ========================
 # COUPON CRUD
@@ -566,14 +567,10 @@ def search_products_ajax(request):
     # فیلتر پایه
     products = Product.objects.filter(isActive=True).select_related('brand').prefetch_related('category')
 
-    # اعمال فیلترها
-    if search_term:
-        products = products.filter(
-            Q(title__icontains=search_term) |
-            Q(slug__icontains=search_term) |
-            Q(brand__title__icontains=search_term) |
-            Q(category__title__icontains=search_term)
-        )
+    # اعمال فیلترها (عبارت جستجو از ایندکس جستجو: عنوان، slug، برند و دسته‌بندی)
+    ranked_ids = SearchIndexService.search(search_term) if search_term else None
+    if ranked_ids is not None:
+        products = products.filter(pk__in=ranked_ids)
 
     if category_id:
         products = products.filter(category__id=category_id)
@@ -581,13 +578,19 @@ def search_products_ajax(request):
     if brand_id:
         products = products.filter(brand__id=brand_id)
 
-    # تعداد کل محصولات
-    total_count = products.count()
-
     # صفحه‌بندی
     start = (page - 1) * limit
     end = start + limit
-    paginated_products = products.distinct()[start:end]
+    if ranked_ids is not None:
+        # به ترتیب رتبه جستجو
+        matching_ids = set(products.values_list('id', flat=True))
+        ranked_ids = [pk for pk in ranked_ids if pk in matching_ids]
+        total_count = len(ranked_ids)
+        page_ids = ranked_ids[start:end]
+        paginated_products = SearchIndexService.in_rank_order(products.filter(pk__in=page_ids).distinct(), page_ids)
+    else:
+        total_count = products.count()
+        paginated_products = products.distinct()[start:end]
 
     # آماده‌سازی داده‌ها
     results = []
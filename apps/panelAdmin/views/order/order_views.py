@@ -3,7 +3,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db import transaction
 from django.core.paginator import Paginator
-from django.db.models import Q, Sum, Count, F
+from django.db.models import Q, Sum, Count, F, Prefetch
+from django.db.models.functions import TruncDate
 from django.http import JsonResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -12,9 +13,17 @@ from apps.order.models import (
     State, City, UserAddress,
     Order, OrderDetail, CustomUser, Product, Brand
 )
+from apps.product.models import ProductSaleType
 import json
 import utils
 
+
+def _active_products():
+    """محصولات فعال فرم‌های سفارش با برند و انواع فروش (بدون کوئری برای هر محصول در قالب)"""
+    return Product.objects.filter(isActive=True).select_related('brand').prefetch_related(
+        Prefetch('saleTypes', queryset=ProductSaleType.objects.order_by('pk'))
+    )
+
 # ========================
 # STATE & CITY CRUD
 # ========================
@@ -453,7 +462,7 @@ def order_detail(request, order_id):
 def order_create(request):
     """ایجاد سفارش جدید"""
     users = CustomUser.objects.all()
-    products = Product.objects.filter(isActive=True)
+    products = _active_products()
     addresses = UserAddress.objects.all()
 
     if request.method == 'POST':
@@ -666,7 +675,7 @@ def add_order_item(request, order_id):
         pass
 
     order = get_object_or_404(Order, id=order_id)
-    products = Product.objects.filter(isActive=True)
+    products = _active_products()
 
     if request.method == 'POST':
         try:
@@ -709,7 +718,7 @@ def update_order_item(request, item_id):
         except Exception as e:
             messages.error(request, f'خطا در ویرایش آیتم سفارش: {str(e)}')
 
-    products = Product.objects.filter(isActive=True)
+    products = _active_products()
 
     return render(request, 'panelAdmin/orders/order/update_item.html', {
         'order_item': order_item,
@@ -808,14 +817,15 @@ def order_report(request):
     order_details_in_period = OrderDetail.objects.filter(
         order__registerDate__date__range=[start_date, end_date]
     )
-    total_revenue = sum(item.price * item.qty for item in order_details_in_period)
+    total_revenue = order_details_in_period.aggregate(total=Sum(F('price') * F('qty')))['total'] or 0
 
     total_items = order_details_in_period.aggregate(Sum('qty'))['qty__sum'] or 0
 
     # آمار بر اساس وضعیت
+    status_counts = dict(orders.values_list('status').annotate(total=Count('id')).order_by())
     status_stats = {}
     for status_code, status_name in Order.STATUS_CHOICES:
-        count = orders.filter(status=status_code).count()
+        count = status_counts.get(status_code, 0)
         if count > 0:
             status_stats[status_name] = {
                 'count': count,
@@ -823,23 +833,25 @@ def order_report(request):
             }
 
     # آمار بر اساس روز
+    # تعداد و درآمد همه روزها با یک کوئری گروه‌بندی شده برای هر کدام
+    daily_counts = dict(
+        orders.annotate(day=TruncDate('registerDate')).values_list('day')
+        .annotate(total=Count('id')).order_by()
+    )
+    daily_revenues = dict(
+        order_details_in_period.annotate(day=TruncDate('order__registerDate')).values_list('day')
+        .annotate(total=Sum(F('price') * F('qty'))).order_by()
+    )
     daily_stats = []
     current_date = start_date
     while current_date <= end_date:
-        day_orders = orders.filter(registerDate__date=current_date)
-        day_count = day_orders.count()
-
-        # محاسبه درآمد روزانه
-        day_order_details = OrderDetail.objects.filter(
-            order__registerDate__date=current_date
-        )
-        day_revenue = sum(item.price * item.qty for item in day_order_details)
-
+        # مثل فیلتر __date: تاریخ محلی (سفارش‌ها با TruncDate به وقت محلی گروه‌بندی شده‌اند)
+        day = (timezone.localtime(current_date) if timezone.is_aware(current_date) else current_date).date()
         daily_stats.append({
             'date': current_date.strftime('%Y-%m-%d'),
             'date_display': current_date.strftime('%d/%m/%Y'),
-            'order_count': day_count,
-            'revenue': day_revenue
+            'order_count': daily_counts.get(day, 0),
+            'revenue': daily_revenues.get(day) or 0
         })
 
         current_date += timedelta(days=1)
@@ -857,23 +869,21 @@ def order_report(request):
 
     # کاربران فعال - با محاسبه مجموع خرید از OrderDetail
     top_customers_data = []
+    # تعداد سفارش و مجموع خرید همه مشتریان با یک کوئری گروه‌بندی شده برای هر کدام
     customers = orders.values(
         'customer__id',
         'customer__mobileNumber',
         'customer__name',
         'customer__family'
-    ).distinct()
+    ).annotate(order_count=Count('id')).order_by()
+    customer_spent = dict(
+        order_details_in_period.values_list('order__customer_id')
+        .annotate(total=Sum(F('price') * F('qty'))).order_by()
+    )
 
     for customer in customers:
-        customer_orders = orders.filter(customer_id=customer['customer__id'])
-        order_count = customer_orders.count()
-
-        # محاسبه مجموع خرید از OrderDetail
-        customer_order_details = OrderDetail.objects.filter(
-            order__customer_id=customer['customer__id'],
-            order__registerDate__date__range=[start_date, end_date]
-        )
-        total_spent = sum(item.price * item.qty for item in customer_order_details)
+        order_count = customer['order_count']
+        total_spent = customer_spent.get(customer['customer__id']) or 0
 
         if order_count > 0:
             top_customers_data.append({
@@ -892,7 +902,7 @@ def order_report(request):
     status_data = []
     colors = ['#4361ee', '#4cc9f0', '#f72585', '#7209b7', '#3a0ca3', '#f8961e']
     for i, (status_code, status_name) in enumerate(Order.STATUS_CHOICES):
-        count = orders.filter(status=status_code).count()
+        count = status_counts.get(status_code, 0)
         status_data.append({
             'name': status_name,
             'count': count,
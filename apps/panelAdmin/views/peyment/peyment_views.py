@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.db import transaction
 from django.core.paginator import Paginator
 from django.db.models import Q, Sum, Count, F
+from django.db.models.functions import TruncDate
 from django.http import JsonResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -435,40 +436,52 @@ def payment_report(request):
     # فیلتر پرداخت‌ها بر اساس تاریخ
     payments = Peyment.objects.filter(
         createAt__date__range=[start_date, end_date]
+    ).select_related('order', 'customer')
+
+    # آمار کلی، موفق و ناموفق با یک کوئری
+    totals = payments.aggregate(
+        total_payments=Count('id'),
+        total_amount=Sum('amount'),
+        successful_count=Count('id', filter=Q(isFinaly=True)),
+        successful_amount=Sum('amount', filter=Q(isFinaly=True)),
+        failed_count=Count('id', filter=Q(isFinaly=False)),
+        failed_amount=Sum('amount', filter=Q(isFinaly=False)),
     )
-
-    # آمار کلی
-    total_payments = payments.count()
-    total_amount = payments.aggregate(Sum('amount'))['amount__sum'] or 0
+    total_payments = totals['total_payments']
+    total_amount = totals['total_amount'] or 0
 
     # پرداخت‌های موفق
-    successful_payments = payments.filter(isFinaly=True)
-    successful_count = successful_payments.count()
-    successful_amount = successful_payments.aggregate(Sum('amount'))['amount__sum'] or 0
+    successful_count = totals['successful_count']
+    successful_amount = totals['successful_amount'] or 0
 
     # پرداخت‌های ناموفق
-    failed_payments = payments.filter(isFinaly=False)
-    failed_count = failed_payments.count()
-    failed_amount = failed_payments.aggregate(Sum('amount'))['amount__sum'] or 0
+    failed_count = totals['failed_count']
+    failed_amount = totals['failed_amount'] or 0
 
     # آمار بر اساس روز
+    # آمار همه روزها با یک کوئری گروه‌بندی شده (به جای چهار کوئری برای هر روز)
+    daily_totals = {
+        row['day']: row for row in payments.annotate(day=TruncDate('createAt')).values('day').annotate(
+            payment_count=Count('id'),
+            total_amount=Sum('amount'),
+            successful_count=Count('id', filter=Q(isFinaly=True)),
+            failed_count=Count('id', filter=Q(isFinaly=False)),
+        ).order_by()
+    }
     daily_stats = []
     current_date = start_date
     while current_date <= end_date:
-        day_payments = payments.filter(createAt__date=current_date)
-        day_count = day_payments.count()
-        day_amount = day_payments.aggregate(Sum('amount'))['amount__sum'] or 0
-
-        day_successful = day_payments.filter(isFinaly=True).count()
-        day_failed = day_payments.filter(isFinaly=False).count()
+        # مثل فیلتر __date: تاریخ محلی (پرداخت‌ها با TruncDate به وقت محلی گروه‌بندی شده‌اند)
+        day = (timezone.localtime(current_date) if timezone.is_aware(current_date) else current_date).date()
+        day_totals = daily_totals.get(day, {})
 
         daily_stats.append({
             'date': current_date.strftime('%Y-%m-%d'),
             'date_jalali': utils.to_jalali(current_date),
-            'payment_count': day_count,
-            'total_amount': day_amount,
-            'successful_count': day_successful,
-            'failed_count': day_failed,
+            'payment_count': day_totals.get('payment_count', 0),
+            'total_amount': day_totals.get('total_amount') or 0,
+            'successful_count': day_totals.get('successful_count', 0),
+            'failed_count': day_totals.get('failed_count', 0),
         })
 
         current_date += timedelta(days=1)
@@ -569,7 +582,7 @@ def search_payments_ajax(request):
     search_term = request.GET.get('q', '')
     status = request.GET.get('status', '')
 
-    payments = Peyment.objects.all()
+    payments = Peyment.objects.select_related('order', 'customer')
 
     if status == 'success':
         payments = payments.filter(isFinaly=True)
@@ -611,31 +624,38 @@ def payment_dashboard_widget(request):
     now = timezone.now()
     today = now.date()
 
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+
+    # آمار امروز، هفته جاری و ماه جاری با یک کوئری
+    totals = Peyment.objects.filter(createAt__date__gte=min(week_start, month_start)).aggregate(
+        today_count=Count('id', filter=Q(createAt__date=today)),
+        today_amount=Sum('amount', filter=Q(createAt__date=today)),
+        today_successful_count=Count('id', filter=Q(createAt__date=today, isFinaly=True)),
+        today_successful_amount=Sum('amount', filter=Q(createAt__date=today, isFinaly=True)),
+        week_amount=Sum('amount', filter=Q(createAt__date__gte=week_start)),
+        month_amount=Sum('amount', filter=Q(createAt__date__gte=month_start)),
+    )
+
     # پرداخت‌های امروز
-    today_payments = Peyment.objects.filter(createAt__date=today)
-    today_count = today_payments.count()
-    today_amount = today_payments.aggregate(Sum('amount'))['amount__sum'] or 0
+    today_count = totals['today_count']
+    today_amount = totals['today_amount'] or 0
 
     # پرداخت‌های موفق امروز
-    today_successful = today_payments.filter(isFinaly=True)
-    today_successful_count = today_successful.count()
-    today_successful_amount = today_successful.aggregate(Sum('amount'))['amount__sum'] or 0
+    today_successful_count = totals['today_successful_count']
+    today_successful_amount = totals['today_successful_amount'] or 0
 
-    # پرداخت‌های هفته جاری
-    week_start = today - timedelta(days=today.weekday())
-    week_payments = Peyment.objects.filter(createAt__date__gte=week_start)
-    week_amount = week_payments.aggregate(Sum('amount'))['amount__sum'] or 0
-
-    # پرداخت‌های ماه جاری
-    month_start = today.replace(day=1)
-    month_payments = Peyment.objects.filter(createAt__date__gte=month_start)
-    month_amount = month_payments.aggregate(Sum('amount'))['amount__sum'] or 0
+    # پرداخت‌های هفته و ماه جاری
+    week_amount = totals['week_amount'] or 0
+    month_amount = totals['month_amount'] or 0
 
     # آخرین پرداخت‌ها
     recent_payments = Peyment.objects.select_related('order', 'customer').order_by('-createAt')[:10]
 
     # پرداخت‌های نیازمند توجه (ناموفق)
-    failed_payments = Peyment.objects.filter(isFinaly=False).order_by('-createAt')[:5]
+    failed_payments = Peyment.objects.filter(isFinaly=False).select_related(
+        'order', 'customer'
+    ).order_by('-createAt')[:5]
 
     context = {
         # آمار امروز
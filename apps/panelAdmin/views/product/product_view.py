@@ -2,10 +2,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db import transaction
 from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.db.models import Q, Prefetch
 from django.views.decorators.http import require_POST
 from django.core.files.storage import default_storage
+import io
 import json
 import os
 import uuid
@@ -13,8 +14,11 @@ from datetime import datetime
 from apps.product.models import (
     Product, Category, Brand, Feature, ProductGallery,
     ProductFeature, FeatureValue, ProductSaleType,
-    Rating, Comment,SaleType
+    Rating, Comment,SaleType, PriceChangeBatch
 )
+from apps.product.service.review_service import ReviewSummaryService
+from apps.product.service.catalog_service import CatalogImportService, CatalogExportService
+from apps.product.service.repricing_service import RepricingService
 
 
 # ========================
@@ -951,6 +955,118 @@ def product_delete(request, product_id):
         }
     })
 
+# ========================
+# ورود و خروجی گروهی کاتالوگ
+# ========================
+def catalog_import(request):
+    """ورود گروهی محصولات از فایل CSV/JSONL (با امکان اعتبارسنجی بدون ذخیره)"""
+    report = None
+    if request.method == 'POST':
+        uploaded = request.FILES.get('file')
+        file_format = request.POST.get('format') or (
+            'jsonl' if uploaded and uploaded.name.endswith(('.jsonl', '.json')) else 'csv'
+        )
+        dry_run = request.POST.get('dry_run') == 'on'
+
+        if not uploaded:
+            messages.error(request, 'لطفاً فایل را انتخاب کنید')
+        elif file_format not in CatalogImportService.FORMATS:
+            messages.error(request, 'فرمت فایل پشتیبانی نمی‌شود')
+        else:
+            try:
+                stream = io.TextIOWrapper(uploaded.file, encoding='utf-8-sig', newline='')
+                report = CatalogImportService.run(stream, file_format, dry_run=dry_run)
+                if report['errorCount']:
+                    messages.warning(request, f"{report['errorCount']} ردیف نامعتبر بود و ذخیره نشد")
+                if dry_run:
+                    messages.info(request, 'اعتبارسنجی انجام شد؛ تغییری ذخیره نشد')
+                else:
+                    messages.success(
+                        request,
+                        f"{report['created']} محصول جدید و {report['updated']} بروزرسانی ثبت شد"
+                    )
+            except UnicodeDecodeError:
+                messages.error(request, 'فایل باید با کدگذاری UTF-8 ذخیره شده باشد')
+            except Exception as e:
+                messages.error(request, f'خطا در ورود کاتالوگ: {str(e)}')
+
+    return render(request, 'panelAdmin/products/product/import.html', {
+        'report': report,
+        'formats': CatalogImportService.FORMATS,
+    })
+
+
+def catalog_export(request):
+    """دانلود جریانی کل کاتالوگ در قالب CSV یا JSONL"""
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in CatalogImportService.FORMATS:
+        file_format = 'csv'
+
+    response = StreamingHttpResponse(
+        CatalogExportService.iter_lines(file_format),
+        content_type='text/csv; charset=utf-8' if file_format == 'csv' else 'application/x-ndjson; charset=utf-8'
+    )
+    filename = f"catalog_{datetime.now().strftime('%Y%m%d_%H%M')}.{file_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ========================
+# تغییر گروهی قیمت
+# ========================
+def product_reprice(request):
+    """تغییر گروهی قیمت انواع فروش: پیش‌نمایش و سپس اعمال"""
+    preview = None
+    form_data = {}
+    if request.method == 'POST':
+        form_data = {
+            'brands': request.POST.getlist('brands'),
+            'categories': request.POST.getlist('categories'),
+            'typeSales': request.POST.getlist('type_sales'),
+            'products': request.POST.get('product_ids', ''),
+            'mode': request.POST.get('mode'),
+            'amount': request.POST.get('amount', ''),
+            'rounding': request.POST.get('rounding'),
+            'step': request.POST.get('step'),
+            'note': request.POST.get('note', '').strip(),
+        }
+        try:
+            rule = RepricingService.clean_rule(form_data)
+        except ValueError as e:
+            messages.error(request, str(e))
+        else:
+            if request.POST.get('action') == 'apply':
+                try:
+                    batch = RepricingService.apply(
+                        [rule],
+                        user=request.user if request.user.is_authenticated else None,
+                        note=form_data['note']
+                    )
+                    messages.success(
+                        request,
+                        f'قیمت {batch.saleTypeCount} نوع فروش از {batch.productCount} محصول تغییر کرد'
+                    )
+                    return redirect('panelAdmin:admin_product_reprice')
+                except Exception as e:
+                    messages.error(request, f'خطا در اعمال تغییر قیمت: {str(e)}')
+            else:
+                preview = RepricingService.preview([rule])[0]
+                if not preview['count']:
+                    messages.info(request, 'قیمت هیچ نوع فروشی با این قانون تغییر نمی‌کند')
+
+    return render(request, 'panelAdmin/products/product/reprice.html', {
+        'brands': Brand.objects.filter(isActive=True).order_by('title'),
+        'categories': Category.objects.filter(isActive=True).order_by('level', 'title'),
+        'sale_type_choices': SaleType.CHOICES,
+        'form_data': form_data,
+        'selected_brands': [int(value) for value in form_data.get('brands', []) if value.isdigit()],
+        'selected_categories': [int(value) for value in form_data.get('categories', []) if value.isdigit()],
+        'selected_type_sales': [int(value) for value in form_data.get('typeSales', []) if value.isdigit()],
+        'preview': preview,
+        'recent_batches': PriceChangeBatch.objects.select_related('user')[:10],
+    })
+
+
 @require_POST
 def delete_gallery_image(request, image_id):
     """حذف تصویر از گالری"""
@@ -1173,12 +1289,16 @@ def bulk_comment_action(request):
 
         try:
             comments = Comment.objects.filter(id__in=comment_ids)
+            product_ids = set(comments.values_list('product_id', flat=True))
 
             if action == 'activate':
                 comments.update(isActive=True)
+                # update سیگنال نمی‌فرستد؛ خلاصه نظرات محصولات دستی بروزرسانی می‌شود
+                ReviewSummaryService.refresh_many(product_ids)
                 messages.success(request, f'{comments.count()} کامنت فعال شدند')
             elif action == 'deactivate':
                 comments.update(isActive=False)
+                ReviewSummaryService.refresh_many(product_ids)
                 messages.success(request, f'{comments.count()} کامنت غیرفعال شدند')
             elif action == 'delete':
                 count = comments.count()
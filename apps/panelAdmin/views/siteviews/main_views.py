@@ -5,7 +5,7 @@ from django.db import transaction
 from django.core.paginator import Paginator
 from django.utils import timezone
 from django.http import JsonResponse
-from django.db.models import Q
+from django.db.models import Count, Q
 from datetime import datetime
 from PIL import Image
 import os
@@ -690,36 +690,45 @@ def site_dashboard(request):
     """داشبورد مدیریت سایت"""
     now = timezone.now()
 
+    # تعداد کل، فعال، منقضی شده و در حال اجرای هر نوع محتوا با یک کوئری
+    def content_counts(queryset):
+        return queryset.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(isActive=True)),
+            expired=Count('id', filter=Q(endData__lt=now)),
+            current=Count('id', filter=Q(registerData__lte=now, endData__gte=now, isActive=True)),
+        )
+
     # آمار اسلایدرهای سایت
     site_sliders = SliderSite.objects.all()
-    active_site_sliders = site_sliders.filter(isActive=True).count()
-    expired_site_sliders = site_sliders.filter(endData__lt=now).count()
-    current_site_sliders = site_sliders.filter(
-        registerData__lte=now, endData__gte=now, isActive=True
-    ).count()
+    site_slider_counts = content_counts(site_sliders)
+    active_site_sliders = site_slider_counts['active']
+    expired_site_sliders = site_slider_counts['expired']
+    current_site_sliders = site_slider_counts['current']
 
     # آمار اسلایدرهای اصلی
     main_sliders = SliderMain.objects.all()
-    active_main_sliders = main_sliders.filter(isActive=True).count()
-    expired_main_sliders = main_sliders.filter(endData__lt=now).count()
-    current_main_sliders = main_sliders.filter(
-        registerData__lte=now, endData__gte=now, isActive=True
-    ).count()
+    main_slider_counts = content_counts(main_sliders)
+    active_main_sliders = main_slider_counts['active']
+    expired_main_sliders = main_slider_counts['expired']
+    current_main_sliders = main_slider_counts['current']
 
     # آمار بنرها
     banners = Banner.objects.all()
-    active_banners = banners.filter(isActive=True).count()
-    expired_banners = banners.filter(endData__lt=now).count()
-    current_banners = banners.filter(
-        registerData__lte=now, endData__gte=now, isActive=True
-    ).count()
+    banner_counts = content_counts(banners)
+    active_banners = banner_counts['active']
+    expired_banners = banner_counts['expired']
+    current_banners = banner_counts['current']
 
-    # آمار شماره‌های تماس
+    # آمار شماره‌های تماس (تعداد شماره‌های فعال هر نوع با یک کوئری گروه‌بندی شده)
     phones = ContactPhone.objects.all()
-    active_phones = phones.filter(is_active=True).count()
+    active_by_type = dict(
+        phones.filter(is_active=True).values_list('phone_type').annotate(total=Count('id')).order_by()
+    )
+    active_phones = sum(active_by_type.values())
     phone_by_type = {}
     for phone_type, type_name in ContactPhone.PHONE_TYPE_CHOICES:
-        count = phones.filter(phone_type=phone_type, is_active=True).count()
+        count = active_by_type.get(phone_type, 0)
         if count > 0:
             phone_by_type[type_name] = count
 
@@ -748,9 +757,9 @@ def site_dashboard(request):
 
     context = {
         # آمار کلی
-        'total_site_sliders': site_sliders.count(),
-        'total_main_sliders': main_sliders.count(),
-        'total_banners': banners.count(),
+        'total_site_sliders': site_slider_counts['total'],
+        'total_main_sliders': main_slider_counts['total'],
+        'total_banners': banner_counts['total'],
         'total_phones': phones.count(),
 
         # آمار فعال
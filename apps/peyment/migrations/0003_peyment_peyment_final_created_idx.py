@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('peyment', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='peyment',
+            index=models.Index(fields=['isFinaly', 'createAt'], name='peyment_final_created_idx'),
+        ),
+    ]
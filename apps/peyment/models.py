@@ -32,4 +32,8 @@ class Peyment(models.Model):
     class Meta:
         verbose_name = 'پرداخت'
         verbose_name_plural = 'پرداخت ها'
+        indexes = [
+            # پرداخت‌های موفق بازه زمانی (گزارش فروش)
+            models.Index(fields=['isFinaly', 'createAt'], name='peyment_final_created_idx'),
+        ]
 
@@ -5,6 +5,7 @@ from .models import (
     Category, Brand, Feature, FeatureValue, Product,
     ProductGallery, ProductFeature, ProductSaleType,
     Rating, Comment,TypeProductTitle)
+from .service.review_service import ReviewSummaryService
 
 # ========================
 # فیلترهای سفارشی
@@ -360,18 +361,27 @@ class CommentAdmin(admin.ModelAdmin):
         return obj.text
     text_preview.short_description = 'متن'
 
+    # queryset.update سیگنال post_save نمی‌فرستد؛ خلاصه نظرات دستی بروزرسانی می‌شود
+    def _refresh_summaries(self, queryset):
+        product_ids = set(queryset.values_list('product_id', flat=True))
+        ReviewSummaryService.refresh_many(product_ids)
+
     def make_active(self, request, queryset):
         updated = queryset.update(isActive=True)
+        self._refresh_summaries(queryset)
         self.message_user(request, f'{updated} کامنت فعال شدند.')
 
     def make_inactive(self, request, queryset):
         updated = queryset.update(isActive=False)
+        self._refresh_summaries(queryset)
         self.message_user(request, f'{updated} کامنت غیرفعال شدند.')
 
     def mark_as_recommend(self, request, queryset):
         updated = queryset.update(typeComment='recommend')
+        self._refresh_summaries(queryset)
         self.message_user(request, f'{updated} کامنت به "پیشنهاد می‌کنم" تغییر یافت.')
 
     def mark_as_not_recommend(self, request, queryset):
         updated = queryset.update(typeComment='not_recommend')
-        self.message_user(request, f'{updated} کامنت به "پیشنهاد نمی‌کنم" تغییر یافت.')
\ No newline at end of file
+        self._refresh_summaries(queryset)
+        self.message_user(request, f'{updated} کامنت به "پیشنهاد نمی‌کنم" تغییر یافت.')
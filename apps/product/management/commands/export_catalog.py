@@ -0,0 +1,26 @@
+import sys
+from django.core.management.base import BaseCommand
+from apps.product.service.catalog_service import CatalogExportService, CatalogImportService
+
+
+class Command(BaseCommand):
+    help = 'خروجی جریانی کاتالوگ محصولات در قالب CSV یا JSONL (قابل ورود با import_catalog)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=CatalogImportService.FORMATS, default='jsonl')
+        parser.add_argument('--output', help='مسیر فایل خروجی (پیش‌فرض: خروجی استاندارد)')
+        parser.add_argument('--chunk-size', type=int, default=CatalogExportService.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lines = CatalogExportService.iter_lines(options['format'], chunk_size=options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                sys.stdout.write(line)
+            return
+
+        count = -1 if options['format'] == 'csv' else 0
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count} محصول در {options["output"]} نوشته شد'))
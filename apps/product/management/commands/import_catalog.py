@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.product.service.catalog_service import CatalogImportService
+
+
+class Command(BaseCommand):
+    help = 'ورود گروهی محصولات، انواع فروش، ویژگی‌ها و دسته‌بندی‌ها از فایل CSV یا JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='مسیر فایل ورودی')
+        parser.add_argument('--format', choices=CatalogImportService.FORMATS,
+                            help='فرمت فایل (پیش‌فرض: از روی پسوند)')
+        parser.add_argument('--dry-run', action='store_true', help='فقط اعتبارسنجی، بدون ذخیره')
+        parser.add_argument('--batch-size', type=int, default=CatalogImportService.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+
+        def progress(report):
+            self.stdout.write(
+                f"{report['rows']} ردیف خوانده شد - {report['valid']} معتبر، {report['errorCount']} خطا"
+            )
+
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                report = CatalogImportService.run(
+                    stream, file_format, dry_run=options['dry_run'],
+                    batch_size=options['batch_size'], progress=progress
+                )
+        except OSError as e:
+            raise CommandError(f'خطا در خواندن فایل: {e}')
+
+        for line_number, message in report['errors']:
+            self.stdout.write(self.style.ERROR(f'خط {line_number}: {message}'))
+        if report['errorCount'] > len(report['errors']):
+            self.stdout.write(self.style.ERROR(f"... و {report['errorCount'] - len(report['errors'])} خطای دیگر"))
+
+        prefix = 'اعتبارسنجی (بدون ذخیره)' if report['dryRun'] else 'ورود کاتالوگ'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}: {report['created']} محصول جدید، {report['updated']} بروزرسانی، "
+            f"{report['errorCount']} ردیف نامعتبر"
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.product.service.category_service import CategoryClosureService
+
+
+class Command(BaseCommand):
+    help = 'ساخت مجدد جدول بستار دسته‌بندی‌ها (CategoryClosure)، سطح و تعداد محصولات زیرشاخه‌ها'
+
+    def handle(self, *args, **options):
+        rows = CategoryClosureService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{rows} رابطه دسته‌بندی ساخته شد'))
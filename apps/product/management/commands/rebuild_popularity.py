@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.product.service.popularity_service import PopularityService
+
+
+class Command(BaseCommand):
+    help = 'ثبت بازدیدهای بافر شده و محاسبه مجدد امتیاز محبوبیت همه محصولات'
+
+    def handle(self, *args, **options):
+        products = PopularityService.refresh_scores()
+        self.stdout.write(self.style.SUCCESS(f'امتیاز محبوبیت {products} محصول بروزرسانی شد'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from apps.product.models import Product
+from apps.product.service.pricing_service import PricingService
+
+
+class Command(BaseCommand):
+    help = 'ساخت مجدد جدول قیمت محصولات (ProductPricing) برای همه محصولات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = list(Product.objects.values_list('pk', flat=True).order_by('pk'))
+
+        for start in range(0, len(product_ids), batch_size):
+            PricingService.refresh_many(product_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f'قیمت {len(product_ids)} محصول بروزرسانی شد'))
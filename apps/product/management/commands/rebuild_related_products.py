@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.product.service.recommendation_service import RecommendationService
+
+
+class Command(BaseCommand):
+    help = 'ساخت مجدد محصولات مرتبط (RelatedProduct) از روی خریدها و علاقه‌مندی‌های مشترک'
+
+    def handle(self, *args, **options):
+        rows = RecommendationService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{rows} رابطه محصول مرتبط ساخته شد'))
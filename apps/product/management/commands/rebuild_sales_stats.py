@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.product.service.sales_service import SalesStatsService
+
+
+class Command(BaseCommand):
+    help = 'محاسبه مجدد آمار فروش محصولات (ProductSalesStats) از روی سفارش‌های فروخته شده'
+
+    def handle(self, *args, **options):
+        products = SalesStatsService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'آمار فروش {products} محصول ساخته شد'))
@@ -0,0 +1,36 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0003_typeproducttitle_product_typetitle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductReviewSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('averageRating', models.FloatField(default=0, verbose_name='میانگین امتیاز')),
+                ('totalRatings', models.PositiveIntegerField(default=0, verbose_name='تعداد امتیازها')),
+                ('star1', models.PositiveIntegerField(default=0, verbose_name='۱ ستاره')),
+                ('star2', models.PositiveIntegerField(default=0, verbose_name='۲ ستاره')),
+                ('star3', models.PositiveIntegerField(default=0, verbose_name='۳ ستاره')),
+                ('star4', models.PositiveIntegerField(default=0, verbose_name='۴ ستاره')),
+                ('star5', models.PositiveIntegerField(default=0, verbose_name='۵ ستاره')),
+                ('totalComments', models.PositiveIntegerField(default=0, verbose_name='تعداد کامنت\u200cهای فعال')),
+                ('recommendCount', models.PositiveIntegerField(default=0, verbose_name='تعداد پیشنهاد می\u200cکنم')),
+                ('notRecommendCount', models.PositiveIntegerField(default=0, verbose_name='تعداد پیشنهاد نمی\u200cکنم')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reviewSummary', to='product.product', verbose_name='محصول')),
+            ],
+            options={
+                'verbose_name': 'خلاصه نظرات محصول',
+                'verbose_name_plural': 'خلاصه نظرات محصولات',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_productreviewsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPricing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('basePrice', models.PositiveIntegerField(blank=True, null=True, verbose_name='قیمت پایه')),
+                ('discountPercent', models.PositiveIntegerField(default=0, verbose_name='درصد تخفیف')),
+                ('finalPrice', models.PositiveIntegerField(blank=True, null=True, verbose_name='قیمت نهایی')),
+                ('discountEndsAt', models.DateTimeField(blank=True, null=True, verbose_name='پایان تخفیف')),
+                ('nextChangeAt', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='زمان تغییر بعدی')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pricing', to='product.product', verbose_name='محصول')),
+            ],
+            options={
+                'verbose_name': 'قیمت محصول',
+                'verbose_name_plural': 'قیمت محصولات',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productpricing',
+            index=models.Index(fields=['basePrice', 'product'], name='pricing_base_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productpricing',
+            index=models.Index(fields=['finalPrice', 'product'], name='pricing_final_price_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:23
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def build_category_closure(apps, schema_editor):
+    """ساخت روابط جد/نواده، سطح و تعداد محصولات دسته‌بندی‌های موجود"""
+    Category = apps.get_model('product', 'Category')
+    CategoryClosure = apps.get_model('product', 'CategoryClosure')
+
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    rows, levels = [], {}
+    for category_id in parents:
+        node, depth, seen = category_id, 0, set()
+        while node is not None and node not in seen:
+            seen.add(node)
+            rows.append(CategoryClosure(ancestor_id=node, descendant_id=category_id, depth=depth))
+            node, depth = parents.get(node), depth + 1
+        levels[category_id] = depth - 1
+
+    CategoryClosure.objects.bulk_create(rows, batch_size=1000)
+    for category_id, level in levels.items():
+        if level:
+            Category.objects.filter(pk=category_id).update(level=level)
+
+    counts = CategoryClosure.objects.values('ancestor_id').annotate(
+        total=Count('descendant__products', filter=Q(descendant__products__isActive=True), distinct=True)
+    ).order_by().values_list('ancestor_id', 'total')
+    for category_id, total in counts:
+        if total:
+            Category.objects.filter(pk=category_id).update(subtreeProductCount=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_productpricing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='level',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, verbose_name='سطح'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='subtreeProductCount',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد محصولات زیرشاخه\u200cها'),
+        ),
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(verbose_name='فاصله')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendantLinks', to='product.category', verbose_name='دسته\u200cبندی جد')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestorLinks', to='product.category', verbose_name='دسته\u200cبندی نواده')),
+            ],
+            options={
+                'verbose_name': 'رابطه دسته\u200cبندی',
+                'verbose_name_plural': 'روابط دسته\u200cبندی',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='categoryclosure',
+            index=models.Index(fields=['descendant', 'ancestor'], name='category_closure_desc_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categoryclosure',
+            unique_together={('ancestor', 'descendant')},
+        ),
+        migrations.RunPython(build_category_closure, migrations.RunPython.noop),
+    ]
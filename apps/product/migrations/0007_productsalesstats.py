@@ -0,0 +1,96 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:29
+
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+import django.db.models.deletion
+
+
+SOLD_STATUSES = ('processing', 'paid', 'shipped', 'delivered')
+
+
+def build_sales_stats(apps, schema_editor):
+    """ثبت سفارش‌های فروخته شده موجود و محاسبه آمار فروش محصولات"""
+    Order = apps.get_model('order', 'Order')
+    OrderDetail = apps.get_model('order', 'OrderDetail')
+    OrderSalesRecord = apps.get_model('product', 'OrderSalesRecord')
+    ProductSalesStats = apps.get_model('product', 'ProductSalesStats')
+
+    sold_orders = Order.objects.filter(isFinally=True, status__in=SOLD_STATUSES)
+    OrderSalesRecord.objects.bulk_create(
+        [OrderSalesRecord(order_id=order_id) for order_id in sold_orders.values_list('pk', flat=True)],
+        batch_size=1000
+    )
+
+    def aggregate(details):
+        rows = details.values('product_id').annotate(
+            total_qty=Sum('qty'),
+            total_revenue=Sum(F('price') * F('qty')),
+            last_sold=Max('order__registerDate'),
+        ).order_by()
+        return {row['product_id']: row for row in rows}
+
+    details = OrderDetail.objects.filter(order__in=sold_orders)
+    totals = aggregate(details)
+    window = aggregate(details.filter(order__registerDate__gte=timezone.now() - timedelta(days=30)))
+    ProductSalesStats.objects.bulk_create([
+        ProductSalesStats(
+            product_id=product_id,
+            unitsSold=row['total_qty'] or 0,
+            revenue=row['total_revenue'] or 0,
+            unitsSold30d=window.get(product_id, {}).get('total_qty') or 0,
+            revenue30d=window.get(product_id, {}).get('total_revenue') or 0,
+            lastSoldAt=row['last_sold'],
+        )
+        for product_id, row in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0002_initial'),
+        ('product', '0006_categoryclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unitsSold', models.PositiveIntegerField(default=0, verbose_name='تعداد فروش')),
+                ('revenue', models.PositiveBigIntegerField(default=0, verbose_name='درآمد')),
+                ('unitsSold30d', models.PositiveIntegerField(default=0, verbose_name='تعداد فروش ۳۰ روز اخیر')),
+                ('revenue30d', models.PositiveBigIntegerField(default=0, verbose_name='درآمد ۳۰ روز اخیر')),
+                ('lastSoldAt', models.DateTimeField(blank=True, null=True, verbose_name='آخرین فروش')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='salesStats', to='product.product', verbose_name='محصول')),
+            ],
+            options={
+                'verbose_name': 'آمار فروش محصول',
+                'verbose_name_plural': 'آمار فروش محصولات',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderSalesRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('countedAt', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ثبت در آمار')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='salesRecord', to='order.order', verbose_name='سفارش')),
+            ],
+            options={
+                'verbose_name': 'سفارش ثبت شده در آمار فروش',
+                'verbose_name_plural': 'سفارش\u200cهای ثبت شده در آمار فروش',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productsalesstats',
+            index=models.Index(fields=['-unitsSold', 'product'], name='sales_units_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productsalesstats',
+            index=models.Index(fields=['-unitsSold30d', 'product'], name='sales_units_30d_idx'),
+        ),
+        migrations.RunPython(build_sales_stats, migrations.RunPython.noop),
+    ]
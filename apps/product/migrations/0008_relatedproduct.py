@@ -0,0 +1,36 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0007_productsalesstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='رتبه')),
+                ('score', models.FloatField(verbose_name='امتیاز')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relatedLinks', to='product.product', verbose_name='محصول')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relatedTo', to='product.product', verbose_name='محصول مرتبط')),
+            ],
+            options={
+                'verbose_name': 'محصول مرتبط',
+                'verbose_name_plural': 'محصولات مرتبط',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='relatedproduct',
+            index=models.Index(fields=['product', 'rank'], name='related_product_rank_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedproduct',
+            unique_together={('product', 'related')},
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('product', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChangeBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note', models.CharField(blank=True, default='', max_length=200, verbose_name='توضیح')),
+                ('rules', models.JSONField(default=list, verbose_name='قوانین')),
+                ('saleTypeCount', models.PositiveIntegerField(default=0, verbose_name='تعداد انواع فروش تغییر کرده')),
+                ('productCount', models.PositiveIntegerField(default=0, verbose_name='تعداد محصولات')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='کاربر')),
+            ],
+            options={
+                'verbose_name': 'تغییر گروهی قیمت',
+                'verbose_name_plural': 'تغییرات گروهی قیمت',
+                'ordering': ('-createdAt',),
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceChangeItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('oldPrice', models.PositiveIntegerField(verbose_name='قیمت قبلی')),
+                ('newPrice', models.PositiveIntegerField(verbose_name='قیمت جدید')),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='product.pricechangebatch', verbose_name='تغییر گروهی')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='priceChanges', to='product.product', verbose_name='محصول')),
+                ('saleType', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='priceChanges', to='product.productsaletype', verbose_name='نوع فروش')),
+            ],
+            options={
+                'verbose_name': 'قلم تغییر قیمت',
+                'verbose_name_plural': 'اقلام تغییر قیمت',
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def mark_paid_orders(apps, schema_editor):
+    """سفارش‌هایی که قبلاً پرداخت نهایی داشته‌اند (موجودی‌شان کسر شده) علامت می‌خورند"""
+    Peyment = apps.get_model('peyment', 'Peyment')
+    OrderStockRecord = apps.get_model('product', 'OrderStockRecord')
+
+    order_ids = Peyment.objects.filter(isFinaly=True).values_list('order_id', flat=True).distinct()
+    OrderStockRecord.objects.bulk_create(
+        [OrderStockRecord(order_id=order_id) for order_id in order_ids],
+        batch_size=1000, ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0002_initial'),
+        ('peyment', '0002_initial'),
+        ('product', '0010_pricechangebatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('order', 'فروش سفارش')], max_length=20, verbose_name='علت')),
+                ('quantity', models.IntegerField(verbose_name='تغییر موجودی')),
+                ('shortage', models.PositiveIntegerField(default=0, verbose_name='کسری موجودی')),
+                ('stockAfter', models.PositiveIntegerField(verbose_name='موجودی بعد از تغییر')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stockMovements', to='order.order', verbose_name='سفارش')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stockMovements', to='product.product', verbose_name='محصول')),
+            ],
+            options={
+                'verbose_name': 'گردش موجودی',
+                'verbose_name_plural': 'گردش موجودی محصولات',
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderStockRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appliedAt', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ کسر موجودی')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stockRecord', to='order.order', verbose_name='سفارش')),
+            ],
+            options={
+                'verbose_name': 'سفارش کسر شده از موجودی',
+                'verbose_name_plural': 'سفارش\u200cهای کسر شده از موجودی',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', '-createdAt'], name='stock_movement_product_idx'),
+        ),
+        migrations.RunPython(mark_paid_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0002_initial'),
+        ('product', '0011_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='جمع رزروهای فعال سفارش\u200cهای در انتظار پرداخت', verbose_name='رزرو شده'),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='تعداد')),
+                ('status', models.CharField(choices=[('active', 'فعال'), ('released', 'آزاد شده'), ('converted', 'کسر شده از موجودی')], default='active', max_length=10, verbose_name='وضعیت')),
+                ('expiresAt', models.DateTimeField(verbose_name='زمان انقضا')),
+                ('createdAt', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stockReservations', to='order.order', verbose_name='سفارش')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='product.product', verbose_name='محصول')),
+            ],
+            options={
+                'verbose_name': 'رزرو موجودی',
+                'verbose_name_plural': 'رزروهای موجودی',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['status', 'expiresAt'], name='stock_reservation_expiry_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stockreservation',
+            unique_together={('order', 'product')},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0012_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['product', 'isActive', '-createdAt', '-id'], name='comment_feed_idx'),
+        ),
+    ]
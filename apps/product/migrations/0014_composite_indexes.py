@@ -0,0 +1,21 @@
+# Generated by Django 4.0.3 on 2026-10-17 21:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0013_comment_feed_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['isActive', 'createdAt'], name='product_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productsaletype',
+            index=models.Index(fields=['product', 'isActive', 'price'], name='saletype_active_price_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.3 on 2026-10-17 22:05
+
+from django.db import migrations, models
+from apps.search.service.normalizer_service import TextNormalizer
+
+
+def fill_search_titles(apps, schema_editor):
+    """عنوان جستجوی برندها و دسته‌بندی‌های موجود"""
+    for model_name in ('Brand', 'Category'):
+        model = apps.get_model('product', model_name)
+        items = list(model.objects.only('id', 'title'))
+        for item in items:
+            item.searchTitle = TextNormalizer.search_text(item.title)[:200]
+        model.objects.bulk_update(items, ['searchTitle'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0014_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brand',
+            name='searchTitle',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='عنوان جستجو'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='searchTitle',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='عنوان جستجو'),
+        ),
+        migrations.RunPython(fill_search_titles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.0.3 on 2026-10-17 22:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0015_brand_searchtitle_category_searchtitle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductEngagement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('viewCount', models.PositiveIntegerField(default=0, verbose_name='تعداد بازدید')),
+                ('searchClickCount', models.PositiveIntegerField(default=0, verbose_name='تعداد ورود از جستجو')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')),
+            ],
+            options={
+                'verbose_name': 'بازدید محصول',
+                'verbose_name_plural': 'بازدید محصولات',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='popularityScore',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='امتیاز محبوبیت'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-popularityScore', '-id'], name='product_popularity_idx'),
+        ),
+        migrations.AddField(
+            model_name='productengagement',
+            name='product',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='engagement', to='product.product', verbose_name='محصول'),
+        ),
+    ]
@@ -5,6 +5,7 @@ from apps.user.models.user import CustomUser
 from django.db.models import Avg, Count, Q
 from django.utils import timezone
 from ckeditor_uploader.fields import RichTextUploadingField
+from apps.search.service.normalizer_service import TextNormalizer
 
 # ========================
 # مدل پایه (Base Model)
@@ -34,6 +35,14 @@ class Category(BaseModel):
     description = RichTextUploadingField(
         verbose_name="توضیحات محصول", config_name="special", blank=True, null=True
     )
+    # مقادیر محاسبه شده توسط CategoryClosureService
+    level = models.PositiveSmallIntegerField(default=0, editable=False, db_index=True,
+                                             verbose_name="سطح")
+    subtreeProductCount = models.PositiveIntegerField(default=0, editable=False,
+                                                      verbose_name="تعداد محصولات زیرشاخه‌ها")
+    # عنوان یکسان شده با TextNormalizer برای جستجو
+    searchTitle = models.CharField(max_length=200, blank=True, editable=False,
+                                   verbose_name="عنوان جستجو")
 
     class Meta:
         verbose_name = "دسته‌بندی"
@@ -42,6 +51,36 @@ class Category(BaseModel):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.searchTitle = TextNormalizer.search_text(self.title)[:200]
+        super().save(*args, **kwargs)
+
+
+# ========================
+# جدول بستار دسته‌بندی (Category Closure)
+# ========================
+class CategoryClosure(models.Model):
+    """
+    یک ردیف برای هر جفت (جد، نواده) در درخت دسته‌بندی، شامل خود دسته با depth=0
+    «همه محصولات زیر یک دسته» با یک join ایندکس‌دار روی این جدول بدست می‌آید
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name="دسته‌بندی جد",
+                                 related_name='descendantLinks')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name="دسته‌بندی نواده",
+                                   related_name='ancestorLinks')
+    depth = models.PositiveSmallIntegerField(verbose_name="فاصله")
+
+    class Meta:
+        verbose_name = "رابطه دسته‌بندی"
+        verbose_name_plural = "روابط دسته‌بندی"
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            models.Index(fields=['descendant', 'ancestor'], name='category_closure_desc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
 
 # ========================
 # ویژگی (Feature)
@@ -61,11 +100,18 @@ class Feature(BaseModel):
 class Brand(BaseModel):
     logo = models.ImageField(upload_to='brand/', verbose_name="لوگو", null=True, blank=True)
     description = models.TextField(verbose_name="توضیحات", null=True, blank=True)
+    # عنوان یکسان شده با TextNormalizer برای جستجو
+    searchTitle = models.CharField(max_length=200, blank=True, editable=False,
+                                   verbose_name="عنوان جستجو")
 
     class Meta:
         verbose_name = "برند"
         verbose_name_plural = "برندها"
 
+    def save(self, *args, **kwargs):
+        self.searchTitle = TextNormalizer.search_text(self.title)[:200]
+        super().save(*args, **kwargs)
+
 
 # ========================
 # محصول (Product)
@@ -87,6 +133,9 @@ class Product(BaseModel):
     category = models.ManyToManyField(Category, verbose_name="دسته‌بندی‌ها",
                                      related_name='products')
     mainImage = models.ImageField(upload_to='products/main/', verbose_name="تصویر اصلی")
+    # نسخه‌های کوچک‌شده/WebP تصویر اصلی برای srcset (ImageDerivativeService)
+    mainImageVariants = models.JSONField(default=dict, blank=True, editable=False,
+                                         verbose_name="نسخه‌های تصویر اصلی")
     description = RichTextUploadingField(
         verbose_name="توضیحات محصول", config_name="special", blank=True, null=True
     )
@@ -95,69 +144,77 @@ class Product(BaseModel):
 
     typetitle = models.ForeignKey(TypeProductTitle,on_delete=models.CASCADE,verbose_name='نوع بسته بندی محصول',blank=True,null=True)
     stock = models.PositiveIntegerField(verbose_name="موجودی", default=0)
+    reserved = models.PositiveIntegerField(verbose_name="رزرو شده", default=0, editable=False,
+                                           help_text="جمع رزروهای فعال سفارش‌های در انتظار پرداخت")
     shortDescription = models.TextField(verbose_name="توضیح کوتاه", max_length=500)
+    # ترکیب فروش، بازدید، علاقه‌مندی، امتیاز و کلیک از جستجو (PopularityService، تسک دوره‌ای)
+    popularityScore = models.PositiveIntegerField(default=0, editable=False, verbose_name="امتیاز محبوبیت")
 
     class Meta:
         verbose_name = "محصول"
         verbose_name_plural = "محصولات"
         ordering = ['-createdAt']
+        indexes = [
+            # لیست‌های محصولات فعال به ترتیب جدیدترین
+            models.Index(fields=['isActive', 'createdAt'], name='product_active_created_idx'),
+            # مرتب‌سازی «محبوب‌ترین» با صفحه‌بندی کلیدی (امتیاز، id)
+            models.Index(fields=['-popularityScore', '-id'], name='product_popularity_idx'),
+        ]
 
     def get_absolute_url(self):
         return reverse("product:product_detail", kwargs={"slug": self.slug})
 
+    @property
+    def available_stock(self):
+        """موجودی قابل فروش: موجودی منهای رزروهای فعال"""
+        return max(self.stock - self.reserved, 0)
+
+
+    def get_review_summary(self):
+        """
+        خلاصه امتیاز و کامنت محصول (جدول ProductReviewSummary)
+        اگر ردیف خلاصه هنوز ساخته نشده باشد همین‌جا ساخته می‌شود
+        """
+        try:
+            summary = self.reviewSummary
+        except ProductReviewSummary.DoesNotExist:
+            summary = None
+
+        if summary is None:
+            from .service.review_service import ReviewSummaryService
+            summary = ReviewSummaryService.refresh(self.pk)
+            self.reviewSummary = summary
+        return summary
 
     @property
     def average_rating(self):
         """میانگین امتیاز محصول"""
-        result = Rating.objects.filter(product=self).aggregate(avg=Avg('rating'))
-        return round(result['avg'] or 0, 1)
+        return round(self.get_review_summary().averageRating or 0, 1)
 
     @property
     def total_comments(self):
         """تعداد کل کامنت‌های محصول"""
-        return Comment.objects.filter(product=self, isActive=True).count()
+        return self.get_review_summary().totalComments
 
     @property
     def recommendation_stats(self):
         """درصد پیشنهاد کنندگان"""
-        comments = Comment.objects.filter(product=self, isActive=True)
-        total = comments.count()
-
-        if total == 0:
-            return {'recommend': 0, 'not_recommend': 0}
-
-        recommend = comments.filter(typeComment='recommend').count()
-        not_recommend = comments.filter(typeComment='not_recommend').count()
-
-        return {
-            'recommend': round((recommend / total) * 100, 1),
-            'not_recommend': round((not_recommend / total) * 100, 1)
-        }
+        return self.get_review_summary().recommendation
 
     @property
     def rating_distribution(self):
         """توزیع امتیازها"""
-        distribution = {}
-        for i in range(1, 6):
-            count = Rating.objects.filter(product=self, rating=i).count()
-            distribution[f'star_{i}'] = count
-        return distribution
+        return self.get_review_summary().distribution
 
     @property
     def total_ratings(self):
         """تعداد کل ریتینگ‌ها"""
-        return Rating.objects.filter(product=self).count()
+        return self.get_review_summary().totalRatings
 
     @property
     def comment_stats(self):
         """تمام آمار کامنت و ریتینگ"""
-        return {
-            'average_rating': self.average_rating,
-            'total_comments': self.total_comments,
-            'recommendation': self.recommendation_stats,
-            'rating_distribution': self.rating_distribution,
-            'total_ratings': self.total_ratings
-        }
+        return self.get_review_summary().as_stats()
 
 
 
@@ -172,6 +229,7 @@ class ProductGallery(models.Model):
     updatedAt = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
     isActive = models.BooleanField(default=True, verbose_name="فعال")
     image = models.ImageField(upload_to='products/gallery/', verbose_name="تصویر")
+    imageVariants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="نسخه‌های تصویر")
     altText = models.CharField(max_length=200, verbose_name="متن جایگزین", null=True, blank=True)
 
     class Meta:
@@ -256,6 +314,10 @@ class ProductSaleType(models.Model):
     class Meta:
         verbose_name = "نوع فروش محصول"
         verbose_name_plural = "انواع فروش محصولات"
+        indexes = [
+            # انواع فروش فعال یک محصول به ترتیب قیمت (ارزان‌ترین نوع فروش)
+            models.Index(fields=['product', 'isActive', 'price'], name='saletype_active_price_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """
@@ -317,6 +379,316 @@ class Comment(models.Model):
         verbose_name = "کامنت"
         verbose_name_plural = "کامنت‌ها"
         ordering = ['-createdAt']
+        indexes = [
+            # فید کرسری نظرات محصول: (product, isActive) و مرتب‌سازی (createdAt, id) نزولی
+            models.Index(fields=['product', 'isActive', '-createdAt', '-id'], name='comment_feed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.product}"
+
+
+# ========================
+# خلاصه امتیاز و کامنت محصول (ProductReviewSummary)
+# ========================
+class ProductReviewSummary(models.Model):
+    """
+    جدول دنرمال‌شده آمار امتیاز و کامنت هر محصول
+    با ثبت/ویرایش/حذف Rating و Comment (از طریق سیگنال‌ها) بروزرسانی می‌شود
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, verbose_name="محصول",
+                                   related_name='reviewSummary')
+    averageRating = models.FloatField(default=0, verbose_name="میانگین امتیاز")
+    totalRatings = models.PositiveIntegerField(default=0, verbose_name="تعداد امتیازها")
+    star1 = models.PositiveIntegerField(default=0, verbose_name="۱ ستاره")
+    star2 = models.PositiveIntegerField(default=0, verbose_name="۲ ستاره")
+    star3 = models.PositiveIntegerField(default=0, verbose_name="۳ ستاره")
+    star4 = models.PositiveIntegerField(default=0, verbose_name="۴ ستاره")
+    star5 = models.PositiveIntegerField(default=0, verbose_name="۵ ستاره")
+    totalComments = models.PositiveIntegerField(default=0, verbose_name="تعداد کامنت‌های فعال")
+    recommendCount = models.PositiveIntegerField(default=0, verbose_name="تعداد پیشنهاد می‌کنم")
+    notRecommendCount = models.PositiveIntegerField(default=0, verbose_name="تعداد پیشنهاد نمی‌کنم")
+    updatedAt = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "خلاصه نظرات محصول"
+        verbose_name_plural = "خلاصه نظرات محصولات"
+
+    def __str__(self):
+        return f"{self.product} ({self.averageRating})"
+
+    @property
+    def recommendation(self):
+        """درصد پیشنهاد کنندگان"""
+        total = self.totalComments
+        if total == 0:
+            return {'recommend': 0, 'not_recommend': 0}
+        return {
+            'recommend': round((self.recommendCount / total) * 100, 1),
+            'not_recommend': round((self.notRecommendCount / total) * 100, 1)
+        }
+
+    @property
+    def distribution(self):
+        """توزیع امتیازها"""
+        return {f'star_{i}': getattr(self, f'star{i}') for i in range(1, 6)}
+
+    def as_stats(self):
+        """خروجی هم‌شکل با Product.comment_stats"""
+        return {
+            'average_rating': self.averageRating,
+            'total_comments': self.totalComments,
+            'recommendation': self.recommendation,
+            'rating_distribution': self.distribution,
+            'total_ratings': self.totalRatings
+        }
+
+
+# ========================
+# قیمت مؤثر محصول (ProductPricing)
+# ========================
+class ProductPricing(models.Model):
+    """
+    جدول مادی‌شده قیمت هر محصول برای مرتب‌سازی و فیلتر لیست‌ها
+    basePrice: ارزان‌ترین قیمت فعال ProductSaleType
+    discountPercent: بیشترین تخفیف سبد فعال شامل محصول
+    nextChangeAt: زمان بعدی باز یا بسته شدن یک بازه تخفیف (برای تسک دوره‌ای)
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, verbose_name="محصول",
+                                   related_name='pricing')
+    basePrice = models.PositiveIntegerField(verbose_name="قیمت پایه", null=True, blank=True)
+    discountPercent = models.PositiveIntegerField(verbose_name="درصد تخفیف", default=0)
+    finalPrice = models.PositiveIntegerField(verbose_name="قیمت نهایی", null=True, blank=True)
+    discountEndsAt = models.DateTimeField(verbose_name="پایان تخفیف", null=True, blank=True)
+    nextChangeAt = models.DateTimeField(verbose_name="زمان تغییر بعدی", null=True, blank=True,
+                                        db_index=True)
+    updatedAt = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "قیمت محصول"
+        verbose_name_plural = "قیمت محصولات"
+        indexes = [
+            models.Index(fields=['basePrice', 'product'], name='pricing_base_price_idx'),
+            models.Index(fields=['finalPrice', 'product'], name='pricing_final_price_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} - {self.finalPrice}"
+
+
+# ========================
+# آمار فروش محصول (Product Sales Stats)
+# ========================
+class ProductSalesStats(models.Model):
+    """
+    جدول مادی‌شده فروش هر محصول برای لیست‌های «پرفروش‌ترین» فروشگاه و داشبورد ادمین
+    با تغییر وضعیت سفارش‌ها (SalesStatsService.sync_order) بروز می‌شود و
+    ارقام ۳۰ روز اخیر با تسک دوره‌ای از نو محاسبه می‌شوند
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, verbose_name="محصول",
+                                   related_name='salesStats')
+    unitsSold = models.PositiveIntegerField(default=0, verbose_name="تعداد فروش")
+    revenue = models.PositiveBigIntegerField(default=0, verbose_name="درآمد")
+    unitsSold30d = models.PositiveIntegerField(default=0, verbose_name="تعداد فروش ۳۰ روز اخیر")
+    revenue30d = models.PositiveBigIntegerField(default=0, verbose_name="درآمد ۳۰ روز اخیر")
+    lastSoldAt = models.DateTimeField(verbose_name="آخرین فروش", null=True, blank=True)
+    updatedAt = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "آمار فروش محصول"
+        verbose_name_plural = "آمار فروش محصولات"
+        indexes = [
+            models.Index(fields=['-unitsSold', 'product'], name='sales_units_idx'),
+            models.Index(fields=['-unitsSold30d', 'product'], name='sales_units_30d_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product} - {self.unitsSold}"
+
+
+class OrderSalesRecord(models.Model):
+    """
+    نشانگر ماندگار «اقلام این سفارش در ProductSalesStats شمرده شده‌اند»
+    (جدای از Order تا ذخیره مجدد یک نمونه قدیمی سفارش آن را بازنویسی نکند)
+    """
+    order = models.OneToOneField('order.Order', on_delete=models.CASCADE, verbose_name="سفارش",
+                                 related_name='salesRecord')
+    countedAt = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ثبت در آمار")
+
+    class Meta:
+        verbose_name = "سفارش ثبت شده در آمار فروش"
+        verbose_name_plural = "سفارش‌های ثبت شده در آمار فروش"
+
+    def __str__(self):
+        return f"{self.order_id}"
+
+
+class ProductEngagement(models.Model):
+    """
+    شمارنده‌های بازدید صفحه محصول و ورود از نتایج جستجو (ورودی‌های امتیاز محبوبیت)
+    افزایش‌ها در کش جمع و با PopularityService.flush به صورت گروهی ثبت می‌شوند
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, verbose_name="محصول",
+                                   related_name='engagement')
+    viewCount = models.PositiveIntegerField(default=0, verbose_name="تعداد بازدید")
+    searchClickCount = models.PositiveIntegerField(default=0, verbose_name="تعداد ورود از جستجو")
+    updatedAt = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "بازدید محصول"
+        verbose_name_plural = "بازدید محصولات"
+
+    def __str__(self):
+        return f"{self.product} - {self.viewCount}"
+
+
+class RelatedProduct(models.Model):
+    """
+    K همسایه نزدیک هر محصول بر اساس خرید/علاقه‌مندی مشترک (محصولات مرتبط صفحه محصول)
+    توسط RecommendationService به صورت دوره‌ای از نو ساخته می‌شود
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="محصول",
+                                related_name='relatedLinks')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="محصول مرتبط",
+                                related_name='relatedTo')
+    rank = models.PositiveSmallIntegerField(verbose_name="رتبه")
+    score = models.FloatField(verbose_name="امتیاز")
+
+    class Meta:
+        verbose_name = "محصول مرتبط"
+        verbose_name_plural = "محصولات مرتبط"
+        unique_together = ('product', 'related')
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='related_product_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id}"
+
+
+# ========================
+# تغییر گروهی قیمت (Bulk Repricing)
+# ========================
+class PriceChangeBatch(models.Model):
+    """
+    سابقه یک تغییر گروهی قیمت انواع فروش (RepricingService.apply)
+    قوانین اجرا شده به همان شکل ورودی در rules نگه داشته می‌شوند
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, verbose_name="کاربر",
+                             null=True, blank=True)
+    note = models.CharField(max_length=200, verbose_name="توضیح", blank=True, default='')
+    rules = models.JSONField(default=list, verbose_name="قوانین")
+    saleTypeCount = models.PositiveIntegerField(default=0, verbose_name="تعداد انواع فروش تغییر کرده")
+    productCount = models.PositiveIntegerField(default=0, verbose_name="تعداد محصولات")
+    createdAt = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+
+    class Meta:
+        verbose_name = "تغییر گروهی قیمت"
+        verbose_name_plural = "تغییرات گروهی قیمت"
+        ordering = ('-createdAt',)
+
+    def __str__(self):
+        return f"{self.createdAt:%Y-%m-%d %H:%M} - {self.saleTypeCount}"
+
+
+class PriceChangeItem(models.Model):
+    """قیمت قبلی و جدید هر نوع فروش در یک تغییر گروهی"""
+    batch = models.ForeignKey(PriceChangeBatch, on_delete=models.CASCADE, verbose_name="تغییر گروهی",
+                              related_name='items')
+    saleType = models.ForeignKey(ProductSaleType, on_delete=models.SET_NULL, verbose_name="نوع فروش",
+                                 null=True, blank=True, related_name='priceChanges')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, verbose_name="محصول",
+                                null=True, blank=True, related_name='priceChanges')
+    oldPrice = models.PositiveIntegerField(verbose_name="قیمت قبلی")
+    newPrice = models.PositiveIntegerField(verbose_name="قیمت جدید")
+
+    class Meta:
+        verbose_name = "قلم تغییر قیمت"
+        verbose_name_plural = "اقلام تغییر قیمت"
+
+    def __str__(self):
+        return f"{self.saleType_id}: {self.oldPrice} -> {self.newPrice}"
+
+
+# ========================
+# دفتر موجودی (Stock Ledger)
+# ========================
+class StockMovement(models.Model):
+    """
+    هر تغییر موجودی محصول که توسط StockService اعمال می‌شود (کسر بابت سفارش و ...)
+    quantity مقدار اعمال شده است (منفی یعنی کسر)؛ shortage کسری که به دلیل نبود موجودی اعمال نشد
+    """
+    REASON_CHOICES = (
+        ('order', 'فروش سفارش'),
+    )
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="محصول",
+                                related_name='stockMovements')
+    order = models.ForeignKey('order.Order', on_delete=models.SET_NULL, verbose_name="سفارش",
+                              null=True, blank=True, related_name='stockMovements')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name="علت")
+    quantity = models.IntegerField(verbose_name="تغییر موجودی")
+    shortage = models.PositiveIntegerField(default=0, verbose_name="کسری موجودی")
+    stockAfter = models.PositiveIntegerField(verbose_name="موجودی بعد از تغییر")
+    createdAt = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+
+    class Meta:
+        verbose_name = "گردش موجودی"
+        verbose_name_plural = "گردش موجودی محصولات"
+        indexes = [
+            models.Index(fields=['product', '-createdAt'], name='stock_movement_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """
+    رزرو موقت موجودی برای سفارش در انتظار پرداخت
+    جمع رزروهای فعال هر محصول در Product.reserved نگه داشته می‌شود؛ رزرو با پرداخت به
+    کسر دائمی تبدیل و با انقضا یا لغو سفارش آزاد می‌شود
+    """
+    STATUS_CHOICES = (
+        ('active', 'فعال'),
+        ('released', 'آزاد شده'),
+        ('converted', 'کسر شده از موجودی'),
+    )
+
+    order = models.ForeignKey('order.Order', on_delete=models.CASCADE, verbose_name="سفارش",
+                              related_name='stockReservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="محصول",
+                                related_name='reservations')
+    quantity = models.PositiveIntegerField(verbose_name="تعداد")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active', verbose_name="وضعیت")
+    expiresAt = models.DateTimeField(verbose_name="زمان انقضا")
+    createdAt = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+    updatedAt = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "رزرو موجودی"
+        verbose_name_plural = "رزروهای موجودی"
+        unique_together = ('order', 'product')
+        indexes = [
+            models.Index(fields=['status', 'expiresAt'], name='stock_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} / {self.product_id} × {self.quantity}"
+
+
+class OrderStockRecord(models.Model):
+    """
+    نشانگر ماندگار «موجودی اقلام این سفارش کسر شده است»
+    (یکتا بودن سفارش جلوی کسر دوباره در callbackهای تکراری/همزمان پرداخت را می‌گیرد)
+    """
+    order = models.OneToOneField('order.Order', on_delete=models.CASCADE, verbose_name="سفارش",
+                                 related_name='stockRecord')
+    appliedAt = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ کسر موجودی")
+
+    class Meta:
+        verbose_name = "سفارش کسر شده از موجودی"
+        verbose_name_plural = "سفارش‌های کسر شده از موجودی"
+
+    def __str__(self):
+        return f"{self.order_id}"
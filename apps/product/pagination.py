@@ -0,0 +1,206 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Q
+
+
+# ========================
+# صفحه‌بندی کلیدی (Keyset / Cursor Pagination)
+# ========================
+class KeysetPage:
+    """
+    یک صفحه از نتایج صفحه‌بندی کلیدی
+    رابط آن تا حد ممکن شبیه Page جنگو است تا تمپلیت‌ها تغییر زیادی نکنند
+    start: شماره ردیف اولین آیتم (۱ از اول نتایج) که در کرسرها حمل می‌شود
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None, start=1):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.start = start
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def start_index(self):
+        """شماره ردیف اولین آیتم صفحه (مثل Page جنگو، صفحه خالی: ۰)"""
+        return self.start if self.object_list else 0
+
+    def end_index(self):
+        """شماره ردیف آخرین آیتم صفحه"""
+        return self.start + len(self.object_list) - 1 if self.object_list else 0
+
+
+class KeysetPaginator:
+    """
+    صفحه‌بندی بر اساس مقدار کلید مرتب‌سازی + شناسه (به‌جای OFFSET)
+    هزینه صفحات عمیق برابر صفحه اول است و شمارش کل در کش نگه داشته می‌شود
+
+    کلیدهای مرتب‌سازی:
+    - newest: جدیدترین (createdAt نزولی)
+    - cheap: ارزان‌ترین (price صعودی)
+    - expensive: گران‌ترین (price نزولی)
+    - popular: محبوب‌ترین (popularityScore نزولی، ستون ایندکس‌دار محصول)
+    price همان annotate جدول ProductPricing است (PricingService.annotate_listing)
+    """
+
+    SORTS = {
+        'newest': ('createdAt', True),
+        'cheap': ('price', False),
+        'expensive': ('price', True),
+        'popular': ('popularityScore', True),
+    }
+
+    COUNT_CACHE_TIMEOUT = 60 * 5
+
+    def __init__(self, queryset, per_page, sort='newest'):
+        if sort not in self.SORTS:
+            sort = 'newest'
+        self.queryset = queryset
+        self.per_page = per_page
+        self.sort = sort
+        self.field, self.descending = self.SORTS[sort]
+        self._count = None
+
+    # ---------- شمارش تقریبی (کش شده) ----------
+    @property
+    def count(self):
+        """تعداد کل نتایج؛ برای هر فیلتر یکسان فقط یک بار در بازه کش شمرده می‌شود"""
+        if self._count is None:
+            try:
+                sql = str(self.queryset.order_by().query)
+            except EmptyResultSet:
+                # شرط همیشه خالی (مثلاً pk__in=[] جستجوی بدون نتیجه) SQL ندارد
+                self._count = 0
+                return self._count
+            query_hash = hashlib.md5(sql.encode('utf-8')).hexdigest()
+            self._count = cache.get_or_set(
+                f'keyset_count:{query_hash}',
+                lambda: self.queryset.order_by().count(),
+                self.COUNT_CACHE_TIMEOUT
+            )
+        return self._count
+
+    # ---------- کدگذاری کرسر ----------
+    def _encode(self, obj, direction, position):
+        """position: شماره ردیف obj در نتایج (برای start_index صفحه بعد/قبل)"""
+        value = getattr(obj, self.field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = json.dumps({'s': self.sort, 'v': value, 'id': obj.pk, 'd': direction, 'o': position},
+                             separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def _decode(self, cursor):
+        """کرسر نامعتبر یا متعلق به مرتب‌سازی دیگر نادیده گرفته می‌شود (صفحه اول)"""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            if data.get('s') != self.sort or data.get('d') not in ('n', 'p'):
+                return None
+            value = data['v']
+            if self.field == 'createdAt':
+                value = datetime.fromisoformat(value)
+            else:
+                value = int(value)
+            return value, int(data['id']), data['d'], int(data.get('o', 0))
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    # ---------- ساخت کوئری ----------
+    def _ordering(self, reverse=False):
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        return [f'{prefix}{self.field}', f'{prefix}id']
+
+    def _after(self, value, pk, reverse=False):
+        """شرط «بعد از» کرسر در جهت مرتب‌سازی (با شکستن تساوی بر اساس id)"""
+        descending = self.descending != reverse
+        lookup = 'lt' if descending else 'gt'
+        return (
+            Q(**{f'{self.field}__{lookup}': value}) |
+            Q(**{self.field: value, f'id__{lookup}': pk})
+        )
+
+    def get_page(self, cursor=None):
+        decoded = self._decode(cursor)
+        queryset = self.queryset
+
+        if decoded is None:
+            rows = list(queryset.order_by(*self._ordering())[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows, self,
+                next_cursor=self._encode(rows[-1], 'n', len(rows)) if has_more else None,
+                previous_cursor=None
+            )
+
+        value, pk, direction, position = decoded
+
+        if direction == 'n':
+            rows = list(
+                queryset.filter(self._after(value, pk)).order_by(*self._ordering())[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows, self,
+                next_cursor=self._encode(rows[-1], 'n', position + len(rows)) if has_more and rows else None,
+                previous_cursor=self._encode(rows[0], 'p', position + 1) if rows else None,
+                start=position + 1
+            )
+
+        # صفحه قبل: در جهت معکوس خوانده و سپس برعکس می‌شود
+        rows = list(
+            queryset.filter(self._after(value, pk, reverse=True))
+            .order_by(*self._ordering(reverse=True))[:self.per_page + 1]
+        )
+        has_more = len(rows) > self.per_page
+        rows = list(reversed(rows[:self.per_page]))
+        # بدون ردیف بیشتر، این صفحه اول نتایج است (شماره ردیف‌ها دوباره از ۱ درست می‌شوند)
+        start = max(position - len(rows), 1) if has_more else 1
+        return KeysetPage(
+            rows, self,
+            next_cursor=self._encode(rows[-1], 'n', start + len(rows) - 1) if rows else None,
+            previous_cursor=self._encode(rows[0], 'p', start) if has_more and rows else None,
+            start=start
+        )
+
+
+def get_keyset_sort(sort_option):
+    """تبدیل پارامتر sort فعلی URL (1/2/3/5 یا new/expensive/cheap/popular) به کلید صفحه‌بندی کلیدی"""
+    if sort_option in ['3', 'cheap']:
+        return 'cheap'
+    if sort_option in ['2', 'expensive']:
+        return 'expensive'
+    if sort_option in ['5', 'popular']:
+        return 'popular'
+    return 'newest'
+
+
+def use_keyset(request):
+    """
+    حالت کرسری پیش‌فرض است؛ لینک‌های قدیمی ?page=N (N>1) همچنان با Paginator کار می‌کنند
+    """
+    return bool(request.GET.get('cursor')) or request.GET.get('page', '1') in ('', '1')
@@ -0,0 +1,348 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.db import connection
+from utils import get_cache_version, bump_cache_version
+from ..models import Product, ProductFeature, ProductPricing
+
+logger = logging.getLogger(__name__)
+
+
+# ========================
+# توابع کمکی بیت‌مپ (عدد صحیح پایتون = مجموعه شناسه‌ها)
+# ========================
+def to_bitmap(ids):
+    """ساخت بیت‌مپ از لیست شناسه‌ها (بیت n ام = محصول با id=n)"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray((max(ids) >> 3) + 1)
+    for product_id in ids:
+        buffer[product_id >> 3] |= 1 << (product_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_ids(bitmap):
+    """شناسه‌های موجود در یک بیت‌مپ به ترتیب صعودی"""
+    if not bitmap:
+        return
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        if byte:
+            base = index << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield base + bit
+
+
+def count(bitmap):
+    """تعداد شناسه‌های یک بیت‌مپ (popcount)"""
+    return bitmap.bit_count()
+
+
+class ProductBitmapIndex:
+    """
+    ایندکس بیت‌مپ درون حافظه روی ویژگی‌های محصول برای فیلتر و facet لحظه‌ای
+
+    برای هر مقدار ویژگی، برند، دسته، وضعیت فعال و داشتن قیمت یک بیت‌مپ نگه داشته می‌شود؛
+    فیلترها اشتراک/اجتماع بیت‌مپ‌ها و تعداد facetها popcount آن‌هاست و
+    دیتابیس فقط برای گرفتن آبجکت‌های صفحه نمایشی استفاده می‌شود.
+
+    - ساخت کامل در یک ترد پس‌زمینه (اولین درخواست منتظر نمی‌ماند و از مسیر دیتابیس می‌رود)
+    - تغییرات محصول/ویژگی/قیمت با refresh_products به‌صورت افزایشی اعمال می‌شود
+    - پروسس‌های دیگر با نسخه مشترک در کش از تغییر باخبر شده و ایندکس را از نو می‌سازند
+    """
+
+    VERSION_NAME = 'product_bitmap_index'
+    REBUILD_INTERVAL = 60 * 10     # ساخت مجدد دوره‌ای (ثانیه)
+    MIN_REBUILD_GAP = 30           # حداقل فاصله دو ساخت پشت سر هم
+    VERSION_CHECK_INTERVAL = 5     # فاصله بررسی نسخه مشترک در کش
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._state = None
+        self._building = False
+        self._built_at = 0
+        self._version = None
+        self._version_checked_at = 0
+
+    # ========================
+    # ساخت کامل
+    # ========================
+    @staticmethod
+    def _load():
+        """خواندن کل داده‌های ایندکس با چهار کوئری"""
+        products = {}
+        for product_id, brand_id, is_active in Product.objects.values_list(
+            'id', 'brand_id', 'isActive'
+        ).iterator():
+            products[product_id] = {
+                'brand': brand_id, 'active': is_active,
+                'categories': set(), 'values': set(), 'price': None,
+            }
+
+        for product_id, category_id in Product.category.through.objects.values_list(
+            'product_id', 'category_id'
+        ).iterator():
+            if product_id in products:
+                products[product_id]['categories'].add(category_id)
+
+        value_feature = {}
+        for product_id, value_id, feature_id in ProductFeature.objects.filter(
+            filterValue__isnull=False
+        ).values_list('product_id', 'filterValue_id', 'filterValue__feature_id').iterator():
+            if product_id in products:
+                products[product_id]['values'].add(value_id)
+                value_feature[value_id] = feature_id
+
+        for product_id, base_price in ProductPricing.objects.values_list(
+            'product_id', 'basePrice'
+        ).iterator():
+            if product_id in products:
+                products[product_id]['price'] = base_price
+
+        return products, value_feature
+
+    @staticmethod
+    def _build_state(products, value_feature):
+        brands, categories, values = defaultdict(list), defaultdict(list), defaultdict(list)
+        active, prices = [], {}
+        for product_id, item in products.items():
+            if item['brand'] is not None:
+                brands[item['brand']].append(product_id)
+            for category_id in item['categories']:
+                categories[category_id].append(product_id)
+            for value_id in item['values']:
+                values[value_id].append(product_id)
+            if item['active']:
+                active.append(product_id)
+            if item['price'] is not None:
+                prices[product_id] = item['price']
+
+        return {
+            'products': products,
+            'value_feature': value_feature,
+            'brands': {key: to_bitmap(ids) for key, ids in brands.items()},
+            'categories': {key: to_bitmap(ids) for key, ids in categories.items()},
+            'values': {key: to_bitmap(ids) for key, ids in values.items()},
+            'active': to_bitmap(active),
+            'priced': to_bitmap(prices),
+            'prices': prices,
+        }
+
+    # دیکشنری‌های هم‌اندازه دسته‌ها/برندها/مقادیر ویژگی که در هر بروزرسانی کپی می‌شوند
+    COPIED_MAPS = ('brands', 'categories', 'values', 'value_feature')
+
+    @staticmethod
+    def _copy_state(state):
+        """
+        کپی برای بروزرسانی (copy-on-write) فقط از دیکشنری‌های بیت‌مپ که خواننده‌ها پیمایش می‌کنند
+        (اندازه آن‌ها تعداد برندها/دسته‌ها/مقادیر است نه تعداد محصولات؛ بیت‌مپ‌ها عدد صحیح و
+        تغییرناپذیرند). products و prices که یک ردیف برای هر محصول دارند کپی نمی‌شوند و در جا
+        تغییر می‌کنند: products را فقط نویسنده (زیر قفل) می‌خواند و خواننده‌ها prices را فقط
+        برای شناسه‌های بیت‌مپ priced نسخه خودشان می‌خوانند (قیمت حذف شده تا ساخت بعدی می‌ماند)
+        """
+        state = dict(state)
+        for key in ProductBitmapIndex.COPIED_MAPS:
+            state[key] = dict(state[key])
+        return state
+
+    def rebuild(self):
+        """ساخت کامل ایندکس (همزمان)؛ خواننده‌ها تا پایان کار از نسخه قبلی استفاده می‌کنند"""
+        version = get_cache_version(self.VERSION_NAME)
+        started = time.monotonic()
+        state = self._build_state(*self._load())
+        with self._lock:
+            self._state = state
+            self._version = version
+            self._built_at = time.monotonic()
+            self._version_checked_at = self._built_at
+        logger.info(
+            'Product bitmap index rebuilt: %s products in %.3fs',
+            len(state['products']), time.monotonic() - started
+        )
+        return state
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Product bitmap index rebuild failed')
+        finally:
+            with self._lock:
+                self._building = False
+            connection.close()
+
+    # ========================
+    # تازگی ایندکس
+    # ========================
+    def _is_stale(self, now):
+        if now - self._built_at >= self.REBUILD_INTERVAL:
+            return True
+        if now - self._version_checked_at >= self.VERSION_CHECK_INTERVAL:
+            self._version_checked_at = now
+            return get_cache_version(self.VERSION_NAME) != self._version
+        return False
+
+    def ensure_fresh(self):
+        """
+        شروع ساخت پس‌زمینه در صورت نبود/کهنگی ایندکس
+        خروجی: آیا ایندکس (حتی نسخه کمی قدیمی) آماده استفاده است
+        """
+        now = time.monotonic()
+        with self._lock:
+            ready = self._state is not None
+            need_build = not ready or (
+                now - self._built_at >= self.MIN_REBUILD_GAP and self._is_stale(now)
+            )
+            if need_build and not self._building:
+                self._building = True
+                threading.Thread(
+                    target=self._rebuild_in_background,
+                    name='product-bitmap-index',
+                    daemon=True
+                ).start()
+        return ready
+
+    @property
+    def is_ready(self):
+        return self._state is not None
+
+    # ========================
+    # بروزرسانی افزایشی
+    # ========================
+    @staticmethod
+    def _set_bit(bitmaps, key, product_id, value):
+        bit = 1 << product_id
+        current = bitmaps.get(key, 0)
+        bitmaps[key] = current | bit if value else current & ~bit
+
+    def _apply(self, state, product_id, item):
+        """جایگزینی بیت‌های یک محصول در همه بیت‌مپ‌ها (item=None یعنی حذف محصول)"""
+        old = state['products'].pop(product_id, None)
+        bit = 1 << product_id
+        if old is not None:
+            if old['brand'] is not None:
+                self._set_bit(state['brands'], old['brand'], product_id, False)
+            for category_id in old['categories']:
+                self._set_bit(state['categories'], category_id, product_id, False)
+            for value_id in old['values']:
+                self._set_bit(state['values'], value_id, product_id, False)
+            state['active'] &= ~bit
+            state['priced'] &= ~bit
+
+        if item is None:
+            return
+        state['products'][product_id] = item
+        if item['brand'] is not None:
+            self._set_bit(state['brands'], item['brand'], product_id, True)
+        for category_id in item['categories']:
+            self._set_bit(state['categories'], category_id, product_id, True)
+        for value_id in item['values']:
+            self._set_bit(state['values'], value_id, product_id, True)
+        if item['active']:
+            state['active'] |= bit
+        if item['price'] is not None:
+            state['priced'] |= bit
+            state['prices'][product_id] = item['price']
+
+    def refresh_products(self, product_ids):
+        """
+        اعمال تغییرات چند محصول روی ایندکس همین پروسس و اطلاع به پروسس‌های دیگر
+        (بعد از ثبت تراکنش از سیگنال‌ها و PricingService صدا زده می‌شود)
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+
+        with self._lock:
+            ready = self._state is not None
+        if ready:
+            products = {}
+            for product_id, brand_id, is_active in Product.objects.filter(
+                pk__in=product_ids
+            ).values_list('id', 'brand_id', 'isActive'):
+                products[product_id] = {
+                    'brand': brand_id, 'active': is_active,
+                    'categories': set(), 'values': set(), 'price': None,
+                }
+            for product_id, category_id in Product.category.through.objects.filter(
+                product_id__in=products
+            ).values_list('product_id', 'category_id'):
+                products[product_id]['categories'].add(category_id)
+            value_feature = {}
+            for product_id, value_id, feature_id in ProductFeature.objects.filter(
+                product_id__in=products, filterValue__isnull=False
+            ).values_list('product_id', 'filterValue_id', 'filterValue__feature_id'):
+                products[product_id]['values'].add(value_id)
+                value_feature[value_id] = feature_id
+            for product_id, base_price in ProductPricing.objects.filter(
+                product_id__in=products
+            ).values_list('product_id', 'basePrice'):
+                products[product_id]['price'] = base_price
+
+            with self._lock:
+                # خواننده‌ها همچنان وضعیت قبلی را می‌بینند تا جایگزینی کامل شود
+                state = self._copy_state(self._state)
+                state['value_feature'].update(value_feature)
+                for product_id in product_ids:
+                    self._apply(state, product_id, products.get(product_id))
+                self._state = state
+
+        version = bump_cache_version(self.VERSION_NAME)
+        with self._lock:
+            # تغییر همین پروسس اعمال شده است؛ نیازی به ساخت مجدد نیست
+            if ready and self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def invalidate(self):
+        """کهنه اعلام کردن ایندکس همه پروسس‌ها (ساخت مجدد در درخواست بعدی)"""
+        bump_cache_version(self.VERSION_NAME)
+        with self._lock:
+            self._built_at = 0
+
+    # ========================
+    # خواندن بیت‌مپ‌ها
+    # ========================
+    def snapshot(self):
+        """
+        وضعیت فعلی ایندکس برای خواندن بدون قفل
+        (بروزرسانی‌ها وضعیت جدید می‌سازند و این دیکشنری هرگز تغییر نمی‌کند)
+        """
+        return self._state
+
+    def listing_scope(self, category_ids=None, brand_id=None):
+        """
+        محصولات فعال دارای قیمت در یک دسته/برند (همان مجموعه صفحه فروشگاه)
+        category_ids: خود دسته و زیرشاخه‌هایش (CategoryClosureService.descendant_ids)
+        """
+        state = self._state
+        scope = state['active'] & state['priced']
+        if category_ids is not None:
+            categories = 0
+            for category_id in category_ids:
+                categories |= state['categories'].get(category_id, 0)
+            scope &= categories
+        if brand_id is not None:
+            scope &= state['brands'].get(brand_id, 0)
+        return scope
+
+    def filter_features(self, scope, feature_value_ids):
+        """
+        فیلتر ویژگی‌ها روی یک بیت‌مپ: مقادیر یک ویژگی OR و ویژگی‌ها AND
+        (همان معنای FacetService.filter_by_features)
+        """
+        state = self._state
+        groups = defaultdict(int)
+        for value_id in feature_value_ids:
+            # مقدار بدون محصول مثل FacetService.build نادیده گرفته می‌شود
+            if value_id in state['value_feature']:
+                groups[state['value_feature'][value_id]] |= state['values'].get(value_id, 0)
+        for bitmap in groups.values():
+            scope &= bitmap
+        return scope
+
+
+# نمونه مشترک هر پروسس
+product_index = ProductBitmapIndex()
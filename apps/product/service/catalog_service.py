@@ -0,0 +1,584 @@
+import csv
+import json
+import logging
+from itertools import islice
+from django.db import transaction
+from django.utils import timezone
+from apps.search.service.autocomplete_service import autocomplete_index
+from apps.search.service.search_index_service import SearchIndexService
+from .bitmap_service import product_index
+from .category_service import CategoryClosureService
+from .pricing_service import PricingService
+from .review_service import ReviewSummaryService
+from ..models import (
+    Product, Brand, Category, Feature, FeatureValue,
+    ProductFeature, ProductSaleType, SaleType
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogImportService:
+    """
+    ورود گروهی کاتالوگ از CSV یا JSONL (دستور import_catalog و فرم پنل ادمین)
+
+    - فایل به صورت جریانی و در دسته‌های BATCH_SIZE تایی خوانده می‌شود
+    - برای هر دسته، برند/دسته‌بندی/ویژگی/محصولات موجود با یک کوئری برای هر نوع پیدا می‌شوند
+    - محصولات بر اساس slug: اگر موجود باشد بروزرسانی، وگرنه ایجاد (bulk_update / bulk_create)
+    - انواع فروش بر اساس (محصول، نوع فروش) upsert می‌شوند و نوع‌هایی که در فایل نیستند غیرفعال می‌شوند
+    - دسته‌بندی‌ها و ویژگی‌ها فقط وقتی ستون/کلید آن‌ها در ردیف باشد جایگزین می‌شوند
+    - در حالت dry_run فقط اعتبارسنجی انجام می‌شود و چیزی ذخیره نمی‌شود
+
+    رکورد JSONL:
+        {"slug", "title", "shortDescription", "description", "brand": "<slug>",
+         "categories": ["<slug>", ...], "stock", "isActive", "mainImage": "<مسیر در storage>",
+         "saleTypes": [{"typeSale", "price", "memberCarton", "limitedSale", "title", "isActive"}],
+         "features": [{"feature": "<slug>", "value", "filterValue"}]}
+    ستون‌های CSV همان کلیدها هستند؛ فیلدهای چندتایی:
+        categories = "slug1|slug2"
+        saleTypes  = "typeSale:price[:memberCarton[:limitedSale]]|..."
+        features   = "feature-slug=value[=filterValue]|..."
+    filterValue (مقدار فیلتر) اختیاری است و به‌طور پیش‌فرض همان value در نظر گرفته می‌شود
+    """
+
+    FORMATS = ('csv', 'jsonl')
+    BATCH_SIZE = 500
+    # حداکثر خطاهای نگه داشته شده در گزارش (شمارش کامل در errorCount است)
+    MAX_REPORTED_ERRORS = 200
+
+    TYPE_SALE_NAMES = {'single': SaleType.SINGLE, 'carton': SaleType.CARTON, 'limited': SaleType.LIMITED}
+    TRUE_VALUES = ('1', 'true', 'yes', 'y', 'بله')
+    FALSE_VALUES = ('0', 'false', 'no', 'n', 'خیر', '')
+
+    # ========================
+    # خواندن جریانی فایل
+    # ========================
+    @staticmethod
+    def _split(value, separator='|'):
+        return [part.strip() for part in value.split(separator) if part.strip()]
+
+    @staticmethod
+    def _from_csv(row):
+        """تبدیل یک ردیف CSV به رکورد هم‌شکل JSONL (ستون‌های غایب در رکورد نمی‌آیند)"""
+        record = {key: value for key, value in row.items() if key and value is not None}
+        if 'categories' in record:
+            record['categories'] = CatalogImportService._split(record['categories'])
+        if 'saleTypes' in record:
+            sale_types = []
+            for item in CatalogImportService._split(record['saleTypes']):
+                parts = (item.split(':') + [None] * 4)[:4]
+                sale_types.append(dict(zip(('typeSale', 'price', 'memberCarton', 'limitedSale'), parts)))
+            record['saleTypes'] = sale_types
+        if 'features' in record:
+            features = []
+            for item in CatalogImportService._split(record['features']):
+                feature, _, value = item.partition('=')
+                value, _, filter_value = value.partition('=')
+                features.append({'feature': feature.strip(), 'value': value.strip(), 'filterValue': filter_value.strip()})
+            record['features'] = features
+        return record
+
+    @staticmethod
+    def iter_records(stream, file_format):
+        """(شماره خط، رکورد یا None، خطا) برای هر ردیف فایل متنی"""
+        if file_format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, CatalogImportService._from_csv(row), None
+            return
+
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, None, 'JSON نامعتبر'
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, 'هر خط باید یک شیء JSON باشد'
+                continue
+            yield line_number, record, None
+
+    # ========================
+    # اعتبارسنجی
+    # ========================
+    @staticmethod
+    def _to_int(value, label, required=False):
+        if value is None or value == '':
+            if required:
+                raise ValueError(f'{label} الزامی است')
+            return None
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{label} باید عدد صحیح باشد')
+        if number < 0:
+            raise ValueError(f'{label} نمی‌تواند منفی باشد')
+        return number
+
+    @staticmethod
+    def _to_bool(value, label):
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in CatalogImportService.TRUE_VALUES:
+            return True
+        if text in CatalogImportService.FALSE_VALUES:
+            return False
+        raise ValueError(f'{label} نامعتبر است')
+
+    @staticmethod
+    def _to_type_sale(value):
+        text = str(value if value is not None else '').strip().lower()
+        if text in CatalogImportService.TYPE_SALE_NAMES:
+            return CatalogImportService.TYPE_SALE_NAMES[text]
+        type_sale = CatalogImportService._to_int(text, 'نوع فروش', required=True)
+        if type_sale not in dict(SaleType.CHOICES):
+            raise ValueError(f'نوع فروش {value} نامعتبر است')
+        return type_sale
+
+    @staticmethod
+    def _lookups(records):
+        """برند، دسته‌بندی، ویژگی، مقدار ویژگی و محصولات موجود یک دسته (یک کوئری برای هر نوع)"""
+        slugs, brands, categories, features = set(), set(), set(), set()
+        for record in records:
+            slugs.add(str(record.get('slug') or '').strip())
+            if record.get('brand'):
+                brands.add(str(record['brand']).strip())
+            for slug in record.get('categories') or ():
+                categories.add(str(slug).strip())
+            for item in record.get('features') or ():
+                if isinstance(item, dict) and item.get('feature'):
+                    features.add(str(item['feature']).strip())
+
+        products = {}
+        for slug, product_id in Product.objects.filter(slug__in=slugs).values_list('slug', 'id'):
+            products.setdefault(slug, []).append(product_id)
+
+        feature_ids = dict(Feature.objects.filter(slug__in=features).values_list('slug', 'id'))
+        filter_values = {}
+        for value_id, feature_id, value in FeatureValue.objects.filter(
+            feature_id__in=feature_ids.values()
+        ).values_list('id', 'feature_id', 'value').order_by('id'):
+            filter_values.setdefault((feature_id, value), value_id)
+
+        return {
+            'products': products,
+            'brands': dict(Brand.objects.filter(slug__in=brands).values_list('slug', 'id')),
+            'categories': dict(Category.objects.filter(slug__in=categories).values_list('slug', 'id')),
+            'features': feature_ids,
+            'filterValues': filter_values,
+        }
+
+    @staticmethod
+    def _clean(record, lookups, seen_slugs):
+        """
+        اعتبارسنجی و تبدیل یک رکورد به مقادیر قابل ذخیره
+        در صورت خطا ValueError با پیام فارسی
+        """
+        slug = str(record.get('slug') or '').strip()
+        if not slug:
+            raise ValueError('slug الزامی است')
+        if len(slug) > 200:
+            raise ValueError('slug طولانی‌تر از ۲۰۰ کاراکتر است')
+        if slug in seen_slugs:
+            raise ValueError(f'slug «{slug}» در این دسته تکرار شده است')
+
+        existing = lookups['products'].get(slug, [])
+        if len(existing) > 1:
+            raise ValueError(f'چند محصول با slug «{slug}» وجود دارد')
+
+        cleaned = {'slug': slug, 'id': existing[0] if existing else None, 'fields': {}}
+        fields = cleaned['fields']
+
+        for key in ('title', 'shortDescription', 'description', 'mainImage'):
+            if key in record:
+                fields[key] = str(record[key] or '').strip()
+        if 'title' in fields and len(fields['title']) > 200:
+            raise ValueError('عنوان طولانی‌تر از ۲۰۰ کاراکتر است')
+        if 'shortDescription' in fields and len(fields['shortDescription']) > 500:
+            raise ValueError('توضیح کوتاه طولانی‌تر از ۵۰۰ کاراکتر است')
+        if 'stock' in record:
+            fields['stock'] = CatalogImportService._to_int(record['stock'], 'موجودی') or 0
+        if 'isActive' in record:
+            fields['isActive'] = CatalogImportService._to_bool(record['isActive'], 'وضعیت فعال')
+        if 'brand' in record:
+            brand = str(record['brand'] or '').strip()
+            if brand and brand not in lookups['brands']:
+                raise ValueError(f'برند «{brand}» پیدا نشد')
+            fields['brand'] = lookups['brands'].get(brand)
+
+        for key, label in (('title', 'عنوان'), ('shortDescription', 'توضیح کوتاه'), ('mainImage', 'تصویر اصلی')):
+            if cleaned['id'] is None and not fields.get(key):
+                raise ValueError(f'{label} برای محصول جدید الزامی است')
+            if cleaned['id'] is not None and key in fields and not fields[key]:
+                # مقدار خالی در بروزرسانی یعنی بدون تغییر
+                del fields[key]
+
+        if 'categories' in record:
+            categories = record['categories'] or []
+            if not isinstance(categories, list):
+                raise ValueError('categories باید لیست باشد')
+            missing = [slug for slug in categories if str(slug).strip() not in lookups['categories']]
+            if missing:
+                raise ValueError(f'دسته‌بندی پیدا نشد: {", ".join(map(str, missing))}')
+            cleaned['categories'] = list(dict.fromkeys(lookups['categories'][str(slug).strip()] for slug in categories))
+
+        if 'saleTypes' in record:
+            sale_types = {}
+            for item in record['saleTypes'] or []:
+                if not isinstance(item, dict):
+                    raise ValueError('هر نوع فروش باید یک شیء باشد')
+                type_sale = CatalogImportService._to_type_sale(item.get('typeSale'))
+                if type_sale in sale_types:
+                    raise ValueError(f'نوع فروش {type_sale} تکراری است')
+                sale_types[type_sale] = {
+                    'price': CatalogImportService._to_int(item.get('price'), 'قیمت', required=True),
+                    'memberCarton': CatalogImportService._to_int(item.get('memberCarton'), 'تعداد در کارتن'),
+                    'limitedSale': CatalogImportService._to_int(item.get('limitedSale'), 'محدودیت خرید'),
+                    'title': (str(item['title']).strip() or None) if item.get('title') else None,
+                    'isActive': CatalogImportService._to_bool(item.get('isActive', True), 'وضعیت نوع فروش'),
+                }
+                if type_sale == SaleType.CARTON and not sale_types[type_sale]['memberCarton']:
+                    raise ValueError('برای کارتن فروشی تعداد در کارتن الزامی است')
+                if type_sale == SaleType.LIMITED and not sale_types[type_sale]['limitedSale']:
+                    raise ValueError('برای فروش محدود، محدودیت خرید الزامی است')
+            cleaned['saleTypes'] = sale_types
+
+        if 'features' in record:
+            features = []
+            for item in record['features'] or []:
+                if not isinstance(item, dict):
+                    raise ValueError('هر ویژگی باید یک شیء باشد')
+                feature_slug = str(item.get('feature') or '').strip()
+                feature_id = lookups['features'].get(feature_slug)
+                if feature_id is None:
+                    raise ValueError(f'ویژگی «{feature_slug}» پیدا نشد')
+                value = str(item.get('value') or '').strip()
+                if not value or len(value) > 40:
+                    raise ValueError(f'مقدار ویژگی «{feature_slug}» باید بین ۱ تا ۴۰ کاراکتر باشد')
+                filter_value = str(item.get('filterValue') or '').strip() or value
+                features.append((feature_id, value, lookups['filterValues'].get((feature_id, filter_value))))
+            cleaned['features'] = features
+
+        return cleaned
+
+    # ========================
+    # ذخیره یک دسته
+    # ========================
+    @staticmethod
+    def _apply_products(rows, now):
+        """بروزرسانی محصولات موجود و ایجاد محصولات جدید؛ شناسه محصولات جدید در rows ثبت می‌شود"""
+        # bulk_update یک لیست فیلد ثابت می‌خواهد؛ ردیف‌ها بر اساس ستون‌های موجود گروه‌بندی می‌شوند
+        groups = {}
+        for row in rows:
+            if row['id'] is not None:
+                groups.setdefault(tuple(sorted(row['fields'])), []).append(row)
+        for fields, group in groups.items():
+            products = []
+            for row in group:
+                product = Product(pk=row['id'], updatedAt=now)
+                for field, value in row['fields'].items():
+                    setattr(product, 'brand_id' if field == 'brand' else field, value)
+                products.append(product)
+            # bulk_update فیلد auto_now را مقداردهی نمی‌کند
+            Product.objects.bulk_update(products, [*fields, 'updatedAt'])
+
+        new_rows = [row for row in rows if row['id'] is None]
+        if not new_rows:
+            return []
+        products = []
+        for row in new_rows:
+            fields = dict(row['fields'])
+            products.append(Product(
+                slug=row['slug'],
+                title=fields['title'],
+                shortDescription=fields['shortDescription'],
+                description=fields.get('description', ''),
+                mainImage=fields['mainImage'],
+                brand_id=fields.get('brand'),
+                stock=fields.get('stock', 0),
+                isActive=fields.get('isActive', True),
+            ))
+        Product.objects.bulk_create(products)
+        # MySQL شناسه‌های bulk_create را برنمی‌گرداند
+        created = dict(
+            Product.objects.filter(slug__in=[row['slug'] for row in new_rows]).values_list('slug', 'id')
+        )
+        for row in new_rows:
+            row['id'] = created[row['slug']]
+        return [row['id'] for row in new_rows]
+
+    @staticmethod
+    def _apply_categories(rows):
+        rows = [row for row in rows if 'categories' in row]
+        if not rows:
+            return
+        through = Product.category.through
+        through.objects.filter(product_id__in=[row['id'] for row in rows]).delete()
+        through.objects.bulk_create([
+            through(product_id=row['id'], category_id=category_id)
+            for row in rows for category_id in row['categories']
+        ])
+
+    @staticmethod
+    def _apply_sale_types(rows, now):
+        rows = [row for row in rows if 'saleTypes' in row]
+        if not rows:
+            return
+        existing = {}
+        for sale_type in ProductSaleType.objects.filter(product_id__in=[row['id'] for row in rows]).order_by('id'):
+            existing.setdefault((sale_type.product_id, sale_type.typeSale), sale_type)
+
+        to_create, to_update = [], []
+        for row in rows:
+            for type_sale, values in row['saleTypes'].items():
+                sale_type = existing.pop((row['id'], type_sale), None)
+                if sale_type is None:
+                    sale_type = ProductSaleType(product_id=row['id'], typeSale=type_sale, createdAt=now)
+                    to_create.append(sale_type)
+                else:
+                    to_update.append(sale_type)
+                for field, value in values.items():
+                    setattr(sale_type, field, value)
+                # save() مدل finalPrice را برابر قیمت می‌گذارد؛ در عملیات گروهی دستی انجام می‌شود
+                sale_type.finalPrice = values['price']
+                sale_type.updatedAt = now
+
+        # نوع‌های فروشی که در فایل نیامده‌اند غیرفعال می‌شوند (سفارش‌های قبلی به آن‌ها ارجاع دارند)
+        for sale_type in existing.values():
+            if sale_type.isActive:
+                sale_type.isActive = False
+                sale_type.updatedAt = now
+                to_update.append(sale_type)
+
+        if to_update:
+            ProductSaleType.objects.bulk_update(
+                to_update,
+                ['price', 'finalPrice', 'memberCarton', 'limitedSale', 'title', 'isActive', 'updatedAt']
+            )
+        if to_create:
+            ProductSaleType.objects.bulk_create(to_create)
+
+    @staticmethod
+    def _apply_features(rows):
+        rows = [row for row in rows if 'features' in row]
+        if not rows:
+            return
+        # حذف مستقیم بدون سیگنال post_delete هر ردیف (هر کدام یک refresh ایندکس بیت‌مپ می‌ساخت)؛
+        # _write_batch ایندکس و تاریخ بروزرسانی محصولات دسته را یک بار بروز می‌کند
+        features = ProductFeature.objects.filter(product_id__in=[row['id'] for row in rows])
+        features._raw_delete(features.db)
+        ProductFeature.objects.bulk_create([
+            ProductFeature(product_id=row['id'], feature_id=feature_id, value=value, filterValue_id=filter_value_id)
+            for row in rows for feature_id, value, filter_value_id in row['features']
+        ])
+
+    @staticmethod
+    def _write_batch(rows):
+        """ذخیره یک دسته در یک تراکنش؛ خروجی: (شناسه محصولات جدید، همه شناسه‌ها)"""
+        now = timezone.now()
+        with transaction.atomic():
+            created_ids = CatalogImportService._apply_products(rows, now)
+            CatalogImportService._apply_categories(rows)
+            CatalogImportService._apply_sale_types(rows, now)
+            CatalogImportService._apply_features(rows)
+
+        product_ids = [row['id'] for row in rows]
+        # سیگنال‌های save در عملیات گروهی اجرا نمی‌شوند؛ جداول وابسته دستی بروز می‌شوند
+        PricingService.refresh_many(product_ids, now=now)
+        if created_ids:
+            ReviewSummaryService.refresh_many(created_ids)
+        product_index.refresh_products(product_ids)
+        SearchIndexService.refresh_many(product_ids)
+        autocomplete_index.refresh_products(product_ids)
+        return created_ids, product_ids
+
+    # ========================
+    # اجرای ورود
+    # ========================
+    @staticmethod
+    def _new_report(dry_run):
+        return {
+            'dryRun': dry_run, 'rows': 0, 'valid': 0, 'created': 0, 'updated': 0,
+            'errorCount': 0, 'errors': [],
+        }
+
+    @staticmethod
+    def _add_error(report, line_number, message):
+        report['errorCount'] += 1
+        if len(report['errors']) < CatalogImportService.MAX_REPORTED_ERRORS:
+            report['errors'].append((line_number, message))
+
+    @staticmethod
+    def _process_batch(batch, report, dry_run):
+        records = [record for _, record in batch]
+        lookups = CatalogImportService._lookups(records)
+
+        rows, seen_slugs = [], set()
+        for line_number, record in batch:
+            try:
+                row = CatalogImportService._clean(record, lookups, seen_slugs)
+            except ValueError as e:
+                CatalogImportService._add_error(report, line_number, str(e))
+                continue
+            seen_slugs.add(row['slug'])
+            rows.append(row)
+
+        report['valid'] += len(rows)
+        new_count = sum(1 for row in rows if row['id'] is None)
+        if dry_run or not rows:
+            report['created'] += new_count
+            report['updated'] += len(rows) - new_count
+            return
+
+        created_ids, _ = CatalogImportService._write_batch(rows)
+        report['created'] += len(created_ids)
+        report['updated'] += len(rows) - len(created_ids)
+
+    @staticmethod
+    def run(stream, file_format, dry_run=False, batch_size=None, progress=None):
+        """
+        ورود کاتالوگ از یک جریان متنی
+        progress: تابع اختیاری که بعد از هر دسته با گزارش جاری صدا زده می‌شود
+        خروجی: گزارش {'rows', 'valid', 'created', 'updated', 'errorCount', 'errors': [(خط، پیام)]}
+        در حالت dry_run مقادیر created/updated تعداد پیش‌بینی شده است
+        """
+        if file_format not in CatalogImportService.FORMATS:
+            raise ValueError(f'فرمت {file_format} پشتیبانی نمی‌شود')
+        batch_size = batch_size or CatalogImportService.BATCH_SIZE
+        report = CatalogImportService._new_report(dry_run)
+
+        records = CatalogImportService.iter_records(stream, file_format)
+        while True:
+            chunk = list(islice(records, batch_size))
+            if not chunk:
+                break
+            batch = []
+            for line_number, record, error in chunk:
+                report['rows'] += 1
+                if error:
+                    CatalogImportService._add_error(report, line_number, error)
+                else:
+                    batch.append((line_number, record))
+            if batch:
+                CatalogImportService._process_batch(batch, report, dry_run)
+            if progress:
+                progress(report)
+
+        report['errors'].sort()
+        if not dry_run and (report['created'] or report['updated']):
+            from apps.main.service.home_service import HomePageService
+
+            CategoryClosureService.refresh_counts()
+            HomePageService.invalidate(HomePageService.TAG_PRODUCTS)
+        logger.info(
+            'Catalog import finished (dry_run=%s): %s rows, %s created, %s updated, %s errors',
+            dry_run, report['rows'], report['created'], report['updated'], report['errorCount']
+        )
+        return report
+
+
+class CatalogExportService:
+    """
+    خروجی جریانی کاتالوگ در همان قالب ورودی (CSV یا JSONL)
+
+    محصولات در دسته‌های CHUNK_SIZE تایی به ترتیب شناسه (keyset) خوانده می‌شوند و
+    دسته‌بندی‌ها، انواع فروش و ویژگی‌های هر دسته با سه کوئری گروهی گرفته می‌شوند؛
+    حافظه مصرفی مستقل از اندازه کاتالوگ است
+    """
+
+    CHUNK_SIZE = 1000
+    CSV_COLUMNS = (
+        'slug', 'title', 'shortDescription', 'description', 'brand', 'categories',
+        'stock', 'isActive', 'mainImage', 'saleTypes', 'features',
+    )
+
+    @staticmethod
+    def iter_records(chunk_size=None):
+        """رکوردهای کاتالوگ (هم‌شکل ورودی JSONL) به ترتیب شناسه"""
+        chunk_size = chunk_size or CatalogExportService.CHUNK_SIZE
+        last_id = 0
+        while True:
+            products = list(
+                Product.objects.filter(id__gt=last_id).order_by('id').values(
+                    'id', 'slug', 'title', 'shortDescription', 'description', 'brand__slug',
+                    'stock', 'isActive', 'mainImage'
+                )[:chunk_size]
+            )
+            if not products:
+                return
+            last_id = products[-1]['id']
+            product_ids = [product['id'] for product in products]
+
+            categories = {}
+            for product_id, slug in Product.category.through.objects.filter(
+                product_id__in=product_ids
+            ).order_by('id').values_list('product_id', 'category__slug'):
+                categories.setdefault(product_id, []).append(slug)
+
+            sale_types = {}
+            for item in ProductSaleType.objects.filter(product_id__in=product_ids).order_by('typeSale', 'id').values(
+                'product_id', 'typeSale', 'price', 'memberCarton', 'limitedSale', 'title', 'isActive'
+            ):
+                sale_types.setdefault(item.pop('product_id'), []).append(item)
+
+            features = {}
+            for product_id, slug, value, filter_value in ProductFeature.objects.filter(
+                product_id__in=product_ids
+            ).order_by('id').values_list('product_id', 'feature__slug', 'value', 'filterValue__value'):
+                features.setdefault(product_id, []).append({'feature': slug, 'value': value, 'filterValue': filter_value})
+
+            for product in products:
+                product_id = product.pop('id')
+                product['brand'] = product.pop('brand__slug') or ''
+                product['categories'] = categories.get(product_id, [])
+                product['saleTypes'] = sale_types.get(product_id, [])
+                product['features'] = features.get(product_id, [])
+                yield product
+
+    @staticmethod
+    def _csv_row(record):
+        row = dict(record)
+        row['categories'] = '|'.join(record['categories'])
+        row['isActive'] = '1' if record['isActive'] else '0'
+        row['saleTypes'] = '|'.join(
+            ':'.join(str(value) if value is not None else '' for value in (
+                item['typeSale'], item['price'], item['memberCarton'], item['limitedSale']
+            )).rstrip(':')
+            # نوع‌های غیرفعال در CSV نمی‌آیند تا ورود مجدد آن‌ها را غیرفعال کند
+            for item in record['saleTypes'] if item['isActive']
+        )
+        row['features'] = '|'.join(
+            f"{item['feature']}={item['value']}" + (
+                f"={item['filterValue']}" if item['filterValue'] and item['filterValue'] != item['value'] else ''
+            )
+            for item in record['features']
+        )
+        return [row[column] for column in CatalogExportService.CSV_COLUMNS]
+
+    @staticmethod
+    def iter_lines(file_format, chunk_size=None):
+        """خطوط متنی فایل خروجی (برای StreamingHttpResponse یا نوشتن در فایل)"""
+        records = CatalogExportService.iter_records(chunk_size)
+        if file_format == 'jsonl':
+            for record in records:
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+            return
+        if file_format != 'csv':
+            raise ValueError(f'فرمت {file_format} پشتیبانی نمی‌شود')
+
+        buffer = _LineBuffer()
+        writer = csv.writer(buffer)
+        yield writer.writerow(CatalogExportService.CSV_COLUMNS)
+        for record in records:
+            yield writer.writerow(CatalogExportService._csv_row(record))
+
+
+class _LineBuffer:
+    """شیء شبه فایل برای csv.writer که خط نوشته شده را برمی‌گرداند (بدون نگه داشتن در حافظه)"""
+
+    def write(self, value):
+        return value
@@ -0,0 +1,213 @@
+import logging
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from utils import get_cache_version, bump_cache_version
+from ..models import Category, CategoryClosure, Product
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryTreeService:
+    """
+    درخت سه سطحی دسته‌بندی‌های فعال برای منوی هدر (دسکتاپ و موبایل)
+
+    همه دسته‌های فعال با یک کوئری خوانده و درخت در حافظه ساخته می‌شود؛
+    نتیجه با کلید نسخه‌دار کش شده و با ذخیره/حذف هر دسته باطل می‌شود
+    """
+
+    CACHE_NAME = 'category_tree'
+    CACHE_TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def _cache_key():
+        return f'{CategoryTreeService.CACHE_NAME}:v{get_cache_version(CategoryTreeService.CACHE_NAME)}'
+
+    @staticmethod
+    def build_tree():
+        """
+        ساخت درخت از روی دیتابیس (یک کوئری)
+        خروجی: [{'main': Category, 'children': [{'child': Category, 'grandchildren': [Category]}]}]
+        ترتیب هر سطح: قدیمی‌ترین‌ها اول
+        """
+        categories = Category.objects.filter(isActive=True).only(
+            'id', 'title', 'slug', 'image', 'parent_id', 'createdAt', 'level', 'subtreeProductCount'
+        ).order_by('createdAt', 'id')
+
+        children = defaultdict(list)
+        roots = []
+        for category in categories:
+            if category.parent_id is None:
+                roots.append(category)
+            else:
+                children[category.parent_id].append(category)
+
+        return [
+            {
+                'main': main,
+                'children': [
+                    {'child': child, 'grandchildren': children.get(child.id, [])}
+                    for child in children.get(main.id, [])
+                ],
+            }
+            for main in roots
+        ]
+
+    @staticmethod
+    def get_tree(limit=None):
+        """درخت کش شده (limit: حداکثر تعداد دسته‌های اصلی)"""
+        tree = cache.get_or_set(
+            CategoryTreeService._cache_key(),
+            CategoryTreeService.build_tree,
+            CategoryTreeService.CACHE_TIMEOUT
+        )
+        return tree[:limit] if limit else tree
+
+    @staticmethod
+    def invalidate():
+        """باطل کردن درخت کش شده در همه پروسس‌ها"""
+        bump_cache_version(CategoryTreeService.CACHE_NAME)
+
+
+class CategoryClosureService:
+    """
+    نگهداری جدول بستار دسته‌بندی (CategoryClosure)، سطح هر دسته و تعداد محصولات زیرشاخه‌ها
+
+    - ایجاد/جابجایی دسته: فقط روابط زیردرخت همان دسته بازسازی می‌شود (sync_category)
+    - تعداد محصولات: یک کوئری گروه‌بندی شده برای همه دسته‌ها (refresh_counts، تسک دوره‌ای)
+    """
+
+    # ========================
+    # نگهداری روابط
+    # ========================
+    @staticmethod
+    def rebuild():
+        """ساخت کامل روابط و سطح همه دسته‌ها (دستور rebuild_category_closure)"""
+        categories = list(Category.objects.values_list('id', 'parent_id', 'level'))
+        parents = {category_id: parent_id for category_id, parent_id, _ in categories}
+
+        rows, levels = [], {}
+        for category_id in parents:
+            node, depth, seen = category_id, 0, set()
+            while node is not None and node not in seen:
+                seen.add(node)
+                rows.append(CategoryClosure(ancestor_id=node, descendant_id=category_id, depth=depth))
+                node, depth = parents.get(node), depth + 1
+            levels[category_id] = depth - 1
+
+        changed = [
+            Category(pk=category_id, level=levels[category_id])
+            for category_id, _, level in categories if levels[category_id] != level
+        ]
+        with transaction.atomic():
+            CategoryClosure.objects.all().delete()
+            CategoryClosure.objects.bulk_create(rows, batch_size=1000)
+            Category.objects.bulk_update(changed, ['level'], batch_size=1000)
+
+        CategoryClosureService.refresh_counts()
+        return len(rows)
+
+    @staticmethod
+    def sync_category(category):
+        """
+        بروزرسانی روابط بعد از ذخیره یک دسته (ایجاد یا تغییر والد)
+        خروجی: آیا روابط تغییر کرد
+        """
+        links = CategoryClosure.objects.filter(descendant_id=category.pk, depth__lte=1)
+        current = {depth: ancestor_id for ancestor_id, depth in links.values_list('ancestor_id', 'depth')}
+        if 0 in current and current.get(1) == category.parent_id:
+            return False
+
+        with transaction.atomic():
+            # زیردرخت دسته (خودش و نواده‌هایش) با فاصله از دسته
+            subtree = dict(
+                CategoryClosure.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth')
+            )
+            subtree[category.pk] = 0
+
+            if category.parent_id in subtree:
+                logger.warning('Category %s cannot be moved under its own subtree', category.pk)
+                return False
+
+            # حذف روابط اجداد قبلی با زیردرخت
+            CategoryClosure.objects.filter(
+                descendant_id__in=subtree
+            ).exclude(ancestor_id__in=subtree).delete()
+
+            # اتصال زیردرخت به اجداد والد جدید
+            ancestors = []
+            if category.parent_id is not None:
+                ancestors = list(
+                    CategoryClosure.objects.filter(
+                        descendant_id=category.parent_id
+                    ).values_list('ancestor_id', 'depth')
+                )
+            rows = [CategoryClosure(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+            rows += [
+                CategoryClosure(ancestor_id=ancestor_id, descendant_id=descendant_id,
+                                depth=ancestor_depth + descendant_depth + 1)
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, descendant_depth in subtree.items()
+            ]
+            CategoryClosure.objects.bulk_create(rows, ignore_conflicts=True)
+
+            # سطح جدید زیردرخت
+            by_depth = defaultdict(list)
+            for descendant_id, descendant_depth in subtree.items():
+                by_depth[descendant_depth].append(descendant_id)
+            for descendant_depth, ids in by_depth.items():
+                Category.objects.filter(pk__in=ids).update(level=len(ancestors) + descendant_depth)
+
+        CategoryClosureService.refresh_counts()
+        return True
+
+    # ========================
+    # تعداد محصولات زیرشاخه‌ها
+    # ========================
+    @staticmethod
+    def refresh_counts():
+        """
+        تعداد محصولات فعال هر دسته با احتساب زیرشاخه‌ها (هر محصول یک بار شمرده می‌شود)
+        خروجی: تعداد دسته‌های تغییر کرده
+        """
+        counts = dict(
+            CategoryClosure.objects.values('ancestor_id').annotate(
+                total=Count(
+                    'descendant__products',
+                    filter=Q(descendant__products__isActive=True),
+                    distinct=True
+                )
+            ).order_by().values_list('ancestor_id', 'total')
+        )
+        changed = [
+            Category(pk=category_id, subtreeProductCount=counts.get(category_id, 0))
+            for category_id, current in Category.objects.values_list('id', 'subtreeProductCount')
+            if counts.get(category_id, 0) != current
+        ]
+        if changed:
+            Category.objects.bulk_update(changed, ['subtreeProductCount'], batch_size=1000)
+            CategoryTreeService.invalidate()
+        return len(changed)
+
+    # ========================
+    # کوئری‌های زیردرخت
+    # ========================
+    @staticmethod
+    def descendant_ids(category):
+        """شناسه خود دسته و همه نواده‌های آن"""
+        return list(
+            CategoryClosure.objects.filter(ancestor=category).values_list('descendant_id', flat=True)
+        ) or [category.pk]
+
+    @staticmethod
+    def filter_subtree_products(queryset, category):
+        """
+        محصولات متصل به دسته یا هر یک از زیرشاخه‌های آن
+        (نیمه‌اتصال روی جدول میانی محصول-دسته و جدول بستار؛ بدون نیاز به distinct)
+        """
+        return queryset.filter(
+            id__in=Product.category.through.objects.filter(
+                category__ancestorLinks__ancestor=category
+            ).values('product_id')
+        )
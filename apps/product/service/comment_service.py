@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from ..models import Comment
+from ..pagination import KeysetPaginator
+
+
+class CommentFeedService:
+    """
+    فید نظرات صفحه محصول با صفحه‌بندی کرسری روی (createdAt, id) نزولی
+
+    - هر صفحه یک کوئری روی ایندکس comment_feed_idx است (بدون COUNT و OFFSET)؛
+      تعداد کل از ProductReviewSummary خوانده می‌شود
+    - صفحه اول به صورت دیکشنری‌های آماده در کش نگه داشته می‌شود؛ کلید آن شامل updatedAt
+      خلاصه نظرات است که با هر ثبت/تغییر/حذف نظر بروز می‌شود، پس باطل کردن جداگانه لازم ندارد
+    """
+
+    PER_PAGE = 10
+    FIRST_PAGE_TIMEOUT = 60 * 60
+
+    @staticmethod
+    def _paginator(product_id):
+        queryset = Comment.objects.filter(product_id=product_id, isActive=True).select_related('user')
+        return KeysetPaginator(queryset, CommentFeedService.PER_PAGE, sort='newest')
+
+    @staticmethod
+    def serialize(comment):
+        """نمایش یک نظر برای تمپلیت و پاسخ JSON"""
+        return {
+            'id': comment.id,
+            'user_name': comment.user.family or 'کاربر',
+            'text': comment.text,
+            'typeComment': comment.typeComment,
+            'type': comment.get_typeComment_display(),
+            'type_class': 'text-green-500' if comment.typeComment == 'recommend' else 'text-red-500',
+            'createdAt': comment.createdAt,
+            'created_at': comment.createdAt.strftime('%Y/%m/%d %H:%M'),
+            'is_buyer': True,
+        }
+
+    @staticmethod
+    def get_page(product_id, cursor=None):
+        """یک صفحه از نظرات: {'comments': [...], 'next_cursor': کرسر صفحه بعد یا None}"""
+        page = CommentFeedService._paginator(product_id).get_page(cursor)
+        return {
+            'comments': [CommentFeedService.serialize(comment) for comment in page],
+            'next_cursor': page.next_cursor,
+        }
+
+    @staticmethod
+    def first_page(product_id, review_summary):
+        """صفحه اول (کش شده کنار نسخه خلاصه نظرات محصول)"""
+        version = review_summary.updatedAt.timestamp() if review_summary.updatedAt else 0
+        return cache.get_or_set(
+            f'comment_feed:{product_id}:{version}',
+            lambda: CommentFeedService.get_page(product_id),
+            CommentFeedService.FIRST_PAGE_TIMEOUT
+        )
@@ -0,0 +1,363 @@
+from collections import defaultdict
+from ..models import Brand, Category, FeatureValue, Product, ProductFeature
+from .bitmap_service import product_index, iter_ids, count, to_bitmap
+
+
+class FacetService:
+    """
+    موتور فیلترهای چندوجهی (Facet) برای سایدبار فروشگاه و صفحه جستجو
+
+    برای مجموعه محصولات پایه (دسته/برند/جستجو) با دو کوئری:
+      1. (id، برند، قیمت) محصولات
+      2. (محصول، مقدار ویژگی، ویژگی) از ProductFeature
+      3. (محصول، دسته) فقط در صورت شمارش دسته‌ها
+    تعداد محصولات هر مقدار ویژگی، هر برند، هر دسته و هر بازه قیمت محاسبه می‌شود.
+
+    معنای فیلترها (disjunctive):
+    - مقادیر یک ویژگی با هم OR و ویژگی‌های مختلف با هم AND می‌شوند
+    - هر گروه با اعمال همه فیلترهای «دیگر» (به جز خودش) شمرده می‌شود
+    """
+
+    PRICE_BUCKETS = 5
+    # حداکثر شناسه‌های تطابق ایندکس بیت‌مپ که به‌صورت لیست IN به کوئری برمی‌گردند
+    MAX_INDEX_IDS = 1000
+
+    # ========================
+    # خواندن فیلترها از URL
+    # ========================
+    @staticmethod
+    def _int_list(values):
+        result = set()
+        for value in values:
+            for part in str(value).split(','):
+                part = part.strip()
+                if part.isdigit():
+                    result.add(int(part))
+        return result
+
+    @staticmethod
+    def parse_int(value):
+        try:
+            return int(value) if value not in (None, '') else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def parse_request(request):
+        """فیلترهای فعلی کاربر: ?feature=..&brand=1,2&price_min=..&price_max=.."""
+        return {
+            'feature_value_ids': FacetService._int_list(request.GET.getlist('feature')),
+            'brand_ids': FacetService._int_list(request.GET.getlist('brand')),
+            'price_min': FacetService.parse_int(request.GET.get('price_min')),
+            'price_max': FacetService.parse_int(request.GET.get('price_max')),
+        }
+
+    # ========================
+    # فیلتر ویژگی‌ها روی کوئری‌ست لیست
+    # ========================
+    @staticmethod
+    def group_feature_values(feature_value_ids):
+        """گروه‌بندی مقادیر انتخاب‌شده بر اساس ویژگی: {feature_id: {value_id, ...}}"""
+        groups = defaultdict(set)
+        for value_id, feature_id in FeatureValue.objects.filter(
+            id__in=feature_value_ids
+        ).values_list('id', 'feature_id'):
+            groups[feature_id].add(value_id)
+        return groups
+
+    @staticmethod
+    def filter_by_features(queryset, feature_value_ids, category_ids=None, brand_id=None):
+        """
+        اعمال فیلتر ویژگی‌ها با همان معنای facetها
+        (بدون join روی ProductFeature و بدون نیاز به distinct)
+
+        با category_ids / brand_id و آماده بودن ایندکس بیت‌مپ، تطابق در حافظه محاسبه شده
+        و اگر بیش از MAX_INDEX_IDS نباشد فقط شناسه‌های نتیجه به کوئری اضافه می‌شوند
+        """
+        if not feature_value_ids:
+            return queryset
+        if (category_ids is not None or brand_id is not None) and product_index.ensure_fresh():
+            matched = product_index.filter_features(
+                product_index.listing_scope(category_ids=category_ids, brand_id=brand_id),
+                feature_value_ids
+            )
+            # لیست IN بزرگ (دسته‌های پرمحصول) به زیرکوئری ProductFeature پایین واگذار می‌شود
+            if count(matched) <= FacetService.MAX_INDEX_IDS:
+                return queryset.filter(id__in=list(iter_ids(matched)))
+        for value_ids in FacetService.group_feature_values(feature_value_ids).values():
+            queryset = queryset.filter(
+                id__in=ProductFeature.objects.filter(filterValue_id__in=value_ids).values('product_id')
+            )
+        return queryset
+
+    # ========================
+    # محاسبه facetها
+    # ========================
+    @staticmethod
+    def _price_buckets(prices, bucket_count):
+        """بازه‌های قیمت با مرزهای گرد شده بین کمترین و بیشترین قیمت"""
+        if not prices:
+            return []
+        low, high = min(prices), max(prices)
+        if low == high:
+            return [(low, high)]
+        magnitude = 10 ** max(len(str((high - low) // bucket_count)) - 2, 0)
+        start = (low // magnitude) * magnitude
+        step = -(-(high - start + 1) // bucket_count)
+        step = max(-(-step // magnitude) * magnitude, 1)
+        buckets = []
+        while start <= high:
+            buckets.append((start, start + step - 1))
+            start += step
+        return buckets
+
+    @staticmethod
+    def build(base_queryset, feature_value_ids=(), brand_ids=(), price_min=None, price_max=None,
+              feature_queryset=None, bucket_count=None, category_ids=None):
+        """
+        base_queryset: محصولات پایه با annotate قیمت (PricingService.annotate_listing)
+        feature_queryset: محدود کردن ویژگی‌های قابل نمایش (مثلاً ویژگی‌های دسته)
+        category_ids: دسته‌های انتخاب‌شده؛ با None دسته‌ها شمرده نمی‌شوند (یک کوئری کمتر)
+
+        خروجی:
+        {
+            'features': {Feature: [FeatureValue(product_count, selected), ...]},
+            'brands': [Brand(product_count, selected), ...],
+            'categories': [Category(product_count, selected), ...],
+            'price_buckets': [{'min', 'max', 'count'}, ...],
+            'total': تعداد محصولات با همه فیلترها,
+        }
+        """
+        bucket_count = bucket_count or FacetService.PRICE_BUCKETS
+        feature_value_ids = set(feature_value_ids)
+        brand_ids = set(brand_ids)
+        count_categories = category_ids is not None
+        category_ids = set(category_ids or ())
+
+        # کوئری ۱: محصولات پایه
+        products = {
+            product_id: (brand_id, price)
+            for product_id, brand_id, price in base_queryset.order_by().values_list('id', 'brand_id', 'price')
+        }
+
+        # کوئری ۲: مقادیر ویژگی محصولات پایه
+        feature_rows = ProductFeature.objects.filter(
+            product_id__in=base_queryset.order_by().values('id'),
+            filterValue__isnull=False
+        )
+        if feature_queryset is not None:
+            feature_rows = feature_rows.filter(filterValue__feature__in=feature_queryset)
+
+        product_values = defaultdict(lambda: defaultdict(set))  # product -> feature -> values
+        value_feature = {}
+        for product_id, value_id, feature_id in feature_rows.values_list(
+            'product_id', 'filterValue_id', 'filterValue__feature_id'
+        ).distinct():
+            product_values[product_id][feature_id].add(value_id)
+            value_feature[value_id] = feature_id
+
+        # کوئری ۳ (اختیاری): دسته‌های محصولات پایه
+        product_categories = defaultdict(set)
+        if count_categories:
+            for product_id, category_id in Product.category.through.objects.filter(
+                product_id__in=base_queryset.order_by().values('id')
+            ).values_list('product_id', 'category_id'):
+                product_categories[product_id].add(category_id)
+
+        # گروه‌های انتخاب‌شده کاربر: {feature_id: {value_id, ...}}
+        selected_groups = defaultdict(set)
+        for value_id in feature_value_ids:
+            if value_id in value_feature:
+                selected_groups[value_feature[value_id]].add(value_id)
+
+        def features_match(product_id, skip_feature=None):
+            values = product_values.get(product_id, {})
+            for feature_id, selected in selected_groups.items():
+                if feature_id != skip_feature and not (values.get(feature_id, set()) & selected):
+                    return False
+            return True
+
+        def brand_match(brand_id):
+            return not brand_ids or brand_id in brand_ids
+
+        def price_match(price):
+            return (price_min is None or price >= price_min) and (price_max is None or price <= price_max)
+
+        def category_match(product_id):
+            return not category_ids or bool(product_categories[product_id] & category_ids)
+
+        value_counts = defaultdict(int)
+        brand_counts = defaultdict(int)
+        category_counts = defaultdict(int)
+        scope_prices = []
+        bucket_prices = []
+        total = 0
+
+        for product_id, (brand_id, price) in products.items():
+            b_ok, p_ok = brand_match(brand_id), price_match(price)
+            f_ok = features_match(product_id)
+            if b_ok and p_ok and f_ok:
+                for category_id in product_categories.get(product_id, ()):
+                    category_counts[category_id] += 1
+            if not category_match(product_id):
+                continue
+            scope_prices.append(price)
+
+            if b_ok and p_ok and f_ok:
+                total += 1
+            if p_ok and f_ok and brand_id is not None:
+                brand_counts[brand_id] += 1
+            if b_ok and f_ok:
+                bucket_prices.append(price)
+            if b_ok and p_ok:
+                for feature_id, values in product_values.get(product_id, {}).items():
+                    # هر ویژگی با همه فیلترها به جز خودش شمرده می‌شود
+                    if feature_id in selected_groups and not features_match(product_id, feature_id):
+                        continue
+                    if feature_id not in selected_groups and not f_ok:
+                        continue
+                    for value_id in values:
+                        value_counts[value_id] += 1
+
+        # آبجکت‌های نمایشی (مقادیر انتخاب‌شده حتی با تعداد صفر نمایش داده می‌شوند)
+        visible_values = set(value_counts) | (feature_value_ids & set(value_feature))
+        features = {}
+        for value in FeatureValue.objects.filter(
+            id__in=visible_values
+        ).select_related('feature').order_by('feature_id', 'id'):
+            value.product_count = value_counts.get(value.id, 0)
+            value.selected = value.id in feature_value_ids
+            features.setdefault(value.feature, []).append(value)
+
+        brands = list(Brand.objects.filter(id__in=set(brand_counts) | brand_ids).order_by('title'))
+        for brand in brands:
+            brand.product_count = brand_counts.get(brand.id, 0)
+            brand.selected = brand.id in brand_ids
+
+        categories = []
+        if count_categories:
+            categories = list(Category.objects.filter(id__in=set(category_counts) | category_ids).order_by('title'))
+            for category in categories:
+                category.product_count = category_counts.get(category.id, 0)
+                category.selected = category.id in category_ids
+
+        price_buckets = []
+        for low, high in FacetService._price_buckets(scope_prices, bucket_count):
+            price_buckets.append({
+                'min': low,
+                'max': high,
+                'count': sum(1 for price in bucket_prices if low <= price <= high),
+            })
+
+        return {
+            'features': features,
+            'brands': brands,
+            'categories': categories,
+            'price_buckets': price_buckets,
+            'total': total,
+        }
+
+    # ========================
+    # محاسبه facetها از ایندکس بیت‌مپ
+    # ========================
+    @staticmethod
+    def build_from_index(index, scope, feature_value_ids=(), brand_ids=(), price_min=None,
+                         price_max=None, feature_ids=None, bucket_count=None):
+        """
+        همان خروجی build، با شمارش از روی ایندکس بیت‌مپ (ProductBitmapIndex)
+        scope: بیت‌مپ محصولات پایه (index.listing_scope)
+        feature_ids: محدود کردن ویژگی‌های قابل نمایش (مثلاً ویژگی‌های دسته)
+        فقط برای ساخت آبجکت‌های نمایشی (مقادیر ویژگی و برندها) به دیتابیس مراجعه می‌شود
+        """
+        bucket_count = bucket_count or FacetService.PRICE_BUCKETS
+        feature_value_ids = set(feature_value_ids)
+        brand_ids = set(brand_ids)
+        state = index.snapshot()
+        prices = state['prices']
+
+        # مقادیر ویژگی موجود در محصولات پایه
+        value_feature = {}
+        for value_id, bitmap in state['values'].items():
+            feature_id = state['value_feature'].get(value_id)
+            if bitmap & scope and (feature_ids is None or feature_id in feature_ids):
+                value_feature[value_id] = feature_id
+
+        # بیت‌مپ هر گروه انتخاب‌شده (OR مقادیر یک ویژگی)
+        group_bitmaps = defaultdict(int)
+        for value_id in feature_value_ids:
+            if value_id in value_feature:
+                group_bitmaps[value_feature[value_id]] |= state['values'][value_id]
+
+        def features_mask(skip_feature=None):
+            mask = scope
+            for feature_id, bitmap in group_bitmaps.items():
+                if feature_id != skip_feature:
+                    mask &= bitmap
+            return mask
+
+        brand_mask = scope
+        if brand_ids:
+            brand_mask = 0
+            for brand_id in brand_ids:
+                brand_mask |= state['brands'].get(brand_id, 0)
+            brand_mask &= scope
+
+        scope_ids = list(iter_ids(scope))
+        price_mask = scope
+        if price_min is not None or price_max is not None:
+            price_mask = to_bitmap(
+                product_id for product_id in scope_ids
+                if (price_min is None or prices[product_id] >= price_min)
+                and (price_max is None or prices[product_id] <= price_max)
+            )
+
+        all_features = features_mask()
+        total = count(brand_mask & price_mask & all_features)
+
+        value_counts = {}
+        other_masks = {}
+        for value_id, feature_id in value_feature.items():
+            if feature_id not in other_masks:
+                other_masks[feature_id] = brand_mask & price_mask & features_mask(feature_id)
+            product_count = count(state['values'][value_id] & other_masks[feature_id])
+            if product_count:
+                value_counts[value_id] = product_count
+
+        brand_base = price_mask & all_features
+        brand_counts = {}
+        for brand_id, bitmap in state['brands'].items():
+            product_count = count(bitmap & brand_base)
+            if product_count:
+                brand_counts[brand_id] = product_count
+
+        # آبجکت‌های نمایشی (مقادیر انتخاب‌شده حتی با تعداد صفر نمایش داده می‌شوند)
+        visible_values = set(value_counts) | (feature_value_ids & set(value_feature))
+        features = {}
+        for value in FeatureValue.objects.filter(
+            id__in=visible_values
+        ).select_related('feature').order_by('feature_id', 'id'):
+            value.product_count = value_counts.get(value.id, 0)
+            value.selected = value.id in feature_value_ids
+            features.setdefault(value.feature, []).append(value)
+
+        brands = list(Brand.objects.filter(id__in=set(brand_counts) | brand_ids).order_by('title'))
+        for brand in brands:
+            brand.product_count = brand_counts.get(brand.id, 0)
+            brand.selected = brand.id in brand_ids
+
+        bucket_prices = [prices[product_id] for product_id in iter_ids(brand_mask & all_features)]
+        price_buckets = []
+        for low, high in FacetService._price_buckets([prices[pid] for pid in scope_ids], bucket_count):
+            price_buckets.append({
+                'min': low,
+                'max': high,
+                'count': sum(1 for price in bucket_prices if low <= price <= high),
+            })
+
+        return {
+            'features': features,
+            'brands': brands,
+            'categories': [],
+            'price_buckets': price_buckets,
+            'total': total,
+        }
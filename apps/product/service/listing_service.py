@@ -0,0 +1,70 @@
+from ..models import ProductReviewSummary
+from .review_service import ReviewSummaryService
+
+
+class ListingService:
+    """
+    ابزارهای مشترک کارت‌های محصول در لیست‌ها (فروشگاه، برند، شگفت‌انگیز، جستجو و ...)
+    """
+
+    @staticmethod
+    def _review_summaries(product_ids):
+        """خلاصه نظرات چند محصول با یک کوئری (ردیف‌های ساخته نشده همین‌جا ساخته می‌شوند)"""
+        product_ids = set(product_ids)
+        if not product_ids:
+            return {}
+        summaries = {
+            summary.product_id: summary
+            for summary in ProductReviewSummary.objects.filter(product_id__in=product_ids)
+        }
+        missing = product_ids - set(summaries)
+        if missing:
+            summaries.update(ReviewSummaryService.refresh_many(missing))
+        return summaries
+
+    @staticmethod
+    def _stats(summary):
+        if summary is None:
+            return {'rating_avg': 0, 'rating_count': 0, 'comments_count': 0}
+        return {
+            'rating_avg': round(summary.averageRating or 0, 1),
+            'rating_count': summary.totalRatings,
+            'comments_count': summary.totalComments,
+        }
+
+    @staticmethod
+    def review_stats_for_ids(product_ids):
+        """
+        میانگین امتیاز، تعداد امتیاز و تعداد کامنت برای لیستی از شناسه‌ها با یک کوئری
+        خروجی: {product_id: {'rating_avg', 'rating_count', 'comments_count'}}
+        """
+        summaries = ListingService._review_summaries(product_ids)
+        return {
+            product_id: ListingService._stats(summaries.get(product_id))
+            for product_id in product_ids
+        }
+
+    @staticmethod
+    def attach_review_stats(products):
+        """
+        افزودن rating_avg / rating_count / comments_count به کارت‌های محصول با یک کوئری
+        ورودی کوئری‌ست یا لیست محصولات است و خروجی لیست همان محصولات
+        رابطه reviewSummary هم روی هر محصول کش می‌شود تا average_rating و
+        total_comments در تمپلیت کوئری جداگانه نزنند
+        """
+        products = list(products)
+        summaries = ListingService._review_summaries(product.pk for product in products)
+
+        for product in products:
+            summary = summaries.get(product.pk)
+            if summary is not None:
+                product.reviewSummary = summary
+            for key, value in ListingService._stats(summary).items():
+                setattr(product, key, value)
+        return products
+
+    @staticmethod
+    def attach_to_page(page_obj):
+        """اعمال attach_review_stats روی یک صفحه از Paginator"""
+        page_obj.object_list = ListingService.attach_review_stats(page_obj.object_list)
+        return page_obj
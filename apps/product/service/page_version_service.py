@@ -0,0 +1,76 @@
+from django.db.models import Count, Max
+from utils import build_etag, bump_cache_version, get_cache_versions, request_viewer
+from .category_service import CategoryTreeService
+from .pricing_service import PricingService
+from .recommendation_service import RecommendationService
+from ..models import Product
+
+
+class ProductPageVersion:
+    """
+    نسخه محتوای صفحه محصول برای GET شرطی (ETag / Last-Modified)
+
+    با یک کوئری سبک روی محصول (و قیمت، خلاصه نظرات و گالری آن) و یک رفت و برگشت به کش
+    ساخته می‌شود تا اگر صفحه از بازدید قبلی کاربر تغییری نکرده، 304 قبل از کوئری‌های
+    سنگین صفحه برگردد. وضعیت‌های شخصی (علاقه‌مندی، ثبت دیدگاه) در صفحه کش نمی‌شوند و
+    جداگانه از product_user_state گرفته می‌شوند.
+    ویژگی‌های محصول (ProductFeature) تاریخ بروزرسانی ندارند؛ تغییر آن‌ها نسخه کش همان
+    محصول را بالا می‌برد (bump_features از سیگنال‌ها).
+    """
+
+    # نسخه‌های مشترک: قیمت محصولات مرتبط، منوی دسته‌بندی‌ها، محصولات مرتبط
+    SHARED_VERSIONS = (
+        PricingService.CACHE_NAME,
+        CategoryTreeService.CACHE_NAME,
+        RecommendationService.CACHE_NAME,
+    )
+
+    @staticmethod
+    def features_version_name(product_id):
+        return f'product_features:{product_id}'
+
+    @staticmethod
+    def bump_features(product_id):
+        """تغییر ویژگی‌های یک محصول (ETag صفحه آن عوض می‌شود)"""
+        bump_cache_version(ProductPageVersion.features_version_name(product_id))
+
+    @staticmethod
+    def get(request, slug):
+        """{'etag', 'last_modified'} یا None اگر محصول فعالی با این slug نباشد (یک بار در هر درخواست)"""
+        cache_attr = '_product_page_version'
+        if not hasattr(request, cache_attr):
+            setattr(request, cache_attr, ProductPageVersion._build(request, slug))
+        return getattr(request, cache_attr)
+
+    @staticmethod
+    def _build(request, slug):
+        row = Product.objects.filter(slug=slug, isActive=True).values('id', 'updatedAt').annotate(
+            pricing_updated=Max('pricing__updatedAt'),
+            review_updated=Max('reviewSummary__updatedAt'),
+            gallery_updated=Max('galleries__updatedAt'),
+            gallery_count=Count('galleries'),
+        ).order_by().first()
+        if row is None:
+            return None
+
+        names = (*ProductPageVersion.SHARED_VERSIONS, ProductPageVersion.features_version_name(row['id']))
+        versions = get_cache_versions(names)
+        timestamps = [row['updatedAt'], row['pricing_updated'], row['review_updated'], row['gallery_updated']]
+        return {
+            'etag': build_etag(
+                'product', row['id'], *timestamps, row['gallery_count'],
+                *(versions[name] for name in names),
+                request_viewer(request), request.GET.urlencode(),
+            ),
+            'last_modified': max(timestamp for timestamp in timestamps if timestamp is not None),
+        }
+
+    @staticmethod
+    def etag(request, slug):
+        version = ProductPageVersion.get(request, slug)
+        return version['etag'] if version else None
+
+    @staticmethod
+    def last_modified(request, slug):
+        version = ProductPageVersion.get(request, slug)
+        return version['last_modified'] if version else None
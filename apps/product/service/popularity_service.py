@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import math
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from apps.main.service.counter_buffer_service import CounterBuffer
+from utils import get_client_ip
+from ..models import Product, ProductEngagement
+
+logger = logging.getLogger(__name__)
+
+
+class PopularityService:
+    """
+    امتیاز محبوبیت محصولات (Product.popularityScore) برای مرتب‌سازی «محبوب‌ترین»
+
+    امتیاز ترکیب لگاریتمی فروش (کل و ۳۰ روز اخیر)، تعداد علاقه‌مندی‌ها، بازدیدها و ورود از
+    نتایج جستجو است که در میانگین بیزی امتیاز کاربران ضرب می‌شود (محصول کم امتیاز پایین‌تر،
+    محصول بدون امتیاز بدون تغییر). با تسک دوره‌ای refresh_scores از نو محاسبه و روی ستون
+    ایندکس‌دار محصول ذخیره می‌شود تا مرتب‌سازی بدون ORDER BY RAND() و با صفحه‌بندی کلیدی باشد.
+
+    بازدیدها و ورودهای از جستجو مثل شمارنده‌های جستجو در CounterBuffer جمع می‌شوند (بدون
+    نوشتن در دیتابیس در هر درخواست) و با اولین بازدید هر سطل در همان پروسس و قبل از هر
+    محاسبه در ProductEngagement ثبت می‌شوند.
+    """
+
+    PREFIX = 'product_engagement'
+    KINDS = ('view', 'search_click')
+    BUCKET_SECONDS = 60
+    KEY_TIMEOUT = 60 * 60 * 2      # نگهداری بافر تا اجرای بعدی تسک
+    FLUSH_LOCK_TIMEOUT = 60 * 5
+    VIEW_WINDOW = 60 * 30          # بازدید مجدد همان کاربر در این بازه شمرده نمی‌شود
+
+    WEIGHTS = {
+        'unitsSold30d': 6,
+        'unitsSold': 2,
+        'favorites': 4,
+        'searchClicks': 3,
+        'views': 1,
+    }
+    RATING_PRIOR_MEAN = 3.5
+    RATING_PRIOR_COUNT = 5
+    SCALE = 100
+    BATCH_SIZE = 1000
+
+    # ========================
+    # ثبت بازدید در بافر
+    # ========================
+    @staticmethod
+    def _client(request):
+        """شناسه کاربر بدون خواندن session (آی‌پی و مرورگر)"""
+        return hashlib.md5(
+            f'{get_client_ip(request)}|{request.META.get("HTTP_USER_AGENT", "")}'.encode('utf-8')
+        ).hexdigest()[:16]
+
+    @staticmethod
+    def add(kind, product_id, amount=1):
+        """افزودن به شمارنده view/search_click یک محصول در سطل جاری"""
+        engagement_buffer.add(kind, product_id, amount)
+
+    @staticmethod
+    def record_view(request, product_id, from_search=False):
+        """بازدید صفحه محصول (یک بار برای هر کاربر در VIEW_WINDOW)؛ from_search: ورود از نتایج جستجو"""
+        seen = f'{PopularityService.PREFIX}:seen:{PopularityService._client(request)}:{product_id}'
+        if not cache.add(seen, 1, PopularityService.VIEW_WINDOW):
+            return
+        PopularityService.add('view', product_id)
+        if from_search:
+            PopularityService.add('search_click', product_id)
+
+    # ========================
+    # ثبت در دیتابیس
+    # ========================
+    @staticmethod
+    def apply(increments, now=None):
+        """
+        ثبت افزایش‌ها: {product_id: (views, search_clicks)}
+        یک UPDATE با F() برای هر مقدار افزایش مشترک؛ محصولات حذف شده نادیده گرفته می‌شوند
+        """
+        increments = {product_id: counts for product_id, counts in increments.items() if any(counts)}
+        if not increments:
+            return 0
+        now = now or timezone.now()
+        product_ids = set(Product.objects.filter(pk__in=list(increments)).values_list('pk', flat=True))
+        with transaction.atomic():
+            ProductEngagement.objects.bulk_create(
+                [ProductEngagement(product_id=product_id) for product_id in product_ids],
+                ignore_conflicts=True
+            )
+            groups = defaultdict(list)
+            for product_id in product_ids:
+                groups[increments[product_id]].append(product_id)
+            for (views, clicks), ids in groups.items():
+                # updatedAt دستی: update() فیلد auto_now را مقداردهی نمی‌کند
+                ProductEngagement.objects.filter(product_id__in=ids).update(
+                    viewCount=F('viewCount') + views,
+                    searchClickCount=F('searchClickCount') + clicks,
+                    updatedAt=now,
+                )
+        return len(product_ids)
+
+    @staticmethod
+    def flush(now=None):
+        """
+        ثبت سطل‌های بسته شده بافر بازدیدها (سطل جاری و قبلی که ممکن است هنوز نوشته شوند نه)
+        خروجی: تعداد محصولات ثبت شده
+        """
+        return engagement_buffer.flush(now)
+
+    # ========================
+    # محاسبه امتیاز
+    # ========================
+    @staticmethod
+    def score(units_sold=0, units_sold_30d=0, favorites=0, views=0, search_clicks=0,
+              average_rating=0, total_ratings=0):
+        """امتیاز صحیح محبوبیت یک محصول از ورودی‌های آن"""
+        weights = PopularityService.WEIGHTS
+        activity = (
+            weights['unitsSold30d'] * math.log1p(units_sold_30d or 0) +
+            weights['unitsSold'] * math.log1p(units_sold or 0) +
+            weights['favorites'] * math.log1p(favorites or 0) +
+            weights['searchClicks'] * math.log1p(search_clicks or 0) +
+            weights['views'] * math.log1p(views or 0)
+        )
+        # میانگین بیزی: چند امتیاز محدود، ضریب را از میانگین پیش‌فرض دور نمی‌کند
+        prior_mean, prior_count = PopularityService.RATING_PRIOR_MEAN, PopularityService.RATING_PRIOR_COUNT
+        total_ratings = total_ratings or 0
+        rating = ((average_rating or 0) * total_ratings + prior_mean * prior_count) / (total_ratings + prior_count)
+        return int(round(PopularityService.SCALE * activity * rating / prior_mean))
+
+    @staticmethod
+    def _refresh_batch(product_ids):
+        from apps.dashboard.models import Favorite
+
+        favorites = dict(
+            Favorite.objects.filter(product_id__in=product_ids).values('product_id').annotate(
+                total=Count('pk')
+            ).order_by().values_list('product_id', 'total')
+        )
+        rows = Product.objects.filter(pk__in=product_ids).values_list(
+            'pk', 'popularityScore',
+            'salesStats__unitsSold', 'salesStats__unitsSold30d',
+            'engagement__viewCount', 'engagement__searchClickCount',
+            'reviewSummary__averageRating', 'reviewSummary__totalRatings',
+        )
+        changed = []
+        for product_id, current, sold, sold_30d, views, clicks, average, ratings in rows:
+            score = PopularityService.score(
+                units_sold=sold, units_sold_30d=sold_30d, favorites=favorites.get(product_id, 0),
+                views=views, search_clicks=clicks, average_rating=average, total_ratings=ratings,
+            )
+            if score != current:
+                changed.append(Product(pk=product_id, popularityScore=score))
+        # updatedAt محصول عمداً تغییر نمی‌کند: امتیاز بخشی از محتوای صفحه محصول نیست
+        Product.objects.bulk_update(changed, ['popularityScore'], batch_size=500)
+        return len(changed)
+
+    @staticmethod
+    def refresh_scores():
+        """
+        ثبت بافر بازدیدها و محاسبه مجدد امتیاز همه محصولات به صورت دسته‌ای (کلید شناسه)
+        خروجی: تعداد محصولاتی که امتیازشان تغییر کرد
+        """
+        PopularityService.flush()
+        total, last_id = 0, 0
+        while True:
+            product_ids = list(
+                Product.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', flat=True)[:PopularityService.BATCH_SIZE]
+            )
+            if not product_ids:
+                break
+            total += PopularityService._refresh_batch(product_ids)
+            last_id = product_ids[-1]
+        logger.info('Product popularity scores refreshed: %s changed', total)
+        return total
+
+
+engagement_buffer = CounterBuffer(
+    PopularityService.PREFIX, PopularityService.KINDS, PopularityService.apply,
+    bucket_seconds=PopularityService.BUCKET_SECONDS,
+    key_timeout=PopularityService.KEY_TIMEOUT,
+    flush_lock_timeout=PopularityService.FLUSH_LOCK_TIMEOUT,
+)
@@ -0,0 +1,179 @@
+from django.db.models import Min, F
+from django.utils import timezone
+from utils import bump_cache_version
+from ..models import Product, ProductSaleType, ProductPricing
+from .bitmap_service import product_index
+
+
+class PricingService:
+    """
+    نگهداری جدول ProductPricing (قیمت پایه، تخفیف فعال و قیمت نهایی هر محصول)
+    لیست‌ها به‌جای زیرکوئری‌های قیمت/تخفیف روی این جدول مرتب و فیلتر می‌شوند
+    """
+
+    # فضای نام نسخه کش؛ کش‌های وابسته به قیمت (مثل ویجت‌های صفحه اصلی) با آن باطل می‌شوند
+    CACHE_NAME = 'product_pricing'
+
+    @staticmethod
+    def calculate_final_price(base_price, discount_percent):
+        """قیمت نهایی پس از تخفیف (همان فرمول Floor(price * (100 - d) / 100))"""
+        if base_price is None:
+            return None
+        return base_price * (100 - (discount_percent or 0)) // 100
+
+    @staticmethod
+    def _base_prices(product_ids):
+        """ارزان‌ترین قیمت فعال هر محصول (یک کوئری گروه‌بندی شده)"""
+        rows = ProductSaleType.objects.filter(
+            product_id__in=product_ids,
+            isActive=True
+        ).values('product_id').annotate(price=Min('price')).order_by()
+        return {row['product_id']: row['price'] for row in rows}
+
+    @staticmethod
+    def _discounts(product_ids, now):
+        """
+        بهترین تخفیف فعال هر محصول + زمان تغییر بعدی
+        خروجی: {product_id: (discount, end_date, next_change_at)}
+        """
+        from apps.discount.models import DiscountDetail
+
+        rows = DiscountDetail.objects.filter(
+            product_id__in=product_ids,
+            discountBasket__isActive=True,
+            discountBasket__endDate__gte=now
+        ).values_list(
+            'product_id',
+            'discountBasket__discount',
+            'discountBasket__startDate',
+            'discountBasket__endDate'
+        )
+
+        result = {}
+        for product_id, discount, start_date, end_date in rows:
+            best, best_end, next_change = result.get(product_id, (0, None, None))
+
+            if start_date <= now:
+                # سبد در حال اجرا: بیشترین درصد تخفیف انتخاب می‌شود
+                if discount > best:
+                    best, best_end = discount, end_date
+                change_at = end_date
+            else:
+                # سبدی که هنوز شروع نشده: زمان شروع آن یک تغییر آینده است
+                change_at = start_date
+
+            if next_change is None or change_at < next_change:
+                next_change = change_at
+            result[product_id] = (best, best_end, next_change)
+        return result
+
+    @staticmethod
+    def refresh_many(product_ids, now=None):
+        """
+        محاسبه مجدد قیمت چند محصول
+        خروجی: دیکشنری {product_id: ProductPricing}
+        """
+        product_ids = set(
+            Product.objects.filter(pk__in=set(product_ids)).values_list('pk', flat=True)
+        )
+        if not product_ids:
+            return {}
+
+        now = now or timezone.now()
+        base_prices = PricingService._base_prices(product_ids)
+        discounts = PricingService._discounts(product_ids, now)
+
+        pricings = {
+            pricing.product_id: pricing
+            for pricing in ProductPricing.objects.filter(product_id__in=product_ids)
+        }
+
+        to_create, to_update = [], []
+        for product_id in product_ids:
+            pricing = pricings.get(product_id)
+            if pricing is None:
+                pricing = ProductPricing(product_id=product_id)
+                to_create.append(pricing)
+            else:
+                to_update.append(pricing)
+
+            discount, discount_end, next_change = discounts.get(product_id, (0, None, None))
+            base_price = base_prices.get(product_id)
+
+            pricing.basePrice = base_price
+            pricing.discountPercent = discount
+            pricing.finalPrice = PricingService.calculate_final_price(base_price, discount)
+            pricing.discountEndsAt = discount_end
+            pricing.nextChangeAt = next_change
+            pricings[product_id] = pricing
+
+        if to_create:
+            ProductPricing.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            for pricing in to_update:
+                pricing.updatedAt = now
+            ProductPricing.objects.bulk_update(
+                to_update,
+                ['basePrice', 'discountPercent', 'finalPrice',
+                 'discountEndsAt', 'nextChangeAt', 'updatedAt']
+            )
+
+        # محصولات بدون قیمت از scope لیست‌های ایندکس بیت‌مپ خارج می‌شوند
+        product_index.refresh_products(product_ids)
+        bump_cache_version(PricingService.CACHE_NAME)
+
+        return pricings
+
+    @staticmethod
+    def refresh(product_id):
+        """محاسبه مجدد قیمت یک محصول"""
+        return PricingService.refresh_many([product_id]).get(product_id)
+
+    @staticmethod
+    def refresh_basket(basket_id):
+        """محاسبه مجدد قیمت همه محصولات یک سبد تخفیف"""
+        from apps.discount.models import DiscountDetail
+
+        product_ids = DiscountDetail.objects.filter(
+            discountBasket_id=basket_id
+        ).values_list('product_id', flat=True)
+        return PricingService.refresh_many(list(product_ids))
+
+    @staticmethod
+    def refresh_due(now=None, batch_size=1000):
+        """
+        محصولاتی که بازه تخفیفشان باز یا بسته شده است
+        (توسط تسک دوره‌ای سلری صدا زده می‌شود)
+        """
+        now = now or timezone.now()
+        product_ids = list(
+            ProductPricing.objects.filter(nextChangeAt__lte=now).values_list('product_id', flat=True)
+        )
+        # محصولاتی که هنوز ردیف قیمت ندارند (مثلاً داده‌های قبل از ساخت جدول)
+        product_ids += list(
+            Product.objects.filter(pricing__isnull=True).values_list('pk', flat=True)[:batch_size]
+        )
+        PricingService.refresh_many(product_ids, now=now)
+        return len(product_ids)
+
+    @staticmethod
+    def get_for_product(product):
+        """قیمت ذخیره شده یک محصول (در صورت نبود، همین‌جا ساخته می‌شود)"""
+        pricing = ProductPricing.objects.filter(product=product).first()
+        return pricing or PricingService.refresh(product.pk)
+
+    @staticmethod
+    def annotate_listing(queryset, require_price=True):
+        """
+        افزودن price / discount_percent / final_price از جدول ProductPricing
+        (همان نام‌هایی که تمپلیت‌های کارت محصول استفاده می‌کنند)
+        با require_price محصولات بدون نوع فروش فعال حذف می‌شوند
+        """
+        queryset = queryset.annotate(
+            price=F('pricing__basePrice'),
+            discount_percent=F('pricing__discountPercent'),
+            final_price=F('pricing__finalPrice'),
+        )
+        if require_price:
+            queryset = queryset.filter(price__isnull=False)
+        return queryset
@@ -0,0 +1,147 @@
+import heapq
+import logging
+import math
+from collections import defaultdict
+from itertools import combinations
+from django.db import transaction
+from utils import bump_cache_version
+from .pricing_service import PricingService
+from ..models import Product, RelatedProduct
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationService:
+    """
+    محصولات مرتبط بر اساس خرید مشترک (item-to-item)
+
+    - ساخت دوره‌ای: ماتریس هم‌رخدادی محصولات از اقلام سفارش‌های فروخته شده و
+      علاقه‌مندی‌های کاربران، امتیاز کسینوسی و نگهداری K همسایه برتر هر محصول در RelatedProduct
+    - صفحه محصول: یک کوئری روی ایندکس (product, rank)؛ برای محصولات بدون سابقه فروش
+      جای خالی با محصولات هم‌دسته پر می‌شود
+    """
+
+    TOP_K = 12
+    ORDER_WEIGHT = 1.0
+    FAVORITE_WEIGHT = 0.5
+    # سبدهای خیلی بزرگ (سفارش عمده/علاقه‌مندی‌های زیاد) رابطه خاصی نشان نمی‌دهند
+    # و هزینه شمارش آن‌ها درجه دوم است
+    MAX_BASKET_SIZE = 50
+    MIN_CO_OCCURRENCE = 1.0
+
+    # فضای نام نسخه کش؛ با هر ساخت مجدد بالا می‌رود (ETag صفحه محصول)
+    CACHE_NAME = 'related_products'
+
+    # ========================
+    # ساخت همسایه‌ها
+    # ========================
+    @staticmethod
+    def _baskets():
+        """سبدهای وزن‌دار: [(set(product_ids), weight)] از سفارش‌ها و علاقه‌مندی‌ها"""
+        from apps.order.models import OrderDetail
+        from apps.dashboard.models import Favorite
+
+        orders = defaultdict(set)
+        for order_id, product_id in OrderDetail.objects.filter(
+            order__salesRecord__isnull=False
+        ).values_list('order_id', 'product_id').iterator():
+            orders[order_id].add(product_id)
+
+        favorites = defaultdict(set)
+        for user_id, product_id in Favorite.objects.values_list('user_id', 'product_id').iterator():
+            favorites[user_id].add(product_id)
+
+        baskets = [(items, RecommendationService.ORDER_WEIGHT) for items in orders.values()]
+        baskets += [(items, RecommendationService.FAVORITE_WEIGHT) for items in favorites.values()]
+        return baskets
+
+    @staticmethod
+    def compute_neighbors(baskets, allowed_ids=None, top_k=None):
+        """
+        K همسایه برتر هر محصول از روی سبدهای وزن‌دار
+        امتیاز: co(a, b) / sqrt(occ(a) * occ(b))  (کسینوسی؛ محصولات پرفروش همه‌جا بالا نمی‌آیند)
+        خروجی: {product_id: [(related_id, score), ...]} مرتب از بیشترین امتیاز
+        """
+        top_k = top_k or RecommendationService.TOP_K
+        co = defaultdict(lambda: defaultdict(float))
+        occurrences = defaultdict(float)
+
+        for items, weight in baskets:
+            if allowed_ids is not None:
+                items = items & allowed_ids
+            if len(items) > RecommendationService.MAX_BASKET_SIZE:
+                continue
+            for product_id in items:
+                occurrences[product_id] += weight
+            for first, second in combinations(items, 2):
+                co[first][second] += weight
+                co[second][first] += weight
+
+        neighbors = {}
+        for product_id, row in co.items():
+            scored = [
+                (together / math.sqrt(occurrences[product_id] * occurrences[related_id]), together, -related_id)
+                for related_id, together in row.items()
+                if together >= RecommendationService.MIN_CO_OCCURRENCE
+            ]
+            best = heapq.nlargest(top_k, scored)
+            if best:
+                neighbors[product_id] = [(-negative_id, score) for score, _, negative_id in best]
+        return neighbors
+
+    @staticmethod
+    def rebuild():
+        """
+        ساخت مجدد کامل جدول RelatedProduct (تسک شبانه / دستور rebuild_related_products)
+        خروجی: تعداد ردیف‌های ساخته شده
+        """
+        active_ids = set(Product.objects.filter(isActive=True).values_list('id', flat=True))
+        neighbors = RecommendationService.compute_neighbors(
+            RecommendationService._baskets(), allowed_ids=active_ids
+        )
+
+        rows = [
+            RelatedProduct(product_id=product_id, related_id=related_id, rank=rank, score=score)
+            for product_id, items in neighbors.items()
+            for rank, (related_id, score) in enumerate(items, start=1)
+        ]
+        with transaction.atomic():
+            RelatedProduct.objects.all().delete()
+            RelatedProduct.objects.bulk_create(rows, batch_size=1000)
+
+        bump_cache_version(RecommendationService.CACHE_NAME)
+        logger.info('Related products rebuilt: %s products, %s rows', len(neighbors), len(rows))
+        return len(rows)
+
+    # ========================
+    # خواندن برای صفحه محصول
+    # ========================
+    @staticmethod
+    def _listing(queryset):
+        return PricingService.annotate_listing(
+            queryset.filter(isActive=True)
+        ).select_related('reviewSummary').prefetch_related('galleries')
+
+    @staticmethod
+    def related_products(product, limit=8):
+        """
+        محصولات مرتبط یک محصول: همسایه‌های خرید مشترک به ترتیب رتبه
+        و در صورت کمبود، محصولات هم‌دسته (بدون join تکراری و distinct)
+        """
+        related = list(
+            RecommendationService._listing(
+                Product.objects.filter(relatedTo__product=product)
+            ).order_by('relatedTo__rank')[:limit]
+        )
+        if len(related) >= limit:
+            return related
+
+        category_links = Product.category.through.objects
+        fallback = RecommendationService._listing(
+            Product.objects.filter(
+                id__in=category_links.filter(
+                    category_id__in=category_links.filter(product=product).values('category_id')
+                ).values('product_id')
+            ).exclude(id__in=[product.id] + [item.id for item in related])
+        )
+        return related + list(fallback[:limit - len(related)])
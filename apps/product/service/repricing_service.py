@@ -0,0 +1,216 @@
+import logging
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Sum, Value
+from django.db.models.functions import Cast, Floor, Greatest
+from django.utils import timezone
+from .pricing_service import PricingService
+from ..models import CategoryClosure, PriceChangeBatch, PriceChangeItem, Product, ProductSaleType, SaleType
+
+logger = logging.getLogger(__name__)
+
+
+class RepricingService:
+    """
+    تغییر گروهی قیمت انواع فروش (مثلاً افزایش ۸٪ قیمت همه محصولات یک برند)
+
+    هر قانون = انتخاب (برند، دسته‌بندی با زیرشاخه‌ها، نوع فروش، شناسه محصولات) + تغییر
+    (درصدی یا مبلغ ثابت) + گرد کردن به مضرب step. قیمت جدید با یک عبارت SQL صحیح (بدون
+    اعشار) محاسبه می‌شود و همان عبارت هم در پیش‌نمایش و هم در UPDATE استفاده می‌شود.
+    اعمال: یک UPDATE برای هر قانون، ثبت PriceChangeBatch/PriceChangeItem و در پایان
+    یک بار محاسبه مجدد ProductPricing (و بالا رفتن نسخه کش قیمت)
+    """
+
+    MODES = ('percent', 'fixed')
+    ROUNDINGS = ('nearest', 'up', 'down')
+    # درصد با دو رقم اعشار: قیمت * (10000 + درصد * 100) / 10000
+    PERCENT_SCALE = 10000
+    PREVIEW_LIMIT = 50
+
+    # ========================
+    # اعتبارسنجی قانون
+    # ========================
+    @staticmethod
+    def _ids(values):
+        if isinstance(values, str):
+            values = values.replace('،', ',').split(',')
+        ids = []
+        for value in values or []:
+            value = str(value).strip()
+            if not value:
+                continue
+            if not value.isdigit():
+                raise ValueError(f'شناسه «{value}» نامعتبر است')
+            ids.append(int(value))
+        return sorted(set(ids))
+
+    @staticmethod
+    def clean_rule(data):
+        """
+        تبدیل ورودی فرم/JSON به قانون معتبر
+        {'brands', 'categories', 'typeSales', 'products', 'mode', 'amount', 'rounding', 'step'}
+        در صورت خطا ValueError با پیام فارسی
+        """
+        rule = {
+            'brands': RepricingService._ids(data.get('brands')),
+            'categories': RepricingService._ids(data.get('categories')),
+            'typeSales': RepricingService._ids(data.get('typeSales')),
+            'products': RepricingService._ids(data.get('products')),
+            'mode': data.get('mode') or 'percent',
+            'rounding': data.get('rounding') or 'nearest',
+        }
+        if not (rule['brands'] or rule['categories'] or rule['products']):
+            raise ValueError('حداقل یک برند، دسته‌بندی یا محصول را انتخاب کنید')
+        if any(type_sale not in dict(SaleType.CHOICES) for type_sale in rule['typeSales']):
+            raise ValueError('نوع فروش نامعتبر است')
+        if rule['mode'] not in RepricingService.MODES:
+            raise ValueError('نوع تغییر قیمت نامعتبر است')
+        if rule['rounding'] not in RepricingService.ROUNDINGS:
+            raise ValueError('روش گرد کردن نامعتبر است')
+
+        try:
+            amount = Decimal(str(data.get('amount', '')).strip())
+        except InvalidOperation:
+            raise ValueError('مقدار تغییر باید عدد باشد')
+        if rule['mode'] == 'percent':
+            amount = amount.quantize(Decimal('0.01'))
+            if amount <= -100:
+                raise ValueError('کاهش قیمت باید کمتر از ۱۰۰ درصد باشد')
+        elif amount != amount.to_integral_value():
+            raise ValueError('مبلغ ثابت باید عدد صحیح باشد')
+        if amount == 0:
+            raise ValueError('مقدار تغییر نمی‌تواند صفر باشد')
+        rule['amount'] = str(amount)
+
+        try:
+            rule['step'] = int(data.get('step') or 1)
+        except (TypeError, ValueError):
+            raise ValueError('مضرب گرد کردن باید عدد صحیح باشد')
+        if rule['step'] < 1:
+            raise ValueError('مضرب گرد کردن باید حداقل ۱ باشد')
+        return rule
+
+    # ========================
+    # انتخاب و عبارت قیمت جدید
+    # ========================
+    @staticmethod
+    def selection(rule):
+        """انواع فروش فعال مشمول قانون (بدون join روی جدول مقصد UPDATE)"""
+        queryset = ProductSaleType.objects.filter(isActive=True)
+        if rule['typeSales']:
+            queryset = queryset.filter(typeSale__in=rule['typeSales'])
+        if rule['products']:
+            queryset = queryset.filter(product_id__in=rule['products'])
+        if rule['brands']:
+            queryset = queryset.filter(
+                product_id__in=Product.objects.filter(brand_id__in=rule['brands']).values('id')
+            )
+        if rule['categories']:
+            queryset = queryset.filter(
+                product_id__in=Product.category.through.objects.filter(
+                    category_id__in=CategoryClosure.objects.filter(
+                        ancestor_id__in=rule['categories']
+                    ).values('descendant_id')
+                ).values('product_id')
+            )
+        return queryset
+
+    @staticmethod
+    def price_expression(rule):
+        """
+        قیمت جدید به صورت عبارت SQL با حساب صحیح:
+        floor((price * num + delta * den + offset) / (den * step)) * step
+        offset برای گرد کردن به نزدیک‌ترین/بالا؛ حداقل قیمت نتیجه برابر step است
+        """
+        amount = Decimal(rule['amount'])
+        step = rule['step']
+        if rule['mode'] == 'percent':
+            scale = RepricingService.PERCENT_SCALE
+            numerator = scale + int(amount * scale / 100)
+            denominator, delta = scale, 0
+        else:
+            numerator, denominator, delta = 1, 1, int(amount)
+
+        divisor = denominator * step
+        offset = {'nearest': divisor // 2, 'up': divisor - 1, 'down': 0}[rule['rounding']]
+        scaled = Greatest(
+            F('price') * Value(numerator) + Value(delta * denominator + offset),
+            Value(0)
+        )
+        rounded = Cast(Floor(scaled / Value(divisor)), output_field=IntegerField()) * Value(step)
+        return Greatest(rounded, Value(step), output_field=IntegerField())
+
+    @staticmethod
+    def _changed(rule):
+        """انواع فروش مشمول که قیمتشان واقعاً تغییر می‌کند"""
+        return RepricingService.selection(rule).exclude(price=RepricingService.price_expression(rule))
+
+    # ========================
+    # پیش‌نمایش و اعمال
+    # ========================
+    @staticmethod
+    def preview(rules, limit=None):
+        """
+        نتیجه هر قانون بدون ذخیره (قوانین مستقل از هم و روی قیمت‌های فعلی محاسبه می‌شوند)
+        خروجی: [{'rule', 'count', 'productCount', 'oldTotal', 'newTotal', 'rows': [...]}]
+        """
+        limit = limit or RepricingService.PREVIEW_LIMIT
+        result = []
+        for rule in rules:
+            expression = RepricingService.price_expression(rule)
+            changed = RepricingService._changed(rule)
+            summary = changed.aggregate(
+                count=Count('id'),
+                productCount=Count('product_id', distinct=True),
+                oldTotal=Sum('price'),
+                newTotal=Sum(expression),
+            )
+            rows = list(
+                changed.annotate(newPrice=expression).order_by('product_id', 'typeSale').values(
+                    'id', 'product_id', 'product__title', 'typeSale', 'price', 'newPrice'
+                )[:limit]
+            )
+            result.append({'rule': rule, **summary, 'rows': rows})
+        return result
+
+    @staticmethod
+    def apply(rules, user=None, note=''):
+        """
+        اعمال قوانین به ترتیب (هر قانون روی نتیجه قانون قبلی) در یک تراکنش
+        خروجی: PriceChangeBatch ثبت شده
+        """
+        now = timezone.now()
+        product_ids = set()
+        with transaction.atomic():
+            batch = PriceChangeBatch.objects.create(user=user, note=note[:200], rules=list(rules))
+            item_count = 0
+            for rule in rules:
+                expression = RepricingService.price_expression(rule)
+                changed = RepricingService._changed(rule)
+
+                # قفل ردیف‌ها تا قیمت‌های قبلی ثبت شده با UPDATE یکی باشند
+                items = [
+                    PriceChangeItem(batch=batch, saleType_id=sale_type_id, product_id=product_id,
+                                    oldPrice=old_price, newPrice=new_price)
+                    for sale_type_id, product_id, old_price, new_price in changed.select_for_update().annotate(
+                        newPrice=expression
+                    ).values_list('id', 'product_id', 'price', 'newPrice')
+                ]
+                if not items:
+                    continue
+                PriceChangeItem.objects.bulk_create(items, batch_size=1000)
+
+                # finalPrice قبل از price: MySQL در SET مقدار جدید ستون‌های قبلی را می‌بیند
+                changed.update(finalPrice=expression, price=expression, updatedAt=now)
+                item_count += len(items)
+                product_ids.update(item.product_id for item in items)
+
+            batch.saleTypeCount = item_count
+            batch.productCount = len(product_ids)
+            batch.save(update_fields=['saleTypeCount', 'productCount'])
+
+        if product_ids:
+            # یک بار برای همه محصولات؛ نسخه کش قیمت هم یک بار بالا می‌رود
+            PricingService.refresh_many(product_ids, now=now)
+        logger.info('Price batch #%s applied: %s sale types, %s products', batch.pk, item_count, len(product_ids))
+        return batch
@@ -0,0 +1,109 @@
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+from ..models import Product, Rating, Comment, ProductReviewSummary
+
+
+class ReviewSummaryService:
+    """
+    نگهداری جدول ProductReviewSummary
+    به‌جای محاسبه آمار در هر درخواست، با هر تغییر در Rating/Comment
+    آمار همان محصول دوباره محاسبه و ذخیره می‌شود
+    """
+
+    STAR_FIELDS = ['star1', 'star2', 'star3', 'star4', 'star5']
+
+    @staticmethod
+    def _rating_stats(product_ids):
+        """آمار امتیازها به تفکیک محصول (یک کوئری گروه‌بندی شده)"""
+        rows = Rating.objects.filter(
+            product_id__in=product_ids
+        ).values('product_id').annotate(
+            total=Count('id'),
+            avg=Avg('rating'),
+            star1=Count('id', filter=Q(rating=1)),
+            star2=Count('id', filter=Q(rating=2)),
+            star3=Count('id', filter=Q(rating=3)),
+            star4=Count('id', filter=Q(rating=4)),
+            star5=Count('id', filter=Q(rating=5)),
+        ).order_by()
+        return {row['product_id']: row for row in rows}
+
+    @staticmethod
+    def _comment_stats(product_ids):
+        """آمار کامنت‌های فعال به تفکیک محصول (یک کوئری گروه‌بندی شده)"""
+        rows = Comment.objects.filter(
+            product_id__in=product_ids,
+            isActive=True
+        ).values('product_id').annotate(
+            total=Count('id'),
+            recommend=Count('id', filter=Q(typeComment='recommend')),
+            not_recommend=Count('id', filter=Q(typeComment='not_recommend')),
+        ).order_by()
+        return {row['product_id']: row for row in rows}
+
+    @staticmethod
+    def refresh_many(product_ids):
+        """
+        محاسبه مجدد خلاصه نظرات برای چند محصول
+        خروجی: دیکشنری {product_id: ProductReviewSummary}
+        """
+        product_ids = set(
+            Product.objects.filter(pk__in=set(product_ids)).values_list('pk', flat=True)
+        )
+        if not product_ids:
+            return {}
+
+        ratings = ReviewSummaryService._rating_stats(product_ids)
+        comments = ReviewSummaryService._comment_stats(product_ids)
+
+        summaries = {
+            summary.product_id: summary
+            for summary in ProductReviewSummary.objects.filter(product_id__in=product_ids)
+        }
+
+        to_create, to_update = [], []
+        for product_id in product_ids:
+            summary = summaries.get(product_id)
+            if summary is None:
+                summary = ProductReviewSummary(product_id=product_id)
+                to_create.append(summary)
+            else:
+                to_update.append(summary)
+
+            rating = ratings.get(product_id, {})
+            comment = comments.get(product_id, {})
+
+            summary.averageRating = round(rating.get('avg') or 0, 2)
+            summary.totalRatings = rating.get('total', 0)
+            for field in ReviewSummaryService.STAR_FIELDS:
+                setattr(summary, field, rating.get(field, 0))
+            summary.totalComments = comment.get('total', 0)
+            summary.recommendCount = comment.get('recommend', 0)
+            summary.notRecommendCount = comment.get('not_recommend', 0)
+            summaries[product_id] = summary
+
+        if to_create:
+            ProductReviewSummary.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            # bulk_update فیلد auto_now را مقداردهی نمی‌کند
+            now = timezone.now()
+            for summary in to_update:
+                summary.updatedAt = now
+            ProductReviewSummary.objects.bulk_update(
+                to_update,
+                ['averageRating', 'totalRatings', *ReviewSummaryService.STAR_FIELDS,
+                 'totalComments', 'recommendCount', 'notRecommendCount', 'updatedAt']
+            )
+
+        return summaries
+
+    @staticmethod
+    def refresh(product_id):
+        """محاسبه مجدد خلاصه نظرات یک محصول"""
+        return ReviewSummaryService.refresh_many([product_id]).get(product_id)
+
+    @staticmethod
+    def get_for_product(product):
+        """خواندن خلاصه نظرات ذخیره شده یک محصول از دیتابیس"""
+        summary = ProductReviewSummary.objects.filter(product=product).first()
+        return summary or ReviewSummaryService.refresh(product.pk)
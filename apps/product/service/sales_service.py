@@ -0,0 +1,288 @@
+import logging
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Sum, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from utils import bump_cache_version
+from ..models import Product, ProductSalesStats, OrderSalesRecord
+
+logger = logging.getLogger(__name__)
+
+
+class SalesStatsService:
+    """
+    نگهداری جدول ProductSalesStats (تعداد و درآمد فروش هر محصول، کل و ۳۰ روز اخیر)
+
+    سفارش نهایی شده با یکی از وضعیت‌های SOLD_STATUSES یک بار (با OrderSalesRecord) به آمار
+    اضافه و با لغو/خروج از این وضعیت‌ها یا حذف سفارش از آن کم می‌شود.
+    ارقام ۳۰ روز اخیر با تسک دوره‌ای refresh_window از نو محاسبه می‌شوند.
+    ویرایش/حذف اقلام سفارشی که قبلاً شمرده شده با recount_order_lines (سیگنال OrderDetail)
+    آمار محصولات همان اقلام را از نو می‌شمارد.
+    """
+
+    SOLD_STATUSES = ('processing', 'paid', 'shipped', 'delivered')
+    WINDOW_DAYS = 30
+
+    # فضای نام نسخه کش؛ لیست‌های پرفروش کش شده با آن باطل می‌شوند
+    CACHE_NAME = 'product_sales'
+
+    @staticmethod
+    def is_sold(is_finally, status):
+        return bool(is_finally) and status in SalesStatsService.SOLD_STATUSES
+
+    @staticmethod
+    def _order_lines(order_ids):
+        """تعداد و درآمد هر محصول در سفارش‌ها: {product_id: (qty, revenue)}"""
+        from apps.order.models import OrderDetail
+
+        rows = OrderDetail.objects.filter(order_id__in=order_ids).values('product_id').annotate(
+            total_qty=Sum('qty'),
+            total_revenue=Sum(F('price') * F('qty')),
+        ).order_by()
+        return {row['product_id']: (row['total_qty'] or 0, row['total_revenue'] or 0) for row in rows}
+
+    @staticmethod
+    def _apply(lines, sign, sold_at, in_window):
+        """افزودن (sign=1) یا کم کردن (sign=-1) اقلام یک سفارش از آمار با F()"""
+        if not lines:
+            return
+        ProductSalesStats.objects.bulk_create(
+            [ProductSalesStats(product_id=product_id) for product_id in lines],
+            ignore_conflicts=True
+        )
+
+        def shift(field, amount):
+            if sign > 0:
+                return F(field) + amount
+            return Greatest(F(field) - amount, Value(0))
+
+        for product_id, (qty, revenue) in lines.items():
+            updates = {
+                'unitsSold': shift('unitsSold', qty),
+                'revenue': shift('revenue', revenue),
+                'updatedAt': timezone.now(),
+            }
+            if in_window:
+                updates['unitsSold30d'] = shift('unitsSold30d', qty)
+                updates['revenue30d'] = shift('revenue30d', revenue)
+            if sign > 0:
+                updates['lastSoldAt'] = Greatest(Coalesce(F('lastSoldAt'), Value(sold_at)), Value(sold_at))
+            ProductSalesStats.objects.filter(product_id=product_id).update(**updates)
+
+    @staticmethod
+    def sync_order(order_id):
+        """
+        همگام کردن آمار با وضعیت فعلی یک سفارش (idempotent)
+        خروجی: 1 اضافه شد، -1 کم شد، 0 بدون تغییر
+        """
+        from apps.order.models import Order
+
+        with transaction.atomic():
+            order = Order.objects.select_for_update().filter(pk=order_id).values(
+                'isFinally', 'status', 'registerDate'
+            ).first()
+            if order is None:
+                return 0
+
+            sold = SalesStatsService.is_sold(order['isFinally'], order['status'])
+            counted = OrderSalesRecord.objects.filter(order_id=order_id).exists()
+            if sold == counted:
+                return 0
+
+            in_window = order['registerDate'] >= timezone.now() - timedelta(days=SalesStatsService.WINDOW_DAYS)
+            lines = SalesStatsService._order_lines([order_id])
+            if sold:
+                OrderSalesRecord.objects.create(order_id=order_id)
+                SalesStatsService._apply(lines, 1, order['registerDate'], in_window)
+            else:
+                OrderSalesRecord.objects.filter(order_id=order_id).delete()
+                SalesStatsService._apply(lines, -1, order['registerDate'], in_window)
+
+        transaction.on_commit(lambda: bump_cache_version(SalesStatsService.CACHE_NAME))
+        return 1 if sold else -1
+
+    @staticmethod
+    def sync_orders(order_ids):
+        """همگام کردن چند سفارش (مثلاً بعد از queryset.update در اکشن‌های ادمین)"""
+        return sum(abs(SalesStatsService.sync_order(order_id)) for order_id in order_ids)
+
+    @staticmethod
+    def remove_order(order_id):
+        """کم کردن اقلام سفارش شمرده شده قبل از حذف آن (pre_delete سفارش)"""
+        from apps.order.models import Order
+
+        record = OrderSalesRecord.objects.filter(order_id=order_id).first()
+        if record is None:
+            return
+        register_date = Order.objects.filter(pk=order_id).values_list('registerDate', flat=True).first()
+        in_window = bool(register_date) and (
+            register_date >= timezone.now() - timedelta(days=SalesStatsService.WINDOW_DAYS)
+        )
+        SalesStatsService._apply(SalesStatsService._order_lines([order_id]), -1, register_date, in_window)
+        record.delete()
+        transaction.on_commit(lambda: bump_cache_version(SalesStatsService.CACHE_NAME))
+
+    # ========================
+    # محاسبه کامل
+    # ========================
+    @staticmethod
+    def _aggregate(detail_queryset):
+        rows = detail_queryset.values('product_id').annotate(
+            total_qty=Sum('qty'),
+            total_revenue=Sum(F('price') * F('qty')),
+            last_sold=Max('order__registerDate'),
+        ).order_by()
+        return {row['product_id']: row for row in rows}
+
+    @staticmethod
+    def recount_products(product_ids, now=None):
+        """
+        محاسبه مجدد کامل آمار چند محصول از سفارش‌های شمرده شده (idempotent)
+        خروجی: تعداد محصولات
+        """
+        from apps.order.models import OrderDetail
+
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0
+        now = now or timezone.now()
+        details = OrderDetail.objects.filter(order__salesRecord__isnull=False, product_id__in=product_ids)
+        totals = SalesStatsService._aggregate(details)
+        window = SalesStatsService._aggregate(
+            details.filter(order__registerDate__gte=now - timedelta(days=SalesStatsService.WINDOW_DAYS))
+        )
+
+        with transaction.atomic():
+            ProductSalesStats.objects.bulk_create(
+                [ProductSalesStats(product_id=product_id) for product_id in totals],
+                ignore_conflicts=True
+            )
+            for product_id in product_ids:
+                row, recent = totals.get(product_id), window.get(product_id)
+                # updatedAt دستی: update() فیلد auto_now را مقداردهی نمی‌کند
+                ProductSalesStats.objects.filter(product_id=product_id).update(
+                    unitsSold=(row['total_qty'] or 0) if row else 0,
+                    revenue=(row['total_revenue'] or 0) if row else 0,
+                    unitsSold30d=(recent['total_qty'] or 0) if recent else 0,
+                    revenue30d=(recent['total_revenue'] or 0) if recent else 0,
+                    lastSoldAt=row['last_sold'] if row else None,
+                    updatedAt=now,
+                )
+
+        transaction.on_commit(lambda: bump_cache_version(SalesStatsService.CACHE_NAME))
+        return len(product_ids)
+
+    @staticmethod
+    def recount_order_lines(order_id, product_ids):
+        """
+        ویرایش/حذف اقلام یک سفارش: اگر سفارش قبلاً در آمار شمرده شده، آمار محصولات آن اقلام
+        از نو محاسبه می‌شود (سفارش شمرده نشده بعداً با sync_order کامل اضافه می‌شود)
+        """
+        if not OrderSalesRecord.objects.filter(order_id=order_id).exists():
+            return 0
+        return SalesStatsService.recount_products(product_ids)
+
+    @staticmethod
+    def refresh_window(now=None):
+        """
+        محاسبه مجدد ارقام ۳۰ روز اخیر همه محصولات (تسک دوره‌ای)
+        خروجی: تعداد ردیف‌های تغییر کرده
+        """
+        from apps.order.models import OrderDetail
+
+        now = now or timezone.now()
+        totals = SalesStatsService._aggregate(
+            OrderDetail.objects.filter(
+                order__salesRecord__isnull=False,
+                order__registerDate__gte=now - timedelta(days=SalesStatsService.WINDOW_DAYS)
+            )
+        )
+
+        changed = []
+        for stats in ProductSalesStats.objects.all():
+            row = totals.get(stats.product_id)
+            units = row['total_qty'] if row else 0
+            revenue = row['total_revenue'] if row else 0
+            if stats.unitsSold30d != units or stats.revenue30d != revenue:
+                stats.unitsSold30d, stats.revenue30d = units, revenue
+                changed.append(stats)
+
+        if changed:
+            ProductSalesStats.objects.bulk_update(changed, ['unitsSold30d', 'revenue30d'], batch_size=500)
+            bump_cache_version(SalesStatsService.CACHE_NAME)
+        return len(changed)
+
+    @staticmethod
+    def rebuild(now=None):
+        """
+        ساخت کامل آمار و نشانگرهای سفارش از روی همه سفارش‌ها
+        (دستور rebuild_sales_stats؛ برای داده‌های قبلی یا بعد از اصلاح دستی سفارش‌ها)
+        """
+        from apps.order.models import Order, OrderDetail
+
+        now = now or timezone.now()
+        window_start = now - timedelta(days=SalesStatsService.WINDOW_DAYS)
+        sold_orders = Order.objects.filter(isFinally=True, status__in=SalesStatsService.SOLD_STATUSES)
+
+        details = OrderDetail.objects.filter(order__in=sold_orders)
+        totals = SalesStatsService._aggregate(details)
+        window = SalesStatsService._aggregate(details.filter(order__registerDate__gte=window_start))
+
+        with transaction.atomic():
+            OrderSalesRecord.objects.exclude(order__in=sold_orders).delete()
+            counted = set(OrderSalesRecord.objects.values_list('order_id', flat=True))
+            OrderSalesRecord.objects.bulk_create(
+                [OrderSalesRecord(order_id=order_id)
+                 for order_id in sold_orders.values_list('pk', flat=True) if order_id not in counted],
+                batch_size=500
+            )
+
+            ProductSalesStats.objects.all().delete()
+            ProductSalesStats.objects.bulk_create([
+                ProductSalesStats(
+                    product_id=product_id,
+                    unitsSold=row['total_qty'] or 0,
+                    revenue=row['total_revenue'] or 0,
+                    unitsSold30d=(window[product_id]['total_qty'] or 0) if product_id in window else 0,
+                    revenue30d=(window[product_id]['total_revenue'] or 0) if product_id in window else 0,
+                    lastSoldAt=row['last_sold'],
+                )
+                for product_id, row in totals.items()
+            ], batch_size=500)
+
+        bump_cache_version(SalesStatsService.CACHE_NAME)
+        return len(totals)
+
+    # ========================
+    # خواندن لیست پرفروش‌ها
+    # ========================
+    @staticmethod
+    def top_products(limit=10, window=False, active_only=True):
+        """
+        پرفروش‌ترین محصولات از جدول مرتب و ایندکس‌دار آمار فروش
+        هر محصول total_sold و total_revenue دارد
+        """
+        units_field = 'unitsSold30d' if window else 'unitsSold'
+        revenue_field = 'revenue30d' if window else 'revenue'
+
+        products = Product.objects.filter(**{f'salesStats__{units_field}__gt': 0})
+        if active_only:
+            products = products.filter(isActive=True)
+        products = list(
+            products.select_related('salesStats', 'brand').order_by(f'-salesStats__{units_field}')[:limit]
+        )
+        for product in products:
+            product.total_sold = getattr(product.salesStats, units_field)
+            product.total_revenue = getattr(product.salesStats, revenue_field)
+        return products
+
+    @staticmethod
+    def top_product_ids(limit=10, window=False):
+        """[(product_id, total_sold), ...] فقط از جدول آمار (بدون hydrate محصول)"""
+        units_field = 'unitsSold30d' if window else 'unitsSold'
+        return list(
+            ProductSalesStats.objects.filter(
+                **{f'{units_field}__gt': 0}, product__isActive=True
+            ).order_by(f'-{units_field}').values_list('product_id', units_field)[:limit]
+        )
@@ -0,0 +1,228 @@
+import logging
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, PositiveIntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from ..models import Product, StockMovement, StockReservation, OrderStockRecord
+
+logger = logging.getLogger(__name__)
+
+
+class StockReservationError(Exception):
+    """موجودی کافی برای رزرو اقلام سفارش نیست؛ shortages: [(product, requested, available)]"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(', '.join(
+            f'{product.title} (درخواست {requested}، موجود {available})'
+            for product, requested, available in shortages
+        ))
+
+
+class StockService:
+    """
+    تغییرات موجودی محصولات با ثبت در دفتر موجودی (StockMovement)
+
+    رزرو: با ثبت سفارش، اقلام آن برای RESERVATION_MINUTES دقیقه از موجودی قابل فروش
+    (stock - reserved) کنار گذاشته می‌شوند؛ با انقضا (تسک release_expired_reservations)
+    یا لغو سفارش آزاد و با پرداخت به کسر دائمی تبدیل می‌شوند.
+
+    کسر موجودی سفارش بعد از پرداخت موفق یک بار و فقط یک بار انجام می‌شود:
+    - ردیف سفارش قفل می‌شود تا callbackهای همزمان پرداخت پشت سر هم اجرا شوند
+    - نشانگر OrderStockRecord (یکتا برای هر سفارش) در همان تراکنش ثبت می‌شود
+    - محصولات به ترتیب شناسه قفل و با F() کسر می‌شوند (بدون خواندن/نوشتن در پایتون)
+    """
+
+    RESERVATION_MINUTES = 15
+    RELEASE_BATCH_SIZE = 500
+
+    @staticmethod
+    def _order_quantities(order_id):
+        """تعداد هر محصول در سفارش: {product_id: qty}"""
+        from apps.order.models import OrderDetail
+
+        rows = OrderDetail.objects.filter(order_id=order_id).values('product_id').annotate(
+            total_qty=Sum('qty')
+        ).order_by()
+        return {row['product_id']: row['total_qty'] or 0 for row in rows}
+
+    @staticmethod
+    def _release_locked(reservations, status, now):
+        """
+        برگرداندن رزروهای قفل شده به موجودی قابل فروش و تغییر وضعیت آن‌ها
+        (باید داخل تراکنش و بعد از قفل ردیف‌های رزرو صدا زده شود)
+        خروجی: {product_id: تعداد آزاد شده}
+        """
+        held = {}
+        for reservation in reservations:
+            held[reservation.product_id] = held.get(reservation.product_id, 0) + reservation.quantity
+        for product_id in sorted(held):
+            Product.objects.filter(pk=product_id).update(
+                reserved=Greatest(F('reserved') - held[product_id], Value(0)), updatedAt=now
+            )
+        StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).update(
+            status=status, updatedAt=now
+        )
+        return held
+
+    # ========================
+    # رزرو موجودی
+    # ========================
+    @staticmethod
+    def reserve_order(order_id, minutes=None):
+        """
+        رزرو اقلام سفارش تازه ثبت شده (همه یا هیچ)
+        باید داخل تراکنش ثبت سفارش صدا زده شود تا در صورت کمبود، سفارش هم ثبت نشود
+        در صورت کمبود StockReservationError
+        """
+        quantities = StockService._order_quantities(order_id)
+        if not quantities:
+            return []
+
+        now = timezone.now()
+        expires_at = now + timedelta(minutes=minutes or StockService.RESERVATION_MINUTES)
+        with transaction.atomic():
+            # قفل به ترتیب شناسه تا سفارش‌های همزمان با اقلام مشترک به بن‌بست نخورند
+            products = list(
+                Product.objects.select_for_update().filter(pk__in=quantities).order_by('pk')
+                .only('id', 'title', 'stock', 'reserved')
+            )
+            shortages = [
+                (product, quantities[product.pk], product.available_stock)
+                for product in products
+                if product.available_stock < quantities[product.pk]
+            ]
+            if shortages:
+                raise StockReservationError(shortages)
+
+            # افزایش رزرو همه اقلام با یک UPDATE (ردیف‌ها بالاتر قفل شده‌اند)
+            Product.objects.filter(pk__in=[product.pk for product in products]).update(
+                reserved=F('reserved') + Case(
+                    *[When(pk=product.pk, then=Value(quantities[product.pk])) for product in products],
+                    default=Value(0), output_field=PositiveIntegerField()
+                ),
+                updatedAt=now
+            )
+            return StockReservation.objects.bulk_create([
+                StockReservation(order_id=order_id, product_id=product.pk,
+                                 quantity=quantities[product.pk], expiresAt=expires_at)
+                for product in products
+            ])
+
+    @staticmethod
+    def release_order(order_id):
+        """آزاد کردن رزروهای فعال یک سفارش (لغو سفارش)؛ خروجی: تعداد رزروهای آزاد شده"""
+        now = timezone.now()
+        with transaction.atomic():
+            reservations = list(
+                StockReservation.objects.select_for_update().filter(order_id=order_id, status='active')
+            )
+            if not reservations:
+                return 0
+            StockService._release_locked(reservations, 'released', now)
+        logger.info('Stock reservations released for order #%s', order_id)
+        return len(reservations)
+
+    @staticmethod
+    def release_expired(now=None, batch_size=None):
+        """
+        آزاد کردن رزروهای منقضی شده (بدنه تسک دوره‌ای)
+        خروجی: تعداد رزروهای آزاد شده
+        """
+        now = now or timezone.now()
+        batch_size = batch_size or StockService.RELEASE_BATCH_SIZE
+        total = 0
+        while True:
+            with transaction.atomic():
+                reservations = list(
+                    StockReservation.objects.select_for_update().filter(
+                        status='active', expiresAt__lte=now
+                    ).order_by('expiresAt', 'pk')[:batch_size]
+                )
+                if not reservations:
+                    break
+                StockService._release_locked(reservations, 'released', now)
+            total += len(reservations)
+            if len(reservations) < batch_size:
+                break
+        if total:
+            logger.info('%s expired stock reservations released', total)
+        return total
+
+    # ========================
+    # کسر دائمی بعد از پرداخت
+    # ========================
+    @staticmethod
+    def decrease_for_order(order_id):
+        """
+        کسر موجودی اقلام یک سفارش پرداخت شده (idempotent)
+        رزروهای فعال سفارش به کسر دائمی تبدیل می‌شوند؛ اگر رزرو منقضی شده باشد فقط از موجودی
+        قابل فروش (stock - reserved) کسر می‌شود تا رزرو سفارش‌های دیگر مصرف نشود و باقی
+        به عنوان کسری (StockMovement.shortage) ثبت می‌شود
+        خروجی: لیست StockMovementهای ثبت شده یا None اگر قبلاً کسر شده/سفارش وجود ندارد
+        """
+        from apps.order.models import Order
+
+        try:
+            with transaction.atomic():
+                if not Order.objects.select_for_update().filter(pk=order_id).exists():
+                    return None
+                # خواندن قفل‌دار: آخرین وضعیت ثبت شده را می‌بیند، نه snapshot تراکنش
+                if OrderStockRecord.objects.select_for_update().filter(order_id=order_id).exists():
+                    return None
+                OrderStockRecord.objects.create(order_id=order_id)
+
+                # ترتیب قفل مثل آزادسازی رزروها: اول رزروها، بعد محصولات
+                reservations = list(
+                    StockReservation.objects.select_for_update().filter(order_id=order_id, status='active')
+                )
+                quantities = StockService._order_quantities(order_id)
+                stocks = {
+                    product_id: (stock, reserved)
+                    for product_id, stock, reserved in Product.objects.select_for_update().filter(
+                        pk__in=quantities
+                    ).order_by('pk').values_list('pk', 'stock', 'reserved')
+                }
+                held = {}
+                for reservation in reservations:
+                    held[reservation.product_id] = held.get(reservation.product_id, 0) + reservation.quantity
+
+                now = timezone.now()
+                movements = []
+                for product_id in sorted(stocks):
+                    stock, reserved = stocks[product_id]
+                    requested = quantities[product_id]
+                    # رزروهای فعال سفارش‌های دیگر قابل کسر نیستند
+                    available = max(stock - max(reserved - held.get(product_id, 0), 0), 0)
+                    applied = min(available, requested)
+                    shortage = requested - applied
+                    updates = {}
+                    if applied:
+                        updates['stock'] = F('stock') - applied
+                    if held.get(product_id):
+                        updates['reserved'] = Greatest(F('reserved') - held[product_id], Value(0))
+                    if updates:
+                        # updatedAt دستی: update() فیلد auto_now را مقداردهی نمی‌کند (ETag صفحه محصول)
+                        Product.objects.filter(pk=product_id).update(**updates, updatedAt=now)
+                    if shortage:
+                        logger.warning(
+                            'Stock shortage for product #%s in order #%s: requested %s, available %s',
+                            product_id, order_id, requested, available
+                        )
+                    movements.append(StockMovement(
+                        product_id=product_id, order_id=order_id, reason='order',
+                        quantity=-applied, shortage=shortage, stockAfter=stock - applied,
+                    ))
+                StockMovement.objects.bulk_create(movements)
+                if reservations:
+                    StockReservation.objects.filter(pk__in=[item.pk for item in reservations]).update(
+                        status='converted', updatedAt=now
+                    )
+        except IntegrityError:
+            # نشانگر همزمان توسط تراکنش دیگری ثبت شد
+            logger.info('Stock for order #%s was already decreased', order_id)
+            return None
+
+        logger.info('Stock decreased for order #%s: %s products', order_id, len(movements))
+        return movements
@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Category, Product, ProductFeature, Rating, Comment, ProductSaleType
+from .service.review_service import ReviewSummaryService
+from .service.pricing_service import PricingService
+from .service.bitmap_service import product_index
+from .service.category_service import CategoryTreeService, CategoryClosureService
+from .service.page_version_service import ProductPageVersion
+
+
+# ========================
+# بروزرسانی خلاصه نظرات محصول (ProductReviewSummary)
+# ========================
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_product_review_summary(sender, instance, **kwargs):
+    """
+    محاسبه مجدد آمار امتیاز/کامنت محصول بعد از ثبت تراکنش
+    (در حذف آبشاری محصول، ردیف خلاصه دوباره ساخته نمی‌شود)
+    """
+    product_id = instance.product_id
+    transaction.on_commit(lambda: ReviewSummaryService.refresh(product_id))
+
+
+# ========================
+# بروزرسانی جدول قیمت محصول (ProductPricing)
+# ========================
+@receiver(post_save, sender=ProductSaleType)
+@receiver(post_delete, sender=ProductSaleType)
+def refresh_product_pricing(sender, instance, **kwargs):
+    """محاسبه مجدد قیمت پایه/نهایی محصول بعد از تغییر نوع فروش"""
+    product_id = instance.product_id
+    transaction.on_commit(lambda: PricingService.refresh(product_id))
+
+
+# ========================
+# بروزرسانی ایندکس بیت‌مپ محصولات (فیلتر و facet)
+# ========================
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_bitmap_index(sender, instance, **kwargs):
+    """تغییر برند/وضعیت فعال یا حذف محصول"""
+    product_id = instance.pk
+    transaction.on_commit(lambda: product_index.refresh_products([product_id]))
+
+
+@receiver(post_save, sender=ProductFeature)
+@receiver(post_delete, sender=ProductFeature)
+def refresh_product_feature_bitmap_index(sender, instance, **kwargs):
+    """تغییر مقادیر ویژگی محصول (ایندکس بیت‌مپ و ETag صفحه محصول)"""
+    product_id = instance.product_id
+
+    def refresh():
+        product_index.refresh_products([product_id])
+        ProductPageVersion.bump_features(product_id)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(m2m_changed, sender=Product.category.through)
+def refresh_product_category_bitmap_index(sender, instance, action, reverse, pk_set, **kwargs):
+    """تغییر دسته‌بندی‌های محصول (از سمت محصول یا از سمت دسته)"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse and action == 'post_clear':
+        # clear از سمت دسته: محصولات قبلی مشخص نیستند، ایندکس از نو ساخته می‌شود
+        transaction.on_commit(product_index.invalidate)
+        return
+    product_ids = list(pk_set) if reverse else [instance.pk]
+    transaction.on_commit(lambda: product_index.refresh_products(product_ids))
+
+
+# ========================
+# باطل کردن درخت دسته‌بندی کش شده (منوی هدر)
+# ========================
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, instance, **kwargs):
+    transaction.on_commit(CategoryTreeService.invalidate)
+
+
+# ========================
+# جدول بستار دسته‌بندی و تعداد محصولات زیرشاخه‌ها
+# ========================
+@receiver(post_save, sender=Category)
+def sync_category_closure(sender, instance, **kwargs):
+    """ایجاد روابط دسته جدید یا جابجایی زیردرخت بعد از تغییر والد"""
+    transaction.on_commit(lambda: CategoryClosureService.sync_category(instance))
+
+
+@receiver(post_delete, sender=Category)
+def refresh_category_counts_after_delete(sender, instance, **kwargs):
+    """روابط با حذف آبشاری پاک می‌شوند؛ فقط تعداد محصولات اجداد بروز می‌شود"""
+    transaction.on_commit(CategoryClosureService.refresh_counts)
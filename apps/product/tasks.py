@@ -0,0 +1,87 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_due_pricing():
+    """
+    بروزرسانی قیمت محصولاتی که بازه تخفیفشان باز یا بسته شده است
+    (به صورت دوره‌ای از CELERY_BEAT_SCHEDULE اجرا می‌شود)
+    """
+    from apps.product.service.pricing_service import PricingService
+
+    count = PricingService.refresh_due()
+    if count:
+        logger.info(f"قیمت {count} محصول بروزرسانی شد")
+    return count
+
+
+@shared_task
+def refresh_category_counts():
+    """
+    بروزرسانی تعداد محصولات فعال زیرشاخه‌های هر دسته (منوها و پر محتواترین دسته‌ها)
+    (به صورت دوره‌ای از CELERY_BEAT_SCHEDULE اجرا می‌شود)
+    """
+    from apps.product.service.category_service import CategoryClosureService
+
+    count = CategoryClosureService.refresh_counts()
+    if count:
+        logger.info(f"تعداد محصولات {count} دسته‌بندی بروزرسانی شد")
+    return count
+
+
+@shared_task
+def refresh_sales_window():
+    """
+    محاسبه مجدد تعداد و درآمد فروش ۳۰ روز اخیر محصولات (خروج سفارش‌های قدیمی از بازه)
+    (به صورت دوره‌ای از CELERY_BEAT_SCHEDULE اجرا می‌شود)
+    """
+    from apps.product.service.sales_service import SalesStatsService
+
+    count = SalesStatsService.refresh_window()
+    if count:
+        logger.info(f"آمار فروش ۳۰ روز اخیر {count} محصول بروزرسانی شد")
+    return count
+
+
+@shared_task
+def rebuild_related_products():
+    """
+    ساخت مجدد محصولات مرتبط از روی خریدها و علاقه‌مندی‌های مشترک
+    (به صورت دوره‌ای از CELERY_BEAT_SCHEDULE اجرا می‌شود)
+    """
+    from apps.product.service.recommendation_service import RecommendationService
+
+    count = RecommendationService.rebuild()
+    logger.info(f"{count} رابطه محصول مرتبط ساخته شد")
+    return count
+
+
+@shared_task
+def release_expired_reservations():
+    """
+    آزاد کردن رزروهای موجودی سفارش‌هایی که در مهلت پرداخت نشده‌اند
+    (به صورت دوره‌ای از CELERY_BEAT_SCHEDULE اجرا می‌شود)
+    """
+    from apps.product.service.stock_service import StockService
+
+    count = StockService.release_expired()
+    if count:
+        logger.info(f"{count} رزرو موجودی منقضی شده آزاد شد")
+    return count
+
+
+@shared_task
+def refresh_popularity_scores():
+    """
+    ثبت بازدیدهای بافر شده و محاسبه مجدد امتیاز محبوبیت محصولات (مرتب‌سازی «محبوب‌ترین»)
+    (به صورت دوره‌ای از CELERY_BEAT_SCHEDULE اجرا می‌شود)
+    """
+    from apps.product.service.popularity_service import PopularityService
+
+    count = PopularityService.refresh_scores()
+    if count:
+        logger.info(f"امتیاز محبوبیت {count} محصول بروزرسانی شد")
+    return count
@@ -1,3 +1,574 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
+from django.contrib import admin
+from django.core.cache import cache
+from django.db.models import F
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from apps.discount.models import DiscountBasket, DiscountDetail
+from apps.order.admin import OrderAdmin
+from apps.order.models import City, Order, OrderDetail, State, UserAddress
+from apps.user.models.user import CustomUser
+from utils import get_cache_version
+from .models import (
+    Brand, Category, CategoryClosure, Comment, Feature, FeatureValue, PriceChangeItem, Product, ProductFeature, ProductPricing,
+    ProductReviewSummary, ProductSalesStats, ProductSaleType, Rating, StockMovement, StockReservation
+)
+from .pagination import KeysetPaginator
+from .service.bitmap_service import ProductBitmapIndex, iter_ids
+from .service.catalog_service import CatalogExportService, CatalogImportService
+from .service.category_service import CategoryClosureService
+from .service.facet_service import FacetService
+from .service.pricing_service import PricingService
+from .service.repricing_service import RepricingService
+from .service.review_service import ReviewSummaryService
+from .service.sales_service import SalesStatsService
+from .service.stock_service import StockReservationError, StockService
 
-# Create your tests here.
+
+# ========================
+# کاتالوگ نمونه
+# ========================
+class CatalogMixin:
+    """
+    دو دسته، دو برند، ویژگی رنگ (قرمز/آبی)، PRODUCT_COUNT محصول با قیمت 1000 * (index + 1)
+    و یک مشتری با آدرس برای سفارش‌ها
+    سیگنال‌های on_commit داخل تراکنش تست اجرا نمی‌شوند؛ جدول قیمت و خلاصه نظرات مستقیم ساخته می‌شوند
+    """
+
+    PRODUCT_COUNT = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(title='category', slug='category')
+        cls.other_category = Category.objects.create(title='other', slug='other')
+        cls.brands = [Brand.objects.create(title=f'brand {index}', slug=f'brand-{index}') for index in range(2)]
+        cls.feature = Feature.objects.create(title='color', slug='color')
+        cls.red = FeatureValue.objects.create(feature=cls.feature, value='red')
+        cls.blue = FeatureValue.objects.create(feature=cls.feature, value='blue')
+
+        cls.products = []
+        for index in range(cls.PRODUCT_COUNT):
+            product = Product.objects.create(
+                title=f'product {index}', slug=f'product-{index}', shortDescription='-',
+                mainImage='product.jpg', brand=cls.brands[index % 2], stock=10,
+            )
+            product.category.add(cls.category if index < cls.PRODUCT_COUNT - 2 else cls.other_category)
+            ProductSaleType.objects.create(product=product, price=1000 * (index + 1))
+            ProductFeature.objects.create(product=product, feature=cls.feature, value='-',
+                                          filterValue=cls.red if index % 3 == 0 else cls.blue)
+            cls.products.append(product)
+        PricingService.refresh_many([product.pk for product in cls.products])
+        ReviewSummaryService.refresh_many([product.pk for product in cls.products])
+
+        cls.customer = CustomUser.objects.create(mobileNumber='09120000001')
+        state = State.objects.create(name='state')
+        city = City.objects.create(state=state, name='city')
+        cls.address = UserAddress.objects.create(user=cls.customer, state=state, city=city, addressDetail='-')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_order(self, lines, status='pending', is_finally=False):
+        """سفارش با اقلام [(product, qty), ...]"""
+        order = Order.objects.create(customer=self.customer, address=self.address, status=status,
+                                     isFinally=is_finally)
+        for product, qty in lines:
+            OrderDetail.objects.create(order=order, product=product, price=1000, qty=qty)
+        return order
+
+
+# ========================
+# ایندکس بیت‌مپ و فیلتر ویژگی‌ها
+# ========================
+class BitmapIndexTest(CatalogMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index = ProductBitmapIndex()
+        self.index.rebuild()
+
+    def test_refresh_matches_rebuild(self):
+        product = self.products[0]
+        product.brand = self.brands[1]
+        product.save()
+        ProductFeature.objects.filter(product=product).update(filterValue=self.blue)
+        before = self.index.snapshot()
+
+        self.index.refresh_products([product.pk])
+        state = self.index.snapshot()
+        rebuilt = ProductBitmapIndex._build_state(*ProductBitmapIndex._load())
+        for key in ('brands', 'categories', 'values', 'active', 'priced'):
+            self.assertEqual(state[key], rebuilt[key], key)
+        # نسخه قبلی برای خواننده‌های همزمان دست نخورده می‌ماند
+        self.assertNotEqual(before['brands'], state['brands'])
+        self.assertIs(before['prices'], state['prices'])
+
+    def test_filter_features(self):
+        scope = self.index.listing_scope(category_ids=[self.category.pk])
+        matched = set(iter_ids(self.index.filter_features(scope, [self.red.pk])))
+        self.assertEqual(matched, {product.pk for product in self.products[:10:3]})
+
+    def test_filter_by_features_fallback(self):
+        """بیش از MAX_INDEX_IDS تطابق: همان نتیجه از زیرکوئری SQL"""
+        queryset = Product.objects.filter(isActive=True)
+        with mock.patch('apps.product.service.facet_service.product_index', self.index):
+            from_index = set(FacetService.filter_by_features(
+                queryset, [self.blue.pk], category_ids=[self.category.pk]
+            ).filter(category=self.category).values_list('pk', flat=True))
+            with mock.patch.object(FacetService, 'MAX_INDEX_IDS', 2):
+                filtered = FacetService.filter_by_features(
+                    queryset, [self.blue.pk], category_ids=[self.category.pk]
+                ).filter(category=self.category)
+                self.assertIn('product_productfeature', str(filtered.query))
+                from_sql = set(filtered.values_list('pk', flat=True))
+        self.assertEqual(from_index, from_sql)
+        self.assertEqual(len(from_sql), 6)
+
+    def test_facet_category_counts(self):
+        """دسته‌ها با فیلتر برند و بقیه گروه‌ها با فیلتر دسته شمرده می‌شوند"""
+        facets = FacetService.build(
+            PricingService.annotate_listing(Product.objects.filter(isActive=True)),
+            brand_ids={self.brands[0].pk}, category_ids={self.category.pk}
+        )
+        self.assertEqual(
+            {category.slug: (category.product_count, category.selected) for category in facets['categories']},
+            {'category': (5, True), 'other': (1, False)}
+        )
+        self.assertEqual([brand.product_count for brand in facets['brands']], [5, 5])
+        self.assertEqual(facets['total'], 5)
+        self.assertEqual(FacetService.build(PricingService.annotate_listing(Product.objects.none()))['categories'], [])
+
+
+# ========================
+# آمار فروش
+# ========================
+class SalesStatsTest(CatalogMixin, TestCase):
+
+    def stats(self, product):
+        row = ProductSalesStats.objects.filter(product=product).first()
+        return (row.unitsSold, row.unitsSold30d, row.revenue) if row else None
+
+    def test_sync_order(self):
+        first, second = self.products[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order([(first, 2), (second, 1)])
+        self.assertIsNone(self.stats(first))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.isFinally, order.status = True, 'paid'
+            order.save()
+        self.assertEqual(self.stats(first), (2, 2, 2000))
+        # ذخیره مجدد دوباره شمرده نمی‌شود
+        self.assertEqual(SalesStatsService.sync_order(order.pk), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'canceled'
+            order.save()
+        self.assertEqual(self.stats(first), (0, 0, 0))
+
+    def test_detail_changes_after_counting(self):
+        first, second, third = self.products[:3]
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order([(first, 2), (second, 1)], status='paid', is_finally=True)
+        self.assertEqual(self.stats(first), (2, 2, 2000))
+
+        detail = order.details.get(product=first)
+        with self.captureOnCommitCallbacks(execute=True):
+            detail.qty = 5
+            detail.save()
+        self.assertEqual(self.stats(first), (5, 5, 5000))
+
+        # تغییر محصول یک قلم: آمار هر دو محصول اصلاح می‌شود
+        with self.captureOnCommitCallbacks(execute=True):
+            detail.product = third
+            detail.save()
+        self.assertEqual(self.stats(first), (0, 0, 0))
+        self.assertEqual(self.stats(third), (5, 5, 5000))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.details.get(product=second).delete()
+        self.assertEqual(self.stats(second), (0, 0, 0))
+
+        # حذف سفارش: اقلام یک بار کم می‌شوند
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertEqual(self.stats(third), (0, 0, 0))
+
+
+# ========================
+# GET شرطی صفحه محصول
+# ========================
+class ProductPageVersionTest(CatalogMixin, TestCase):
+
+    def get(self, product, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('product:product_detail', kwargs={'slug': product.slug}), **headers)
+
+    def test_not_modified_until_content_changes(self):
+        product = self.products[0]
+        etag = self.get(product)['ETag']
+        self.assertEqual(self.get(product, etag).status_code, 304)
+
+        # تغییر ویژگی محصول تاریخ بروزرسانی ندارد و با نسخه کش همان محصول دیده می‌شود
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductFeature.objects.filter(product=product).first().delete()
+        response = self.get(product, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(self.products[1], self.get(self.products[1])['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.title = 'renamed'
+            product.save()
+        self.assertEqual(self.get(product, response['ETag']).status_code, 200)
+
+
+
+# ========================
+# ورود و خروج کاتالوگ
+# ========================
+class CatalogImportTest(CatalogMixin, TestCase):
+
+    def export(self, file_format):
+        return ''.join(CatalogExportService.iter_lines(file_format))
+
+    def test_round_trip(self):
+        for file_format in CatalogImportService.FORMATS:
+            exported = self.export(file_format)
+            report = CatalogImportService.run(io.StringIO(exported), file_format)
+            self.assertEqual((report['created'], report['updated'], report['errorCount']),
+                             (0, self.PRODUCT_COUNT, 0), file_format)
+            self.assertEqual(self.export(file_format), exported)
+
+    def test_features_refresh_once_per_batch(self):
+        """جایگزینی ویژگی‌ها سیگنال هر ردیف (refresh جداگانه ایندکس) را اجرا نمی‌کند"""
+        exported = self.export('csv').replace('color=-=red', 'color=-=blue')
+        with mock.patch('apps.product.service.catalog_service.product_index') as batch_index, \
+                mock.patch('apps.product.signals.product_index') as signal_index, \
+                self.captureOnCommitCallbacks(execute=True):
+            CatalogImportService.run(io.StringIO(exported), 'csv', batch_size=5)
+        self.assertEqual(batch_index.refresh_products.call_count, 3)
+        signal_index.refresh_products.assert_not_called()
+        self.assertFalse(ProductFeature.objects.filter(filterValue=self.red).exists())
+        self.assertEqual(ProductFeature.objects.filter(filterValue=self.blue).count(), self.PRODUCT_COUNT)
+
+
+# ========================
+# رزرو و کسر موجودی
+# ========================
+class StockServiceTest(CatalogMixin, TestCase):
+
+    def stock(self, product):
+        product = Product.objects.get(pk=product.pk)
+        return product.stock, product.reserved
+
+    def reserved_order(self, lines):
+        order = self.create_order(lines)
+        StockService.reserve_order(order.pk)
+        return order
+
+    def test_reserve_all_or_nothing(self):
+        first, second = self.products[:2]
+        self.reserved_order([(first, 4)])
+        self.assertEqual(self.stock(first), (10, 4))
+
+        order = self.create_order([(first, 7), (second, 1)])
+        with self.assertRaises(StockReservationError) as error:
+            StockService.reserve_order(order.pk)
+        self.assertEqual([(product.pk, requested, available) for product, requested, available
+                          in error.exception.shortages], [(first.pk, 7, 6)])
+        self.assertEqual(self.stock(second), (10, 0))
+
+    def test_expire_and_cancel(self):
+        first = self.products[0]
+        order = self.reserved_order([(first, 3)])
+        self.assertEqual(StockService.release_expired(), 0)
+        self.assertEqual(StockService.release_expired(now=timezone.now() + timedelta(hours=1)), 1)
+        self.assertEqual(self.stock(first), (10, 0))
+
+        order = self.reserved_order([(first, 2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'canceled'
+            order.save()
+        self.assertEqual(self.stock(first), (10, 0))
+        self.assertEqual(StockReservation.objects.get(order=order).status, 'released')
+
+    def test_admin_cancel_and_delete_release(self):
+        first, second = self.products[:2]
+        canceled = self.reserved_order([(first, 2)])
+        deleted = self.reserved_order([(second, 3)])
+
+        request = RequestFactory().post('/')
+        with mock.patch.object(OrderAdmin, 'message_user'):
+            OrderAdmin(Order, admin.site).mark_as_canceled(request, Order.objects.filter(pk=canceled.pk))
+        self.assertEqual(self.stock(first), (10, 0))
+
+        deleted.delete()
+        self.assertEqual(self.stock(second), (10, 0))
+
+    def test_convert_reservation(self):
+        first = self.products[0]
+        order = self.reserved_order([(first, 4)])
+        movements = StockService.decrease_for_order(order.pk)
+        self.assertEqual([(item.quantity, item.shortage, item.stockAfter) for item in movements], [(-4, 0, 6)])
+        self.assertEqual(self.stock(first), (6, 0))
+        self.assertEqual(StockReservation.objects.get(order=order).status, 'converted')
+        # پرداخت تکراری دوباره کسر نمی‌کند
+        self.assertIsNone(StockService.decrease_for_order(order.pk))
+        self.assertEqual(self.stock(first), (6, 0))
+
+    def test_expired_reservation_keeps_other_reservations(self):
+        first = self.products[0]
+        order = self.reserved_order([(first, 5)])
+        StockService.release_expired(now=timezone.now() + timedelta(hours=1))
+        self.reserved_order([(first, 8)])
+
+        movements = StockService.decrease_for_order(order.pk)
+        self.assertEqual([(item.quantity, item.shortage) for item in movements], [(-2, 3)])
+        self.assertEqual(self.stock(first), (8, 8))
+        self.assertEqual(StockMovement.objects.get(order=order).shortage, 3)
+
+
+# ========================
+# صفحه‌بندی کلیدی
+# ========================
+class KeysetPaginatorTest(CatalogMixin, TestCase):
+
+    def listing(self):
+        return PricingService.annotate_listing(Product.objects.filter(isActive=True))
+
+    def walk(self, paginator):
+        """همه صفحات رو به جلو و سپس برگشت از صفحه آخر؛ خروجی: (صفحات جلو، صفحات برگشت)"""
+        forward, page = [], paginator.get_page()
+        forward.append([product.pk for product in page])
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            forward.append([product.pk for product in page])
+        backward = [[product.pk for product in page]]
+        while page.has_previous():
+            page = paginator.get_page(page.previous_cursor)
+            backward.append([product.pk for product in page])
+        return forward, backward[::-1]
+
+    def test_pages_follow_ordering(self):
+        # createdAt یکسان برای همه: ترتیب با شناسه شکسته می‌شود
+        Product.objects.update(createdAt=timezone.now())
+        for sort, ordering in (('newest', ('-createdAt', '-id')), ('cheap', ('price', 'id')),
+                               ('expensive', ('-price', '-id'))):
+            expected = list(self.listing().order_by(*ordering).values_list('pk', flat=True))
+            forward, backward = self.walk(KeysetPaginator(self.listing(), 5, sort=sort))
+            self.assertEqual([len(page) for page in forward], [5, 5, 2], sort)
+            self.assertEqual(sum(forward, []), expected, sort)
+            self.assertEqual(backward, forward, sort)
+
+    def test_page_indexes(self):
+        paginator = KeysetPaginator(self.listing(), 5, sort='cheap')
+        page, ranges = paginator.get_page(), []
+        while True:
+            ranges.append((page.start_index(), page.end_index()))
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+        self.assertEqual(ranges, [(1, 5), (6, 10), (11, 12)])
+        page = paginator.get_page(paginator.get_page(page.previous_cursor).previous_cursor)
+        self.assertEqual((page.start_index(), page.end_index()), (1, 5))
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = KeysetPaginator(self.listing(), 5, sort='cheap')
+        first = [product.pk for product in paginator.get_page()]
+        next_cursor = paginator.get_page().next_cursor
+        for cursor in ('garbage', next_cursor[:-3], KeysetPaginator(self.listing(), 5).get_page().next_cursor):
+            page = paginator.get_page(cursor)
+            self.assertEqual([product.pk for product in page], first)
+            self.assertFalse(page.has_previous())
+        self.assertEqual(paginator.count, len(self.products))
+
+
+# ========================
+# تغییر گروهی قیمت
+# ========================
+class RepricingTest(CatalogMixin, TestCase):
+
+    def rule(self, **data):
+        return RepricingService.clean_rule({'mode': 'percent', 'rounding': 'nearest', **data})
+
+    def prices(self, products):
+        return [ProductSaleType.objects.get(product=product).price for product in products]
+
+    def test_clean_rule(self):
+        for data, message in (
+            ({'amount': '8'}, 'حداقل یک برند'),
+            ({'brands': 'x', 'amount': '8'}, 'نامعتبر'),
+            ({'products': '1', 'amount': '0'}, 'صفر'),
+            ({'products': '1', 'amount': '-100'}, '۱۰۰ درصد'),
+            ({'products': '1', 'amount': '1.5', 'mode': 'fixed'}, 'عدد صحیح'),
+            ({'products': '1', 'amount': '5', 'step': '0'}, 'حداقل ۱'),
+        ):
+            with self.assertRaisesMessage(ValueError, message):
+                self.rule(**data)
+        self.assertEqual(self.rule(products='3، 1,3', amount='8.125')['products'], [1, 3])
+
+    def test_rounding(self):
+        product = self.products[1]                  # قیمت 2000
+        expected = {'nearest': 1900, 'up': 1900, 'down': 1800}
+        for rounding, price in expected.items():
+            rule = self.rule(products=[product.pk], mode='fixed', amount='-150', rounding=rounding, step='100')
+            [row] = RepricingService.preview([rule])[0]['rows']
+            self.assertEqual(row['newPrice'], price, rounding)
+
+        # حداقل قیمت برابر step است
+        rule = self.rule(products=[product.pk], amount='-99.99', step='500')
+        self.assertEqual(RepricingService.preview([rule])[0]['rows'][0]['newPrice'], 500)
+        self.assertEqual(self.prices([product]), [2000])
+
+    def test_apply(self):
+        branded = self.products[::2]                # برند اول: 1000، 3000، ... 11000
+        rules = [
+            self.rule(brands=[self.brands[0].pk], amount='8', step='100'),
+            # قانون دوم روی نتیجه قانون اول: 1100 - 150 = 950 -> 900
+            self.rule(products=[branded[0].pk], mode='fixed', amount='-150', rounding='down', step='100'),
+        ]
+        preview = RepricingService.preview(rules)
+        self.assertEqual((preview[0]['count'], preview[0]['oldTotal'], preview[0]['newTotal']), (6, 36000, 38900))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            batch = RepricingService.apply(rules, note='test')
+        self.assertEqual((batch.saleTypeCount, batch.productCount), (7, 6))
+        self.assertEqual(self.prices(branded), [900, 3200, 5400, 7600, 9700, 11900])
+        self.assertEqual(self.prices(self.products[1:2]), [2000])
+        self.assertFalse(ProductSaleType.objects.exclude(finalPrice=F('price')).exists())
+        self.assertEqual(
+            list(PriceChangeItem.objects.filter(batch=batch, product=branded[0]).order_by('pk')
+                 .values_list('oldPrice', 'newPrice')),
+            [(1000, 1100), (1100, 900)]
+        )
+        self.assertEqual(ProductPricing.objects.get(product=branded[1]).basePrice, 3200)
+        # قیمتی که بعد از گرد کردن تغییر نمی‌کند (909 -> 900) ثبت نمی‌شود
+        unchanged = RepricingService.apply([self.rule(products=[branded[0].pk], amount='1', step='100')])
+        self.assertEqual(unchanged.saleTypeCount, 0)
+
+
+# ========================
+# خلاصه نظرات محصول
+# ========================
+class ReviewSummaryTest(CatalogMixin, TestCase):
+
+    def summary(self, product):
+        row = ProductReviewSummary.objects.get(product=product)
+        stars = [getattr(row, field) for field in ReviewSummaryService.STAR_FIELDS]
+        return (row.averageRating, row.totalRatings, stars,
+                row.totalComments, row.recommendCount, row.notRecommendCount)
+
+    def test_summary_follows_reviews(self):
+        product = self.products[0]
+        users = [CustomUser.objects.create(mobileNumber=f'0912000010{index}') for index in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for user, rating in zip(users, (5, 4, 4)):
+                Rating.objects.create(user=user, product=product, rating=rating)
+            Comment.objects.create(user=users[0], product=product, text='-', typeComment='recommend')
+            Comment.objects.create(user=users[1], product=product, text='-', typeComment='not_recommend')
+            Comment.objects.create(user=users[2], product=product, text='-', isActive=False)
+        self.assertEqual(self.summary(product), (4.33, 3, [0, 0, 0, 2, 1], 2, 1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.filter(rating=5).delete()
+        self.assertEqual(self.summary(product)[:3], (4, 2, [0, 0, 0, 2, 0]))
+        # محصولات دیگر دست نمی‌خورند
+        self.assertEqual(self.summary(self.products[1]), (0, 0, [0, 0, 0, 0, 0], 0, 0, 0))
+
+
+# ========================
+# جدول قیمت محصولات
+# ========================
+class PricingTest(CatalogMixin, TestCase):
+
+    def basket(self, products, discount, start, end):
+        basket = DiscountBasket.objects.create(discountTitle=f'{discount}%', discount=discount, isActive=True,
+                                               startDate=start, endDate=end)
+        for product in products:
+            DiscountDetail.objects.create(discountBasket=basket, product=product)
+        return basket
+
+    def pricing(self, product):
+        row = ProductPricing.objects.get(product=product)
+        return row.basePrice, row.discountPercent, row.finalPrice
+
+    def test_base_price_and_discounts(self):
+        product = self.products[1]
+        now = timezone.now()
+        ProductSaleType.objects.create(product=product, typeSale=2, price=1500, memberCarton=10)
+        ProductSaleType.objects.create(product=product, price=100, isActive=False)
+        self.basket([product], 10, now - timedelta(days=1), now + timedelta(days=1))
+        self.basket([product], 25, now - timedelta(days=1), now + timedelta(hours=1))
+        upcoming = self.basket([product], 50, now + timedelta(hours=2), now + timedelta(days=3))
+
+        version = get_cache_version(PricingService.CACHE_NAME)
+        PricingService.refresh_many([product.pk], now=now)
+        # ارزان‌ترین نوع فروش فعال و بیشترین تخفیف جاری
+        self.assertEqual(self.pricing(product), (1500, 25, 1125))
+        self.assertNotEqual(get_cache_version(PricingService.CACHE_NAME), version)
+        row = ProductPricing.objects.get(product=product)
+        self.assertEqual(row.nextChangeAt, now + timedelta(hours=1))
+
+        # بعد از پایان سبد ۲۵٪ و شروع سبد ۵۰٪ با تسک دوره‌ای
+        self.assertEqual(PricingService.refresh_due(now=now + timedelta(minutes=30)), 0)
+        later = upcoming.startDate + timedelta(minutes=1)
+        self.assertGreaterEqual(PricingService.refresh_due(now=later), 1)
+        self.assertEqual(self.pricing(product), (1500, 50, 750))
+
+        listed = PricingService.annotate_listing(Product.objects.filter(pk=product.pk)).get()
+        self.assertEqual((listed.price, listed.discount_percent, listed.final_price), (1500, 50, 750))
+
+
+# ========================
+# جدول بستار دسته‌بندی‌ها
+# ========================
+class CategoryClosureTest(CatalogMixin, TestCase):
+
+    def create(self, slug, parent=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Category.objects.create(title=slug, slug=slug, parent=parent)
+
+    def links(self):
+        return set(CategoryClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_sync_matches_rebuild(self):
+        CategoryClosureService.rebuild()
+        parent = self.create('parent')
+        child = self.create('child', parent)
+        grandchild = self.create('grandchild', child)
+        self.products[0].category.add(grandchild)
+        self.products[1].category.add(child)
+        CategoryClosureService.refresh_counts()
+        self.assertEqual(Category.objects.get(pk=parent.pk).subtreeProductCount, 2)
+        self.assertEqual(len(CategoryClosureService.descendant_ids(parent)), 3)
+
+        # جابجایی زیردرخت child زیر دسته دیگر
+        with self.captureOnCommitCallbacks(execute=True):
+            child.parent = self.other_category
+            child.save()
+        synced = self.links()
+        self.assertIn((self.other_category.pk, grandchild.pk, 2), synced)
+        self.assertNotIn((parent.pk, grandchild.pk, 2), synced)
+        self.assertEqual(Category.objects.get(pk=grandchild.pk).level, 2)
+        self.assertEqual(Category.objects.get(pk=parent.pk).subtreeProductCount, 0)
+        # دسته‌های دیگر + دو محصول زیردرخت جابجا شده
+        self.assertEqual(Category.objects.get(pk=self.other_category.pk).subtreeProductCount, 4)
+
+        CategoryClosureService.rebuild()
+        self.assertEqual(self.links(), synced)
+
+        # انتقال به زیردرخت خودش انجام نمی‌شود
+        child.parent = grandchild
+        self.assertFalse(CategoryClosureService.sync_category(child))
+        self.assertEqual(self.links(), synced)
+
+    def test_filter_subtree_products(self):
+        CategoryClosureService.rebuild()
+        child = self.create('child', self.other_category)
+        self.products[0].category.add(child)
+        products = CategoryClosureService.filter_subtree_products(Product.objects.all(), self.other_category)
+        self.assertEqual(sorted(products.values_list('pk', flat=True)),
+                         sorted(product.pk for product in [self.products[0], *self.products[-2:]]))
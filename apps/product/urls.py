@@ -10,6 +10,7 @@ urlpatterns = [
     path('popularBrand/',views.popular_brands,name='brand'),
     path('popularCategories/',views.rich_categories,name='rich_categories'),
     path('<slug:slug>/', views.product_detail, name='product_detail'),
+    path('<slug:slug>/user-state/', views.product_user_state, name='product_user_state'),
 
     # اضافه کردن کامنت
     path('<slug:product_slug>/comment/add/', views.add_comment, name='add_comment'),
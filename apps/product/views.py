@@ -1,19 +1,28 @@
 from django.shortcuts import render
-from django.db.models import Min, Max, OuterRef, Subquery, F, Value, PositiveIntegerField, ExpressionWrapper
-from django.db.models.functions import Coalesce, Floor
+from django.db.models import Min, Max
 from datetime import timedelta
-from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_GET, condition
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
-from .models import Product,ProductFeature,ProductSaleType,ProductGallery,Comment,Rating,SaleType,Brand,Feature,FeatureValue
+from .models import Product,ProductFeature,ProductSaleType,ProductGallery,Comment,Rating,SaleType,Brand,Feature
 from .filters import ProductFilter
+from .service.review_service import ReviewSummaryService
+from .service.listing_service import ListingService
+from .service.pricing_service import PricingService
+from .pagination import KeysetPaginator, get_keyset_sort, use_keyset
+from .service.facet_service import FacetService
+from .service.bitmap_service import product_index
+from .service.category_service import CategoryTreeService, CategoryClosureService
+from .service.recommendation_service import RecommendationService
+from .service.page_version_service import ProductPageVersion
+from .service.comment_service import CommentFeedService
+from .service.popularity_service import PopularityService
 from apps.main.models import SettingShop
-
-from apps.discount.models import DiscountBasket, DiscountDetail
+from apps.main.service.home_service import HomePageService
 
 
 # 1. محبوب‌ترین برندها
@@ -21,113 +30,27 @@ def popular_brands(request):
     """
     محبوب‌ترین برندها بر اساس تعداد محصولات
     """
-    from .models import Brand
-
-    brands = Brand.objects.filter(
-        isActive=True
-    ).annotate(
-        product_count=Count('products', filter=Q(products__isActive=True))
-    ).filter(
-        product_count__gt=0
-    ).order_by('-product_count')[:10]
+    context = HomePageService.build_context('popular_brands')
 
-    return render(request, 'product_app/brand/popular_brands.html', {'brands': brands})
+    return render(request, 'product_app/brand/popular_brands.html', context)
 
 # 2. پر محتواترین دسته‌بندی‌ها
 def rich_categories(request):
     """
-    پر محتواترین دسته‌بندی‌ها بر اساس تعداد محصولات
+    پر محتواترین دسته‌بندی‌ها بر اساس تعداد محصولات (با احتساب زیرشاخه‌ها)
     فقط دسته‌بندی‌های لایه دوم (که والد آنها یک دسته‌بندی سطح اول است)
     """
-    from .models import Category
-    from django.db.models import Count, Q
-
-
-    categories = Category.objects.filter(
-        isActive=True,
-        parent__isnull=False,  # خودش زیردسته باشد
-        parent__parent__isnull=True  # والد آن، یک دسته‌بندی سطح اول (بدون والد) باشد
-    ).annotate(
-        total_products=Count('products', filter=Q(products__isActive=True))
-    ).filter(
-        total_products__gt=0
-    ).order_by('-total_products')[:10]
+    context = HomePageService.build_context('rich_categories')
 
-    return render(request, 'product_app/category/popular_categories.html', {'categories': categories})
+    return render(request, 'product_app/category/popular_categories.html', context)
 
 
 def latest_products(request):
     """
     جدیدترین محصولات
     """
-    from .models import Product, ProductGallery
-
-    now = timezone.now()
-    discount_subquery = DiscountBasket.objects.filter(
-        isActive=True,
-        startDate__lte=now,
-        endDate__gte=now,
-        discountOfBasket__product=OuterRef('pk')
-    ).order_by('-discount').values('discount')[:1]
-
-    # گرفتن محصولات جدید + قیمت پایه و تخفیف
-    products = Product.objects.filter(
-        isActive=True
-    ).select_related('brand').prefetch_related(
-        'category', 'saleTypes'
-    ).annotate(
-        price=Subquery(
-            ProductSaleType.objects.filter(
-                product=OuterRef('pk'),
-                isActive=True
-            ).order_by('price').values('price')[:1]
-        ),
-        discount_percent=Subquery(discount_subquery),
-        final_price=ExpressionWrapper(
-            Floor(F('price') * (100 - Coalesce(Subquery(discount_subquery), Value(0))) / Value(100)),
-            output_field=PositiveIntegerField()
-        )
-    ).order_by('-createdAt')[:12]
-
-    # آماده کردن داده‌ها برای تمپلیت
-    product_list = []
-    for product in products:
-        base_price = product.price or 0
-        discount_percent = product.discount_percent or 0
-        final_price = product.final_price or base_price
-
-        # گرفتن تصویر اصلی
-        main_image = product.mainImage.url if product.mainImage else ''
-
-        # گرفتن تصویر hover (اولین تصویر گالری)
-        hover_image = main_image
-        try:
-            gallery_image = product.galleries.filter(isActive=True).first()
-            if gallery_image and gallery_image.image:
-                hover_image = gallery_image.image.url
-        except:
-            pass
-
-        product_list.append({
-            'id': product.id,
-            'slug': product.slug,
-            'title': product.title,
-            'short_title': product.title[:40] + '...' if len(product.title) > 40 else product.title,
-            'main_image': main_image,
-            'hover_image': hover_image,  # این مهمه
-            'final_price': int(final_price),
-            'base_price': int(base_price),
-            'discount_percentage': int(discount_percent),
-            'rating': product.average_rating,
-            'comments_count': product.total_comments,
-            'shipping_today': True,
-            'brand': product.brand.title if product.brand else None,
-        })
-
-    context = {
-        'latest_products': product_list,
-        'title': 'جدیدترین محصولات',
-    }
+    # قیمت (جدول ProductPricing)، امتیاز و تصویر hover همه کارت‌ها با کوئری‌های دسته‌ای
+    context = HomePageService.build_context('latest_products')
 
     return render(request, 'product_app/product/latest_products.html', context)
 
@@ -138,15 +61,15 @@ from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
-from django.db.models import Count, Q, OuterRef, Subquery, ExpressionWrapper, F, Value, PositiveIntegerField
-from django.db.models.functions import Floor, Coalesce
-from django.utils import timezone
 
 
+@condition(etag_func=ProductPageVersion.etag, last_modified_func=ProductPageVersion.last_modified)
 def product_detail(request, slug):
     """
     صفحه جزئیات محصول
     آدرس: /products/<slug>/
+    اگر از بازدید قبلی تغییری نکرده باشد 304 برمی‌گردد (ProductPageVersion)؛
+    علاقه‌مندی و ثبت دیدگاه کاربر جداگانه از product_user_state گرفته می‌شوند
     """
     # 1. اطلاعات اولیه محصول
     product = get_object_or_404(Product, slug=slug, isActive=True)
@@ -162,28 +85,15 @@ def product_detail(request, slug):
         product=product
     ).select_related('feature', 'filterValue')
 
-    # 4. لیست کامنت‌ها
-    comments = Comment.objects.filter(
-        product=product,
-        isActive=True
-    ).select_related('user').order_by('-createdAt')
+    # 4. آمارهای امتیاز و کامنت (از جدول خلاصه ProductReviewSummary)
+    review_summary = product.get_review_summary()
+    comment_stats = review_summary.as_stats()
 
-    # صفحه‌بندی کامنت‌ها
-    page = request.GET.get('page', 1)
-    paginator = Paginator(comments, 10)
-    page_comments = paginator.get_page(page)
+    # 5. صفحه اول نظرات (کرسری، کش شده کنار خلاصه نظرات)
+    comment_feed = CommentFeedService.first_page(product.id, review_summary)
 
-    # 5. آمارهای امتیاز و کامنت (از propertyهای خود مدل Product استفاده می‌کنیم)
-    comment_stats = product.comment_stats
-
-    # 6. قیمت‌ها + تخفیف
-    now = timezone.now()
-    discount_percent = DiscountBasket.objects.filter(
-        isActive=True,
-        startDate__lte=now,
-        endDate__gte=now,
-        discountOfBasket__product=product
-    ).order_by('-discount').values_list('discount', flat=True).first() or 0
+    # 6. قیمت‌ها + تخفیف (درصد تخفیف فعال از جدول ProductPricing)
+    discount_percent = PricingService.get_for_product(product).discountPercent
 
     sale_types = ProductSaleType.objects.filter(
         product=product,
@@ -230,7 +140,7 @@ def product_detail(request, slug):
     total_units = 0
     if default_sale_type and default_sale_type.typeSale == SaleType.CARTON:
         if default_sale_type.memberCarton and default_sale_type.memberCarton > 0:
-            max_cartons = product.stock // default_sale_type.memberCarton
+            max_cartons = product.available_stock // default_sale_type.memberCarton
             total_units = default_sale_type.memberCarton
         else:
             max_cartons = 0
@@ -240,48 +150,11 @@ def product_detail(request, slug):
     max_limited = 0
     step_limited = 0
     if default_sale_type and default_sale_type.typeSale == SaleType.LIMITED:
-        max_limited = product.stock
+        max_limited = product.available_stock
         step_limited = default_sale_type.limitedSale or 1
 
-    # بررسی اینکه آیا کاربر این محصول را قبلاً کامنت کرده است
-    user_has_commented = False
-    if request.user.is_authenticated:
-        user_has_commented = Comment.objects.filter(
-            user=request.user,
-            product=product
-        ).exists()
-
-    # بررسی اینکه آیا محصول در لیست علاقه‌مندی‌های کاربر هست
-    is_favorite = False
-    if request.user.is_authenticated:
-        is_favorite = request.user.favorites.filter(id=product.id).exists()
-
-    # 7. محصولات مرتبط (از همان دسته‌بندی‌ها) + تخفیف
-    discount_subquery = DiscountBasket.objects.filter(
-        isActive=True,
-        startDate__lte=now,
-        endDate__gte=now,
-        discountOfBasket__product=OuterRef('pk')
-    ).order_by('-discount').values('discount')[:1]
-
-    related_products = Product.objects.filter(
-        isActive=True,
-        category__in=product.category.all()
-    ).exclude(
-        id=product.id  # محصول فعلی رو حذف کن
-    ).annotate(
-        price=Subquery(
-            ProductSaleType.objects.filter(
-                product=OuterRef('pk'),
-                isActive=True
-            ).order_by('price').values('price')[:1]
-        ),
-        discount_percent=Subquery(discount_subquery),
-        final_price=ExpressionWrapper(
-            Floor(F('price') * (100 - Coalesce(Subquery(discount_subquery), Value(0))) / Value(100)),
-            output_field=PositiveIntegerField()
-        )
-    ).filter(price__isnull=False).distinct()[:8]
+    # 7. محصولات مرتبط (خرید مشترک، در صورت کمبود از همان دسته‌بندی‌ها) + تخفیف
+    related_products = RecommendationService.related_products(product, limit=8)
 
     # 8. آماده کردن متا تگ‌ها
     meta_data = {
@@ -329,14 +202,15 @@ def product_detail(request, slug):
         'product_features': product_features,
 
         # کامنت‌ها
-        'comments': page_comments,
-        'total_comments': paginator.count,
+        'comments': comment_feed['comments'],
+        'comments_next_cursor': comment_feed['next_cursor'],
+        'total_comments': review_summary.totalComments,
 
         # آمارها
         'comment_stats': comment_stats,
-        'average_rating': product.average_rating,
-        'recommendation_stats': product.recommendation_stats,
-        'rating_distribution': product.rating_distribution,
+        'average_rating': round(review_summary.averageRating, 1),
+        'recommendation_stats': review_summary.recommendation,
+        'rating_distribution': review_summary.distribution,
 
         # قیمت‌ها
         'sale_types': sale_types,
@@ -355,12 +229,6 @@ def product_detail(request, slug):
         # مشخصات کلی
         'specifications': specifications,
 
-        # برای فرم کامنت
-        'user_has_commented': user_has_commented,
-
-        # وضعیت علاقه‌مندی
-        'is_favorite': is_favorite,
-
         # ========== مقادیر محاسبه شده برای موجودی و محدودیت‌ها ==========
         'max_cartons': max_cartons,
         'total_units': total_units,
@@ -368,7 +236,7 @@ def product_detail(request, slug):
         'step_limited': step_limited,
 
         # اطلاعات اضافی برای استفاده در جاوااسکریپت
-        'product_stock': product.stock,
+        'product_stock': product.available_stock,
         'member_carton': default_sale_type.memberCarton if default_sale_type and default_sale_type.typeSale == SaleType.CARTON else 0,
         'limited_sale': default_sale_type.limitedSale if default_sale_type and default_sale_type.typeSale == SaleType.LIMITED else 0,
 
@@ -379,6 +247,34 @@ def product_detail(request, slug):
     return render(request, 'product_app/product/product_detail.html', context)
 
 
+# ========================
+# وضعیت شخصی کاربر در صفحه محصول (برای AJAX)
+# ========================
+@never_cache
+@require_GET
+def product_user_state(request, slug):
+    """
+    علاقه‌مندی و ثبت دیدگاه کاربر برای این محصول
+    (صفحه محصول با ETag کش می‌شود و این مقادیر بعد از لود صفحه گرفته می‌شوند)
+    بازدید صفحه (و ورود از نتایج جستجو با from=search) هم اینجا برای امتیاز محبوبیت شمرده می‌شود
+    """
+    product = get_object_or_404(Product.objects.only('id'), slug=slug, isActive=True)
+    PopularityService.record_view(request, product.id, from_search=request.GET.get('from') == 'search')
+
+    is_favorite = False
+    has_commented = False
+    if request.user.is_authenticated:
+        is_favorite = request.user.favorites.filter(product=product).exists()
+        has_commented = Comment.objects.filter(user=request.user, product=product).exists()
+
+    return JsonResponse({
+        'success': True,
+        'is_authenticated': request.user.is_authenticated,
+        'is_favorite': is_favorite,
+        'has_commented': has_commented,
+    })
+
+
 # ========================
 # درج کامنت (برای AJAX)
 # ========================
@@ -438,11 +334,12 @@ def add_comment(request, product_slug):
             'is_buyer': True,  # می‌توانید بعداً بر اساس خرید کاربر تنظیم کنید
         }
 
-        # آمار جدید
+        # آمار جدید (خلاصه نظرات توسط سیگنال کامنت بروزرسانی شده است)
+        summary = ReviewSummaryService.get_for_product(product)
         stats = {
-            'total_comments': product.total_comments,
-            'average_rating': product.average_rating,
-            'recommendation_stats': product.recommendation_stats,
+            'total_comments': summary.totalComments,
+            'average_rating': round(summary.averageRating, 1),
+            'recommendation_stats': summary.recommendation,
         }
 
         return JsonResponse({
@@ -464,48 +361,19 @@ def add_comment(request, product_slug):
 # ========================
 def load_more_comments(request, product_slug):
     """
-    دریافت کامنت‌های بیشتر به صورت AJAX
-    آدرس: /products/<slug>/comments/load-more/
+    دریافت کامنت‌های بیشتر به صورت AJAX (صفحه‌بندی کرسری)
+    آدرس: /products/<slug>/comments/load-more/?cursor=<next_cursor>
     """
     try:
-        product = get_object_or_404(Product, slug=product_slug, isActive=True)
-
-        page = int(request.GET.get('page', 2))  # صفحه ۲ به بعد
-        per_page = 10
-
-        comments = Comment.objects.filter(
-            product=product,
-            isActive=True
-        ).select_related('user').order_by('-createdAt')
+        product = get_object_or_404(Product.objects.only('id'), slug=product_slug, isActive=True)
 
-        paginator = Paginator(comments, per_page)
-
-        if page > paginator.num_pages:
-            return JsonResponse({
-                'success': True,
-                'has_more': False,
-                'comments': []
-            })
-
-        page_obj = paginator.get_page(page)
-
-        comments_list = []
-        for comment in page_obj:
-            comments_list.append({
-                'id': comment.id,
-                'user_name': comment.user.family or comment.user.username,
-                'text': comment.text,
-                'type': comment.get_typeComment_display(),
-                'type_class': 'text-green-500' if comment.typeComment == 'recommend' else 'text-red-500',
-                'created_at': comment.createdAt.strftime('%Y/%m/%d %H:%M'),
-                'is_buyer': True,
-            })
+        page = CommentFeedService.get_page(product.id, request.GET.get('cursor'))
 
         return JsonResponse({
             'success': True,
-            'has_more': page_obj.has_next(),
-            'comments': comments_list,
-            'next_page': page + 1 if page_obj.has_next() else None
+            'has_more': page['next_cursor'] is not None,
+            'comments': page['comments'],
+            'next_cursor': page['next_cursor'],
         })
 
     except Exception as e:
@@ -525,55 +393,25 @@ def show_by_filter(request, slug):
     category = get_object_or_404(Category, slug=slug)
 
     # ========================
-    # محصولات فعال این دسته
+    # محصولات فعال این دسته و همه زیرشاخه‌های آن
     # ========================
-    products = Product.objects.filter(
-        isActive=True,
-        category__slug=slug
+    products = CategoryClosureService.filter_subtree_products(
+        Product.objects.filter(isActive=True),
+        category
     ).select_related('brand').prefetch_related(
         'saleTypes',
         'featuresValue'
-    ).distinct()
-
-    # ========================
-    # زیرکوئری قیمت (price فقط)
-    # ========================
-    price_subquery = ProductSaleType.objects.filter(
-        product=OuterRef('pk'),
-        isActive=True
-    ).order_by('price').values('price')[:1]
-
-    # 🔥 این خط کلیدی است
-    products = products.annotate(
-        price=Subquery(price_subquery)
-    ).filter(price__isnull=False)
+    )
 
     # ========================
-    # تخفیف فعال برای هر محصول
+    # قیمت پایه، تخفیف فعال و قیمت نهایی (جدول ProductPricing)
     # ========================
-    now = timezone.now()
-    discount_subquery = DiscountBasket.objects.filter(
-        isActive=True,
-        startDate__lte=now,
-        endDate__gte=now,
-        discountOfBasket__product=OuterRef('pk')
-    ).order_by('-discount').values('discount')[:1]
-
-    products = products.annotate(
-        discount_percent=Subquery(discount_subquery),
-        final_price=ExpressionWrapper(
-            Floor(F('price') * (100 - Coalesce(Subquery(discount_subquery), Value(0))) / Value(100)),
-            output_field=PositiveIntegerField()
-        )
-    )
+    products = PricingService.annotate_listing(products)
 
     # ========================
     # min / max قیمت واقعی
     # ========================
-    price_stats = ProductSaleType.objects.filter(
-        product__in=products,
-        isActive=True
-    ).aggregate(
+    price_stats = products.aggregate(
         min_price=Min('price'),
         max_price=Max('price')
     )
@@ -590,12 +428,12 @@ def show_by_filter(request, slug):
     # ========================
     # فیلتر ویژگی‌ها (feature checkboxes)
     # ========================
-    feature_values = request.GET.getlist('feature')
-    if feature_values:
-        # هر مقدار در URL یک FeatureValue.id است
-        filtered_products = filtered_products.filter(
-            featuresValue__filterValue_id__in=feature_values
-        ).distinct()
+    # هر مقدار در URL یک FeatureValue.id است؛ مقادیر یک ویژگی OR و ویژگی‌ها AND می‌شوند
+    feature_values = FacetService.parse_request(request)['feature_value_ids']
+    filtered_products = FacetService.filter_by_features(
+        filtered_products, feature_values,
+        category_ids=CategoryClosureService.descendant_ids(category) if feature_values else None
+    )
 
     # ========================
     # فیلتر قیمت
@@ -625,8 +463,14 @@ def show_by_filter(request, slug):
     # ========================
     # صفحه‌بندی
     # ========================
-    paginator = Paginator(filtered_products, 12)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    # کرسری به‌صورت پیش‌فرض؛ ?page=N برای لینک‌های قدیمی
+    if use_keyset(request):
+        paginator = KeysetPaginator(filtered_products, 12, get_keyset_sort(sort))
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    else:
+        paginator = Paginator(filtered_products, 12)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    ListingService.attach_to_page(page_obj)
 
     # ========================
     # برندها
@@ -671,44 +515,14 @@ def show_brand_products(request, slug):
     ).distinct()
 
     # ========================
-    # زیرکوئری قیمت (price فقط)
+    # قیمت پایه، تخفیف فعال و قیمت نهایی (جدول ProductPricing)
     # ========================
-    price_subquery = ProductSaleType.objects.filter(
-        product=OuterRef('pk'),
-        isActive=True
-    ).order_by('price').values('price')[:1]
-
-    # 🔥 این خط کلیدی است
-    products = products.annotate(
-        price=Subquery(price_subquery)
-    ).filter(price__isnull=False)
-
-    # ========================
-    # تخفیف فعال برای هر محصول
-    # ========================
-    now = timezone.now()
-    discount_subquery = DiscountBasket.objects.filter(
-        isActive=True,
-        startDate__lte=now,
-        endDate__gte=now,
-        discountOfBasket__product=OuterRef('pk')
-    ).order_by('-discount').values('discount')[:1]
-
-    products = products.annotate(
-        discount_percent=Subquery(discount_subquery),
-        final_price=ExpressionWrapper(
-            Floor(F('price') * (100 - Coalesce(Subquery(discount_subquery), Value(0))) / Value(100)),
-            output_field=PositiveIntegerField()
-        )
-    )
+    products = PricingService.annotate_listing(products)
 
     # ========================
     # min / max قیمت واقعی
     # ========================
-    price_stats = ProductSaleType.objects.filter(
-        product__in=products,
-        isActive=True
-    ).aggregate(
+    price_stats = products.aggregate(
         min_price=Min('price'),
         max_price=Max('price')
     )
@@ -725,12 +539,11 @@ def show_brand_products(request, slug):
     # ========================
     # فیلتر ویژگی‌ها (feature checkboxes)
     # ========================
-    feature_values = request.GET.getlist('feature')
-    if feature_values:
-        # هر مقدار در URL یک FeatureValue.id است
-        filtered_products = filtered_products.filter(
-            featuresValue__filterValue_id__in=feature_values
-        ).distinct()
+    # هر مقدار در URL یک FeatureValue.id است؛ مقادیر یک ویژگی OR و ویژگی‌ها AND می‌شوند
+    feature_values = FacetService.parse_request(request)['feature_value_ids']
+    filtered_products = FacetService.filter_by_features(
+        filtered_products, feature_values, brand_id=brand.id
+    )
 
     # ========================
     # فیلتر قیمت
@@ -760,8 +573,14 @@ def show_brand_products(request, slug):
     # ========================
     # صفحه‌بندی
     # ========================
-    paginator = Paginator(filtered_products, 12)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    # کرسری به‌صورت پیش‌فرض؛ ?page=N برای لینک‌های قدیمی
+    if use_keyset(request):
+        paginator = KeysetPaginator(filtered_products, 12, get_keyset_sort(sort))
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    else:
+        paginator = Paginator(filtered_products, 12)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    ListingService.attach_to_page(page_obj)
 
     # ========================
     # دسته‌بندی‌ها (برای فیلتر)
@@ -794,37 +613,32 @@ def show_brand_products(request, slug):
 def get_brand_feature_filter(request, slug):
     brand = get_object_or_404(Brand, slug=slug)
 
-    # دریافت محصولات فیلتر شده برند
-    products = Product.objects.filter(
-        isActive=True,
-        brand=brand
+    # محصولات فعال برند (همان مجموعه‌ای که صفحه برند نمایش می‌دهد)
+    products = PricingService.annotate_listing(
+        Product.objects.filter(
+            isActive=True,
+            brand=brand
+        )
     )
 
-    # ساخت feature_dict برای نمایش در فیلترها
-    # برای برندها، تمام ویژگی‌های محصولات برند را نمایش می‌دهیم
-    feature_dict = {}
-
-    # دریافت تمام ویژگی‌های منحصر به فرد از محصولات این برند
-    all_features = Feature.objects.filter(
-        featureValues__productfeature__product__in=products
-    ).distinct()
-
-    for feature in all_features:
-        values = FeatureValue.objects.filter(
-            feature=feature,
-            productfeature__product__in=products
-        ).annotate(
-            product_count=Count('productfeature__product')
-        ).filter(product_count__gt=0).distinct()
-
-        if values.exists():
-            feature_dict[feature] = values
+    # تعداد محصولات هر مقدار ویژگی با اعمال بقیه فیلترهای فعلی کاربر
+    # برای برندها، تمام ویژگی‌های محصولات برند نمایش داده می‌شود
+    selection = FacetService.parse_request(request)
+    selection['brand_ids'] = set()
+    if product_index.ensure_fresh():
+        # شمارش با بیت‌مپ‌های درون حافظه؛ دیتابیس فقط برای آبجکت‌های نمایشی
+        facets = FacetService.build_from_index(
+            product_index, product_index.listing_scope(brand_id=brand.id), **selection
+        )
+    else:
+        facets = FacetService.build(products, **selection)
 
     # شناسه ویژگی‌های انتخاب‌شده برای علامت زدن چک‌باکس‌ها
     selected_features = request.GET.getlist('feature')
 
     return render(request, 'product_app/product/partials/feature_list_filer.html', {
-        'feature_dict': feature_dict,
+        'feature_dict': facets['features'],
+        'facets': facets,
         'slug': slug,
         'selected_features': selected_features,
     })
@@ -834,94 +648,48 @@ def get_brand_feature_filter(request, slug):
 def get_feature_filter(request, slug):
     category = get_object_or_404(Category, slug=slug)
 
-    # دریافت محصولات فیلتر شده
-    products = Product.objects.filter(
-        isActive=True,
-        category=category
+    # محصولات فعال دسته و زیرشاخه‌ها (همان مجموعه‌ای که صفحه دسته نمایش می‌دهد)
+    products = PricingService.annotate_listing(
+        CategoryClosureService.filter_subtree_products(
+            Product.objects.filter(isActive=True),
+            category
+        )
     )
 
-    # ساخت feature_dict برای نمایش در فیلترها
-    feature_dict = {}
-    features_in_category = Feature.objects.filter(categories=category)
-
-    for feature in features_in_category:
-        values = FeatureValue.objects.filter(
-            feature=feature,
-            productfeature__product__in=products
-        ).annotate(
-            product_count=Count('productfeature__product')
-        ).filter(product_count__gt=0).distinct()
-
-        if values.exists():
-            feature_dict[feature] = values
+    # تعداد محصولات هر مقدار ویژگی/برند/بازه قیمت با اعمال بقیه فیلترهای فعلی کاربر
+    category_features = Feature.objects.filter(
+        categories__ancestorLinks__ancestor=category
+    ).distinct()
+    if product_index.ensure_fresh():
+        # شمارش با بیت‌مپ‌های درون حافظه؛ دیتابیس فقط برای آبجکت‌های نمایشی
+        facets = FacetService.build_from_index(
+            product_index,
+            product_index.listing_scope(category_ids=CategoryClosureService.descendant_ids(category)),
+            feature_ids=set(category_features.values_list('id', flat=True)),
+            **FacetService.parse_request(request)
+        )
+    else:
+        facets = FacetService.build(
+            products,
+            feature_queryset=category_features,
+            **FacetService.parse_request(request)
+        )
 
     # شناسه ویژگی‌های انتخاب‌شده برای علامت زدن چک‌باکس‌ها
     selected_features = request.GET.getlist('feature')
 
     return render(request, 'product_app/product/partials/feature_list_filer.html', {
-        'feature_dict': feature_dict,
+        'feature_dict': facets['features'],
+        'facets': facets,
         'slug': slug,
         'selected_features': selected_features,
     })
 
-from django.db.models import Sum
-
 def top_selling_products(request):
     """
     نمایش 10 محصول پرفروش با تخفیف
     """
-    # دریافت محصولات پرفروش
-    products = Product.objects.filter(
-        orderItems__order__isFinally=True,
-        orderItems__order__status__in=['delivered', 'shipped'],
-        isActive=True
-    ).annotate(
-        total_sold=Sum('orderItems__qty')
-    ).order_by('-total_sold')[:10]
-
-    # تاریخ فعلی برای بررسی تخفیف
-    now = timezone.now()
-
-    products_list = []
-    for product in products:
-        # قیمت اصلی محصول
-        sale_type = product.saleTypes.filter(isActive=True).first()
-        original_price = sale_type.price if sale_type else 0
-
-        # بررسی تخفیف محصول
-        discount_detail = DiscountDetail.objects.filter(
-            product=product,
-            discountBasket__isActive=True,
-            discountBasket__startDate__lte=now,
-            discountBasket__endDate__gte=now
-        ).select_related('discountBasket').first()
-
-        # محاسبه قیمت نهایی
-        if discount_detail:
-            discount_percent = discount_detail.discountBasket.discount
-            final_price = original_price - (original_price * discount_percent // 100)
-            is_amazing = discount_detail.discountBasket.isamzing
-            discount_title = discount_detail.discountBasket.discountTitle
-        else:
-            discount_percent = 0
-            final_price = original_price
-            is_amazing = False
-            discount_title = ""
-
-        products_list.append({
-            'product': product,
-            'total_sold': product.total_sold or 0,
-            'original_price': original_price,
-            'final_price': final_price,
-            'discount_percent': discount_percent,
-            'is_discounted': discount_percent > 0,
-            'is_amazing': is_amazing,
-            'discount_title': discount_title
-        })
-
-    context = {
-        'products_list': products_list,
-    }
+    context = HomePageService.build_context('top_selling')
 
     return render(request, 'product_app/product/top_selling.html', context)
 
@@ -929,129 +697,23 @@ def top_selling_products(request):
 def get_category_tree(request):
     """نمایش درختی دسته‌بندی‌ها - مرتب‌سازی قدیمی‌ترین‌ها اول"""
 
-    # دیباگ: تعداد دسته‌بندی‌های موجود
-    total_categories = Category.objects.count()
-    active_categories = Category.objects.filter(isActive=True).count()
-    main_categories_count = Category.objects.filter(parent=None, isActive=True).count()
-
-    print(f"Total Categories: {total_categories}")
-    print(f"Active Categories: {active_categories}")
-    print(f"Main Categories (parent=None): {main_categories_count}")
-
-    # دریافت دسته‌بندی‌های اصلی
-    # تغییر: order_by('createdAt') یعنی از قدیمی به جدید
-    main_categories = Category.objects.filter(
-        parent=None,
-        isActive=True
-    ).order_by('createdAt')[:20]
-
-    # دیباگ: نام دسته‌بندی‌های اصلی
-    for cat in main_categories:
-        print(f"Main Category: {cat.title} (ID: {cat.id})")
-        children_count = cat.children.filter(isActive=True).count()
-        print(f"  Children: {children_count}")
-
-    # ساختار درختی
-    tree_data = []
-
-    for main_cat in main_categories:
-        # فرزندان سطح دوم (قدیمی‌ترین‌ها اول)
-        children_l2 = main_cat.children.filter(isActive=True).order_by('createdAt')
-
-        children_data = []
-        for child_l2 in children_l2:
-            # فرزندان سطح سوم (قدیمی‌ترین‌ها اول)
-            children_l3 = child_l2.children.filter(isActive=True).order_by('createdAt')
-
-            children_data.append({
-                'child': child_l2,
-                'grandchildren': children_l3
-            })
-
-        tree_data.append({
-            'main': main_cat,
-            'children': children_data
-        })
-
-    # دیباگ: ساختار نهایی
-    print(f"Tree Data Length: {len(tree_data)}")
+    # درخت سه سطحی از کش (یک کوئری در صورت نبود کش)
+    tree_data = CategoryTreeService.get_tree(limit=20)
 
     context = {
         'tree_data': tree_data,
-        'debug': {
-            'total_categories': total_categories,
-            'active_categories': active_categories,
-            'main_categories': list(main_categories.values_list('title', flat=True))
-        }
     }
 
     return render(request, 'product_app/category/category_tree_pc.html', context)
 
 
-
-from django.shortcuts import render
-from .models import Category
-import json
-
 def get_category_tree_mobile(request):
-    """نمایش درختی دسته‌بندی‌ها با لاگ برای دیباگ"""
+    """نمایش درختی دسته‌بندی‌ها برای منوی موبایل (همان درخت کش شده نسخه دسکتاپ)"""
 
-    # دیباگ: تعداد دسته‌بندی‌های موجود
-    total_categories = Category.objects.count()
-    active_categories = Category.objects.filter(isActive=True).count()
-    main_categories_count = Category.objects.filter(parent=None, isActive=True).count()
-
-    print(f"Total Categories: {total_categories}")
-    print(f"Active Categories: {active_categories}")
-    print(f"Main Categories (parent=None): {main_categories_count}")
-
-    # دریافت دسته‌بندی‌های اصلی
-    main_categories = Category.objects.filter(
-        parent=None,
-        isActive=True
-    ).order_by('createdAt')[:6]
-
-    # دیباگ: نام دسته‌بندی‌های اصلی
-    for cat in main_categories:
-        print(f"Main Category: {cat.title} (ID: {cat.id})")
-        children_count = cat.children.filter(isActive=True).count()
-        print(f"  Children: {children_count}")
-
-        for child in cat.children.filter(isActive=True)[:50]:
-            grandchildren_count = child.children.filter(isActive=True).count()
-            print(f"    Child: {child.title} - Grandchildren: {grandchildren_count}")
-
-    # ساختار درختی
-    tree_data = []
-
-    for main_cat in main_categories:
-        # فرزندان سطح دوم
-        children_l2 = main_cat.children.filter(isActive=True).order_by('createdAt')
-
-        children_data = []
-        for child_l2 in children_l2:
-            # فرزندان سطح سوم
-            children_l3 = child_l2.children.filter(isActive=True).order_by('createdAt')
-            children_data.append({
-                'child': child_l2,
-                'grandchildren': children_l3
-            })
-
-        tree_data.append({
-            'main': main_cat,
-            'children': children_data
-        })
-
-    # دیباگ: ساختار نهایی
-    print(f"Tree Data Length: {len(tree_data)}")
+    tree_data = CategoryTreeService.get_tree(limit=6)
 
     context = {
         'tree_data': tree_data,
-        'debug': {
-            'total_categories': total_categories,
-            'active_categories': active_categories,
-            'main_categories': list(main_categories.values_list('title', flat=True))
-        }
     }
 
-    return render(request, 'product_app/category/category_tree_mobile.html', context)
\ No newline at end of file
+    return render(request, 'product_app/category/category_tree_mobile.html', context)
@@ -0,0 +1,99 @@
+import statistics
+import threading
+import time
+from django.core.management.base import BaseCommand
+from apps.search.models import PopularSearch
+from apps.search.service.autocomplete_service import autocomplete_index
+from apps.search.service.normalizer_service import TextNormalizer
+from apps.search.service.search_index_service import SearchIndexService
+
+
+class Command(BaseCommand):
+    help = (
+        'هزینه هر عبارت جستجو: یکسان‌سازی متن، پیشنهادهای درون حافظه (میکروثانیه) و جستجوی '
+        'ایندکس (میلی‌ثانیه)؛ با --concurrency تأخیر پیشنهادها زیر بار همزمان'
+    )
+
+    # نمونه‌های املای مختلف وقتی عبارتی داده نشده و جستجوی پرطرفداری ثبت نشده
+    SAMPLE_QUERIES = (
+        'قرص', 'ويتامين‌ها', 'ويتامین ها', 'کرم ضد آفتاب', 'شامپو كودك',
+        'ژل ۵۰ میلی', 'مُسكّن', 'vitamin c 1000',
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', action='append', help='عبارت جستجو (قابل تکرار)')
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='تعداد تردهای همزمان برای سنجش پیشنهادها (۰: بدون این مرحله)')
+
+    @staticmethod
+    def _timings(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    @staticmethod
+    def _percentile(timings, percent):
+        ordered = sorted(timings)
+        return ordered[max(int(len(ordered) * percent / 100) - 1, 0)]
+
+    def _concurrent(self, queries, repeat, threads):
+        """همه عبارت‌ها repeat بار در هر ترد؛ خروجی: (زمان هر فراخوانی‌ها، مدت کل)"""
+        timings, lock = [], threading.Lock()
+        barrier = threading.Barrier(threads + 1)
+
+        def worker():
+            local = []
+            barrier.wait()
+            for _ in range(repeat):
+                for query in queries:
+                    start = time.perf_counter()
+                    autocomplete_index.suggest(query)
+                    local.append(time.perf_counter() - start)
+            with lock:
+                timings.extend(local)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        return timings, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        queries = options['query'] or list(
+            PopularSearch.objects.order_by('-search_count').values_list('keyword', flat=True)[:10]
+        ) or list(self.SAMPLE_QUERIES)
+        autocomplete_index.rebuild()
+
+        self.stdout.write(
+            f'{"normalize µs":>13} {"suggest µs":>11} {"search ms":>10} {"p95 ms":>8} {"results":>8}'
+            f'  query → tokens'
+        )
+        for query in queries:
+            normalize = self._timings(lambda: TextNormalizer.tokenize(query), repeat)
+            suggest = self._timings(lambda: autocomplete_index.suggest(query), repeat)
+            search = self._timings(lambda: SearchIndexService.search(query), repeat)
+            self.stdout.write(
+                f'{statistics.mean(normalize) * 1e6:>13.1f} {statistics.mean(suggest) * 1e6:>11.1f} '
+                f'{statistics.mean(search) * 1e3:>10.2f} {self._percentile(search, 95) * 1e3:>8.2f} '
+                f'{len(SearchIndexService.search(query)):>8}  '
+                f'{query} → {" ".join(TextNormalizer.tokenize(query))}'
+            )
+
+        if options['concurrency'] > 0:
+            timings, elapsed = self._concurrent(queries, repeat, options['concurrency'])
+            self.stdout.write(
+                f'suggest × {options["concurrency"]} threads: {len(timings)} calls, '
+                f'{len(timings) / elapsed:,.0f} calls/s, '
+                f'p50 {self._percentile(timings, 50) * 1e6:.1f}µs, '
+                f'p95 {self._percentile(timings, 95) * 1e6:.1f}µs, '
+                f'p99 {self._percentile(timings, 99) * 1e6:.1f}µs'
+            )
+        self.stdout.write(self.style.SUCCESS(f'{len(queries)} عبارت، هر کدام {repeat} بار'))
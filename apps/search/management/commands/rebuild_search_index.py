@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.search.service.search_index_service import SearchIndexService
+
+
+class Command(BaseCommand):
+    help = 'ساخت مجدد ایندکس جستجوی محصولات (SearchDocument / SearchTerm) برای همه محصولات'
+
+    def handle(self, *args, **options):
+        count = SearchIndexService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'ایندکس جستجوی {count} محصول ساخته شد'))
@@ -0,0 +1,41 @@
+# Generated by Django 4.0.3 on 2026-10-17 22:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0014_composite_indexes'),
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='searchDocument', serialize=False, to='product.product', verbose_name='محصول')),
+                ('length', models.PositiveIntegerField(default=0, verbose_name='طول وزن\u200cدار متن')),
+                ('updatedAt', models.DateTimeField(auto_now=True, verbose_name='تاریخ بروزرسانی')),
+            ],
+            options={
+                'verbose_name': 'سند جستجو',
+                'verbose_name_plural': 'اسناد جستجو',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='واژه')),
+                ('frequency', models.PositiveIntegerField(default=1, verbose_name='تکرار وزن\u200cدار')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='search.searchdocument', verbose_name='سند')),
+            ],
+            options={
+                'verbose_name': 'واژه جستجو',
+                'verbose_name_plural': 'واژه\u200cهای جستجو',
+                'unique_together': {('term', 'document')},
+            },
+        ),
+    ]
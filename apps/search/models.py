@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 # در فایل models.py (پایین فایل)
 class PopularSearch(models.Model):
@@ -18,11 +19,49 @@ class PopularSearch(models.Model):
         return f"{self.keyword} ({self.search_count} جستجو)"
 
     def increment_search(self):
-        """افزایش تعداد جستجو"""
-        self.search_count += 1
-        self.save()
+        """افزایش تعداد جستجو (در دیتابیس با F، بدون از دست رفتن افزایش‌های همزمان)"""
+        PopularSearch.objects.filter(pk=self.pk).update(
+            search_count=models.F('search_count') + 1, last_searched=timezone.now()
+        )
 
     def increment_click(self):
-        """افزایش تعداد کلیک"""
-        self.click_count += 1
-        self.save()
\ No newline at end of file
+        """افزایش تعداد کلیک (در دیتابیس با F)"""
+        PopularSearch.objects.filter(pk=self.pk).update(click_count=models.F('click_count') + 1)
+
+
+# ========================
+# ایندکس معکوس جستجوی محصولات
+# ========================
+class SearchDocument(models.Model):
+    """سند ایندکس جستجوی یک محصول فعال (طول وزن‌دار متن برای نرمال‌سازی BM25)"""
+    product = models.OneToOneField('product.Product', on_delete=models.CASCADE, primary_key=True,
+                                   related_name='searchDocument', verbose_name="محصول")
+    length = models.PositiveIntegerField(default=0, verbose_name="طول وزن‌دار متن")
+    updatedAt = models.DateTimeField(auto_now=True, verbose_name="تاریخ بروزرسانی")
+
+    class Meta:
+        verbose_name = "سند جستجو"
+        verbose_name_plural = "اسناد جستجو"
+
+    def __str__(self):
+        return f"{self.product_id} ({self.length})"
+
+
+class SearchTerm(models.Model):
+    """
+    یک واژه در سند جستجو؛ frequency مجموع وزن‌دار تکرار واژه در فیلدهای محصول
+    (عنوان، برند، دسته‌بندی، توضیحات)
+    """
+    term = models.CharField(max_length=64, verbose_name="واژه")
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='terms',
+                                 verbose_name="سند")
+    frequency = models.PositiveIntegerField(default=1, verbose_name="تکرار وزن‌دار")
+
+    class Meta:
+        verbose_name = "واژه جستجو"
+        verbose_name_plural = "واژه‌های جستجو"
+        # جستجوی واژه (و پیشوند واژه) از ستون اول این ایندکس یکتا استفاده می‌کند
+        unique_together = ['term', 'document']
+
+    def __str__(self):
+        return f"{self.term} → {self.document_id}"
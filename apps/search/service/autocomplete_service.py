@@ -0,0 +1,325 @@
+import logging
+import threading
+import time
+from urllib.parse import quote
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Count, Q
+from django.urls import reverse
+from utils import bump_cache_version, get_cache_version
+from apps.product.models import Brand, Category, Product
+from ..models import PopularSearch
+from .normalizer_service import TextNormalizer
+
+logger = logging.getLogger(__name__)
+
+
+class AutocompleteIndex:
+    """
+    ایندکس درون حافظه پیشنهادهای جستجو (محصولات، دسته‌بندی‌ها، برندها و جستجوهای پرطرفدار)
+
+    برای هر پیشوند کلمات عنوان‌های یکسان شده (TextNormalizer) و هر نوع، یک آرایه از ورودی‌ها
+    به ترتیب امتیاز (فروش و امتیازهای محصول، تعداد محصولات دسته/برند، تعداد جستجو) ساخته
+    می‌شود؛ پاسخ هر نوع از ابتدای کوتاه‌ترین آرایه واژه‌های عبارت خوانده می‌شود و با پر شدن
+    سهم آن نوع متوقف می‌شود (هر واژه عبارت باید پیشوند یکی از کلمات عنوان باشد). پاسخ هیچ
+    رفت و برگشتی به دیتابیس ندارد.
+
+    - ساخت کامل در ترد پس‌زمینه (مثل ProductBitmapIndex)؛ تا آماده شدن، view از دیتابیس جواب می‌دهد
+    - تغییر محصول/برند/دسته با refresh_* به‌صورت افزایشی و copy-on-write (فقط آرایه‌های
+      پیشوندهای تغییر کرده) اعمال می‌شود
+    - پروسس‌های دیگر (وب و ورکر) با نسخه مشترک در کش redis (CACHES) باخبر می‌شوند؛ ترتیب فروش و جستجوهای پرطرفدار
+      با ساخت دوره‌ای بروز می‌شوند
+    """
+
+    VERSION_NAME = 'search_autocomplete_index'
+    REBUILD_INTERVAL = 60 * 10     # ساخت مجدد دوره‌ای (ثانیه)
+    MIN_REBUILD_GAP = 30           # حداقل فاصله دو ساخت پشت سر هم
+    VERSION_CHECK_INTERVAL = 5     # فاصله بررسی نسخه مشترک در کش
+
+    KEYWORD_LIMIT = 1000
+    # واژه‌های کوتاه‌تر فقط روی کلمات ورودی‌ها بررسی می‌شوند؛ پیشوندهای بلندتر از کلمات برش خورده
+    MIN_PREFIX_LENGTH = 2
+    MAX_PREFIX_LENGTH = 12
+    RECENT_SALES_WEIGHT = 3
+    CLICK_WEIGHT = 2
+    # حداکثر پیشنهاد هر نوع، به ترتیب نمایش
+    LIMITS = {'product': 5, 'category': 5, 'brand': 5, 'keyword': 3}
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._state = None
+        self._building = False
+        self._built_at = 0
+        self._version = None
+        self._version_checked_at = 0
+
+    # ========================
+    # خواندن داده‌ها
+    # ========================
+    @staticmethod
+    def _entry(kind, title, url, image, score):
+        return {
+            'type': kind,
+            'title': title,
+            'url': url,
+            'image': default_storage.url(image) if image else None,
+            'score': score,
+            'words': tuple(dict.fromkeys(
+                TextNormalizer.TOKEN_PATTERN.findall(TextNormalizer.normalize(title))
+            )),
+        }
+
+    @staticmethod
+    def _load_products(product_ids=None):
+        queryset = Product.objects.filter(isActive=True)
+        if product_ids is not None:
+            queryset = queryset.filter(pk__in=product_ids)
+        rows = queryset.values_list(
+            'id', 'title', 'slug', 'mainImage',
+            'salesStats__unitsSold', 'salesStats__unitsSold30d', 'reviewSummary__totalRatings'
+        )
+        return {
+            ('product', product_id): AutocompleteIndex._entry(
+                'product', title, reverse('product:product_detail', kwargs={'slug': slug}), image,
+                (sold_30d or 0) * AutocompleteIndex.RECENT_SALES_WEIGHT + (sold or 0) + (ratings or 0)
+            )
+            for product_id, title, slug, image, sold, sold_30d, ratings in rows.iterator()
+        }
+
+    @staticmethod
+    def _load_categories(category_ids=None):
+        queryset = Category.objects.filter(isActive=True)
+        if category_ids is not None:
+            queryset = queryset.filter(pk__in=category_ids)
+        return {
+            ('category', category_id): AutocompleteIndex._entry(
+                'category', title, f'/product/category/{slug}/', image, count
+            )
+            for category_id, title, slug, image, count in queryset.values_list(
+                'id', 'title', 'slug', 'image', 'subtreeProductCount'
+            )
+        }
+
+    @staticmethod
+    def _load_brands(brand_ids=None):
+        queryset = Brand.objects.filter(isActive=True)
+        if brand_ids is not None:
+            queryset = queryset.filter(pk__in=brand_ids)
+        rows = queryset.annotate(
+            productCount=Count('products', filter=Q(products__isActive=True))
+        ).values_list('id', 'title', 'slug', 'logo', 'productCount')
+        return {
+            ('brand', brand_id): AutocompleteIndex._entry('brand', title, f'/brand/{slug}/', logo, count)
+            for brand_id, title, slug, logo, count in rows
+        }
+
+    @staticmethod
+    def _load_keywords():
+        rows = PopularSearch.objects.order_by('-search_count').values_list(
+            'id', 'keyword', 'search_count', 'click_count'
+        )[:AutocompleteIndex.KEYWORD_LIMIT]
+        return {
+            ('keyword', keyword_id): AutocompleteIndex._entry(
+                'keyword', keyword, f'/search/search/?q={quote(keyword)}', None,
+                searches + clicks * AutocompleteIndex.CLICK_WEIGHT
+            )
+            for keyword_id, keyword, searches, clicks in rows
+        }
+
+    @staticmethod
+    def _rank(entries):
+        """کلید مرتب‌سازی آرایه‌ها: امتیاز نزولی"""
+        return lambda key: (-entries[key]['score'], key)
+
+    @staticmethod
+    def _prefixes(entry):
+        return {
+            word[:length]
+            for word in entry['words']
+            for length in range(AutocompleteIndex.MIN_PREFIX_LENGTH,
+                                min(len(word), AutocompleteIndex.MAX_PREFIX_LENGTH) + 1)
+        }
+
+    @staticmethod
+    def _build_state(entries):
+        postings = {}
+        for key in sorted(entries, key=AutocompleteIndex._rank(entries)):
+            entry = entries[key]
+            for prefix in AutocompleteIndex._prefixes(entry):
+                postings.setdefault((entry['type'], prefix), []).append(key)
+        return {'entries': entries, 'postings': postings}
+
+    # ========================
+    # ساخت کامل
+    # ========================
+    def rebuild(self):
+        """ساخت کامل ایندکس (همزمان)؛ خواننده‌ها تا پایان کار از نسخه قبلی استفاده می‌کنند"""
+        version = get_cache_version(self.VERSION_NAME)
+        started = time.monotonic()
+        entries = {
+            **self._load_products(), **self._load_categories(),
+            **self._load_brands(), **self._load_keywords(),
+        }
+        state = self._build_state(entries)
+        with self._lock:
+            self._state = state
+            self._version = version
+            self._built_at = time.monotonic()
+            self._version_checked_at = self._built_at
+        logger.info(
+            'Search autocomplete index rebuilt: %s entries, %s prefixes in %.3fs',
+            len(entries), len(state['postings']), time.monotonic() - started
+        )
+        return state
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception('Search autocomplete index rebuild failed')
+        finally:
+            with self._lock:
+                self._building = False
+            connection.close()
+
+    # ========================
+    # تازگی ایندکس
+    # ========================
+    def _is_stale(self, now):
+        if now - self._built_at >= self.REBUILD_INTERVAL:
+            return True
+        if now - self._version_checked_at >= self.VERSION_CHECK_INTERVAL:
+            self._version_checked_at = now
+            return get_cache_version(self.VERSION_NAME) != self._version
+        return False
+
+    def ensure_fresh(self):
+        """
+        شروع ساخت پس‌زمینه در صورت نبود/کهنگی ایندکس
+        خروجی: آیا ایندکس (حتی نسخه کمی قدیمی) آماده استفاده است
+        """
+        now = time.monotonic()
+        with self._lock:
+            ready = self._state is not None
+            need_build = not ready or (
+                now - self._built_at >= self.MIN_REBUILD_GAP and self._is_stale(now)
+            )
+            if need_build and not self._building:
+                self._building = True
+                threading.Thread(
+                    target=self._rebuild_in_background,
+                    name='search-autocomplete-index',
+                    daemon=True
+                ).start()
+        return ready
+
+    @property
+    def is_ready(self):
+        return self._state is not None
+
+    # ========================
+    # بروزرسانی افزایشی
+    # ========================
+    def _refresh(self, kind, ids, loader):
+        """
+        جایگزینی ورودی‌های یک نوع در ایندکس همین پروسس و اطلاع به پروسس‌های دیگر
+        (ورودی‌های غیرفعال/حذف شده از ایندکس خارج می‌شوند)
+        """
+        ids = set(ids)
+        if not ids:
+            return
+
+        with self._lock:
+            ready = self._state is not None
+        if ready:
+            fresh = loader(ids)
+            keys = {(kind, item_id) for item_id in ids}
+            with self._lock:
+                # خواننده‌ها همچنان وضعیت قبلی را می‌بینند تا جایگزینی کامل شود
+                state = self._state
+                entries = {key: entry for key, entry in state['entries'].items() if key not in keys}
+                entries.update(fresh)
+                added = {}
+                for key, entry in fresh.items():
+                    for prefix in self._prefixes(entry):
+                        added.setdefault((kind, prefix), []).append(key)
+                affected = set(added)
+                for key in keys:
+                    if key in state['entries']:
+                        affected.update((kind, prefix) for prefix in self._prefixes(state['entries'][key]))
+                postings = dict(state['postings'])
+                rank = self._rank(entries)
+                for posting_key in affected:
+                    items = [key for key in postings.get(posting_key, ()) if key not in keys]
+                    items.extend(added.get(posting_key, ()))
+                    if items:
+                        postings[posting_key] = sorted(items, key=rank)
+                    else:
+                        postings.pop(posting_key, None)
+                self._state = {'entries': entries, 'postings': postings}
+
+        version = bump_cache_version(self.VERSION_NAME)
+        with self._lock:
+            # تغییر همین پروسس اعمال شده است؛ نیازی به ساخت مجدد نیست
+            if ready and self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def refresh_products(self, product_ids):
+        self._refresh('product', product_ids, self._load_products)
+
+    def refresh_categories(self, category_ids):
+        self._refresh('category', category_ids, self._load_categories)
+
+    def refresh_brands(self, brand_ids):
+        self._refresh('brand', brand_ids, self._load_brands)
+
+    def invalidate(self):
+        """کهنه اعلام کردن ایندکس همه پروسس‌ها (ساخت مجدد در درخواست بعدی)"""
+        bump_cache_version(self.VERSION_NAME)
+        with self._lock:
+            self._built_at = 0
+
+    # ========================
+    # پیشنهادها
+    # ========================
+    def suggest(self, query, limits=None):
+        """
+        پیشنهادهای یک عبارت از حافظه: [{'type', 'title', 'url', 'image'}]
+        به ترتیب نوع (LIMITS) و در هر نوع به ترتیب امتیاز
+        """
+        state = self._state
+        tokens = list(dict.fromkeys(TextNormalizer.tokenize(query)))
+        if state is None or not tokens:
+            return []
+
+        entries, postings = state['entries'], state['postings']
+        lookups = [token for token in tokens if len(token) >= self.MIN_PREFIX_LENGTH]
+        if not lookups:
+            return []
+
+        suggestions = []
+        for kind, limit in (limits or self.LIMITS).items():
+            candidates = [
+                (postings.get((kind, token[:self.MAX_PREFIX_LENGTH]), ()), token) for token in lookups
+            ]
+            # پیمایش کوتاه‌ترین آرایه؛ بقیه واژه‌ها روی کلمات همان ورودی بررسی می‌شوند
+            keys, driver = min(candidates, key=lambda item: len(item[0]))
+            checks = [
+                token for token in tokens
+                if token != driver or len(token) > self.MAX_PREFIX_LENGTH
+            ]
+            found = 0
+            for key in keys:
+                entry = entries[key]
+                if all(any(word.startswith(token) for word in entry['words']) for token in checks):
+                    suggestions.append({
+                        'type': kind, 'title': entry['title'], 'url': entry['url'], 'image': entry['image'],
+                    })
+                    found += 1
+                    if found == limit:
+                        break
+        return suggestions
+
+
+# نمونه مشترک هر پروسس
+autocomplete_index = AutocompleteIndex()
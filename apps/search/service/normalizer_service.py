@@ -0,0 +1,85 @@
+import html
+import re
+import unicodedata
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+
+class TextNormalizer:
+    """
+    یکسان‌سازی متن فارسی/عربی برای ایندکس و عبارت جستجو (هر دو سمت دقیقاً با همین توابع)
+
+    - حروف عربی به فارسی (ي ى ئ → ی، ك → ک، ة ۀ → ه، أ إ آ ٱ → ا، ؤ → و) و حالت‌های نمایشی (NFKC)
+    - ارقام فارسی و عربی به لاتین
+    - حذف اعراب، تنوین، تطویل (ـ) و نویسه‌های کنترلی جهت متن
+    - نیم‌فاصله مثل فاصله؛ پسوند جدا نوشته شده (کتاب ها / کتاب‌ها) به کلمه قبل می‌چسبد
+    - ریشه‌یابی سبک: حذف پسوندهای جمع و صفت عالی (ها، های، هایی، ترین)
+    """
+
+    CHARACTER_MAP = str.maketrans({
+        **{character: 'ی' for character in 'يىئ'},
+        'ك': 'ک',
+        'ة': 'ه', 'ۀ': 'ه',
+        **{character: 'ا' for character in 'أإآٱ'},
+        'ؤ': 'و',
+        **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+        **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+        # اعراب، تنوین، همزه و الف کوچک روی حرف و تطویل
+        **{chr(code): None for code in range(0x064B, 0x0660)},
+        'ٰ': None, 'ـ': None,
+        # نیم‌فاصله و نویسه‌های بدون عرض
+        '‌': ' ', '​': None, '‍': None, '‎': None, '‏': None, '﻿': None,
+    })
+    TOKEN_PATTERN = re.compile(r'\w+')
+    # به ترتیب طول (اول بلندترین)
+    SUFFIXES = ('هایی', 'ترین', 'های', 'ها')
+    MIN_STEM_LENGTH = 3
+    TERM_MAX_LENGTH = 64
+
+    @staticmethod
+    def normalize(text):
+        """متن یکسان شده (بدون HTML، حروف کوچک، فاصله‌های تکی) بدون ریشه‌یابی"""
+        if not text:
+            return ''
+        text = html.unescape(strip_tags(str(text)))
+        text = unicodedata.normalize('NFKC', text).translate(TextNormalizer.CHARACTER_MAP).lower()
+        return ' '.join(text.split())
+
+    @staticmethod
+    def stem(token):
+        """حذف یک پسوند رایج اگر ریشه حداقل MIN_STEM_LENGTH حرف بماند"""
+        for suffix in TextNormalizer.SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= TextNormalizer.MIN_STEM_LENGTH:
+                return token[:-len(suffix)]
+        return token
+
+    @staticmethod
+    def tokenize(text):
+        """واژه‌های ریشه‌یابی شده متن (ورودی ایندکس و عبارت جستجو)"""
+        tokens = []
+        for token in TextNormalizer.TOKEN_PATTERN.findall(TextNormalizer.normalize(text)):
+            if token in TextNormalizer.SUFFIXES and tokens:
+                # پسوند جدا نوشته شده: کلمه قبل خودش ریشه است
+                continue
+            if len(token) > 1 or token.isdigit():
+                tokens.append(TextNormalizer.stem(token)[:TextNormalizer.TERM_MAX_LENGTH])
+        return tokens
+
+    @staticmethod
+    def search_text(*texts):
+        """متن قابل جستجوی ذخیره شده کنار مدل (واژه‌های یکسان شده با فاصله)"""
+        return ' '.join(token for text in texts for token in TextNormalizer.tokenize(text))
+
+    @staticmethod
+    def match_q(field, query):
+        """
+        شرط جستجو روی ستون متن یکسان شده (search_text): همه واژه‌های عبارت باید در متن باشند
+        عبارت بدون واژه معتبر: شرطی که هیچ ردیفی را برنمی‌گرداند
+        """
+        tokens = TextNormalizer.tokenize(query)
+        if not tokens:
+            return Q(pk__in=[])
+        condition = Q()
+        for token in dict.fromkeys(tokens):
+            condition &= Q(**{f'{field}__contains': token})
+        return condition
@@ -0,0 +1,163 @@
+import hashlib
+import time
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.main.service.counter_buffer_service import CounterBuffer
+from utils import get_client_ip
+from ..models import PopularSearch
+
+class SearchCounterService:
+    """
+    شمارنده‌های جستجو و کلیک PopularSearch با بافر در کش (write-behind)
+
+    - هر افزایش فقط چند دستور کش است و به دیتابیس نمی‌رود (CounterBuffer با سطل‌های
+      BUCKET_SECONDS ثانیه‌ای و هش کلیدواژه به عنوان عضو)
+    - flush سطل‌های بسته شده را با یک UPDATE گروهی F() برای هر مقدار افزایش و یک
+      bulk_create برای کلیدواژه‌های جدید ثبت می‌کند (تسک دوره‌ای و اولین درخواست هر سطل)
+    - حروف تایپ شده در پیشنهادها (ما، ماس، ماسک) شمرده نمی‌شوند: فقط آخرین عبارت هر کاربر وقتی
+      عبارت بعدی ادامه آن نباشد یا بیش از DEBOUNCE_SECONDS بعد بیاید یک جستجو حساب می‌شود
+    - تکرار یک عبارت توسط همان کاربر در REPEAT_WINDOW (صفحه‌بندی، مرتب‌سازی) یک بار شمرده می‌شود
+    """
+
+    PREFIX = 'search_counter'
+    KINDS = ('search', 'click')
+    BUCKET_SECONDS = 60
+    KEY_TIMEOUT = 60 * 60          # نگهداری بافر اگر flush عقب بیفتد
+    FLUSH_LOCK_TIMEOUT = 60
+    REPEAT_WINDOW = 60 * 10
+    DEBOUNCE_SECONDS = 3
+    TYPING_TIMEOUT = 60 * 30
+    KEYWORD_MAX_LENGTH = 100
+
+    # ========================
+    # کلیدها
+    # ========================
+    @staticmethod
+    def keyword(query):
+        """شکل ذخیره کلیدواژه (فاصله‌های تکی، حروف کوچک)"""
+        return ' '.join(str(query or '').split()).lower()[:SearchCounterService.KEYWORD_MAX_LENGTH]
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _client(request):
+        """شناسه کاربر بدون خواندن session (آی‌پی و مرورگر)"""
+        return SearchCounterService._digest(
+            f'{get_client_ip(request)}|{request.META.get("HTTP_USER_AGENT", "")}'
+        )[:16]
+
+    # ========================
+    # ثبت در بافر
+    # ========================
+    @staticmethod
+    def add(kind, keyword, amount=1):
+        """افزودن به شمارنده search/click یک کلیدواژه در سطل جاری"""
+        keyword = SearchCounterService.keyword(keyword)
+        if keyword:
+            search_counter_buffer.add(kind, SearchCounterService._digest(keyword), amount, value=keyword)
+
+    @staticmethod
+    def _count_search(client, keyword):
+        """یک جستجو برای هر کاربر و عبارت در REPEAT_WINDOW"""
+        seen = f'{SearchCounterService.PREFIX}:seen:{client}:{SearchCounterService._digest(keyword)}'
+        if cache.add(seen, 1, SearchCounterService.REPEAT_WINDOW):
+            SearchCounterService.add('search', keyword)
+
+    @staticmethod
+    def record_typing(request, query):
+        """
+        عبارت در حال تایپ (پیشنهادهای جستجو): عبارت قبلی همان کاربر فقط وقتی شمرده می‌شود
+        که این عبارت ادامه/اصلاح آن نباشد یا مکث بیشتر از DEBOUNCE_SECONDS بوده باشد
+        """
+        keyword = SearchCounterService.keyword(query)
+        if not keyword:
+            return
+        client = SearchCounterService._client(request)
+        key = f'{SearchCounterService.PREFIX}:typing:{client}'
+        now = time.time()
+        pending = cache.get(key)
+        if pending:
+            previous, typed_at = pending
+            related = keyword.startswith(previous) or previous.startswith(keyword)
+            if previous != keyword and (not related or now - typed_at > SearchCounterService.DEBOUNCE_SECONDS):
+                SearchCounterService._count_search(client, previous)
+        cache.set(key, (keyword, now), SearchCounterService.TYPING_TIMEOUT)
+
+    @staticmethod
+    def record_search(request, query):
+        """جستجوی ثبت شده (صفحه نتایج)؛ عبارت در حال تایپ مرتبط با آن دیگر شمرده نمی‌شود"""
+        keyword = SearchCounterService.keyword(query)
+        if not keyword:
+            return
+        client = SearchCounterService._client(request)
+        key = f'{SearchCounterService.PREFIX}:typing:{client}'
+        pending = cache.get(key)
+        if pending:
+            previous = pending[0]
+            if not (keyword.startswith(previous) or previous.startswith(keyword)):
+                SearchCounterService._count_search(client, previous)
+            cache.delete(key)
+        SearchCounterService._count_search(client, keyword)
+
+    @staticmethod
+    def record_click(query):
+        """کلیک روی یکی از پیشنهادهای یک عبارت"""
+        SearchCounterService.add('click', query)
+
+    # ========================
+    # ثبت در دیتابیس
+    # ========================
+    @staticmethod
+    def apply(increments, now=None):
+        """
+        ثبت افزایش‌ها: {keyword: (searches, clicks)}
+        یک UPDATE با F() برای هر مقدار افزایش مشترک و یک bulk_create برای کلیدواژه‌های جدید
+        """
+        increments = {keyword: counts for keyword, counts in increments.items() if any(counts)}
+        if not increments:
+            return 0
+        now = now or timezone.now()
+        with transaction.atomic():
+            existing = {
+                keyword.lower(): pk
+                for keyword, pk in PopularSearch.objects.filter(
+                    keyword__in=list(increments)
+                ).values_list('keyword', 'pk')
+            }
+            groups = defaultdict(list)
+            for keyword, counts in increments.items():
+                if keyword in existing:
+                    groups[counts].append(existing[keyword])
+            for (searches, clicks), ids in groups.items():
+                # last_searched دستی: update() فیلد auto_now را مقداردهی نمی‌کند
+                updates = {'search_count': F('search_count') + searches, 'last_searched': now} if searches else {}
+                if clicks:
+                    updates['click_count'] = F('click_count') + clicks
+                PopularSearch.objects.filter(pk__in=ids).update(**updates)
+            # ردیف‌های همزمان ساخته شده (یکتایی keyword) نادیده گرفته می‌شوند
+            PopularSearch.objects.bulk_create([
+                PopularSearch(keyword=keyword, search_count=max(searches, 1), click_count=clicks)
+                for keyword, (searches, clicks) in increments.items() if keyword not in existing
+            ], ignore_conflicts=True)
+        return len(increments)
+
+    @staticmethod
+    def flush(now=None):
+        """
+        ثبت سطل‌های بسته شده در دیتابیس (سطل جاری و قبلی که ممکن است هنوز نوشته شوند نه)
+        خروجی: تعداد کلیدواژه‌های ثبت شده
+        """
+        return search_counter_buffer.flush(now)
+
+
+search_counter_buffer = CounterBuffer(
+    SearchCounterService.PREFIX, SearchCounterService.KINDS, SearchCounterService.apply,
+    bucket_seconds=SearchCounterService.BUCKET_SECONDS,
+    key_timeout=SearchCounterService.KEY_TIMEOUT,
+    flush_lock_timeout=SearchCounterService.FLUSH_LOCK_TIMEOUT,
+)
@@ -0,0 +1,238 @@
+import logging
+import math
+from collections import Counter, defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from utils import bump_cache_version, get_cache_version
+from apps.product.models import Product
+from ..models import SearchDocument, SearchTerm
+from .normalizer_service import TextNormalizer
+
+logger = logging.getLogger(__name__)
+
+
+class SearchIndexService:
+    """
+    ایندکس معکوس جستجوی محصولات فعال (SearchDocument / SearchTerm) با رتبه‌بندی BM25
+
+    متن هر محصول (عنوان، برند، عنوان دسته‌بندی‌ها، slug، توضیح کوتاه و توضیحات بدون HTML)
+    به واژه تبدیل و تکرار هر واژه با وزن فیلد آن جمع می‌شود (BM25F ساده). جستجو یک کوئری
+    روی ستون term است (به جای icontains روی کل جدول محصولات) و امتیازدهی در پایتون انجام
+    می‌شود؛ محصولاتی که واژه‌های بیشتری از عبارت جستجو را دارند اول می‌آیند.
+    ایندکس با سیگنال‌های محصول/برند/دسته‌بندی و دستور rebuild_search_index بروز می‌شود.
+    """
+
+    CACHE_NAME = 'search_index'
+    FIELD_WEIGHTS = {
+        'title': 4,
+        'brand': 3,
+        'category': 2,
+        'slug': 1,
+        'shortDescription': 1,
+        'description': 1,
+    }
+    K1 = 1.2
+    B = 0.75
+    # امتیاز واژه‌هایی که فقط با پیشوند آخرین کلمه عبارت منطبق‌اند (کلمه در حال تایپ)
+    PREFIX_FACTOR = 0.6
+    MIN_PREFIX_LENGTH = 2
+    MAX_PREFIX_TERMS = 50
+    MAX_RESULTS = 1000
+    BATCH_SIZE = 500
+    STATS_TIMEOUT = 60 * 60
+
+    # ========================
+    # متن و واژه‌ها
+    # ========================
+    @staticmethod
+    def tokenize(text):
+        """واژه‌های یکسان شده یک متن (TextNormalizer؛ برای سند و عبارت جستجو یکی است)"""
+        return TextNormalizer.tokenize(text)
+
+    @staticmethod
+    def _documents(product_ids):
+        """{product_id: (Counter تکرار وزن‌دار واژه‌ها, طول وزن‌دار)} برای محصولات فعال"""
+        rows = Product.objects.filter(pk__in=product_ids, isActive=True).values_list(
+            'id', 'title', 'slug', 'shortDescription', 'description', 'brand__title'
+        )
+        categories = defaultdict(list)
+        for product_id, title in Product.category.through.objects.filter(
+            product_id__in=product_ids
+        ).values_list('product_id', 'category__title'):
+            categories[product_id].append(title)
+
+        weights = SearchIndexService.FIELD_WEIGHTS
+        documents = {}
+        for product_id, title, slug, short_description, description, brand in rows:
+            fields = {
+                'title': title,
+                'brand': brand,
+                'category': ' '.join(categories[product_id]),
+                'slug': slug.replace('-', ' ') if slug else '',
+                'shortDescription': short_description,
+                'description': description,
+            }
+            counts, length = Counter(), 0
+            for field, text in fields.items():
+                tokens = SearchIndexService.tokenize(text)
+                length += weights[field] * len(tokens)
+                for token in tokens:
+                    counts[token] += weights[field]
+            documents[product_id] = (counts, length)
+        return documents
+
+    # ========================
+    # بروزرسانی ایندکس
+    # ========================
+    @staticmethod
+    def refresh_many(product_ids):
+        """
+        بازسازی سند جستجوی چند محصول (محصولات غیرفعال/حذف شده از ایندکس خارج می‌شوند)
+        خروجی: تعداد اسناد ساخته/بروز شده
+        """
+        product_ids = list(set(product_ids))
+        total = 0
+        for start in range(0, len(product_ids), SearchIndexService.BATCH_SIZE):
+            total += SearchIndexService._refresh_batch(product_ids[start:start + SearchIndexService.BATCH_SIZE])
+        if product_ids:
+            bump_cache_version(SearchIndexService.CACHE_NAME)
+        return total
+
+    @staticmethod
+    def _refresh_batch(product_ids):
+        documents = SearchIndexService._documents(product_ids)
+        now = timezone.now()
+        with transaction.atomic():
+            SearchDocument.objects.filter(
+                product_id__in=set(product_ids) - set(documents)
+            ).delete()
+            SearchTerm.objects.filter(document_id__in=documents).delete()
+
+            existing = {
+                document.pk: document
+                for document in SearchDocument.objects.filter(product_id__in=documents)
+            }
+            to_create, to_update = [], []
+            for product_id, (counts, length) in documents.items():
+                document = existing.get(product_id)
+                if document is None:
+                    to_create.append(SearchDocument(product_id=product_id, length=length))
+                else:
+                    # updatedAt دستی: bulk_update فیلد auto_now را مقداردهی نمی‌کند
+                    document.length, document.updatedAt = length, now
+                    to_update.append(document)
+            SearchDocument.objects.bulk_create(to_create)
+            SearchDocument.objects.bulk_update(to_update, ['length', 'updatedAt'])
+            SearchTerm.objects.bulk_create([
+                SearchTerm(term=term, document_id=product_id, frequency=frequency)
+                for product_id, (counts, length) in documents.items()
+                for term, frequency in counts.items()
+            ], batch_size=1000)
+        return len(documents)
+
+    @staticmethod
+    def refresh_brand(brand_id):
+        """تغییر عنوان برند: بروزرسانی محصولات آن"""
+        return SearchIndexService.refresh_many(
+            Product.objects.filter(brand_id=brand_id).values_list('pk', flat=True)
+        )
+
+    @staticmethod
+    def refresh_category(category_id):
+        """تغییر عنوان دسته‌بندی: بروزرسانی محصولات مستقیم آن"""
+        return SearchIndexService.refresh_many(
+            Product.category.through.objects.filter(category_id=category_id).values_list('product_id', flat=True)
+        )
+
+    @staticmethod
+    def rebuild():
+        """ساخت کامل ایندکس به صورت دسته‌ای (کلید شناسه)؛ خروجی: تعداد اسناد"""
+        total, last_id = 0, 0
+        while True:
+            product_ids = list(
+                Product.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', flat=True)[:SearchIndexService.BATCH_SIZE]
+            )
+            if not product_ids:
+                break
+            total += SearchIndexService._refresh_batch(product_ids)
+            last_id = product_ids[-1]
+        # اسناد محصولاتی که دیگر وجود ندارند با حذف آبشاری پاک شده‌اند
+        bump_cache_version(SearchIndexService.CACHE_NAME)
+        logger.info('Search index rebuilt: %s documents', total)
+        return total
+
+    # ========================
+    # جستجو و رتبه‌بندی
+    # ========================
+    @staticmethod
+    def stats():
+        """تعداد اسناد و میانگین طول (کش شده تا تغییر بعدی ایندکس)"""
+        version = get_cache_version(SearchIndexService.CACHE_NAME)
+
+        def compute():
+            row = SearchDocument.objects.aggregate(count=Count('pk'), total=Sum('length'))
+            count = row['count'] or 0
+            return {'count': count, 'avgdl': (row['total'] or 0) / count if count else 0}
+
+        return cache.get_or_set(f'search_index_stats:{version}', compute, SearchIndexService.STATS_TIMEOUT)
+
+    @staticmethod
+    def _expand(tokens, prefix):
+        """{واژه عبارت: {واژه ایندکس: ضریب}}؛ آخرین واژه با پیشوند هم گسترش داده می‌شود"""
+        expansions = {token: {token: 1.0} for token in tokens}
+        last = tokens[-1]
+        if prefix and len(last) >= SearchIndexService.MIN_PREFIX_LENGTH:
+            terms = SearchTerm.objects.filter(term__startswith=last).exclude(term=last).order_by(
+                'term'
+            ).values_list('term', flat=True).distinct()[:SearchIndexService.MAX_PREFIX_TERMS]
+            for term in terms:
+                expansions[last][term] = SearchIndexService.PREFIX_FACTOR
+        return expansions
+
+    @staticmethod
+    def search(query, limit=None, prefix=True):
+        """
+        شناسه محصولات منطبق به ترتیب رتبه: اول تعداد واژه‌های منطبق عبارت، بعد امتیاز BM25
+        """
+        tokens = list(dict.fromkeys(SearchIndexService.tokenize(query)))
+        if not tokens:
+            return []
+
+        expansions = SearchIndexService._expand(tokens, prefix)
+        postings = defaultdict(list)
+        for term, document_id, frequency, length in SearchTerm.objects.filter(
+            term__in={term for terms in expansions.values() for term in terms}
+        ).values_list('term', 'document_id', 'frequency', 'document__length'):
+            postings[term].append((document_id, frequency, length))
+        if not postings:
+            return []
+
+        stats = SearchIndexService.stats()
+        count, avgdl = max(stats['count'], 1), stats['avgdl'] or 1
+        k1, b = SearchIndexService.K1, SearchIndexService.B
+        scores, matched = defaultdict(float), defaultdict(set)
+        for token, terms in expansions.items():
+            for term, factor in terms.items():
+                rows = postings.get(term)
+                if not rows:
+                    continue
+                idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for document_id, frequency, length in rows:
+                    scores[document_id] += factor * idf * frequency * (k1 + 1) / (
+                        frequency + k1 * (1 - b + b * length / avgdl)
+                    )
+                    matched[document_id].add(token)
+
+        ranked = sorted(scores, key=lambda document_id: (
+            -len(matched[document_id]), -scores[document_id], document_id
+        ))
+        return ranked[:limit or SearchIndexService.MAX_RESULTS]
+
+    @staticmethod
+    def in_rank_order(queryset, ranked_ids):
+        """اشیای queryset به ترتیب ranked_ids"""
+        position = {product_id: index for index, product_id in enumerate(ranked_ids)}
+        return sorted(queryset, key=lambda obj: position.get(obj.pk, len(position)))
@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from apps.product.models import Brand, Category, Product
+from .service.autocomplete_service import autocomplete_index
+from .service.search_index_service import SearchIndexService
+
+
+# ========================
+# بروز نگه داشتن ایندکس جستجو (SearchDocument / SearchTerm)
+# ========================
+@receiver(post_save, sender=Product)
+def refresh_product_search_document(sender, instance, **kwargs):
+    """ثبت/ویرایش محصول (در حذف، سند با حذف آبشاری پاک می‌شود)"""
+    product_id = instance.pk
+    transaction.on_commit(lambda: SearchIndexService.refresh_many([product_id]))
+
+
+@receiver(post_save, sender=Brand)
+def refresh_brand_search_documents(sender, instance, created, **kwargs):
+    """عنوان برند جزو متن محصولات آن است"""
+    if created:
+        return
+    brand_id = instance.pk
+    transaction.on_commit(lambda: SearchIndexService.refresh_brand(brand_id))
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_search_documents(sender, instance, created, **kwargs):
+    """عنوان دسته‌بندی جزو متن محصولات آن است"""
+    if created:
+        return
+    category_id = instance.pk
+    transaction.on_commit(lambda: SearchIndexService.refresh_category(category_id))
+
+
+@receiver(m2m_changed, sender=Product.category.through)
+def refresh_product_category_search_documents(sender, instance, action, reverse, pk_set, **kwargs):
+    """تغییر دسته‌بندی‌های محصول (از سمت محصول یا از سمت دسته)"""
+    if reverse and action == 'pre_clear':
+        # محصولات قبلی دسته قبل از clear نگه داشته می‌شوند
+        instance._search_cleared_products = list(
+            sender.objects.filter(category_id=instance.pk).values_list('product_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        product_ids = list(pk_set or getattr(instance, '_search_cleared_products', []))
+    else:
+        product_ids = [instance.pk]
+    transaction.on_commit(lambda: SearchIndexService.refresh_many(product_ids))
+
+
+# ========================
+# بروزرسانی افزایشی ایندکس پیشنهادهای جستجو (درون حافظه)
+# ========================
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_autocomplete(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: autocomplete_index.refresh_products([product_id]))
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def refresh_brand_autocomplete(sender, instance, **kwargs):
+    brand_id = instance.pk
+    transaction.on_commit(lambda: autocomplete_index.refresh_brands([brand_id]))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_category_autocomplete(sender, instance, **kwargs):
+    category_id = instance.pk
+    transaction.on_commit(lambda: autocomplete_index.refresh_categories([category_id]))
@@ -0,0 +1,18 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_search_counters():
+    """
+    ثبت شمارنده‌های جستجو و کلیک بافر شده در کش در جدول PopularSearch
+    (به صورت دوره‌ای از CELERY_BEAT_SCHEDULE اجرا می‌شود)
+    """
+    from apps.search.service.search_counter_service import SearchCounterService
+
+    count = SearchCounterService.flush()
+    if count:
+        logger.info(f"شمارنده {count} کلیدواژه جستجو ثبت شد")
+    return count
@@ -1,3 +1,87 @@
+from django.core.cache import cache
+from django.db.models import Q
 from django.test import TestCase
+from apps.product.models import Brand, Product
+from .service.normalizer_service import TextNormalizer
+from .service.search_index_service import SearchIndexService
 
-# Create your tests here.
+
+# ========================
+# یکسان‌سازی متن فارسی
+# ========================
+class TextNormalizerTest(TestCase):
+
+    def test_normalize(self):
+        for text, expected in (
+            ('كتاب علي', 'کتاب علی'),                       # حروف عربی
+            ('۱۲۳ و ٤٥٦', '123 و 456'),                     # ارقام فارسی و عربی
+            ('مُحَمَّد', 'محمد'),                             # اعراب
+            ('کـــتاب', 'کتاب'),                             # تطویل
+            ('أحمد مؤمن آب', 'احمد مومن اب'),
+            ('<p>ماسک&nbsp;N95</p>  سه\u200cلایه', 'ماسک n95 سه لایه'),
+            ('ﻻ', 'لا'),                                    # حالت نمایشی (NFKC)
+        ):
+            self.assertEqual(TextNormalizer.normalize(text), expected, text)
+        self.assertEqual(TextNormalizer.normalize(None), '')
+
+    def test_tokenize(self):
+        # پسوند چسبیده، با نیم‌فاصله یا جدا نوشته شده یک واژه می‌سازد
+        for text in ('کتابها', 'کتاب‌ها', 'کتاب ها', 'كتابهاي'):
+            self.assertEqual(TextNormalizer.tokenize(text), ['کتاب'], text)
+        # ریشه کوتاه‌تر از MIN_STEM_LENGTH: پسوند حذف نمی‌شود
+        self.assertEqual(TextNormalizer.tokenize('بهترین'), ['بهترین'])
+        self.assertEqual(TextNormalizer.tokenize('سریع‌ترین ماسک‌های'), ['سریع', 'ماسک'])
+        # کلمه تک حرفی حذف، عدد تک رقمی نگه داشته می‌شود
+        self.assertEqual(TextNormalizer.tokenize('و 3 قرص'), ['3', 'قرص'])
+
+    def test_match_q(self):
+        self.assertEqual(str(TextNormalizer.match_q('search_text', 'و')), str(Q(pk__in=[])))
+        condition = TextNormalizer.match_q('search_text', 'ماسك ماسک‌ها')
+        self.assertEqual(condition.children, [('search_text__contains', 'ماسک')])
+
+
+# ========================
+# ایندکس جستجو و رتبه‌بندی BM25
+# ========================
+class SearchIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(title='پزشکی پارس', slug='pars')
+
+        def create(slug, title, description='', **fields):
+            return Product.objects.create(title=title, slug=slug, shortDescription='-', description=description,
+                                          mainImage='product.jpg', **fields)
+
+        cls.mask = create('mask', 'ماسک سه لایه')
+        cls.medical_mask = create('medical-mask', 'ماسک‌های جراحی', brand=brand)
+        cls.gloves = create('gloves', 'دستکش لاتکس', '<p>مناسب استفاده همراه ماسک</p>')
+        cls.inactive = create('old-mask', 'ماسک قدیمی', isActive=False)
+
+    def setUp(self):
+        cache.clear()
+        SearchIndexService.rebuild()
+
+    def test_field_weights(self):
+        ranked = SearchIndexService.search('ماسک')
+        self.assertEqual(set(ranked[:2]), {self.mask.pk, self.medical_mask.pk})
+        # فقط در توضیحات (وزن کمتر)؛ محصول غیرفعال در ایندکس نیست
+        self.assertEqual(ranked[2:], [self.gloves.pk])
+
+    def test_matched_terms_first(self):
+        # دو واژه منطبق (عنوان و برند) قبل از محصولات با یک واژه منطبق
+        self.assertEqual(SearchIndexService.search('ماسک پزشکی')[0], self.medical_mask.pk)
+        self.assertEqual(SearchIndexService.search('لاتکس ماسک')[0], self.gloves.pk)
+
+    def test_prefix_and_normalized_query(self):
+        # کلمه آخر در حال تایپ با پیشوند منطبق می‌شود؛ حروف عربی و جمع مثل متن ایندکس یکسان می‌شوند
+        self.assertEqual(SearchIndexService.search('دستک'), [self.gloves.pk])
+        self.assertEqual(SearchIndexService.search('دستک', prefix=False), [])
+        self.assertEqual(SearchIndexService.search('ماسك جراحي'), SearchIndexService.search('ماسک جراحی'))
+        self.assertEqual(SearchIndexService.search('ماسک ها جراحی')[0], self.medical_mask.pk)
+
+    def test_refresh_removes_inactive(self):
+        Product.objects.filter(pk=self.gloves.pk).update(isActive=False)
+        SearchIndexService.refresh_many([self.gloves.pk])
+        self.assertNotIn(self.gloves.pk, SearchIndexService.search('ماسک'))
+        self.assertEqual(SearchIndexService.stats()['count'], 2)
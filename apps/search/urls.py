@@ -9,6 +9,7 @@ urlpatterns = [
 
     path('api/search/suggestions/', views.search_suggestions, name='search_suggestions'),
     path('api/search/popular/', views.popular_searches, name='popular_searches'),
+    path('api/search/click/', views.increment_click, name='increment_click'),
     path('search/', views.search_results, name='search_results'),
 
 ]
\ No newline at end of file
@@ -2,18 +2,20 @@
 
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.db.models import (
-    Q, OuterRef, Subquery, Min, Max, F, Value
-)
+from django.db.models import Min, Max
 from django.core.paginator import Paginator
 from django.utils import timezone
-from django.db.models.expressions import ExpressionWrapper
-from django.db.models.fields import PositiveIntegerField
-from django.db.models.functions import Coalesce, Floor
 
-from apps.product.models import Product, Category, Brand, ProductSaleType
-from apps.discount.models import DiscountBasket
+from apps.product.models import Product, Category, Brand
+from apps.product.service.listing_service import ListingService
+from apps.product.service.pricing_service import PricingService
+from apps.product.pagination import KeysetPaginator, get_keyset_sort, use_keyset
+from apps.product.service.facet_service import FacetService
 from apps.search.models import PopularSearch
+from apps.search.service.autocomplete_service import autocomplete_index
+from apps.search.service.normalizer_service import TextNormalizer
+from apps.search.service.search_counter_service import SearchCounterService
+from apps.search.service.search_index_service import SearchIndexService
 
 
 # ======================================================
@@ -80,28 +82,26 @@ def search_suggestions(request):
     if is_malicious_query(query):
         return JsonResponse({'suggestions': [], 'blocked': True})
 
-    # ذخیره یا افزایش تعداد جستجو
-    popular_search, created = PopularSearch.objects.get_or_create(
-        keyword__iexact=query,
-        defaults={'keyword': query}
-    )
-    if not created:
-        popular_search.search_count += 1
-        popular_search.save()
+    # شمارش با تأخیر در کش (حروف پشت سر هم یک جستجو حساب می‌شوند)
+    SearchCounterService.record_typing(request, query)
 
-    product_suggestions = Product.objects.filter(
-        Q(title__icontains=query) |
-        Q(shortDescription__icontains=query),
-        isActive=True
-    ).distinct()[:5]
+    # پاسخ از ایندکس درون حافظه بدون دیتابیس؛ تا ساخته شدن ایندکس از مسیر دیتابیس
+    if autocomplete_index.ensure_fresh():
+        return JsonResponse({'suggestions': autocomplete_index.suggest(query)})
+
+    # محصولات از ایندکس جستجو به ترتیب رتبه (کلمه آخر به عنوان پیشوند)
+    ranked_ids = SearchIndexService.search(query, limit=5)
+    product_suggestions = SearchIndexService.in_rank_order(
+        Product.objects.filter(pk__in=ranked_ids, isActive=True), ranked_ids
+    )
 
     category_suggestions = Category.objects.filter(
-        title__icontains=query,
+        TextNormalizer.match_q('searchTitle', query),
         isActive=True
     ).distinct()[:5]
 
     brand_suggestions = Brand.objects.filter(
-        title__icontains=query,
+        TextNormalizer.match_q('searchTitle', query),
         isActive=True
     ).distinct()[:5]
 
@@ -152,14 +152,9 @@ def popular_searches(request):
 
 
 def increment_click(request):
-    query = request.GET.get('q', '')
-    if query:
-        popular_search, _ = PopularSearch.objects.get_or_create(
-            keyword__iexact=query,
-            defaults={'keyword': query}
-        )
-        popular_search.click_count += 1
-        popular_search.save()
+    query = request.GET.get('q', '').strip()
+    if query and not is_malicious_query(query):
+        SearchCounterService.record_click(query)
 
     return JsonResponse({'status': 'success'})
 
@@ -187,85 +182,70 @@ def search_results(request):
         })
 
     if query:
-        popular_search, created = PopularSearch.objects.get_or_create(
-            keyword__iexact=query,
-            defaults={'keyword': query}
-        )
-        if not created:
-            popular_search.search_count += 1
-            popular_search.save()
-
-    products_qs = Product.objects.filter(
-        Q(title__icontains=query) |
-        Q(shortDescription__icontains=query) |
-        Q(description__icontains=query),
-        isActive=True
-    ).distinct()
+        SearchCounterService.record_search(request, query)
 
-    price_subquery = ProductSaleType.objects.filter(
-        product=OuterRef('pk'),
-        isActive=True
-    ).order_by('price').values('price')[:1]
-
-    products_qs = products_qs.annotate(
-        price=Subquery(price_subquery)
-    ).filter(price__isnull=False)
-
-    now = timezone.now()
-    discount_subquery = DiscountBasket.objects.filter(
-        isActive=True,
-        startDate__lte=now,
-        endDate__gte=now,
-        discountOfBasket__product=OuterRef('pk')
-    ).order_by('-discount').values('discount')[:1]
-
-    products_qs = products_qs.annotate(
-        discount_percent=Subquery(discount_subquery),
-        final_price=ExpressionWrapper(
-            Floor(
-                F('price') * (100 - Coalesce(Subquery(discount_subquery), Value(0))) / Value(100)
-            ),
-            output_field=PositiveIntegerField()
-        )
-    )
+    # شناسه محصولات منطبق به ترتیب رتبه BM25 از ایندکس جستجو (بدون icontains روی جدول محصولات)
+    ranked_ids = SearchIndexService.search(query) if query else None
+    products_qs = Product.objects.filter(isActive=True)
+    if ranked_ids is not None:
+        products_qs = products_qs.filter(pk__in=ranked_ids)
+    products_qs = products_qs.distinct()
 
-    categories = Category.objects.filter(
-        title__icontains=query,
-        isActive=True
-    ).distinct()
+    # قیمت پایه، تخفیف فعال و قیمت نهایی از جدول ProductPricing
+    products_qs = PricingService.annotate_listing(products_qs)
 
-    brands = Brand.objects.filter(
-        title__icontains=query,
-        isActive=True
-    ).distinct()
+    # عنوان یکسان شده (همان نرمال‌سازی ایندکس محصولات)
+    categories = Category.objects.filter(isActive=True)
+    brands = Brand.objects.filter(isActive=True)
+    if query:
+        categories = categories.filter(TextNormalizer.match_q('searchTitle', query))
+        brands = brands.filter(TextNormalizer.match_q('searchTitle', query))
+    categories = categories.distinct()
+    brands = brands.distinct()
 
     price_min = request.GET.get('price_min')
     price_max = request.GET.get('price_max')
 
-    if price_min:
-        products_qs = products_qs.filter(price__gte=int(price_min))
-    if price_max:
-        products_qs = products_qs.filter(price__lte=int(price_max))
-
     if request.GET.get('available'):
         products_qs = products_qs.filter(saleTypes__isActive=True)
 
+    category_filter = request.GET.get('category')
+    selected_category = Category.objects.filter(slug=category_filter).first() if category_filter else None
+
     brand_filter = request.GET.get('brand')
-    if brand_filter:
-        products_qs = products_qs.filter(brand__slug=brand_filter)
+    selected_brand = Brand.objects.filter(slug=brand_filter).first() if brand_filter else None
+
+    # تعداد محصولات هر دسته/برند/بازه قیمت با اعمال بقیه فیلترها (facet)
+    facets = FacetService.build(
+        products_qs,
+        brand_ids={selected_brand.id} if selected_brand else set(),
+        category_ids={selected_category.id} if selected_category else set(),
+        price_min=FacetService.parse_int(price_min),
+        price_max=FacetService.parse_int(price_max),
+    )
 
-    category_filter = request.GET.get('category')
     if category_filter:
         products_qs = products_qs.filter(category__slug=category_filter)
 
-    sort = request.GET.get('sort', '1')
+    if price_min:
+        products_qs = products_qs.filter(price__gte=int(price_min))
+    if price_max:
+        products_qs = products_qs.filter(price__lte=int(price_max))
+
+    if brand_filter:
+        products_qs = products_qs.filter(brand__slug=brand_filter)
+
+    # با عبارت جستجو پیش‌فرض مرتب‌سازی بر اساس میزان ارتباط است
+    sort = request.GET.get('sort', '0' if query else '1')
+    by_relevance = ranked_ids is not None and sort in ['0', 'relevance']
 
     if sort in ['3', 'cheap']:
         products_qs = products_qs.order_by('price')
     elif sort in ['2', 'expensive']:
         products_qs = products_qs.order_by('-price')
     elif sort in ['5', 'popular']:
-        products_qs = products_qs.order_by('?')
+        # امتیاز محبوبیت از پیش محاسبه شده (PopularityService)؛ id ترتیب را پایدار می‌کند
+        products_qs = products_qs.order_by('-popularityScore', '-id')
     else:
         products_qs = products_qs.order_by('-createdAt')
 
@@ -277,15 +257,27 @@ def search_results(request):
     min_price = price_stats['min_price'] or 0
     max_price = price_stats['max_price'] or 0
 
-    paginator = Paginator(products_qs, 20)
-    page = request.GET.get('page', 1)
-    products_page = paginator.get_page(page)
-
-    available_brands = Brand.objects.filter(products__in=products_qs).distinct()
-    available_categories = Category.objects.filter(products__in=products_qs).distinct()
+    # کرسری به‌صورت پیش‌فرض؛ ?page=N با Paginator
+    if by_relevance:
+        # صفحه‌بندی روی لیست رتبه‌بندی شده (بعد از اعمال فیلترها)، فقط محصولات همان صفحه خوانده می‌شوند
+        matching_ids = set(products_qs.values_list('id', flat=True))
+        paginator = Paginator([pk for pk in ranked_ids if pk in matching_ids], 20)
+        products_page = paginator.get_page(request.GET.get('page', 1))
+        page_ids = list(products_page.object_list)
+        products_page.object_list = SearchIndexService.in_rank_order(
+            products_qs.filter(pk__in=page_ids), page_ids
+        )
+    elif use_keyset(request):
+        paginator = KeysetPaginator(products_qs, 20, get_keyset_sort(sort))
+        products_page = paginator.get_page(request.GET.get('cursor'))
+    else:
+        paginator = Paginator(products_qs, 20)
+        page = request.GET.get('page', 1)
+        products_page = paginator.get_page(page)
+    ListingService.attach_to_page(products_page)
 
-    selected_brand = available_brands.filter(slug=brand_filter).first() if brand_filter else None
-    selected_category = available_categories.filter(slug=category_filter).first() if category_filter else None
+    available_brands = facets['brands']
+    available_categories = facets['categories']
 
     context = {
         'query': query,
@@ -293,6 +285,7 @@ def search_results(request):
         'categories': categories,
         'brands': brands,
         'available_brands': available_brands,
+        'price_buckets': facets['price_buckets'],
         'available_categories': available_categories,
         'selected_brand': selected_brand,
         'selected_category': selected_category,
@@ -141,6 +141,70 @@ def get_client_ip(request):
     return ip
 
 
+# ========================
+# نسخه‌بندی کش (برای باطل کردن کش بین چند پروسس)
+# ========================
+def get_cache_version(name):
+    """
+    نسخه فعلی یک فضای نام کش؛ کلیدهای کش با این نسخه ساخته می‌شوند
+    تا با bump_cache_version همه آن‌ها یکجا باطل شوند
+    """
+    from django.core.cache import cache
+
+    key = f'cache_version:{name}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def get_cache_versions(names):
+    """نسخه چند فضای نام کش با یک رفت و برگشت به کش: {name: version}"""
+    from django.core.cache import cache
+
+    keys = {f'cache_version:{name}': name for name in names}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for name in names:
+        if name not in versions:
+            versions[name] = get_cache_version(name)
+    return versions
+
+
+def bump_cache_version(name):
+    """افزایش نسخه یک فضای نام کش (مثلاً بعد از تغییر داده‌های آن)"""
+    from django.core.cache import cache
+
+    key = f'cache_version:{name}'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # کلید هنوز ساخته نشده یا از کش حذف شده است
+        cache.add(key, 1, None)
+        return cache.incr(key)
+
+
+# ========================
+# GET شرطی (ETag / Last-Modified)
+# ========================
+def build_etag(*parts):
+    """
+    ETag ضعیف از روی اجزای نسخه محتوا (تاریخ‌ها، نسخه‌های کش، کاربر و ...)
+    ضعیف است چون HTML هر بار توکن CSRF متفاوتی دارد ولی از نظر محتوا یکسان است
+    """
+    import hashlib
+
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest}"'
+
+
+def request_viewer(request):
+    """شناسه بیننده برای ETag صفحه‌هایی که هدر/منوی کاربر را رندر می‌کنند"""
+    user = getattr(request, 'user', None)
+    return f'u{user.pk}' if user is not None and user.is_authenticated else 'anon'
+
+
 
 from decimal import Decimal
 
@@ -104,6 +104,18 @@ DATABASES = {
 }
 
 
+# کش مشترک همه پروسس‌ها (وب و ورکر Celery)
+# نسخه‌های کش (utils.bump_cache_version)، بافر شمارنده‌ها و قفل‌ها باید بین پروسس‌ها
+# دیده شوند؛ کش پیش‌فرض LocMemCache برای هر پروسس جدا است
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+        'KEY_PREFIX': 'medical',
+    }
+}
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -200,6 +212,43 @@ CELERY_TIMEZONE = 'Asia/Tehran'  # منطقه زمانی خودت
 # ❗ مهم برای دیتابیس: برای هر تسک، یک اتصال جدید به دیتابیس بگیر
 CELERY_TASK_ALWAYS_EAGER = False  # مطمئن شو False هست
 
+# تسک‌های دوره‌ای (celery -A web beat)
+CELERY_BEAT_SCHEDULE = {
+    # باز و بسته شدن بازه‌های تخفیف در جدول قیمت محصولات
+    'refresh-due-pricing': {
+        'task': 'apps.product.tasks.refresh_due_pricing',
+        'schedule': 60.0,
+    },
+    # تعداد محصولات زیرشاخه‌های دسته‌بندی (منوها و پر محتواترین دسته‌ها)
+    'refresh-category-counts': {
+        'task': 'apps.product.tasks.refresh_category_counts',
+        'schedule': 60.0 * 10,
+    },
+    'refresh-sales-window': {
+        'task': 'apps.product.tasks.refresh_sales_window',
+        'schedule': 60.0 * 60,
+    },
+    'rebuild-related-products': {
+        'task': 'apps.product.tasks.rebuild_related_products',
+        'schedule': 60.0 * 60 * 24,
+    },
+    # آزاد کردن رزرو موجودی سفارش‌های پرداخت نشده
+    'release-expired-reservations': {
+        'task': 'apps.product.tasks.release_expired_reservations',
+        'schedule': 60.0,
+    },
+    # امتیاز محبوبیت محصولات (فروش، بازدید، علاقه‌مندی، امتیاز و ورود از جستجو)
+    'refresh-popularity-scores': {
+        'task': 'apps.product.tasks.refresh_popularity_scores',
+        'schedule': 60.0 * 30,
+    },
+    # ثبت شمارنده‌های جستجوهای پرطرفدار از بافر کش
+    'flush-search-counters': {
+        'task': 'apps.search.tasks.flush_search_counters',
+        'schedule': 60.0,
+    },
+}
+
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'